@@ -5,13 +5,47 @@ from .error_handler import (
     ErrorHandler, 
     RateLimitHandler, 
     ErrorTracker, 
-    APIErrorHandler
+    APIErrorHandler,
+    CircuitBreaker,
+    CircuitState,
+    CircuitOpenError,
+    get_circuit_breaker,
+    ProviderError,
+    RateLimitedError,
+    QuotaExhaustedError,
+    ContextTooLongError,
+    TransientError,
+    FatalError
 )
+from .model_ranker import ModelRanker, get_model_ranker
+from .retry_budget import RetryBudget, Deadline, DeadlineExceeded, RetryAborted
+from .quota_ledger import QuotaLedger, get_quota_ledger
+from .latency_tracker import LatencyTracker, get_latency_tracker
 
 __all__ = [
     'APIHandler', 
     'ErrorHandler',
     'RateLimitHandler',
     'ErrorTracker',
-    'APIErrorHandler'
+    'APIErrorHandler',
+    'CircuitBreaker',
+    'CircuitState',
+    'CircuitOpenError',
+    'get_circuit_breaker',
+    'ModelRanker',
+    'get_model_ranker',
+    'RetryBudget',
+    'Deadline',
+    'DeadlineExceeded',
+    'RetryAborted',
+    'ProviderError',
+    'RateLimitedError',
+    'QuotaExhaustedError',
+    'ContextTooLongError',
+    'TransientError',
+    'FatalError',
+    'QuotaLedger',
+    'get_quota_ledger',
+    'LatencyTracker',
+    'get_latency_tracker'
 ] 
\ No newline at end of file
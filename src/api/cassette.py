@@ -0,0 +1,211 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from . import provider_errors
+from .provider_errors import ProviderError, TransientError, as_provider_error
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay')
+
+
+class CassetteMissError(TransientError):
+    """Request không có trong cassette khi phát lại"""
+    pass
+
+
+def request_key(provider: str, model: str, target_lang: str, text: str) -> str:
+    """Khóa của một request trong cassette (không lưu nguyên văn bản gốc)"""
+    return hashlib.sha1(f"{provider}\x00{model}\x00{target_lang}\x00{text}".encode('utf-8')).hexdigest()[:20]
+
+
+class Cassette:
+    """Ghi lại và phát lại các lần gọi model ở ranh giới provider.
+
+    Mỗi lần gọi _try_translate_with_model được ghi thành một dòng JSON (kết quả hoặc lỗi có kiểu,
+    thời gian phản hồi, token và header giới hạn). Khi phát lại, cassette được đánh chỉ mục theo khóa
+    request; cùng một request lặp lại được phát lần lượt theo thứ tự đã ghi (ví dụ 429 rồi thành công),
+    hết bản ghi thì lặp lại bản ghi cuối. Thời gian phản hồi được nhân với time_scale
+    (1 là như thật, 0.1 là nhanh gấp 10 lần, 0 là tức thì). File có đuôi .gz được nén.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', time_scale: Optional[float] = None):
+        """Khởi tạo Cassette
+
+        Args:
+            path: Đường dẫn file cassette (.jsonl hoặc .jsonl.gz)
+            mode: 'record' (gọi thật và ghi lại) hoặc 'replay' (chỉ phát lại, không gọi mạng)
+            time_scale: Hệ số thời gian khi phát lại (None để đọc từ CASSETTE_TIME_SCALE)
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Chế độ cassette không hợp lệ: {mode}")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale if time_scale is not None else float(os.getenv('CASSETTE_TIME_SCALE', '1'))
+        self._entries: Dict[str, List[Dict]] = {}
+        self._positions: Dict[str, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+        self.misses = 0
+
+        if mode == 'replay':
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def call(self, provider, model: str, target_lang: str, text: str, timeout, invoke: Callable[[], str]) -> str:
+        """Thực hiện (hoặc phát lại) một lần gọi model
+
+        Args:
+            provider: Provider thực hiện lần gọi
+            model: Tên model
+            target_lang: Ngôn ngữ đích
+            text: Văn bản cần dịch
+            timeout: Tuple (connect timeout, read timeout) của lần gọi
+            invoke: Hàm gọi model thật (chỉ dùng khi ghi)
+
+        Returns:
+            Văn bản đã dịch
+
+        Raises:
+            ProviderError: Lỗi đã ghi lại (khi phát lại) hoặc lỗi thật (khi ghi)
+        """
+        key = request_key(provider.name, model, target_lang, text)
+        if self.mode == 'replay':
+            return self._replay(provider, key, model, timeout)
+
+        self._local.quota = None
+        start_time = time.time()
+        entry = {'k': key, 'p': provider.name, 'm': model, 'n': len(text)}
+        try:
+            result = invoke()
+            entry['r'] = result
+            return result
+        except Exception as e:
+            error = as_provider_error(e, provider.name, model)
+            entry['e'] = {
+                'type': type(error).__name__, 'message': str(error)[:500],
+                'status': error.status, 'retry_after': error.retry_after,
+                'timeout': provider._is_read_timeout(error)
+            }
+            raise
+        finally:
+            entry['t'] = round(time.time() - start_time, 4)
+            if self._local.quota is not None:
+                entry['q'] = self._local.quota
+            self._write(entry)
+
+    def capture_quota(self, headers, tokens: int) -> None:
+        """Ghi nhận token và header giới hạn của lần gọi đang được ghi (gọi từ BaseProvider._record_quota)"""
+        if self.mode != 'record':
+            return
+        kept = {name.lower(): value for name, value in dict(headers or {}).items()
+                if name.lower().startswith('x-ratelimit') or name.lower() == 'retry-after'}
+        self._local.quota = {'tokens': tokens, 'headers': kept}
+
+    def close(self) -> None:
+        """Đóng file cassette đang ghi"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _replay(self, provider, key: str, model: str, timeout) -> str:
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries:
+                position = self._positions.get(key, 0)
+                entry = entries[min(position, len(entries) - 1)]
+                self._positions[key] = position + 1
+            else:
+                self.misses += 1
+        if not entries:
+            raise CassetteMissError(f"Request {key} không có trong cassette {self.path}",
+                                    provider=provider.name, model=model)
+
+        error = entry.get('e')
+        delay = entry.get('t', 0.0) * self.time_scale
+        if error is not None and error.get('timeout') and timeout is not None:
+            # Timeout đã ghi xảy ra ở read timeout của lần ghi, khi phát lại thì ở read timeout hiện tại
+            delay = min(delay, timeout[1] * self.time_scale)
+        if delay > 0:
+            time.sleep(delay)
+
+        if error is not None:
+            error_class = getattr(provider_errors, error.get('type', ''), None)
+            if not (isinstance(error_class, type) and issubclass(error_class, ProviderError)):
+                error_class = TransientError
+            replayed = error_class(error.get('message', ''), provider=provider.name, model=model,
+                                   status=error.get('status'), retry_after=error.get('retry_after'))
+            if error.get('timeout'):
+                raise replayed from TimeoutError(error.get('message', ''))
+            raise replayed
+
+        quota = entry.get('q')
+        if quota is not None:
+            provider.quota_ledger.record_usage(provider.name, model, tokens=quota.get('tokens', 0),
+                                               headers=quota.get('headers'))
+        return entry.get('r', '')
+
+    def _open(self, mode: str):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.warning(f"Không tìm thấy cassette {self.path}, mọi request sẽ báo thiếu")
+            return
+        count = 0
+        with self._open('r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = entry['k']
+                except (ValueError, KeyError, TypeError):
+                    # Dòng cuối bị ghi dở khi tiến trình ghi bị dừng
+                    continue
+                self._entries.setdefault(key, []).append(entry)
+                count += 1
+        logger.info(f"Đã nạp cassette {self.path}: {count} lần gọi, {len(self._entries)} request khác nhau")
+
+    def _write(self, entry: Dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self._open('a')
+            self._file.write(line)
+            self._file.flush()
+
+
+_shared_cassette: Optional[Cassette] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+def get_cassette() -> Optional[Cassette]:
+    """Lấy Cassette dùng chung theo cấu hình CASSETTE_MODE/CASSETTE_FILE
+
+    Returns:
+        Cassette dùng chung, None nếu không bật (CASSETTE_MODE=off hoặc không có CASSETTE_FILE)
+    """
+    global _shared_cassette, _shared_loaded
+    with _shared_lock:
+        if not _shared_loaded:
+            _shared_loaded = True
+            mode = os.getenv('CASSETTE_MODE', 'off').lower()
+            path = os.getenv('CASSETTE_FILE')
+            if mode not in MODES:
+                logger.warning(f"CASSETTE_MODE không hợp lệ: {mode}, tắt cassette")
+            elif mode != 'off' and path:
+                _shared_cassette = Cassette(path, mode)
+                logger.info(f"Cassette ở chế độ {mode}: {path}")
+        return _shared_cassette
@@ -0,0 +1,284 @@
+import os
+import time
+import logging
+import threading
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(Enum):
+    """Các trạng thái của circuit breaker"""
+    CLOSED = "closed"          # Hoạt động bình thường
+    OPEN = "open"              # Tạm ngưng, không gửi request
+    HALF_OPEN = "half_open"    # Cho phép một request thăm dò
+
+
+class CircuitOpenError(Exception):
+    """Lỗi khi tất cả các mạch của provider đều đang mở (không có request nào được gửi)"""
+
+    def __init__(self, provider: str, model: Optional[str] = None, retry_in: float = 0.0):
+        self.provider = provider
+        self.model = model
+        self.retry_in = retry_in
+        target = f"{provider}/{model}" if model else provider
+        super().__init__(f"Circuit đang mở cho {target}, thử lại sau {retry_in:.1f}s")
+
+
+class _Circuit:
+    """Trạng thái của một mạch (provider hoặc provider/model)"""
+
+    __slots__ = ('state', 'failures', 'open_until', 'probe_in_flight')
+
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+
+class CircuitBreaker:
+    """Circuit breaker dùng chung, an toàn với đa luồng, theo dõi sức khỏe ở cấp provider và model.
+
+    Khóa của mạch là (provider, model); model=None là mạch cấp provider.
+    Mọi quyết định đều là một lần tra cứu dict dưới lock nên có độ phức tạp O(1).
+    """
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        cooldown_period: Optional[float] = None,
+        model_failure_threshold: Optional[int] = None,
+        model_cooldown_period: Optional[float] = None
+    ):
+        """Khởi tạo CircuitBreaker
+
+        Args:
+            failure_threshold: Số lần lỗi liên tiếp trước khi mở mạch provider
+            cooldown_period: Thời gian (giây) mạch provider mở trước khi cho phép thăm dò
+            model_failure_threshold: Số lần lỗi liên tiếp trước khi mở mạch model
+            model_cooldown_period: Thời gian (giây) mạch model mở trước khi cho phép thăm dò
+        """
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+        self.cooldown_period = cooldown_period or float(os.getenv('CIRCUIT_COOLDOWN', '180'))
+        self.model_failure_threshold = model_failure_threshold or int(os.getenv('MODEL_CIRCUIT_FAILURE_THRESHOLD', '3'))
+        self.model_cooldown_period = model_cooldown_period or float(os.getenv('MODEL_CIRCUIT_COOLDOWN', '60'))
+
+        self._circuits: Dict[Tuple[str, Optional[str]], _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def allow_request(self, provider: str, model: Optional[str] = None) -> bool:
+        """Kiểm tra và giữ chỗ cho một request tới provider/model
+
+        Khi mạch hết thời gian mở, chỉ đúng một luồng nhận quyền gửi request thăm dò;
+        các luồng khác bị từ chối cho tới khi có kết quả thăm dò.
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+
+        Returns:
+            True nếu được phép gửi request, False nếu không
+        """
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is None or circuit.state == CircuitState.CLOSED:
+                return True
+
+            if circuit.state == CircuitState.OPEN:
+                if time.time() < circuit.open_until:
+                    return False
+                circuit.state = CircuitState.HALF_OPEN
+                circuit.probe_in_flight = True
+                logger.info(f"Circuit {self._label(provider, model)} chuyển sang half-open, gửi request thăm dò")
+                return True
+
+            # HALF_OPEN: chỉ cho phép một request thăm dò tại một thời điểm
+            if circuit.probe_in_flight:
+                return False
+            circuit.probe_in_flight = True
+            return True
+
+    def is_available(self, provider: str, model: Optional[str] = None) -> bool:
+        """Kiểm tra provider/model có thể nhận request không (không giữ chỗ thăm dò)
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+
+        Returns:
+            True nếu mạch đóng hoặc sẵn sàng thăm dò
+        """
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is None or circuit.state == CircuitState.CLOSED:
+                return True
+            if circuit.state == CircuitState.OPEN:
+                return time.time() >= circuit.open_until
+            return not circuit.probe_in_flight
+
+    def record_success(self, provider: str, model: Optional[str] = None) -> None:
+        """Ghi nhận request thành công, đóng mạch
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+        """
+        with self._lock:
+            circuit = self._circuits.pop((provider, model), None)
+        if circuit is not None and circuit.state != CircuitState.CLOSED:
+            logger.info(f"Circuit {self._label(provider, model)} đã đóng lại sau request thành công")
+
+    def record_failure(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        cooldown: Optional[float] = None,
+        trip: bool = False,
+        threshold: Optional[int] = None
+    ) -> Tuple[bool, int]:
+        """Ghi nhận request thất bại
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+            cooldown: Thời gian mở mạch (giây), None để dùng giá trị mặc định
+            trip: Mở mạch ngay lập tức (ví dụ khi bị rate limit)
+            threshold: Ngưỡng lỗi riêng cho lần ghi nhận này
+
+        Returns:
+            Tuple (mạch đang mở, số lỗi liên tiếp hiện tại)
+        """
+        if threshold is None:
+            threshold = self.failure_threshold if model is None else self.model_failure_threshold
+        if cooldown is None:
+            cooldown = self.cooldown_period if model is None else self.model_cooldown_period
+
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is None:
+                circuit = _Circuit()
+                self._circuits[(provider, model)] = circuit
+
+            circuit.failures += 1
+            # Thăm dò thất bại, vượt ngưỡng hoặc bị yêu cầu mở ngay
+            should_open = trip or circuit.state == CircuitState.HALF_OPEN or circuit.failures >= threshold
+            if should_open:
+                circuit.state = CircuitState.OPEN
+                circuit.open_until = time.time() + cooldown
+                circuit.probe_in_flight = False
+            failures = circuit.failures
+
+        if should_open:
+            logger.warning(f"Circuit {self._label(provider, model)} mở trong {cooldown:.0f}s sau {failures} lần lỗi")
+        return should_open, failures
+
+    def release(self, provider: str, model: Optional[str] = None) -> None:
+        """Trả lại quyền thăm dò khi request không được gửi đi
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+        """
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is not None:
+                circuit.probe_in_flight = False
+
+    def get_state(self, provider: str, model: Optional[str] = None) -> CircuitState:
+        """Lấy trạng thái hiện tại của mạch
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+
+        Returns:
+            Trạng thái của mạch
+        """
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is None:
+                return CircuitState.CLOSED
+            if circuit.state == CircuitState.OPEN and time.time() >= circuit.open_until:
+                return CircuitState.HALF_OPEN
+            return circuit.state
+
+    def retry_in(self, provider: str, model: Optional[str] = None) -> float:
+        """Số giây còn lại trước khi mạch cho phép thăm dò
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cấp provider)
+
+        Returns:
+            Số giây còn lại (0 nếu đã có thể gửi request)
+        """
+        with self._lock:
+            circuit = self._circuits.get((provider, model))
+            if circuit is None or circuit.state != CircuitState.OPEN:
+                return 0.0
+            return max(0.0, circuit.open_until - time.time())
+
+    def get_available(self, providers: List[str], model: Optional[str] = None) -> List[str]:
+        """Lọc danh sách các provider có mạch cho phép request
+
+        Args:
+            providers: Danh sách provider
+            model: Tên model (None cho cấp provider)
+
+        Returns:
+            Danh sách các provider khả dụng, giữ nguyên thứ tự
+        """
+        return [p for p in providers if self.is_available(p, model)]
+
+    def reset(self, provider: str, model: Optional[str] = None) -> None:
+        """Đặt lại mạch của provider/model
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None để reset provider và tất cả model của nó)
+        """
+        with self._lock:
+            if model is not None:
+                self._circuits.pop((provider, model), None)
+            else:
+                for key in [k for k in self._circuits if k[0] == provider]:
+                    del self._circuits[key]
+        logger.info(f"Đã reset circuit cho {self._label(provider, model)}")
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Lấy thông tin trạng thái của tất cả các mạch không đóng
+
+        Returns:
+            Từ điển {nhãn mạch: {state, failures, retry_in}}
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                self._label(provider, model): {
+                    'state': circuit.state.value,
+                    'failures': circuit.failures,
+                    'retry_in': max(0.0, circuit.open_until - now) if circuit.state == CircuitState.OPEN else 0.0
+                }
+                for (provider, model), circuit in self._circuits.items()
+            }
+
+    @staticmethod
+    def _label(provider: str, model: Optional[str]) -> str:
+        return f"{provider}/{model}" if model else provider
+
+
+_shared_breaker: Optional[CircuitBreaker] = None
+_shared_lock = threading.Lock()
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Lấy circuit breaker dùng chung cho toàn bộ tiến trình
+
+    Returns:
+        Đối tượng CircuitBreaker dùng chung
+    """
+    global _shared_breaker
+    with _shared_lock:
+        if _shared_breaker is None:
+            _shared_breaker = CircuitBreaker()
+        return _shared_breaker
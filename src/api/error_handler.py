@@ -6,10 +6,29 @@ from .error_interface import ErrorHandler
 from .rate_limit_handler import RateLimitHandler
 from .error_tracker import ErrorTracker
 from .api_error_handler import APIErrorHandler
+from .circuit_breaker import CircuitBreaker, CircuitState, CircuitOpenError, get_circuit_breaker
+from .provider_errors import (
+    ProviderError,
+    RateLimitedError,
+    QuotaExhaustedError,
+    ContextTooLongError,
+    TransientError,
+    FatalError
+)
 
 __all__ = [
     'ErrorHandler',
     'RateLimitHandler',
     'ErrorTracker',
-    'APIErrorHandler'
+    'APIErrorHandler',
+    'CircuitBreaker',
+    'CircuitState',
+    'CircuitOpenError',
+    'get_circuit_breaker',
+    'ProviderError',
+    'RateLimitedError',
+    'QuotaExhaustedError',
+    'ContextTooLongError',
+    'TransientError',
+    'FatalError'
 ] 
\ No newline at end of file
@@ -15,6 +15,9 @@ from .providers import (
 )
 from .error_handler import RateLimitHandler, APIErrorHandler
 from .translation_service import TranslationService
+from .circuit_breaker import get_circuit_breaker
+from .retry_budget import Deadline, DeadlineExceeded, RetryAborted
+from .provider_errors import ProviderError
 
 # Load biến môi trường
 load_dotenv()
@@ -26,6 +29,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _should_give_up(error: Exception) -> bool:
+    """Không retry khi block đã hết thời hạn, hết ngân sách retry hoặc lỗi không thể thử lại"""
+    if isinstance(error, ProviderError):
+        return not error.retryable
+    return isinstance(error, (DeadlineExceeded, RetryAborted))
+
+def _record_backoff(details: Dict) -> None:
+    """Ghi nhận lần retry của backoff vào deadline của block (nếu có)"""
+    deadline = details['kwargs'].get('deadline')
+    if deadline is not None:
+        deadline.record_retry()
+
 class APIHandler:
     """Lớp xử lý các cuộc gọi API đến các provider"""
     
@@ -41,8 +56,11 @@ class APIHandler:
         # Cấu hình provider
         self.provider_priority = os.getenv('PROVIDER_PRIORITY', 'novita,google,mistral,groq,openrouter,cerebras').split(',')
         
+        # Circuit breaker dùng chung với ConcreteProviderService
+        self.circuit_breaker = get_circuit_breaker()
+        
         # Khởi tạo Rate Limit Handler
-        self.rate_limit_handler = RateLimitHandler()
+        self.rate_limit_handler = RateLimitHandler(self.circuit_breaker)
         
         # Khởi tạo API Error Handler
         self.error_handler = APIErrorHandler()
@@ -61,7 +79,8 @@ class APIHandler:
         self.translation_service = TranslationService(
             providers=self.providers,
             rate_limit_handler=self.rate_limit_handler,
-            provider_priorities=self.provider_priority
+            provider_priorities=self.provider_priority,
+            circuit_breaker=self.circuit_breaker
         )
         
         # Log các providers đã được khởi tạo
@@ -85,16 +104,38 @@ class APIHandler:
         backoff.expo,
         Exception,
         max_tries=3,
-        max_time=30
+        max_time=30,
+        giveup=_should_give_up,
+        on_backoff=_record_backoff
     )
-    def translate(self, text: str, target_lang: str = None, provider_name: Optional[str] = None) -> Optional[str]:
-        """Dịch văn bản sử dụng provider được chỉ định, hoặc thử lần lượt các provider nếu bị lỗi."""
-        # Sử dụng TranslationService đã tách riêng
-        return self.translation_service.translate(text, target_lang, provider_name)
+    def translate(self, text: str, target_lang: str = None, provider_name: Optional[str] = None,
+                  deadline: Optional[Deadline] = None, model: Optional[str] = None,
+                  allow_chunking: bool = True, failover: bool = True) -> Optional[str]:
+        """Dịch văn bản sử dụng provider được chỉ định, hoặc thử lần lượt các provider nếu bị lỗi.
+
+        Khi có deadline, backoff chỉ retry nếu block còn thời gian và lần chạy còn ngân sách retry.
+        Khi chỉ định model, chỉ model đó của provider_name được dùng; failover=False giữ nguyên provider_name.
+        Với allow_chunking=False, văn bản dài không bị cắt thành nhiều request (dùng cho prompt JSON).
+        """
+        if deadline is not None:
+            deadline.check()
+        try:
+            # Sử dụng TranslationService đã tách riêng
+            return self.translation_service.translate(text, target_lang, provider_name, deadline=deadline, model=model,
+                                                      allow_chunking=allow_chunking, failover=failover)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # Lỗi không thể thử lại (ví dụ văn bản quá dài) được chuyển nguyên vẹn lên tầng trên
+            retryable = not isinstance(e, ProviderError) or e.retryable
+            if retryable and deadline is not None and not deadline.can_retry():
+                raise RetryAborted(str(e)) from e
+            raise
 
-    def translate_text(self, text, target_lang='vi', provider_name=None):
+    def translate_text(self, text, target_lang='vi', provider_name=None, deadline: Optional[Deadline] = None,
+                       model: Optional[str] = None):
         """
         Dịch văn bản sử dụng provider được chỉ định hoặc provider đầu tiên khả dụng.
         Wrapper cho hàm translate để tương thích với các module khác.
         """
-        return self.translate(text, target_lang, provider_name) 
\ No newline at end of file
+        return self.translate(text, target_lang, provider_name, deadline=deadline, model=model) 
\ No newline at end of file
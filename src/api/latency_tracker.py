@@ -0,0 +1,149 @@
+import os
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Theo dõi độ trễ của từng provider/model để tính timeout thích ứng.
+
+    Độ trễ được lưu ở dạng đã chuẩn hóa theo kích thước (trừ đi phần thời gian tỉ lệ với số ký tự),
+    nên cùng một phân phối dùng được cho cả block ngắn lẫn batch dài:
+        read_timeout = p99(độ trễ chuẩn hóa) * multiplier + per_1k_chars * số ký tự / 1000
+    Connect timeout được cấu hình riêng để phát hiện nhanh kết nối bị treo.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: Optional[float] = None,
+        default_read_timeout: Optional[float] = None,
+        multiplier: Optional[float] = None,
+        per_1k_chars: Optional[float] = None,
+        min_read_timeout: Optional[float] = None,
+        max_read_timeout: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        window: int = 200
+    ):
+        """Khởi tạo LatencyTracker
+
+        Args:
+            connect_timeout: Timeout kết nối (giây)
+            default_read_timeout: Timeout đọc khi chưa đủ mẫu (giây)
+            multiplier: Hệ số nhân với p99
+            per_1k_chars: Số giây cộng thêm cho mỗi 1000 ký tự đầu vào
+            min_read_timeout: Timeout đọc nhỏ nhất (giây)
+            max_read_timeout: Timeout đọc lớn nhất (giây)
+            min_samples: Số mẫu tối thiểu trước khi dùng p99
+            window: Số mẫu gần nhất được giữ lại cho mỗi provider/model
+        """
+        self.connect_timeout = connect_timeout or float(os.getenv('CONNECT_TIMEOUT', '5'))
+        self.default_read_timeout = default_read_timeout or float(os.getenv('READ_TIMEOUT', '30'))
+        self.multiplier = multiplier or float(os.getenv('TIMEOUT_MULTIPLIER', '3'))
+        self.per_1k_chars = per_1k_chars if per_1k_chars is not None else float(os.getenv('TIMEOUT_PER_1K_CHARS', '4'))
+        self.min_read_timeout = min_read_timeout or float(os.getenv('MIN_READ_TIMEOUT', '3'))
+        self.max_read_timeout = max_read_timeout or float(os.getenv('MAX_READ_TIMEOUT', '180'))
+        self.min_samples = min_samples or int(os.getenv('LATENCY_MIN_SAMPLES', '20'))
+        self.window = window
+
+        # Khóa (provider, model); model=None gộp mọi model của provider
+        self._samples: Dict[Tuple[str, Optional[str]], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, seconds: float, chars: int = 0) -> None:
+        """Ghi nhận thời gian phản hồi của một request
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            seconds: Thời gian phản hồi (giây)
+            chars: Số ký tự đầu vào của request
+        """
+        normalized = max(0.0, seconds - self._size_term(chars))
+        with self._lock:
+            for key in ((provider, model), (provider, None)):
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = deque(maxlen=self.window)
+                    self._samples[key] = samples
+                samples.append(normalized)
+
+    def record_timeout(self, provider: str, model: str, read_timeout: float, chars: int = 0) -> None:
+        """Ghi nhận request bị timeout (dùng chính timeout làm mẫu để timeout không bị siết quá chặt)
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            read_timeout: Timeout đọc đã dùng (giây)
+            chars: Số ký tự đầu vào của request
+        """
+        self.record(provider, model, read_timeout, chars)
+
+    def percentile(self, provider: str, model: Optional[str] = None, q: float = 0.99) -> Optional[float]:
+        """Tính phân vị độ trễ chuẩn hóa
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None để gộp mọi model)
+            q: Phân vị (0-1)
+
+        Returns:
+            Độ trễ ở phân vị q, None nếu chưa đủ mẫu
+        """
+        with self._lock:
+            samples = self._samples.get((provider, model))
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def get_timeouts(self, provider: str, model: str, chars: int = 0, deadline=None) -> Tuple[float, float]:
+        """Tính timeout (connect, read) cho một request
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            chars: Số ký tự đầu vào của request
+            deadline: Thời hạn của block (timeout không vượt quá thời gian còn lại)
+
+        Returns:
+            Tuple (connect timeout, read timeout) tính bằng giây
+        """
+        p99 = self.percentile(provider, model)
+        if p99 is None:
+            # Model chưa đủ mẫu: dùng số liệu gộp của provider, rồi tới giá trị mặc định
+            p99 = self.percentile(provider)
+
+        if p99 is None:
+            read_timeout = self.default_read_timeout + self._size_term(chars)
+        else:
+            read_timeout = p99 * self.multiplier + self._size_term(chars)
+        read_timeout = min(max(read_timeout, self.min_read_timeout), self.max_read_timeout)
+        connect_timeout = self.connect_timeout
+
+        if deadline is not None:
+            remaining = max(deadline.remaining(), 1.0)
+            read_timeout = min(read_timeout, remaining)
+            connect_timeout = min(connect_timeout, remaining)
+        return connect_timeout, read_timeout
+
+    def _size_term(self, chars: int) -> float:
+        return self.per_1k_chars * chars / 1000
+
+
+_shared_tracker: Optional[LatencyTracker] = None
+_shared_lock = threading.Lock()
+
+def get_latency_tracker() -> LatencyTracker:
+    """Lấy LatencyTracker dùng chung cho toàn bộ tiến trình
+
+    Returns:
+        Đối tượng LatencyTracker dùng chung
+    """
+    global _shared_tracker
+    with _shared_lock:
+        if _shared_tracker is None:
+            _shared_tracker = LatencyTracker()
+        return _shared_tracker
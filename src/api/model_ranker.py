@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Điểm trung tính cho model chưa có dữ liệu
+NEUTRAL_SCORE = 0.5
+
+# Trạng thái học được giữa các lần chạy nằm ngoài thư mục cache dịch (xóa cache không làm mất trạng thái)
+STATE_DIR_NAME = ".subtitle_translator_state"
+
+
+def state_file(filename: str) -> str:
+    """Đường dẫn file trạng thái trong thư mục SUBTITLE_TRANSLATOR_STATE_DIR (mặc định ~/.subtitle_translator_state)"""
+    state_dir = os.getenv('SUBTITLE_TRANSLATOR_STATE_DIR') or os.path.join(os.path.expanduser("~"), STATE_DIR_NAME)
+    return os.path.join(state_dir, filename)
+
+
+class ModelRanker:
+    """Xếp hạng model của từng provider dựa trên kết quả các lần gọi trước.
+
+    Mỗi model có điểm thành công (trung bình trượt, phân rã dần về mức trung tính theo thời gian),
+    điểm cộng "dính" cho model thành công gần nhất và điểm trừ theo độ trễ trung bình.
+    Dữ liệu được lưu ra file JSON để dùng lại giữa các lần chạy.
+    """
+
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        half_life: Optional[float] = None,
+        sticky_bonus: float = 1.0,
+        latency_weight: float = 0.3,
+        latency_reference: float = 10.0,
+        smoothing: float = 0.3,
+        save_interval: float = 30.0
+    ):
+        """Khởi tạo ModelRanker
+
+        Args:
+            storage_path: Đường dẫn file lưu xếp hạng (None để dùng mặc định)
+            half_life: Chu kỳ bán rã (giây) của điểm số và điểm cộng dính
+            sticky_bonus: Điểm cộng cho model thành công gần nhất của provider
+            latency_weight: Trọng số điểm trừ theo độ trễ
+            latency_reference: Độ trễ (giây) ứng với điểm trừ tối đa
+            smoothing: Hệ số trung bình trượt cho điểm thành công và độ trễ
+            save_interval: Khoảng thời gian tối thiểu (giây) giữa hai lần ghi file
+        """
+        self.storage_path = storage_path or os.getenv('MODEL_RANKING_FILE') or state_file("model_rankings.json")
+        self.half_life = half_life or float(os.getenv('MODEL_RANKING_HALF_LIFE', '3600'))
+        self.sticky_bonus = sticky_bonus
+        self.latency_weight = latency_weight
+        self.latency_reference = latency_reference
+        self.smoothing = smoothing
+        self.save_interval = save_interval
+
+        # {provider: {model: {score, latency, updated_at}}}
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # {provider: {model, at}}
+        self._last_success: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+        self.load()
+
+    def rank(self, provider: str, models: List[str]) -> List[str]:
+        """Sắp xếp danh sách model theo độ ưu tiên học được
+
+        Args:
+            provider: Tên provider
+            models: Danh sách model theo thứ tự cấu hình
+
+        Returns:
+            Danh sách model đã sắp xếp (model chưa có dữ liệu giữ thứ tự cấu hình)
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._stats.get(provider, {})
+            last = self._last_success.get(provider)
+            priorities = {}
+            for model in models:
+                priorities[model] = self._priority(stats.get(model), last, model, now)
+
+        order = {model: i for i, model in enumerate(models)}
+        return sorted(models, key=lambda m: (-priorities[m], order[m]))
+
+    def record_success(self, provider: str, model: str, latency: float) -> None:
+        """Ghi nhận model trả kết quả thành công
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            latency: Thời gian phản hồi (giây)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._get_entry(provider, model, now)
+            entry['score'] = entry['score'] * (1 - self.smoothing) + self.smoothing
+            if entry.get('latency'):
+                entry['latency'] = entry['latency'] * (1 - self.smoothing) + latency * self.smoothing
+            else:
+                entry['latency'] = latency
+            self._last_success[provider] = {'model': model, 'at': now}
+            self._dirty = True
+        self._maybe_save()
+
+    def record_failure(self, provider: str, model: str) -> None:
+        """Ghi nhận model thất bại
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._get_entry(provider, model, now)
+            entry['score'] = entry['score'] * (1 - self.smoothing)
+            last = self._last_success.get(provider)
+            if last and last['model'] == model:
+                # Model "dính" đã lỗi, bỏ ưu tiên để model khác được thử trước
+                del self._last_success[provider]
+            self._dirty = True
+        self._maybe_save()
+
+    def get_rankings(self, provider: str) -> Dict[str, Dict[str, float]]:
+        """Lấy thông tin xếp hạng hiện tại của provider
+
+        Args:
+            provider: Tên provider
+
+        Returns:
+            Từ điển {model: {score, latency}}
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                model: {
+                    'score': self._decayed_score(entry, now),
+                    'latency': entry.get('latency', 0.0)
+                }
+                for model, entry in self._stats.get(provider, {}).items()
+            }
+
+    def load(self) -> None:
+        """Đọc dữ liệu xếp hạng từ file"""
+        if not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self._stats = data.get('models', {})
+                self._last_success = data.get('last_success', {})
+            logger.info(f"Đã tải xếp hạng model từ: {self.storage_path}")
+        except Exception as e:
+            logger.warning(f"Lỗi khi đọc xếp hạng model: {str(e)}")
+
+    def save(self) -> bool:
+        """Ghi dữ liệu xếp hạng ra file (ghi file tạm rồi đổi tên)
+
+        Returns:
+            True nếu ghi thành công, False nếu thất bại
+        """
+        with self._lock:
+            data = json.dumps({'models': self._stats, 'last_success': self._last_success})
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.storage_path) or '.', exist_ok=True)
+            tmp_path = f"{self.storage_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.storage_path)
+            return True
+        except Exception as e:
+            logger.warning(f"Lỗi khi lưu xếp hạng model: {str(e)}")
+            return False
+
+    def flush(self) -> None:
+        """Ghi dữ liệu nếu có thay đổi chưa lưu"""
+        if self._dirty:
+            self.save()
+
+    def _maybe_save(self) -> None:
+        if self._dirty and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def _get_entry(self, provider: str, model: str, now: float) -> Dict[str, float]:
+        entry = self._stats.setdefault(provider, {}).setdefault(model, {'score': NEUTRAL_SCORE})
+        # Áp dụng phân rã trước khi cập nhật để điểm cũ không lấn át kết quả mới
+        entry['score'] = self._decayed_score(entry, now)
+        entry['updated_at'] = now
+        return entry
+
+    def _decay(self, elapsed: float) -> float:
+        return 0.5 ** (max(0.0, elapsed) / self.half_life)
+
+    def _decayed_score(self, entry: Dict[str, float], now: float) -> float:
+        decay = self._decay(now - entry.get('updated_at', now))
+        return NEUTRAL_SCORE + (entry['score'] - NEUTRAL_SCORE) * decay
+
+    def _priority(self, entry: Optional[Dict[str, float]], last: Optional[Dict[str, object]], model: str, now: float) -> float:
+        if entry is None:
+            return NEUTRAL_SCORE
+
+        priority = self._decayed_score(entry, now)
+        if last and last['model'] == model:
+            priority += self.sticky_bonus * self._decay(now - last['at'])
+        latency = entry.get('latency')
+        if latency:
+            priority -= self.latency_weight * min(latency / self.latency_reference, 1.0)
+        return priority
+
+
+_shared_ranker: Optional[ModelRanker] = None
+_shared_lock = threading.Lock()
+
+def get_model_ranker() -> ModelRanker:
+    """Lấy ModelRanker dùng chung cho toàn bộ tiến trình (tự lưu khi thoát)
+
+    Returns:
+        Đối tượng ModelRanker dùng chung
+    """
+    global _shared_ranker
+    with _shared_lock:
+        if _shared_ranker is None:
+            _shared_ranker = ModelRanker()
+            atexit.register(_shared_ranker.flush)
+        return _shared_ranker
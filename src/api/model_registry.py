@@ -0,0 +1,222 @@
+import os
+import json
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Số ký tự trung bình của một token (ước lượng cho văn bản phụ đề)
+CHARS_PER_TOKEN = 4
+
+# Khả năng mặc định theo mẫu tên model (khớp chuỗi con, mẫu đầu tiên khớp được dùng):
+# (context window, số token đầu ra tối đa, giá USD/1 triệu token đầu vào, giá USD/1 triệu token đầu ra)
+DEFAULT_CAPABILITIES: List[Tuple[str, Tuple[int, int, float, float]]] = [
+    ('gemini-2.0-flash', (1048576, 8192, 0.10, 0.40)),
+    ('gemini-2.0-pro', (2097152, 8192, 1.25, 5.00)),
+    ('gemini-1.5-flash', (1048576, 8192, 0.075, 0.30)),
+    ('gemini-1.5-pro', (2097152, 8192, 1.25, 5.00)),
+    ('llama-4-maverick', (1048576, 8192, 0.17, 0.85)),
+    ('deepseek-prover', (163840, 8192, 0.70, 2.50)),
+    ('deepseek-r1-distill', (32768, 8192, 0.80, 0.80)),
+    ('deepseek', (65536, 8192, 0.40, 1.30)),
+    ('nemotron-ultra', (131072, 8192, 0.60, 1.80)),
+    ('llama-3-70b-8192', (8192, 4096, 0.59, 0.79)),
+    ('llama-3-8b-8192', (8192, 4096, 0.05, 0.08)),
+    ('llama-3.1-8b', (131072, 8192, 0.05, 0.08)),
+    ('llama-3', (131072, 8192, 0.59, 0.79)),
+    ('mixtral-8x7b', (32768, 4096, 0.24, 0.24)),
+    ('gemma-7b', (8192, 2048, 0.07, 0.07)),
+    ('gemma-3', (131072, 8192, 0.10, 0.20)),
+    ('qwen2.5-vl', (32768, 8192, 0.80, 0.80)),
+    ('qwen-2.5-72b', (32768, 8192, 0.38, 0.40)),
+    ('qwq-32b', (131072, 8192, 0.18, 0.20)),
+    ('qwen3', (40960, 8192, 0.10, 0.30)),
+    ('qwerky', (32768, 4096, 0.0, 0.0)),
+    ('glm-4-32b', (32000, 8192, 0.24, 0.24)),
+    ('midnight-rose-70b', (4096, 2048, 0.80, 0.80)),
+    ('airoboros-l2-70b', (4096, 2048, 0.50, 0.50)),
+    ('mistral-large', (131072, 8192, 2.00, 6.00)),
+    ('mistral-medium', (131072, 8192, 0.40, 2.00)),
+    ('mistral-small', (32768, 8192, 0.10, 0.30)),
+    ('mistral-nemo', (131072, 8192, 0.15, 0.15)),
+    ('open-mistral-7b', (32768, 4096, 0.25, 0.25)),
+    ('open-mixtral-8x7b', (32768, 4096, 0.70, 0.70)),
+    ('cerebras', (8192, 4096, 0.10, 0.10)),
+    ('slimstral', (8192, 4096, 0.10, 0.10)),
+]
+
+
+class ModelInfo:
+    """Khả năng của một model: context window, số token đầu ra tối đa, giá theo token"""
+
+    def __init__(self, provider: str, model: str, context_window: Optional[int] = None,
+                 max_output: Optional[int] = None, input_cost: float = 0.0, output_cost: float = 0.0):
+        """Khởi tạo ModelInfo
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            context_window: Tổng số token đầu vào + đầu ra (None nếu chưa biết)
+            max_output: Số token đầu ra tối đa (None nếu chưa biết)
+            input_cost: Giá USD cho 1 triệu token đầu vào
+            output_cost: Giá USD cho 1 triệu token đầu ra
+        """
+        self.provider = provider
+        self.model = model
+        self.context_window = context_window
+        self.max_output = max_output
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Ước lượng chi phí (USD) của một request"""
+        return (input_tokens * self.input_cost + output_tokens * self.output_cost) / 1_000_000
+
+    def __repr__(self) -> str:
+        return f"ModelInfo({self.provider}/{self.model}: context={self.context_window}, output={self.max_output})"
+
+
+class ModelRegistry:
+    """Bảng khả năng của các model dùng để chọn model trước khi gửi request.
+
+    Văn bản được ước lượng số token theo số ký tự; bản dịch được giả định dài hơn bản gốc
+    output_ratio lần. Model không vừa (đầu vào + đầu ra vượt context window, hoặc đầu ra vượt
+    giới hạn đầu ra) bị bỏ qua mà không tốn request. Model chưa có thông tin luôn được coi là vừa.
+    Có thể ghi đè/bổ sung bằng file JSON {"provider/model" hoặc "model": {"context_window": ..., ...}}.
+    """
+
+    def __init__(self, storage_path: Optional[str] = None, output_ratio: Optional[float] = None, latency_source=None):
+        """Khởi tạo ModelRegistry
+
+        Args:
+            storage_path: File JSON ghi đè khả năng model (None để đọc từ MODEL_REGISTRY_FILE)
+            output_ratio: Số token bản dịch / số token bản gốc (None để đọc từ OUTPUT_TOKEN_RATIO)
+            latency_source: ModelRanker cung cấp độ trễ quan sát được (None để dùng bản dùng chung)
+        """
+        self.storage_path = storage_path or os.getenv('MODEL_REGISTRY_FILE')
+        self.output_ratio = output_ratio or float(os.getenv('OUTPUT_TOKEN_RATIO', '1.5'))
+        self._latency_source = latency_source
+        self._overrides: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Đọc file ghi đè khả năng model (nếu có)"""
+        if not self.storage_path or not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Không đọc được file khả năng model: {str(e)}")
+            return
+        with self._lock:
+            self._overrides.update({key: value for key, value in data.items() if isinstance(value, dict)})
+
+    def register(self, provider: str, model: str, **capabilities) -> None:
+        """Ghi đè khả năng của một model
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            capabilities: context_window, max_output, input_cost, output_cost
+        """
+        with self._lock:
+            self._overrides[f"{provider}/{model}"] = capabilities
+
+    def get(self, provider: str, model: str) -> ModelInfo:
+        """Lấy khả năng của một model
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+
+        Returns:
+            ModelInfo (các giới hạn là None nếu chưa biết)
+        """
+        info = ModelInfo(provider, model)
+        for pattern, (context_window, max_output, input_cost, output_cost) in DEFAULT_CAPABILITIES:
+            if pattern in model:
+                info = ModelInfo(provider, model, context_window, max_output, input_cost, output_cost)
+                break
+        if model.endswith(':free'):
+            info.input_cost = info.output_cost = 0.0
+
+        with self._lock:
+            override = self._overrides.get(f"{provider}/{model}") or self._overrides.get(model) or {}
+        for field in ('context_window', 'max_output', 'input_cost', 'output_cost'):
+            if field in override:
+                setattr(info, field, override[field])
+        return info
+
+    def estimate_tokens(self, chars: int, prompt_chars: int = 0) -> Tuple[int, int]:
+        """Ước lượng số token của một request
+
+        Args:
+            chars: Số ký tự văn bản cần dịch
+            prompt_chars: Số ký tự của prompt hệ thống
+
+        Returns:
+            Tuple (token đầu vào, token đầu ra)
+        """
+        text_tokens = math.ceil(chars / CHARS_PER_TOKEN)
+        return text_tokens + math.ceil(prompt_chars / CHARS_PER_TOKEN), math.ceil(text_tokens * self.output_ratio)
+
+    def fits(self, provider: str, model: str, chars: int, prompt_chars: int = 0) -> bool:
+        """Kiểm tra văn bản có vừa với model không
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            chars: Số ký tự văn bản cần dịch
+            prompt_chars: Số ký tự của prompt hệ thống
+
+        Returns:
+            True nếu vừa hoặc chưa biết giới hạn của model
+        """
+        info = self.get(provider, model)
+        input_tokens, output_tokens = self.estimate_tokens(chars, prompt_chars)
+        if info.max_output is not None and output_tokens > info.max_output:
+            return False
+        if info.context_window is not None and input_tokens + output_tokens > info.context_window:
+            return False
+        return True
+
+    def fitting_models(self, provider: str, models: List[str], chars: int, prompt_chars: int = 0) -> List[str]:
+        """Lọc các model vừa với văn bản, giữ nguyên thứ tự
+
+        Args:
+            provider: Tên provider
+            models: Danh sách model
+            chars: Số ký tự văn bản cần dịch
+            prompt_chars: Số ký tự của prompt hệ thống
+
+        Returns:
+            Danh sách model vừa với văn bản
+        """
+        return [model for model in models if self.fits(provider, model, chars, prompt_chars)]
+
+    def observed_latency(self, provider: str, model: str) -> Optional[float]:
+        """Độ trễ trung bình (giây) đã quan sát được của model, None nếu chưa có dữ liệu"""
+        if self._latency_source is None:
+            from .model_ranker import get_model_ranker
+            self._latency_source = get_model_ranker()
+        return self._latency_source.get_rankings(provider).get(model, {}).get('latency')
+
+
+_shared_registry: Optional[ModelRegistry] = None
+_shared_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Lấy ModelRegistry dùng chung cho toàn bộ tiến trình
+
+    Returns:
+        Đối tượng ModelRegistry dùng chung
+    """
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = ModelRegistry()
+        return _shared_registry
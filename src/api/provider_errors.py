@@ -0,0 +1,305 @@
+import os
+import re
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+class ProviderError(Exception):
+    """Lỗi có kiểu từ provider, mang theo mã HTTP và thời gian chờ server yêu cầu"""
+
+    # Có nên thử lại cùng request (sau khi chờ) hay không
+    retryable = True
+    # Có mở mạch ngay lập tức hay không (thay vì cộng dồn tới ngưỡng)
+    trips_circuit = False
+    # Phạm vi ảnh hưởng: 'model' (chỉ model hiện tại) hoặc 'provider' (mọi model của provider)
+    scope = 'model'
+
+    def __init__(
+        self,
+        message: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        """Khởi tạo ProviderError
+
+        Args:
+            message: Thông báo lỗi
+            provider: Tên provider
+            model: Tên model
+            status: Mã trạng thái HTTP (None nếu không có)
+            retry_after: Thời gian (giây) server yêu cầu chờ trước khi thử lại
+        """
+        self.provider = provider
+        self.model = model
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(message)
+
+    @property
+    def cooldown(self) -> Optional[float]:
+        """Thời gian mở mạch: đúng thời gian server yêu cầu, hoặc mặc định theo loại lỗi"""
+        if self.retry_after is not None:
+            return self.retry_after
+        return self.default_cooldown()
+
+    def default_cooldown(self) -> Optional[float]:
+        """Thời gian mở mạch mặc định khi server không cho biết (None để dùng mặc định của breaker)"""
+        return None
+
+
+class RateLimitedError(ProviderError):
+    """Bị giới hạn tốc độ (HTTP 429), thử lại sau thời gian server yêu cầu"""
+    trips_circuit = True
+
+    def default_cooldown(self) -> Optional[float]:
+        return float(os.getenv('RATE_LIMIT_RESET_TIME', '60'))
+
+
+class QuotaExhaustedError(RateLimitedError):
+    """Hết quota hoặc hết tín dụng, cả provider không dùng được cho tới kỳ reset"""
+    retryable = False
+    scope = 'provider'
+
+    def default_cooldown(self) -> Optional[float]:
+        return float(os.getenv('QUOTA_COOLDOWN', '3600'))
+
+
+class ContextTooLongError(ProviderError):
+    """Văn bản vượt quá context của model, cần chia nhỏ thay vì thử lại"""
+    retryable = False
+
+
+class TransientError(ProviderError):
+    """Lỗi tạm thời (timeout, lỗi mạng, 5xx), có thể thử lại"""
+    pass
+
+
+class FatalError(ProviderError):
+    """Lỗi không thể khắc phục bằng cách thử lại (sai API key, model không tồn tại, request sai)"""
+    retryable = False
+    trips_circuit = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Lỗi xác thực ảnh hưởng mọi model của provider
+        if self.status in (401, 403):
+            self.scope = 'provider'
+
+    def default_cooldown(self) -> Optional[float]:
+        return float(os.getenv('FATAL_ERROR_COOLDOWN', '3600'))
+
+
+# Dấu hiệu nhận biết trong nội dung lỗi (dùng khi không có hoặc bổ sung cho mã HTTP)
+QUOTA_MARKERS = (
+    'insufficient_quota', 'exceeded your current quota', 'billing', 'insufficient credits',
+    'credit balance', 'perday', 'per day', 'daily limit'
+)
+CONTEXT_MARKERS = (
+    'context length', 'context_length', 'maximum context', 'too long', 'token limit',
+    'maximum number of tokens', 'too many tokens', 'reduce the length'
+)
+RATE_LIMIT_MARKERS = (
+    'rate limit', 'ratelimit', 'rate_limit', 'too many requests', 'limit exceeded',
+    'too frequent', 'throttled', 'slow down', 'try again later', 'resource has been exhausted'
+)
+
+_STATUS_PATTERN = re.compile(r'(?:error code|status code|status|^)\s*:?\s*([45]\d\d)\b', re.IGNORECASE)
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_RETRY_IN_PATTERN = re.compile(r'(?:retry in|retry after|try again in)\s+(\d+(?:\.\d+)?)\s*(ms|s|sec|seconds)?', re.IGNORECASE)
+_RETRY_DELAY_PATTERN = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE)
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Chuyển chuỗi thời lượng ("30", "1.5s", "6m0s", "250ms") thành số giây
+
+    Args:
+        value: Chuỗi thời lượng
+
+    Returns:
+        Số giây hoặc None nếu không đọc được
+    """
+    value = str(value).strip().lower()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def _parse_reset_value(value: str, now: float) -> Optional[float]:
+    """Đọc giá trị reset: số giây còn lại, thời điểm epoch (giây hoặc mili giây) hoặc thời lượng"""
+    seconds = parse_duration(value)
+    if seconds is None:
+        return None
+    if seconds > 1e12:
+        # Epoch mili giây (OpenRouter)
+        return max(0.0, seconds / 1000 - now)
+    if seconds > 1e9:
+        # Epoch giây
+        return max(0.0, seconds - now)
+    return seconds
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]], now: Optional[float] = None) -> Optional[float]:
+    """Đọc thời gian chờ từ header Retry-After và các header x-ratelimit-reset*
+
+    Args:
+        headers: Header của response
+        now: Thời điểm hiện tại (mặc định time.time())
+
+    Returns:
+        Số giây cần chờ hoặc None nếu server không cho biết
+    """
+    if not headers:
+        return None
+    now = time.time() if now is None else now
+    lowered = {str(k).lower(): str(v) for k, v in headers.items()}
+
+    if 'retry-after-ms' in lowered:
+        seconds = parse_duration(lowered['retry-after-ms'])
+        if seconds is not None:
+            return seconds / 1000
+
+    if 'retry-after' in lowered:
+        value = lowered['retry-after']
+        seconds = parse_duration(value)
+        if seconds is not None:
+            return seconds
+        try:
+            # Dạng HTTP-date
+            return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+        except (TypeError, ValueError):
+            pass
+
+    # x-ratelimit-reset, x-ratelimit-reset-requests, x-ratelimit-reset-tokens-minute, ...
+    resets: Dict[str, float] = {}
+    for key, value in lowered.items():
+        if key.startswith('x-ratelimit-reset'):
+            seconds = _parse_reset_value(value, now)
+            if seconds is not None:
+                resets[key[len('x-ratelimit-reset'):]] = seconds
+    if not resets:
+        return None
+
+    # Ưu tiên các giới hạn đã cạn (remaining = 0), phải chờ tới khi tất cả được reset
+    exhausted = [
+        seconds for suffix, seconds in resets.items()
+        if parse_duration(lowered.get(f'x-ratelimit-remaining{suffix}', '1')) == 0
+    ]
+    return max(exhausted) if exhausted else min(resets.values())
+
+
+def _parse_retry_from_message(message: str) -> Optional[float]:
+    """Đọc thời gian chờ ghi trong nội dung lỗi (ví dụ Gemini: "Please retry in 38.5s")"""
+    match = _RETRY_DELAY_PATTERN.search(message)
+    if match:
+        return float(match.group(1))
+    match = _RETRY_IN_PATTERN.search(message)
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if match.group(2) == 'ms' else seconds
+    return None
+
+
+def classify_http_error(
+    status: Optional[int],
+    message: str = "",
+    headers: Optional[Mapping[str, str]] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None
+) -> ProviderError:
+    """Phân loại lỗi theo mã HTTP, header và nội dung lỗi
+
+    Args:
+        status: Mã trạng thái HTTP (None nếu không có)
+        message: Nội dung lỗi
+        headers: Header của response
+        provider: Tên provider
+        model: Tên model
+
+    Returns:
+        Lỗi có kiểu tương ứng
+    """
+    text = message.lower()
+    retry_after = parse_retry_after(headers)
+    if retry_after is None:
+        retry_after = _parse_retry_from_message(message)
+    kwargs = {'provider': provider, 'model': model, 'status': status, 'retry_after': retry_after}
+
+    if status == 402 or (status in (403, 429, None) and any(m in text for m in QUOTA_MARKERS)):
+        return QuotaExhaustedError(message, **kwargs)
+    if status == 429:
+        return RateLimitedError(message, **kwargs)
+    if status == 413 or (status in (400, 422, None) and any(m in text for m in CONTEXT_MARKERS)):
+        return ContextTooLongError(message, **kwargs)
+    if status in (408, 409, 425) or (status is not None and status >= 500):
+        return TransientError(message, **kwargs)
+    if status is not None and 400 <= status < 500:
+        return FatalError(message, **kwargs)
+    if any(m in text for m in RATE_LIMIT_MARKERS):
+        return RateLimitedError(message, **kwargs)
+    return TransientError(message, **kwargs)
+
+
+def raise_for_status(response, provider: Optional[str] = None, model: Optional[str] = None) -> None:
+    """Ném lỗi có kiểu nếu response HTTP báo lỗi (thay cho response.raise_for_status())
+
+    Args:
+        response: Response HTTP (có status_code, headers, text)
+        provider: Tên provider
+        model: Tên model
+
+    Raises:
+        ProviderError: Nếu mã trạng thái >= 400
+    """
+    status = response.status_code
+    if status < 400:
+        return
+    body = getattr(response, 'text', '') or ''
+    raise classify_http_error(status, f"HTTP {status}: {body[:500]}", response.headers, provider, model)
+
+
+def as_provider_error(error: Exception, provider: Optional[str] = None, model: Optional[str] = None) -> ProviderError:
+    """Chuyển một exception bất kỳ (requests, OpenAI SDK, Google SDK, ...) thành lỗi có kiểu
+
+    Args:
+        error: Exception gốc
+        provider: Tên provider
+        model: Tên model
+
+    Returns:
+        Lỗi có kiểu (chính error nếu đã là ProviderError)
+    """
+    if isinstance(error, ProviderError):
+        return error
+
+    message = str(error)
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+
+    # OpenAI SDK: status_code; requests: response.status_code; Google SDK: code
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status is None:
+        code = getattr(error, 'code', None)
+        status = code if isinstance(code, int) and 100 <= code < 600 else None
+    if status is None:
+        match = _STATUS_PATTERN.search(message)
+        status = int(match.group(1)) if match else None
+
+    error_type = type(error).__name__.lower()
+    if status is None and ('timeout' in error_type or 'connection' in error_type):
+        typed = TransientError(message or type(error).__name__, provider=provider, model=model)
+    else:
+        typed = classify_http_error(status, message, headers, provider, model)
+    typed.__cause__ = error
+    return typed
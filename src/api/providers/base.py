@@ -1,22 +1,185 @@
 from abc import ABC, abstractmethod
+import os
+import time
 import logging
+from typing import List, Optional, Tuple
+
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from ..model_ranker import ModelRanker, get_model_ranker
+from ..retry_budget import Deadline
+from ..provider_errors import ContextTooLongError, QuotaExhaustedError, as_provider_error
+from ..quota_ledger import QuotaLedger, get_quota_ledger
+from ..latency_tracker import LatencyTracker, get_latency_tracker
+from ..model_registry import ModelRegistry, get_model_registry
+from ..cassette import Cassette, get_cassette
 
 logger = logging.getLogger(__name__)
 
 class BaseProvider(ABC):
-    def __init__(self, api_key: str):
+    # Tên dùng làm khóa trong circuit breaker và tên hiển thị trong log
+    name = "base"
+    display_name = "Base"
+    # URL gốc của API tương thích OpenAI, ghi đè bằng {NAME}_BASE_URL hoặc PROVIDER_BASE_URL (ví dụ server giả lập)
+    default_base_url = ""
+
+    def __init__(self, api_key: str, circuit_breaker: Optional[CircuitBreaker] = None,
+                 model_ranker: Optional[ModelRanker] = None, quota_ledger: Optional[QuotaLedger] = None,
+                 latency_tracker: Optional[LatencyTracker] = None, model_registry: Optional[ModelRegistry] = None,
+                 cassette: Optional[Cassette] = None):
         self.api_key = api_key
-        
+        self.models: List[str] = []
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+        self.model_ranker = model_ranker or get_model_ranker()
+        self.quota_ledger = quota_ledger or get_quota_ledger()
+        self.latency_tracker = latency_tracker or get_latency_tracker()
+        self.model_registry = model_registry or get_model_registry()
+        # Ghi lại/phát lại các lần gọi model (CASSETTE_MODE), None là gọi thật như bình thường
+        self.cassette = cassette or get_cassette()
+        self.base_url = (os.getenv(f"{self.name.upper()}_BASE_URL") or os.getenv('PROVIDER_BASE_URL')
+                         or self.default_base_url).rstrip('/')
+
+    def translate(self, text: str, target_lang: str, deadline: Optional[Deadline] = None,
+                  model: Optional[str] = None) -> str:
+        """Dịch văn bản sang ngôn ngữ đích, thử lần lượt các model có mạch đang đóng
+
+        Args:
+            model: Chỉ dùng model này (None để thử mọi model theo xếp hạng)
+        """
+        return self._translate_with_models(text, target_lang, deadline, model)
+
+    def fitting_models(self, chars: int, target_lang: str, model: Optional[str] = None) -> List[str]:
+        """Lọc các model có context đủ cho văn bản (kèm prompt hệ thống và bản dịch ước lượng)
+
+        Args:
+            chars: Số ký tự văn bản cần dịch
+            target_lang: Ngôn ngữ đích
+            model: Chỉ xét model này (None để xét mọi model)
+
+        Returns:
+            Danh sách model vừa với văn bản, theo thứ tự cấu hình
+        """
+        models = [model] if model else self.models
+        return self.model_registry.fitting_models(self.name, models, chars, len(self.get_system_prompt(target_lang)))
+
     @abstractmethod
-    def translate(self, text: str, target_lang: str) -> str:
-        """Dịch văn bản sang ngôn ngữ đích"""
+    def _try_translate_with_model(self, text: str, target_lang: str, model: str, timeout: Tuple[float, float]) -> str:
+        """Thử dịch sử dụng một model cụ thể
+
+        Args:
+            timeout: Tuple (connect timeout, read timeout) tính từ độ trễ quan sát được của model
+        """
         pass
-        
+
+    def _translate_with_models(self, text: str, target_lang: str, deadline: Optional[Deadline] = None,
+                               model: Optional[str] = None) -> str:
+        """Thử lần lượt các model theo thứ tự xếp hạng, bỏ qua model có mạch đang mở mà không tốn request nào.
+
+        Mỗi lần chuyển sang model khác sau lỗi được tính là một lần retry trong deadline của block.
+        Nếu chỉ định model, chỉ model đó được thử (dù có trong danh sách models hay không).
+        """
+        last_error = None
+        models = [model] if model else self.models
+
+        # Model không đủ context bị bỏ qua mà không tốn request; không model nào vừa thì báo ngay để chia nhỏ
+        fitting = self.fitting_models(len(text), target_lang, model)
+        if not fitting:
+            logger.warning(f"Text of {len(text)} chars does not fit any {self.display_name} model")
+            raise ContextTooLongError(f"Text of {len(text)} chars does not fit any {self.display_name} model",
+                                      provider=self.name, model=model)
+
+        if deadline is not None:
+            deadline.check()
+
+        # Model thành công gần nhất và nhanh nhất được thử trước
+        for model in self.model_ranker.rank(self.name, fitting):
+            # Model đã cạn quota theo ledger được bỏ qua mà không tốn request
+            if self.quota_ledger.is_exhausted(self.name, model):
+                continue
+            if not self.circuit_breaker.allow_request(self.name, model):
+                continue
+
+            if last_error is not None and deadline is not None and not deadline.acquire_retry():
+                # Hết thời hạn hoặc hết ngân sách retry, không thử thêm model
+                self.circuit_breaker.release(self.name, model)
+                logger.warning(f"Retry budget or deadline exhausted, stop trying {self.display_name} models")
+                break
+
+            # Timeout thích ứng theo p99 của model và kích thước văn bản, không vượt quá deadline
+            timeout = self.latency_tracker.get_timeouts(self.name, model, len(text), deadline)
+            try:
+                logger.info(f"Trying {self.display_name} API with model: {model}")
+                start_time = time.time()
+                result = self._call_model(text, target_lang, model, timeout)
+                elapsed = time.time() - start_time
+                self.circuit_breaker.record_success(self.name, model)
+                self.model_ranker.record_success(self.name, model, elapsed)
+                self.latency_tracker.record(self.name, model, elapsed, len(text))
+                return result
+            except Exception as e:
+                error = as_provider_error(e, self.name, model)
+                last_error = error
+                if self._is_read_timeout(error):
+                    # Request bị cắt ở timeout vẫn là một mẫu độ trễ, tránh siết timeout quá chặt
+                    self.latency_tracker.record_timeout(self.name, model, timeout[1], len(text))
+                
+                if isinstance(error, ContextTooLongError):
+                    # Không phải lỗi của model: trả lại quyền thăm dò để tầng trên chia nhỏ văn bản
+                    self.circuit_breaker.release(self.name, model)
+                    raise error
+                
+                # Rate limit/lỗi nghiêm trọng mở mạch model đúng thời gian server yêu cầu,
+                # các lỗi tạm thời cộng dồn tới ngưỡng
+                self.circuit_breaker.record_failure(self.name, model, cooldown=error.cooldown, trip=error.trips_circuit)
+                self.model_ranker.record_failure(self.name, model)
+                if isinstance(error, QuotaExhaustedError):
+                    # Lưu lại để các lần chạy sau bỏ qua provider ngay từ block đầu tiên
+                    self.quota_ledger.mark_exhausted(self.name, retry_after=error.cooldown)
+                
+                if error.scope == 'provider':
+                    # Hết quota hoặc sai API key: mọi model đều sẽ lỗi, dừng ngay
+                    logger.error(f"{self.display_name} failed with {type(error).__name__}: {str(error)}")
+                    raise error
+                logger.warning(f"Failed with {self.display_name} model {model}: {str(e)}, trying next model...")
+                continue
+
+        if last_error is None:
+            # Tất cả model đều đang mở mạch hoặc cạn quota, không gửi request nào
+            retry_in = min(
+                (max(self.circuit_breaker.retry_in(self.name, m), self.quota_ledger.exhausted_for(self.name, m))
+                 for m in fitting),
+                default=0.0
+            )
+            logger.warning(f"All {self.display_name} models are circuit-open, retry in {retry_in:.1f}s")
+            raise CircuitOpenError(self.name, retry_in=retry_in)
+
+        # Nếu tất cả các model đều thất bại
+        logger.error(f"All {self.display_name} models failed")
+        raise last_error
+
+    def _call_model(self, text: str, target_lang: str, model: str, timeout: Tuple[float, float]) -> str:
+        """Gọi một model, qua cassette nếu đang ghi hoặc phát lại"""
+        if self.cassette is None:
+            return self._try_translate_with_model(text, target_lang, model, timeout)
+        return self.cassette.call(self, model, target_lang, text, timeout,
+                                  lambda: self._try_translate_with_model(text, target_lang, model, timeout))
+
+    @staticmethod
+    def _is_read_timeout(error: Exception) -> bool:
+        """Kiểm tra lỗi có phải do hết thời gian đọc response không (không tính lỗi kết nối)"""
+        cause_name = type(error.__cause__ or error).__name__.lower()
+        return 'timeout' in cause_name and 'connect' not in cause_name
+
+    def _record_quota(self, model: str, headers=None, tokens: int = 0) -> None:
+        """Ghi nhận request thành công vào quota ledger, kèm các header x-ratelimit-* nếu có"""
+        self.quota_ledger.record_usage(self.name, model, tokens=tokens, headers=headers)
+        if self.cassette is not None:
+            self.cassette.capture_quota(headers, tokens)
+
     def get_system_prompt(self, target_lang: str) -> str:
         """Lấy prompt hệ thống cho việc dịch"""
         return f"""Translate the following text to {target_lang}. 
 IMPORTANT INSTRUCTIONS:
-1. Only return the translated text, without any explanations or notes
+1. Only return the translated text, without any explanations or notes (if the text asks for a JSON answer, return only that JSON)
 2. Keep the original format and timing information
 3. Keep technical terms and IT concepts in English (e.g. API, CPU, RAM, etc.)
 4. Keep certification names in English (e.g. CISP, CISM, etc.)
@@ -27,4 +190,4 @@ IMPORTANT INSTRUCTIONS:
 9. Keep commands and code snippets in English
 10. Keep all numbers and timestamps exactly as they are
 11. Keep all special characters and formatting exactly as they are
-12. Keep all line breaks and spacing exactly as they are""" 
\ No newline at end of file
+12. Keep all line breaks and spacing exactly as they are"""
@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .model_ranker import state_file
+from .provider_errors import parse_duration, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+HEADER_PREFIXES = ('x-ratelimit-limit', 'x-ratelimit-remaining', 'x-ratelimit-reset')
+
+class QuotaLedger:
+    """Sổ theo dõi quota (request và token) của từng provider/model, lưu ra đĩa giữa các lần chạy.
+
+    Mỗi khóa provider hoặc provider/model gồm:
+    - windows: các cửa sổ giới hạn học được từ header x-ratelimit-* (limit, remaining, reset_at)
+    - usage: số request/token đã dùng trong ngày (UTC)
+    - exhausted_until: thời điểm hết trạng thái cạn quota (từ lỗi QuotaExhausted)
+    """
+
+    def __init__(self, storage_path: Optional[str] = None, save_interval: float = 30.0):
+        """Khởi tạo QuotaLedger
+
+        Args:
+            storage_path: Đường dẫn file ledger (None để dùng mặc định)
+            save_interval: Khoảng thời gian tối thiểu (giây) giữa hai lần ghi file
+        """
+        self.storage_path = storage_path or os.getenv('QUOTA_LEDGER_FILE') or state_file("quota_ledger.json")
+        self.save_interval = save_interval
+
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+        self.load()
+
+    def record_usage(self, provider: str, model: Optional[str] = None, requests: int = 1, tokens: int = 0,
+                     headers: Optional[Mapping[str, str]] = None) -> None:
+        """Ghi nhận một lần gọi thành công và cập nhật các cửa sổ giới hạn từ header
+
+        Args:
+            provider: Tên provider
+            model: Tên model
+            requests: Số request đã dùng
+            tokens: Số token đã dùng
+            headers: Header của response (nếu có)
+        """
+        now = time.time()
+        with self._lock:
+            for key in self._keys(provider, model):
+                entry = self._get_entry(key, now)
+                entry['usage']['requests'] += requests
+                entry['usage']['tokens'] += tokens
+                # Ước lượng remaining giữa các lần server gửi header
+                for name, window in entry['windows'].items():
+                    if window.get('remaining') is not None:
+                        used = tokens if 'tokens' in name else requests
+                        window['remaining'] = max(0, window['remaining'] - used)
+
+            if headers:
+                self._update_windows(self._get_entry(self._key(provider, model), now), headers, now)
+            self._dirty = True
+        self._maybe_save()
+
+    def mark_exhausted(self, provider: str, model: Optional[str] = None, retry_after: Optional[float] = None) -> None:
+        """Đánh dấu provider/model đã cạn quota
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cả provider)
+            retry_after: Số giây tới khi quota được reset (None để dùng QUOTA_COOLDOWN)
+        """
+        if retry_after is None:
+            retry_after = float(os.getenv('QUOTA_COOLDOWN', '3600'))
+        now = time.time()
+        with self._lock:
+            entry = self._get_entry(self._key(provider, model), now)
+            entry['exhausted_until'] = max(entry.get('exhausted_until', 0.0), now + retry_after)
+            self._dirty = True
+        # Trạng thái cạn quota cần được lưu ngay để lần chạy sau nhìn thấy
+        self.save()
+        logger.warning(f"Quota của {self._key(provider, model)} đã cạn, reset sau {retry_after:.0f}s")
+
+    def exhausted_for(self, provider: str, model: Optional[str] = None) -> float:
+        """Số giây còn lại tới khi provider/model hết trạng thái cạn quota
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None chỉ xét cấp provider)
+
+        Returns:
+            Số giây còn lại (0 nếu còn quota)
+        """
+        now = time.time()
+        with self._lock:
+            return max(self._wait_locked(key, now) for key in self._keys(provider, model))
+
+    def is_exhausted(self, provider: str, model: Optional[str] = None) -> bool:
+        """Kiểm tra provider/model có đang cạn quota không
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None chỉ xét cấp provider)
+
+        Returns:
+            True nếu đang cạn quota
+        """
+        return self.exhausted_for(provider, model) > 0
+
+    def remaining(self, provider: str, model: Optional[str] = None, kind: str = 'requests') -> Optional[int]:
+        """Ước lượng quota còn lại (nhỏ nhất trong các cửa sổ đã biết)
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None chỉ xét cấp provider)
+            kind: 'requests' hoặc 'tokens'
+
+        Returns:
+            Số request/token còn lại, None nếu chưa biết giới hạn
+        """
+        if self.is_exhausted(provider, model):
+            return 0
+
+        now = time.time()
+        candidates = []
+        with self._lock:
+            for key in self._keys(provider, model):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                self._roll_windows(entry, now)
+                for name, window in entry['windows'].items():
+                    window_kind = 'tokens' if 'tokens' in name else 'requests'
+                    if window_kind == kind and window.get('remaining') is not None:
+                        candidates.append(window['remaining'])
+
+            # Giới hạn theo ngày cấu hình thủ công (ví dụ GOOGLE_DAILY_REQUESTS) cho provider không gửi header
+            daily_limit = os.getenv(f"{provider.upper()}_DAILY_{kind.upper()}")
+            if daily_limit:
+                entry = self._entries.get(provider)
+                used = self._current_usage(entry, now)[kind] if entry else 0
+                candidates.append(max(0, int(daily_limit) - used))
+
+        return min(candidates) if candidates else None
+
+    def get_usage(self, provider: str, model: Optional[str] = None) -> Dict[str, int]:
+        """Lấy số request/token đã dùng trong ngày
+
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cả provider)
+
+        Returns:
+            Từ điển {requests, tokens}
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(provider, model))
+            return self._current_usage(entry, time.time()) if entry else {'requests': 0, 'tokens': 0}
+
+    def exhausted_entries(self) -> List[Tuple[str, Optional[str], float]]:
+        """Liệt kê các provider/model đang cạn quota
+
+        Returns:
+            Danh sách (provider, model, số giây còn lại)
+        """
+        with self._lock:
+            keys = list(self._entries)
+        result = []
+        for key in keys:
+            provider, _, model = key.partition('/')
+            model = model or None
+            # Chỉ xét đúng khóa này, không gộp với cấp provider
+            with self._lock:
+                wait = self._wait_locked(key, time.time())
+            if wait > 0:
+                result.append((provider, model, wait))
+        return result
+
+    def apply_to(self, circuit_breaker) -> int:
+        """Mở mạch cho các provider/model đang cạn quota (dùng khi khởi động)
+
+        Args:
+            circuit_breaker: Circuit breaker dùng chung
+
+        Returns:
+            Số mạch đã mở
+        """
+        entries = self.exhausted_entries()
+        for provider, model, wait in entries:
+            circuit_breaker.record_failure(provider, model, cooldown=wait, trip=True)
+        if entries:
+            logger.info(f"Bỏ qua {len(entries)} provider/model đã cạn quota theo ledger")
+        return len(entries)
+
+    def load(self) -> None:
+        """Đọc ledger từ file"""
+        if not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self._entries = data.get('entries', {})
+            logger.info(f"Đã tải quota ledger từ: {self.storage_path}")
+        except Exception as e:
+            logger.warning(f"Lỗi khi đọc quota ledger: {str(e)}")
+
+    def save(self) -> bool:
+        """Ghi ledger ra file (ghi file tạm rồi đổi tên)
+
+        Returns:
+            True nếu ghi thành công, False nếu thất bại
+        """
+        with self._lock:
+            data = json.dumps({'entries': self._entries})
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.storage_path) or '.', exist_ok=True)
+            tmp_path = f"{self.storage_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.storage_path)
+            return True
+        except Exception as e:
+            logger.warning(f"Lỗi khi lưu quota ledger: {str(e)}")
+            return False
+
+    def flush(self) -> None:
+        """Ghi ledger nếu có thay đổi chưa lưu"""
+        if self._dirty:
+            self.save()
+
+    def _maybe_save(self) -> None:
+        if self._dirty and time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    @staticmethod
+    def _key(provider: str, model: Optional[str]) -> str:
+        return f"{provider}/{model}" if model else provider
+
+    def _keys(self, provider: str, model: Optional[str]) -> List[str]:
+        return [provider, self._key(provider, model)] if model else [provider]
+
+    def _wait_locked(self, key: str, now: float) -> float:
+        """Số giây tới khi khóa hết cạn quota (gọi khi đang giữ lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        waits = [entry.get('exhausted_until', 0.0) - now]
+        waits += [w['reset_at'] - now for w in entry['windows'].values()
+                  if w.get('remaining') == 0 and w.get('reset_at')]
+
+        # Đã dùng hết giới hạn ngày cấu hình thủ công: chờ tới đầu ngày UTC kế tiếp
+        if '/' not in key:
+            usage = self._current_usage(entry, now)
+            for kind in ('requests', 'tokens'):
+                daily_limit = os.getenv(f"{key.upper()}_DAILY_{kind.upper()}")
+                if daily_limit and usage[kind] >= int(daily_limit):
+                    waits.append(86400 - now % 86400)
+        return max(0.0, max(waits))
+
+    def _get_entry(self, key: str, now: float) -> Dict:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {'windows': {}, 'usage': {'day': self._today(now), 'requests': 0, 'tokens': 0}, 'exhausted_until': 0.0}
+            self._entries[key] = entry
+        if entry['usage'].get('day') != self._today(now):
+            entry['usage'] = {'day': self._today(now), 'requests': 0, 'tokens': 0}
+        self._roll_windows(entry, now)
+        return entry
+
+    def _current_usage(self, entry: Dict, now: float) -> Dict[str, int]:
+        usage = entry['usage']
+        if usage.get('day') != self._today(now):
+            return {'requests': 0, 'tokens': 0}
+        return {'requests': usage['requests'], 'tokens': usage['tokens']}
+
+    @staticmethod
+    def _roll_windows(entry: Dict, now: float) -> None:
+        # Cửa sổ đã qua thời điểm reset được khôi phục về giới hạn đầy đủ
+        for window in entry['windows'].values():
+            if window.get('reset_at') and window['reset_at'] <= now:
+                window['remaining'] = window.get('limit')
+                window['reset_at'] = None
+
+    @staticmethod
+    def _today(now: float) -> str:
+        return datetime.fromtimestamp(now, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def _update_windows(self, entry: Dict, headers: Mapping[str, str], now: float) -> None:
+        """Cập nhật cửa sổ giới hạn từ header x-ratelimit-limit/remaining/reset[-<tên cửa sổ>]"""
+        for key, value in headers.items():
+            key = str(key).lower()
+            prefix = next((p for p in HEADER_PREFIXES if key.startswith(p)), None)
+            if prefix is None:
+                continue
+            name = key[len(prefix):].lstrip('-') or 'requests'
+            window = entry['windows'].setdefault(name, {'limit': None, 'remaining': None, 'reset_at': None})
+            if prefix == 'x-ratelimit-reset':
+                seconds = parse_retry_after({key: value}, now=now)
+                if seconds is not None:
+                    window['reset_at'] = now + seconds
+            else:
+                number = parse_duration(value)
+                if number is not None:
+                    window['limit' if prefix == 'x-ratelimit-limit' else 'remaining'] = int(number)
+
+
+_shared_ledger: Optional[QuotaLedger] = None
+_shared_lock = threading.Lock()
+
+def get_quota_ledger() -> QuotaLedger:
+    """Lấy QuotaLedger dùng chung cho toàn bộ tiến trình (tự lưu khi thoát)
+
+    Returns:
+        Đối tượng QuotaLedger dùng chung
+    """
+    global _shared_ledger
+    with _shared_lock:
+        if _shared_ledger is None:
+            _shared_ledger = QuotaLedger()
+            atexit.register(_shared_ledger.flush)
+        return _shared_ledger
@@ -1,19 +1,34 @@
 import os
 import time
 import logging
+import threading
 from typing import Dict, Optional, List
 from .error_interface import ErrorHandler
+from .circuit_breaker import CircuitBreaker, get_circuit_breaker
+from .provider_errors import RateLimitedError, QuotaExhaustedError, as_provider_error
+from .quota_ledger import QuotaLedger, get_quota_ledger
 
 logger = logging.getLogger(__name__)
 
 class RateLimitHandler(ErrorHandler):
     """Lớp xử lý lỗi giới hạn tốc độ (rate limit)"""
     
-    def __init__(self):
-        """Khởi tạo RateLimitHandler"""
-        # Theo dõi trạng thái rate limit của các provider
-        self.rate_limited_providers = {}
-        self.reset_times = {}
+    def __init__(self, circuit_breaker: Optional[CircuitBreaker] = None, quota_ledger: Optional[QuotaLedger] = None):
+        """Khởi tạo RateLimitHandler
+        
+        Args:
+            circuit_breaker: Circuit breaker dùng chung (None để dùng bản toàn cục)
+            quota_ledger: Quota ledger lưu trên đĩa (None để dùng bản toàn cục)
+        """
+        # Trạng thái rate limit của các provider được lưu trong circuit breaker
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+        
+        # Quota đã dùng ở các lần chạy trước: provider/model đã cạn bị bỏ qua ngay từ block đầu tiên
+        self.quota_ledger = quota_ledger or get_quota_ledger()
+        self.quota_ledger.apply_to(self.circuit_breaker)
+        
+        # Lock bảo vệ bộ đếm RPM khi được gọi từ nhiều luồng
+        self._lock = threading.Lock()
         
         # Cấu hình từ biến môi trường hoặc giá trị mặc định
         self.default_reset_time = int(os.getenv('RATE_LIMIT_RESET_TIME', '60'))  # 60 giây
@@ -27,19 +42,6 @@ class RateLimitHandler(ErrorHandler):
             'openrouter': {'rpm': int(os.getenv('OPENROUTER_RPM', '1000')), 'current': 0, 'last_reset': time.time()},
             'cerebras': {'rpm': int(os.getenv('CEREBRAS_RPM', '1000')), 'current': 0, 'last_reset': time.time()}
         }
-        
-        # Từ khóa để phát hiện lỗi rate limit
-        self.rate_limit_keywords = [
-            'rate limit',
-            'ratelimit',
-            'too many requests',
-            'quota exceeded',
-            'try again later',
-            'limit exceeded',
-            'too frequent',
-            'throttled',
-            'slow down'
-        ]
     
     def check_rate_limit(self, provider: str) -> bool:
         """Kiểm tra xem provider có vượt quá giới hạn RPM không
@@ -50,25 +52,30 @@ class RateLimitHandler(ErrorHandler):
         Returns:
             True nếu provider còn trong giới hạn, False nếu đã vượt quá
         """
+        # Provider đã cạn quota (theo ledger) không được sử dụng
+        if self.quota_ledger.is_exhausted(provider):
+            return False
+            
         # Nếu provider không được theo dõi, cho phép sử dụng
         if provider not in self.provider_limits:
             return True
             
-        limit_info = self.provider_limits[provider]
-        current_time = time.time()
-        
-        # Nếu đã qua 1 phút kể từ lần reset cuối, reset counter
-        if current_time - limit_info['last_reset'] > 60:
-            limit_info['current'] = 0
-            limit_info['last_reset'] = current_time
-            
-        # Nếu đã đạt giới hạn, không cho phép sử dụng
-        if limit_info['current'] >= limit_info['rpm']:
-            return False
+        with self._lock:
+            limit_info = self.provider_limits[provider]
+            current_time = time.time()
             
-        # Tăng counter và cho phép sử dụng
-        limit_info['current'] += 1
-        return True
+            # Nếu đã qua 1 phút kể từ lần reset cuối, reset counter
+            if current_time - limit_info['last_reset'] > 60:
+                limit_info['current'] = 0
+                limit_info['last_reset'] = current_time
+                
+            # Nếu đã đạt giới hạn, không cho phép sử dụng
+            if limit_info['current'] >= limit_info['rpm']:
+                return False
+                
+            # Tăng counter và cho phép sử dụng
+            limit_info['current'] += 1
+            return True
     
     def is_rate_limited(self, provider: str) -> bool:
         """Kiểm tra xem provider có đang bị giới hạn tốc độ không
@@ -79,19 +86,7 @@ class RateLimitHandler(ErrorHandler):
         Returns:
             True nếu provider đang bị giới hạn tốc độ, False nếu không
         """
-        if provider not in self.rate_limited_providers:
-            return False
-            
-        limit_time = self.rate_limited_providers[provider]
-        current_time = time.time()
-        reset_time = self.reset_times.get(provider, self.default_reset_time)
-        
-        # Nếu đã qua thời gian reset, xóa khỏi danh sách bị limit
-        if current_time - limit_time > reset_time:
-            del self.rate_limited_providers[provider]
-            return False
-            
-        return True
+        return not self.circuit_breaker.is_available(provider)
         
     def mark_rate_limited(self, provider: str, reset_time: Optional[int] = None) -> None:
         """Đánh dấu provider đã bị giới hạn tốc độ
@@ -100,9 +95,8 @@ class RateLimitHandler(ErrorHandler):
             provider: Tên provider
             reset_time: Thời gian reset (giây), nếu None sẽ sử dụng giá trị mặc định
         """
-        self.rate_limited_providers[provider] = time.time()
-        if reset_time is not None:
-            self.reset_times[provider] = reset_time
+        cooldown = reset_time if reset_time is not None else self.default_reset_time
+        self.circuit_breaker.record_failure(provider, cooldown=cooldown, trip=True)
             
     def handle_error(self, error: Exception, provider: str, **kwargs) -> bool:
         """Xử lý lỗi từ provider, phát hiện và xử lý lỗi rate limit
@@ -114,21 +108,39 @@ class RateLimitHandler(ErrorHandler):
         Returns:
             True nếu lỗi là do rate limit, False nếu không
         """
-        error_msg = str(error).lower()
-        
-        # Kiểm tra xem lỗi có phải do rate limit không
-        if any(keyword in error_msg for keyword in self.rate_limit_keywords):
-            # Lấy thời gian reset từ kwargs hoặc sử dụng mặc định
-            reset_time = kwargs.get('reset_time', self.default_reset_time)
+        error = as_provider_error(error, provider)
+        
+        # Kiểm tra xem lỗi có phải do rate limit (hoặc hết quota) không
+        if isinstance(error, RateLimitedError):
+            # Chờ đúng thời gian server yêu cầu, nếu không có thì lấy từ kwargs hoặc mặc định
+            if error.retry_after is not None:
+                reset_time = error.retry_after
+            else:
+                reset_time = kwargs.get('reset_time', error.cooldown)
             
             # Đánh dấu provider đã bị rate limit
             self.mark_rate_limited(provider, reset_time)
+            if isinstance(error, QuotaExhaustedError):
+                self.quota_ledger.mark_exhausted(provider, retry_after=reset_time)
             
-            logger.warning(f"Provider {provider} đã bị rate limit, sẽ tạm ngưng trong {reset_time}s")
+            logger.warning(f"Provider {provider} đã bị rate limit ({type(error).__name__}), sẽ tạm ngưng trong {reset_time:.0f}s")
             return True
             
         return False
         
+    def get_remaining_quota(self, provider: str, model: Optional[str] = None, kind: str = 'requests') -> Optional[int]:
+        """Lấy quota còn lại của provider để lập kế hoạch phân phối request
+        
+        Args:
+            provider: Tên provider
+            model: Tên model (None cho cả provider)
+            kind: 'requests' hoặc 'tokens'
+            
+        Returns:
+            Số request/token còn lại, None nếu chưa biết giới hạn
+        """
+        return self.quota_ledger.remaining(provider, model, kind)
+        
     def get_available_providers(self, all_providers: List[str]) -> List[str]:
         """Lọc danh sách các provider chưa bị giới hạn tốc độ
         
@@ -138,18 +150,19 @@ class RateLimitHandler(ErrorHandler):
         Returns:
             Danh sách các provider chưa bị giới hạn tốc độ
         """
-        return [p for p in all_providers if not self.is_rate_limited(p)]
+        return self.circuit_breaker.get_available(all_providers)
         
     def get_oldest_limited_provider(self) -> Optional[str]:
-        """Lấy provider bị giới hạn tốc độ lâu nhất
+        """Lấy provider bị giới hạn tốc độ sắp được mở lại sớm nhất
         
         Returns:
             Tên provider hoặc None nếu không có provider nào bị giới hạn
         """
-        if not self.rate_limited_providers:
+        limited = [p for p in self.provider_limits if self.is_rate_limited(p)]
+        if not limited:
             return None
             
-        return min(self.rate_limited_providers.items(), key=lambda x: x[1])[0]
+        return min(limited, key=self.circuit_breaker.retry_in)
         
     def reset_provider(self, provider: str) -> None:
         """Đặt lại trạng thái giới hạn tốc độ cho provider
@@ -157,6 +170,5 @@ class RateLimitHandler(ErrorHandler):
         Args:
             provider: Tên provider
         """
-        if provider in self.rate_limited_providers:
-            del self.rate_limited_providers[provider]
-            logger.info(f"Đã reset trạng thái rate limit cho provider {provider}") 
\ No newline at end of file
+        self.circuit_breaker.reset(provider)
+        logger.info(f"Đã reset trạng thái rate limit cho provider {provider}") 
\ No newline at end of file
@@ -0,0 +1,194 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class DeadlineExceeded(Exception):
+    """Lỗi khi block đã hết thời gian cho phép"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        super().__init__(f"Đã vượt quá thời hạn {timeout:.0f}s cho block")
+
+
+class RetryAborted(Exception):
+    """Lỗi khi không được phép thử lại (hết thời hạn hoặc hết ngân sách retry)"""
+    pass
+
+
+class RetryBudget:
+    """Ngân sách retry dùng chung cho một lần chạy, an toàn với đa luồng.
+
+    Số retry tối đa = min_retries + ratio * số block, nên tổng số request của cả lần chạy
+    không vượt quá (1 + ratio) lần số block cộng một hằng số, bất kể có bao nhiêu tầng retry.
+    """
+
+    def __init__(self, ratio: Optional[float] = None, min_retries: Optional[int] = None):
+        """Khởi tạo RetryBudget
+
+        Args:
+            ratio: Số retry được cấp thêm cho mỗi block
+            min_retries: Số retry luôn có sẵn, kể cả khi mới bắt đầu
+        """
+        self.ratio = ratio if ratio is not None else float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))
+        self.min_retries = min_retries if min_retries is not None else int(os.getenv('RETRY_BUDGET_MIN', '10'))
+
+        self._requests = 0
+        self._retries = 0
+        self._denied = 0
+        self._deadline_exceeded = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        """Ghi nhận một block mới (cấp thêm ngân sách retry)"""
+        with self._lock:
+            self._requests += 1
+
+    def available(self) -> bool:
+        """Kiểm tra còn ngân sách retry không (không tiêu thụ)
+
+        Returns:
+            True nếu còn ít nhất một lượt retry
+        """
+        with self._lock:
+            return self._retries < self._limit()
+
+    def acquire(self, force: bool = False) -> bool:
+        """Tiêu thụ một lượt retry
+
+        Args:
+            force: Ghi nhận retry kể cả khi đã hết ngân sách (retry đã được quyết định ở tầng khác)
+
+        Returns:
+            True nếu được phép retry, False nếu đã hết ngân sách
+        """
+        with self._lock:
+            if force or self._retries < self._limit():
+                self._retries += 1
+                return True
+            self._denied += 1
+            return False
+
+    def record_deadline_exceeded(self) -> None:
+        """Ghi nhận một block hết thời hạn"""
+        with self._lock:
+            self._deadline_exceeded += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Lấy thống kê retry của lần chạy
+
+        Returns:
+            Từ điển gồm số block, số retry, số retry bị từ chối,
+            số block hết hạn và hệ số khuếch đại request
+        """
+        with self._lock:
+            requests = self._requests
+            return {
+                'requests': requests,
+                'retries': self._retries,
+                'retries_denied': self._denied,
+                'deadline_exceeded': self._deadline_exceeded,
+                'amplification': (requests + self._retries) / requests if requests else 0.0
+            }
+
+    def _limit(self) -> float:
+        return self.min_retries + self.ratio * self._requests
+
+
+class Deadline:
+    """Thời hạn cho một block, truyền xuống mọi tầng retry cùng với ngân sách retry dùng chung.
+
+    Có hai loại retry:
+    - chuyển sang model/provider khác ngay lập tức (acquire_retry)
+    - lặp lại request, có thể phải chờ backoff (can_retry, bị tắt khi defer_retries=True)
+    """
+
+    def __init__(self, timeout: Optional[float] = None, budget: Optional[RetryBudget] = None,
+                 defer_retries: bool = False):
+        """Khởi tạo Deadline
+
+        Args:
+            timeout: Thời gian tối đa (giây) cho block (None để đọc từ BLOCK_DEADLINE)
+            budget: Ngân sách retry của lần chạy (None nếu không giới hạn)
+            defer_retries: Không lặp lại/chờ backoff, block lỗi sẽ được thử lại ở lượt sau
+        """
+        self.timeout = timeout if timeout is not None else float(os.getenv('BLOCK_DEADLINE', '120'))
+        self.budget = budget
+        self.defer_retries = defer_retries
+        self.expires_at = time.time() + self.timeout
+        self.retries = 0
+        self._expired_reported = False
+        self._lock = threading.Lock()
+
+        if budget is not None:
+            budget.record_request()
+
+    def remaining(self) -> float:
+        """Số giây còn lại trước khi hết hạn
+
+        Returns:
+            Số giây còn lại (0 nếu đã hết hạn)
+        """
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        """Kiểm tra đã hết hạn chưa (ghi nhận vào thống kê ở lần đầu phát hiện)
+
+        Returns:
+            True nếu đã hết hạn
+        """
+        if time.time() < self.expires_at:
+            return False
+        with self._lock:
+            first_time = not self._expired_reported
+            self._expired_reported = True
+        if first_time and self.budget is not None:
+            self.budget.record_deadline_exceeded()
+        return True
+
+    def check(self) -> None:
+        """Dừng xử lý nếu đã hết hạn
+
+        Raises:
+            DeadlineExceeded: Nếu đã hết hạn
+        """
+        if self.expired():
+            raise DeadlineExceeded(self.timeout)
+
+    def can_retry(self, wait: float = 0.0) -> bool:
+        """Kiểm tra có thể lặp lại request không (không tiêu thụ ngân sách)
+
+        Args:
+            wait: Thời gian chờ dự kiến trước lần retry
+
+        Returns:
+            True nếu không hoãn retry, còn thời gian và còn ngân sách
+        """
+        if self.defer_retries or self.expired() or self.remaining() <= wait:
+            return False
+        return self.budget is None or self.budget.available()
+
+    def acquire_retry(self, wait: float = 0.0) -> bool:
+        """Xin phép retry, tiêu thụ một lượt trong ngân sách nếu được phép
+
+        Args:
+            wait: Thời gian chờ dự kiến trước lần retry
+
+        Returns:
+            True nếu được phép retry
+        """
+        if self.expired() or self.remaining() <= wait:
+            return False
+        if self.budget is not None and not self.budget.acquire():
+            return False
+        self.retries += 1
+        return True
+
+    def record_retry(self) -> None:
+        """Ghi nhận retry đã được quyết định ở tầng khác (ví dụ backoff)"""
+        if self.budget is not None:
+            self.budget.acquire(force=True)
+        self.retries += 1
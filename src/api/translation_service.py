@@ -4,27 +4,31 @@ import logging
 import threading
 from typing import Optional, List, Dict, Callable
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from .retry_budget import Deadline, DeadlineExceeded
+from .provider_errors import ProviderError, ContextTooLongError, FatalError
+
 logger = logging.getLogger(__name__)
 
 class TranslationService:
     """Dịch vụ dịch văn bản, sử dụng các provider khác nhau"""
     
-    def __init__(self, providers: Dict, rate_limit_handler, provider_priorities: List[str]):
+    def __init__(self, providers: Dict, rate_limit_handler, provider_priorities: List[str],
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         """Khởi tạo TranslationService
         
         Args:
             providers: Từ điển các provider
             rate_limit_handler: Đối tượng xử lý giới hạn tốc độ
             provider_priorities: Danh sách ưu tiên các provider
+            circuit_breaker: Circuit breaker dùng chung (None để dùng bản toàn cục)
         """
         self.providers = providers
         self.provider_priorities = provider_priorities
         self.rate_limit_handler = rate_limit_handler
         
-        # Provider failures
-        self.provider_failures = {name: 0 for name in self.provider_priorities}
-        self.failure_threshold = 5  # Sau 5 lần thất bại liên tiếp
-        self.disabled_providers = {}  # {provider: thời_gian_hết_timeout}
+        # Sức khỏe provider được theo dõi bởi circuit breaker dùng chung
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
         
         # Cấu hình dịch
         self.default_target_lang = os.getenv('DEFAULT_TARGET_LANG', 'vi')
@@ -34,7 +38,13 @@ class TranslationService:
         self._last_call_time = {}
         self._lock = threading.Lock()
         
-    def get_rate_limit(self, provider, paid=False):
+    @staticmethod
+    def is_paid_provider(provider):
+        """Xác định loại tài khoản (free/paid) của provider"""
+        return provider == "novita"  # Giả sử Novita luôn trả phí, có thể mở rộng
+    
+    @staticmethod
+    def get_rate_limit(provider, paid=False):
         """Lấy thời gian giới hạn giữa các lần gọi API"""
         # Novita: chỉ rate limit nếu trả phí
         if provider == "novita":
@@ -63,13 +73,16 @@ class TranslationService:
             def wrapper(*args, **kwargs):
                 interval = self.get_rate_limit(provider, paid)
                 if interval > 0:
+                    # Giữ chỗ lượt gọi kế tiếp của provider trong khóa, rồi chờ ngoài khóa:
+                    # các luồng cùng provider được xếp hàng đúng khoảng cách,
+                    # còn luồng của provider khác không bị chặn theo
                     with self._lock:
-                        last = self._last_call_time.get(provider, 0)
                         now = time.time()
-                        wait = interval - (now - last)
-                        if wait > 0:
-                            time.sleep(wait)
-                        self._last_call_time[provider] = time.time()
+                        slot = max(now, self._last_call_time.get(provider, 0) + interval)
+                        self._last_call_time[provider] = slot
+                    wait = slot - time.time()
+                    if wait > 0:
+                        time.sleep(wait)
                 return func(*args, **kwargs)
             return wrapper
         return decorator
@@ -79,25 +92,18 @@ class TranslationService:
         tried_providers = set()
         provider_list = []
         
-        # Lọc ra các provider tạm thời bị vô hiệu hóa do lỗi liên tục
-        current_time = time.time()
-        for provider, disable_until in list(self.disabled_providers.items()):
-            if current_time > disable_until:
-                logger.info(f"Re-enabling provider {provider} after timeout")
-                del self.disabled_providers[provider]
-        
         # Nếu chỉ định provider, thử provider đó trước
         if provider_name:
-            # Nếu provider không bị disable
-            if provider_name not in self.disabled_providers:
+            # Nếu mạch của provider cho phép request
+            if self.circuit_breaker.is_available(provider_name):
                 provider_list.append(provider_name)
                 tried_providers.add(provider_name)
         
         # Sau đó thử các provider còn lại theo thứ tự ưu tiên
         for name in self.provider_priorities:
             if name not in tried_providers and self.providers.get(name) is not None:
-                # Nếu provider không bị disable
-                if name not in self.disabled_providers:
+                # Nếu mạch của provider cho phép request
+                if self.circuit_breaker.is_available(name):
                     provider_list.append(name)
             
         return provider_list
@@ -115,20 +121,50 @@ class TranslationService:
             
         return " ".join(translated_chunks)
         
-    def translate(self, text: str, target_lang: str = None, provider_name: Optional[str] = None) -> Optional[str]:
-        """Dịch văn bản sử dụng provider được chỉ định hoặc thử lần lượt các provider."""
+    def translate(self, text: str, target_lang: str = None, provider_name: Optional[str] = None,
+                  deadline: Optional[Deadline] = None, model: Optional[str] = None,
+                  allow_chunking: bool = True, failover: bool = True) -> Optional[str]:
+        """Dịch văn bản sử dụng provider được chỉ định hoặc thử lần lượt các provider.
+
+        Nếu chỉ định model hoặc failover=False, chỉ provider_name được thử, không chuyển sang provider khác.
+        Với allow_chunking=False (prompt có cấu trúc như JSON), văn bản được gửi nguyên vẹn trong một request.
+        """
         target_lang = target_lang or self.default_target_lang
-        provider_list = self._get_provider_list(provider_name)
+        if model or not failover:
+            provider_list = [name for name in self._get_provider_list(provider_name) if name == provider_name]
+        else:
+            provider_list = self._get_provider_list(provider_name)
         
         if not provider_list:
             logger.error("Không tìm thấy provider khả dụng")
             return None
         
-        return self._try_translate_with_providers(text, target_lang, provider_list)
-        
-    def _try_translate_with_providers(self, text: str, target_lang: str, provider_list: List[str]) -> Optional[str]:
-        """Thử dịch văn bản với danh sách các providers cho trước."""
+        # Gửi thẳng tới provider có model đủ context (mỗi request tối đa một chunk),
+        # thay vì đợi provider nhỏ từ chối; không provider nào vừa thì báo ngay để tầng trên chia nhỏ
+        chars = min(len(text), self.translation_chunk_size) if allow_chunking else len(text)
+        fitting = [name for name in provider_list if self._fits(name, chars, target_lang, model)]
+        if not fitting:
+            raise ContextTooLongError(f"Văn bản {chars} ký tự vượt quá context của mọi provider khả dụng",
+                                      provider=provider_name, model=model)
+        if provider_name in provider_list and provider_name not in fitting:
+            logger.info(f"Văn bản {chars} ký tự không vừa model nào của {provider_name}, chuyển sang {fitting[0]}")
+        
+        return self._try_translate_with_providers(text, target_lang, fitting, deadline, model, allow_chunking)
+    
+    def _fits(self, provider_name: str, chars: int, target_lang: str, model: Optional[str] = None) -> bool:
+        """Kiểm tra provider có model đủ context cho văn bản không (provider không khai báo thì coi là vừa)"""
+        fitting_models = getattr(self.providers.get(provider_name), 'fitting_models', None)
+        return fitting_models is None or bool(fitting_models(chars, target_lang, model))
+        
+    def _try_translate_with_providers(self, text: str, target_lang: str, provider_list: List[str],
+                                      deadline: Optional[Deadline] = None, model: Optional[str] = None,
+                                      allow_chunking: bool = True) -> Optional[str]:
+        """Thử dịch văn bản với danh sách các providers cho trước.
+
+        Mỗi lần chuyển sang provider khác sau lỗi được tính là một lần retry trong deadline của block.
+        """
         error_info = {}
+        attempted = False
         
         for provider_key in provider_list:
             provider = self.providers.get(provider_key)
@@ -136,48 +172,82 @@ class TranslationService:
                 logger.error(f"Provider {provider_key} không tồn tại, bỏ qua")
                 continue
             
+            # Giữ chỗ trong circuit breaker (chỉ một request thăm dò khi half-open)
+            if not self.circuit_breaker.allow_request(provider_key):
+                error_info[provider_key] = "Circuit đang mở"
+                continue
+            
             # Kiểm tra rate limit tổng thể (nếu áp dụng) trước khi thử gọi API
             if not self.rate_limit_handler.check_rate_limit(provider_key):
                 logger.warning(f"Bỏ qua provider {provider_key} do đạt giới hạn tổng thể RPM")
                 error_info[provider_key] = "Đạt giới hạn RPM tổng thể"
+                self.circuit_breaker.release(provider_key)
                 continue
             
+            # Dừng khi block hết thời hạn hoặc lần chạy đã hết ngân sách retry
+            if deadline is not None:
+                allowed = deadline.acquire_retry() if attempted else not deadline.expired()
+                if not allowed:
+                    error_info[provider_key] = "Hết thời hạn hoặc hết ngân sách retry"
+                    self.circuit_breaker.release(provider_key)
+                    break
+            attempted = True
+            
             # Xác định loại tài khoản (free/paid)
-            is_paid = provider_key == "novita"  # Giả sử Novita luôn trả phí, có thể mở rộng
+            is_paid = self.is_paid_provider(provider_key)
             
             # Bọc hàm dịch với rate limit
             @self.rate_limited(provider_key, is_paid)
             def do_translate(text, target_lang):
-                return provider.translate(text, target_lang)
+                return provider.translate(text, target_lang, deadline=deadline, model=model)
             
             try:
                 # Dịch toàn bộ văn bản hoặc theo từng chunk
-                if len(text) > self.translation_chunk_size:
+                if allow_chunking and len(text) > self.translation_chunk_size:
                     result = self._translate_text_in_chunks(text, target_lang, do_translate)
                 else:
                     result = do_translate(text, target_lang)
                 
                 if result:
                     logger.info(f"Đã dịch thành công với provider: {provider_key}")
-                    # Reset số lần thất bại vì đã thành công
-                    self.provider_failures[provider_key] = 0
+                    # Đóng mạch vì đã thành công
+                    self.circuit_breaker.record_success(provider_key)
                     return result
                 else:
                     logger.warning(f"Provider {provider_key} trả về kết quả rỗng. Thử provider tiếp theo...")
                     error_info[provider_key] = "Kết quả dịch rỗng"
-                    self.provider_failures[provider_key] += 1
+                    self.circuit_breaker.record_failure(provider_key)
+            except CircuitOpenError as e:
+                # Mọi model của provider đều đang mở mạch: mở mạch provider tới khi có model khả dụng
+                error_info[provider_key] = str(e)
+                self.circuit_breaker.record_failure(provider_key, cooldown=e.retry_in, trip=True)
+            except DeadlineExceeded as e:
+                # Hết thời hạn không phải lỗi của provider, giải phóng mạch và dừng
+                error_info[provider_key] = str(e)
+                self.circuit_breaker.release(provider_key)
+                break
+            except ContextTooLongError:
+                # Văn bản quá dài với mọi provider: để tầng trên chia nhỏ thay vì thử provider khác
+                self.circuit_breaker.release(provider_key)
+                raise
+            except ProviderError as e:
+                logger.warning(f"Lỗi {type(e).__name__} khi dịch với provider {provider_key}: {str(e)}. Thử provider tiếp theo...")
+                error_info[provider_key] = str(e)
+                
+                if self.rate_limit_handler.handle_error(e, provider_key):
+                    # Rate limit/hết quota: mạch provider mở đúng thời gian server yêu cầu
+                    pass
+                elif isinstance(e, FatalError) and e.scope == 'provider':
+                    # Sai API key hoặc không có quyền: không thử lại provider này
+                    self.circuit_breaker.record_failure(provider_key, cooldown=e.cooldown, trip=True)
+                else:
+                    self.circuit_breaker.record_failure(provider_key)
             except Exception as e:
                 logger.warning(f"Lỗi khi dịch với provider {provider_key}: {str(e)}. Thử provider tiếp theo...")
                 error_info[provider_key] = str(e)
                 
-                # Tăng số lần thất bại
-                self.provider_failures[provider_key] += 1
-                
-                # Nếu provider thất bại quá nhiều lần liên tiếp, tạm thời vô hiệu hóa
-                if self.provider_failures[provider_key] >= self.failure_threshold:
-                    # Vô hiệu hóa provider trong 3 phút
-                    self.disabled_providers[provider_key] = time.time() + 180
-                    logger.warning(f"Tạm thời vô hiệu hóa provider {provider_key} trong 3 phút do lỗi liên tục")
+                # Nếu provider thất bại quá nhiều lần liên tiếp, mạch sẽ mở
+                self.circuit_breaker.record_failure(provider_key)
         
         # Nếu tất cả providers đều thất bại
         logger.error(f"Tất cả providers đều thất bại. Chi tiết lỗi: {error_info}")
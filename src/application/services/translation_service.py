@@ -173,7 +173,7 @@ class TranslationService:
         # Get or create strategy instance
         if mode_str not in self._strategy_instances:
             strategy_class = self._strategies[mode_str]
-            self._strategy_instances[mode_str] = strategy_class()
+            self._strategy_instances[mode_str] = strategy_class(self.provider_service, self.cache_service)
             logger.debug(f"Created strategy instance: {mode_str}")
         
         return self._strategy_instances[mode_str]
@@ -2,8 +2,8 @@
 Translation strategies package
 """
 
-from .simple_translation import SimpleTranslationStrategy
-from .context_aware_translation import ContextAwareTranslationStrategy
+from .simple_translation_strategy import SimpleTranslationStrategy
+from .context_aware_translation_strategy import ContextAwareTranslationStrategy
 
 __all__ = [
     'SimpleTranslationStrategy',
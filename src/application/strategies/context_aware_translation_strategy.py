@@ -3,12 +3,21 @@ Context-Aware Translation Strategy - Application Layer
 Implements intelligent translation using surrounding context
 """
 
+import re
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import concurrent.futures
+from typing import List, Dict, Any, Optional, Tuple
 from ...core import TranslationStrategy, ProviderService, CacheService, SubtitleBlock, TranslationContext
+from .context_index import ContextIndex, TranslationHistory, PROMPT_HISTORY_SIZE, hash_lines
 
 logger = logging.getLogger(__name__)
 
+# Marker for line breaks inside a block when several blocks share one request
+LINE_BREAK_TOKEN = "<br>"
+WINDOW_LINE_PATTERN = re.compile(r'^\[(\d+)\]\s*(.*)$')
+
 
 class ContextAwareTranslationStrategy(TranslationStrategy):
     """
@@ -19,16 +28,39 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
     - Open/Closed: Extensible for different context strategies
     """
     
-    def __init__(self, provider_service: ProviderService, cache_service: CacheService):
+    def __init__(
+        self,
+        provider_service: ProviderService,
+        cache_service: CacheService,
+        scene_gap: float = 2.0,
+        min_segment_size: int = 20,
+        max_segment_size: int = 80,
+        strict_cache: bool = False
+    ):
         """
         Initialize context-aware translation strategy
         
         Args:
             provider_service: Service for calling translation providers
             cache_service: Service for caching translations
+            scene_gap: Silence (seconds) between blocks treated as a scene boundary
+            min_segment_size: Minimum number of blocks per parallel segment
+            max_segment_size: Maximum number of blocks per parallel segment
+            strict_cache: Also key the cache on the previous translations and prefer exact matches
         """
         self.provider_service = provider_service
         self.cache_service = cache_service
+        self.scene_gap = scene_gap
+        self.min_segment_size = min_segment_size
+        self.max_segment_size = max_segment_size
+        self.strict_cache = strict_cache
+        self.last_run_stats: Dict[str, Any] = {}
+        self._request_count = 0
+        self._prompt_chars = 0
+        self._cache_lookups = 0
+        self._primary_hits = 0
+        self._strict_hits = 0
+        self._stats_lock = threading.Lock()
         logger.info("Context-aware translation strategy initialized")
     
     def get_strategy_name(self) -> str:
@@ -44,6 +76,16 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
         """
         Translate subtitle blocks using context-aware strategy
         
+        With context.shard_by_scene (and parallel processing enabled), the file is sharded at
+        scene boundaries and the segments are translated concurrently; by default the whole
+        file is translated as one sequential chain. Each segment restarts the chain of previous
+        translations; continuity across segments comes only from the neighbouring source
+        blocks, which the context window reads across segment boundaries.
+        
+        With context.window_batching, context.batch_size consecutive blocks of a segment are
+        sent in one request with a shared context, so requests and context tokens drop by
+        about that factor; otherwise each block gets its own request.
+        
         Args:
             blocks: List of subtitle blocks
             context: Translation context
@@ -52,55 +94,448 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
         Returns:
             List of translated subtitle blocks
         """
+        start_time = time.time()
+        with self._stats_lock:
+            self._request_count = 0
+            self._prompt_chars = 0
+            self._cache_lookups = 0
+            self._primary_hits = 0
+            self._strict_hits = 0
+        
+        if context.shard_by_scene and context.enable_parallel and context.max_workers > 1:
+            segments = self._split_into_segments(blocks)
+        else:
+            segments = [(0, len(blocks))]
+        
+        # Rendered neighbours are computed once per file and shared by all segments
+        index = ContextIndex(blocks, context)
+        translated_blocks: List[Optional[SubtitleBlock]] = [None] * len(blocks)
+        segment_times = []
+        
+        if len(segments) == 1:
+            translated_blocks, seconds = self._translate_segment(index, blocks, 0, len(blocks), context, provider_service)
+            segment_times.append(seconds)
+        else:
+            workers = min(context.max_workers, len(segments))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                future_to_segment = {
+                    executor.submit(self._translate_segment, index, blocks, seg_start, seg_end, context, provider_service): (seg_start, seg_end)
+                    for seg_start, seg_end in segments
+                }
+                
+                for future in concurrent.futures.as_completed(future_to_segment):
+                    seg_start, seg_end = future_to_segment[future]
+                    try:
+                        segment_results, seconds = future.result()
+                    except Exception as e:
+                        logger.error(f"Segment with blocks {seg_start + 1}-{seg_end} failed: {e}")
+                        continue
+                    translated_blocks[seg_start:seg_end] = segment_results
+                    segment_times.append(seconds)
+        
+        # Sequential mode would have spent roughly the sum of all segment times
+        elapsed = time.time() - start_time
+        sequential_estimate = sum(segment_times)
+        self.last_run_stats = {
+            'mode': 'sharded' if len(segments) > 1 else 'sequential',
+            'segments': len(segments),
+            'elapsed': elapsed,
+            'sequential_estimate': sequential_estimate,
+            'speedup': sequential_estimate / elapsed if elapsed > 0 else 1.0,
+            'requests': self._request_count,
+            'prompt_chars': self._prompt_chars,
+            'cache': self.get_cache_report()
+        }
+        
+        successful_count = len([b for b in translated_blocks if b])
+        logger.info(
+            f"Translated {successful_count} of {len(blocks)} blocks using context-aware strategy "
+            f"({self._request_count} requests, {self._prompt_chars} prompt characters)"
+        )
+        if len(segments) > 1:
+            logger.info(
+                f"Sharded context-aware translation: {len(segments)} segments in {elapsed:.1f}s "
+                f"(~{sequential_estimate:.1f}s sequential, speedup x{self.last_run_stats['speedup']:.2f})"
+            )
+        cache_report = self.last_run_stats['cache']
+        if cache_report['lookups']:
+            strict_rate = cache_report['strict_hit_rate']
+            logger.info(
+                f"Context-aware cache: {cache_report['primary_hit_rate']:.0%} hits on source-context keys"
+                + (f", {strict_rate:.0%} on strict keys" if strict_rate is not None else "")
+                + f" ({cache_report['lookups']} lookups)"
+            )
+        return translated_blocks
+    
+    def _translate_segment(
+        self,
+        index: ContextIndex,
+        blocks: List[SubtitleBlock],
+        start: int,
+        end: int,
+        context: TranslationContext,
+        provider_service: ProviderService
+    ) -> Tuple[List[Optional[SubtitleBlock]], float]:
+        """
+        Translate blocks[start:end] sequentially, chaining previous translations
+        
+        The chain starts from the source text of the blocks just before the segment,
+        so segments never depend on each other's translations.
+        
+        Args:
+            index: Precomputed context of the file
+            blocks: All subtitle blocks of the file (read-only context)
+            start: Index of the first block of the segment
+            end: Index after the last block of the segment
+            context: Translation context
+            provider_service: Provider service to use
+            
+        Returns:
+            Tuple (translated blocks of the segment, seconds spent)
+        """
+        segment_start_time = time.time()
         translated_blocks = []
-        previous_segments = []
         
-        for i, block in enumerate(blocks):
-            if block.is_empty():
-                # Keep empty blocks as-is
-                translated_blocks.append(block.clone())
-                continue
+        # Seed the chain with read-only source lines from before the segment (no translations)
+        history = index.new_history(start)
+        
+        use_cache = context.use_cache and self.cache_service is not None
+        provider = getattr(context, 'provider_name', None) or 'auto'
+        
+        # Translate windows of K consecutive blocks per request (K=1 keeps one request per block)
+        window_size = max(1, context.batch_size) if context.window_batching and not context.custom_prompt_template else 1
+        window_start = start
+        while window_start < end:
+            window_end = min(end, window_start + window_size)
+            window = [i for i in range(window_start, window_end) if not blocks[i].is_empty()]
+            
+            # Cached blocks are not sent to the provider
+            cached, cache_keys = {}, {}
+            if use_cache:
+                for i in window:
+                    cached_text, cache_keys[i] = self._lookup_cache(
+                        blocks[i].text, context, provider, index.neighbour_hashes[i], history.recent(2)
+                    )
+                    if cached_text:
+                        cached[i] = cached_text
+            pending = [i for i in window if i not in cached]
+            
+            window_translations = {}
+            if len(pending) > 1:
+                window_translations = self._translate_window(
+                    index, blocks, pending, history, context, provider_service
+                )
             
-            # Build context window
-            context_segments = self._build_subtitle_context(
-                blocks, i, context.context_window_size
-            )
+            for i in range(window_start, window_end):
+                block = blocks[i]
+                if block.is_empty():
+                    # Keep empty blocks as-is
+                    translated_blocks.append(block.clone())
+                    continue
+                
+                # Lines missing from the window response fall back to a single-block request
+                translated_text = cached.get(i) or window_translations.get(i) or self._translate_block(
+                    index, blocks[i], i, history, context, provider_service
+                )
+                
+                if translated_text and use_cache and i not in cached:
+                    for key in cache_keys[i]:
+                        self.cache_service.set(key, translated_text)
+                
+                if translated_text:
+                    translated_block = block.clone()
+                    translated_block.translated_text = translated_text
+                    translated_blocks.append(translated_block)
+                    
+                    # Update history for next iteration
+                    history.append(block, translated_text)
+                else:
+                    # Translation failed
+                    translated_blocks.append(None)
+                
+                logger.debug(f"Context-aware translation for block {block.number}: {block.text[:30]}...")
             
-            # Create enhanced context for this block
-            enhanced_context = context.clone()
-            enhanced_context.previous_segments = previous_segments + context_segments
+            window_start = window_end
+        
+        return translated_blocks, time.time() - segment_start_time
+    
+    def _translate_block(
+        self,
+        index: ContextIndex,
+        block: SubtitleBlock,
+        position: int,
+        history: TranslationHistory,
+        context: TranslationContext,
+        provider_service: ProviderService
+    ) -> Optional[str]:
+        """
+        Translate a single block with its own context-enhanced prompt
+        
+        Args:
+            index: Precomputed context of the file
+            block: Block to translate
+            position: Index of the block in the file
+            history: Recent translations in the segment
+            context: Translation context
+            provider_service: Provider service to use
             
-            # Create a copy of the block
-            translated_block = block.clone()
+        Returns:
+            Translated text or None if failed
+        """
+        # History goes last so the prompt's most recent entries are the previous translations
+        segments = index.neighbours(position) + history.recent()
+        
+        return self._translate_with_context(
+            block.text, context, provider_service,
+            previous_segments=segments, prompt_template=index.prompt_template
+        )
+    
+    def _translate_window(
+        self,
+        index: ContextIndex,
+        blocks: List[SubtitleBlock],
+        indices: List[int],
+        history: TranslationHistory,
+        context: TranslationContext,
+        provider_service: ProviderService
+    ) -> Dict[int, str]:
+        """
+        Translate several consecutive blocks in one request
+        
+        Args:
+            index: Precomputed context of the file
+            blocks: All subtitle blocks of the file
+            indices: Indices of the (non-empty) blocks in the window
+            history: Recent translations in the segment
+            context: Translation context
+            provider_service: Provider service to use
             
-            # Translate with context
-            translated_text = self._translate_with_context(
-                block.text, enhanced_context, provider_service
+        Returns:
+            Dict {block index: translated text} for every line found in the response
+        """
+        prompt = self._build_window_prompt(index, blocks, indices, history, context)
+        try:
+            self._record_request(prompt)
+            response = provider_service.translate_text(
+                text=prompt,
+                target_lang=context.target_language,
+                provider_name=getattr(context, 'provider_name', None)
+            )
+        except Exception as e:
+            logger.error(f"Context-aware window translation failed: {e}")
+            return {}
+        
+        if not response:
+            return {}
+        
+        translations = {}
+        for line in response.splitlines():
+            match = WINDOW_LINE_PATTERN.match(line.strip())
+            if not match:
+                continue
+            position = int(match.group(1)) - 1
+            text = "\n".join(part.strip() for part in match.group(2).split(LINE_BREAK_TOKEN)).strip()
+            if 0 <= position < len(indices) and text:
+                translations[indices[position]] = text
+        
+        if len(translations) < len(indices):
+            logger.warning(
+                f"Window response covered {len(translations)} of {len(indices)} lines, "
+                f"translating the rest one by one"
             )
+        return translations
+    
+    def _build_window_prompt(
+        self,
+        index: ContextIndex,
+        blocks: List[SubtitleBlock],
+        indices: List[int],
+        history: TranslationHistory,
+        context: TranslationContext
+    ) -> str:
+        """
+        Build a prompt for a window of blocks
+        
+        The instructions, metadata and file-level context (the opening lines of the file) come
+        first and are identical for every window of the file, so provider-side prompt caching
+        can reuse them; the per-window context and the ID-tagged target lines follow.
+        
+        Args:
+            index: Precomputed context of the file
+            blocks: All subtitle blocks of the file
+            indices: Indices of the blocks in the window
+            history: Recent translations in the segment
+            context: Translation context
             
-            if translated_text:
-                translated_block.translated_text = translated_text
-                translated_blocks.append(translated_block)
-                
-                # Update previous segments for next iteration
-                previous_segments.append(f"[{block.start_time}] {block.text} -> {translated_text}")
-                if len(previous_segments) > context.context_window_size * 2:
-                    previous_segments = previous_segments[-context.context_window_size:]
-            else:
-                # Translation failed
-                translated_blocks.append(None)
+        Returns:
+            Prompt string
+        """
+        prompt_parts = [
+            f"Translate each numbered subtitle line below to {context.target_language}.",
+            "IMPORTANT INSTRUCTIONS:",
+            '1. Return exactly one line per input line, in the form "[ID] translation"',
+            "2. Keep the IDs unchanged, do not merge, split or skip lines",
+            f"3. Keep the {LINE_BREAK_TOKEN} markers where the original line breaks are",
+            "4. Only return the translated lines, without any explanations or notes",
+            "5. Keep technical terms and IT concepts in English",
+            "6. Use the context below for consistency and accuracy, don't translate it"
+        ]
+        
+        # Add video metadata
+        metadata = getattr(context, 'video_metadata', None) or {}
+        if metadata.get('title'):
+            prompt_parts.append(f"Video title: {metadata['title']}")
+        if metadata.get('genre'):
+            prompt_parts.append(f"Genre: {metadata['genre']}")
+        
+        # Add custom instructions
+        if getattr(context, 'custom_instructions', None):
+            prompt_parts.append(f"Special instructions: {context.custom_instructions}")
+        
+        # File-level context, the same for every window
+        if index.file_context:
+            prompt_parts.append("")
+            prompt_parts.append("Opening lines of the file (for reference only, don't translate):")
+            prompt_parts.extend(f"- {line}" for line in index.file_context)
+        
+        # Per-window context: previous translations and the source lines around the window
+        context_lines = [f"- {segment}" for segment in history.recent() + index.following(indices[-1])]
+        
+        prompt_parts.append("")
+        prompt_parts.append("Context (for reference only, don't translate):")
+        prompt_parts.append("\n".join(context_lines) if context_lines else "No additional context")
+        prompt_parts.append("")
+        prompt_parts.append("Lines to translate:")
+        for position, i in enumerate(indices, 1):
+            text = blocks[i].text.strip().replace("\n", f" {LINE_BREAK_TOKEN} ")
+            prompt_parts.append(f"[{position}] {text}")
+        
+        return "\n".join(prompt_parts)
+    
+    def _lookup_cache(
+        self,
+        text: str,
+        context: TranslationContext,
+        provider: str,
+        neighbour_hash: Optional[str] = None,
+        previous_segments: Optional[List[str]] = None
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Look up a translation with the two-level cache keys
+        
+        Args:
+            text: Text being translated
+            context: Translation context
+            provider: Provider name
+            neighbour_hash: Hash of the neighbouring source lines (None to derive from context)
+            previous_segments: Previous translations (None to use context.previous_segments)
             
-            logger.debug(f"Context-aware translation for block {block.number}: {block.text[:30]}...")
+        Returns:
+            Tuple (cached translation or None, keys to store a new translation under)
+        """
+        primary_key = self.generate_cache_key(
+            text, context, provider, neighbour_hash=neighbour_hash, previous_segments=previous_segments
+        )
+        keys = [primary_key]
+        
+        result = None
+        strict_hit = False
+        if self.strict_cache:
+            strict_key = self.generate_cache_key(
+                text, context, provider, neighbour_hash=neighbour_hash,
+                previous_segments=previous_segments, strict=True
+            )
+            keys.append(strict_key)
+            result = self.cache_service.get(strict_key)
+            strict_hit = bool(result)
         
-        successful_count = len([b for b in translated_blocks if b])
-        logger.info(f"Translated {successful_count} of {len(blocks)} blocks using context-aware strategy")
-        return translated_blocks
+        primary_result = self.cache_service.get(primary_key)
+        
+        with self._stats_lock:
+            self._cache_lookups += 1
+            self._primary_hits += 1 if primary_result else 0
+            self._strict_hits += 1 if strict_hit else 0
+        return result or primary_result, keys
+    
+    def get_cache_report(self) -> Dict[str, Any]:
+        """
+        Compare cache hit rates of the source-context (primary) and strict keys
+        
+        Returns:
+            Dict with lookups, hits and hit rates (strict rate is None if strict keys are disabled)
+        """
+        with self._stats_lock:
+            lookups = self._cache_lookups
+            return {
+                'lookups': lookups,
+                'primary_hits': self._primary_hits,
+                'strict_hits': self._strict_hits,
+                'primary_hit_rate': self._primary_hits / lookups if lookups else 0.0,
+                'strict_hit_rate': (self._strict_hits / lookups if lookups else 0.0) if self.strict_cache else None
+            }
+    
+    def _record_request(self, prompt: str) -> None:
+        """Count a provider request and its prompt size for the run statistics"""
+        with self._stats_lock:
+            self._request_count += 1
+            self._prompt_chars += len(prompt)
+    
+    def _split_into_segments(self, blocks: List[SubtitleBlock]) -> List[Tuple[int, int]]:
+        """
+        Cut blocks into independent segments at scene (silence) boundaries
+        
+        A segment ends at the first gap of at least scene_gap seconds once it holds
+        min_segment_size blocks; when it reaches max_segment_size without such a gap,
+        it is cut at the longest gap seen so far.
+        
+        Args:
+            blocks: All subtitle blocks
+            
+        Returns:
+            List of (start, end) index ranges covering all blocks
+        """
+        segments = []
+        start = 0
+        best_cut, best_gap = None, -1.0
+        
+        for i in range(1, len(blocks)):
+            size = i - start
+            if size >= self.min_segment_size:
+                gap = self._gap_seconds(blocks[i - 1], blocks[i])
+                if gap >= self.scene_gap:
+                    segments.append((start, i))
+                    start, best_cut, best_gap = i, None, -1.0
+                    continue
+                if gap > best_gap:
+                    best_cut, best_gap = i, gap
+            
+            if size >= self.max_segment_size:
+                cut = best_cut if best_cut is not None else i
+                segments.append((start, cut))
+                start, best_cut, best_gap = cut, None, -1.0
+        
+        if blocks:
+            if segments and len(blocks) - start < self.min_segment_size:
+                # Merge a short tail into the previous segment
+                segments[-1] = (segments[-1][0], len(blocks))
+            else:
+                segments.append((start, len(blocks)))
+        return segments
+    
+    def _gap_seconds(self, previous: SubtitleBlock, following: SubtitleBlock) -> float:
+        """Silence between the end of one block and the start of the next"""
+        try:
+            return following._timestamp_to_seconds(following.start_time) - previous._timestamp_to_seconds(previous.end_time)
+        except ValueError:
+            return 0.0
     
     def _translate_with_context(
         self, 
         text: str, 
         context: TranslationContext, 
-        provider_service: ProviderService
+        provider_service: ProviderService,
+        previous_segments: Optional[List[str]] = None,
+        prompt_template: Optional[str] = None
     ) -> Optional[str]:
         """
         Translate text with context using provider service
@@ -109,13 +544,18 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
             text: Text to translate
             context: Enhanced translation context
             provider_service: Provider service
+            previous_segments: Context lines (None to use context.previous_segments)
+            prompt_template: Precomputed prompt template (None to build from context)
             
         Returns:
             Translated text or None if failed
         """
         try:
             # Build enhanced prompt with context
-            enhanced_text = self._build_context_enhanced_prompt(text, context)
+            enhanced_text = self._build_context_enhanced_prompt(
+                text, context, previous_segments=previous_segments, prompt_template=prompt_template
+            )
+            self._record_request(enhanced_text)
             
             translated = provider_service.translate_text(
                 text=enhanced_text,
@@ -149,12 +589,10 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
         if not text or not text.strip():
             return text
         
-        # Generate cache key (includes context)
-        cache_key = self._generate_cache_key(text, context, provider)
-        
-        # Check cache first
+        # Check cache first (source-context key, plus strict key if enabled)
+        cache_keys = []
         if context.use_cache:
-            cached_result = self.cache_service.get(cache_key)
+            cached_result, cache_keys = self._lookup_cache(text, context, provider)
             if cached_result:
                 logger.debug(f"Cache hit for context-aware translation: {text[:50]}...")
                 return cached_result
@@ -176,7 +614,8 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
             
             # Cache the result
             if context.use_cache and cleaned_translation:
-                self.cache_service.set(cache_key, cleaned_translation)
+                for cache_key in cache_keys:
+                    self.cache_service.set(cache_key, cleaned_translation)
             
             logger.debug(f"Context-aware translation: {text[:30]}... -> {cleaned_translation[:30]}...")
             return cleaned_translation
@@ -287,25 +726,36 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
         logger.info(f"Translated {len(translated_blocks)} subtitle blocks using context-aware strategy")
         return translated_blocks
     
-    def _build_context_enhanced_prompt(self, text: str, context: TranslationContext) -> str:
+    def _build_context_enhanced_prompt(
+        self,
+        text: str,
+        context: TranslationContext,
+        previous_segments: Optional[List[str]] = None,
+        prompt_template: Optional[str] = None
+    ) -> str:
         """
         Build enhanced prompt with context information
         
         Args:
             text: Original text to translate
             context: Translation context
+            previous_segments: Context lines (None to use context.previous_segments)
+            prompt_template: Precomputed prompt template (None to build from context)
             
         Returns:
             Enhanced prompt string
         """
-        prompt_template = context.get_prompt_template()
+        if prompt_template is None:
+            prompt_template = context.get_prompt_template()
+        if previous_segments is None:
+            previous_segments = getattr(context, 'previous_segments', None)
         
         # Build context string
         context_parts = []
         
         # Add previous segments
-        if hasattr(context, 'previous_segments') and context.previous_segments:
-            recent_segments = context.previous_segments[-3:]  # Last 3 segments
+        if previous_segments:
+            recent_segments = previous_segments[-PROMPT_HISTORY_SIZE:]
             context_parts.append("Previous translations:")
             for segment in recent_segments:
                 context_parts.append(f"- {segment}")
@@ -377,33 +827,49 @@ class ContextAwareTranslationStrategy(TranslationStrategy):
         
         return context_segments
     
-    def _generate_cache_key(self, text: str, context: TranslationContext, provider: str) -> str:
+    def generate_cache_key(
+        self,
+        text: str,
+        context: TranslationContext,
+        provider: str,
+        neighbour_hash: Optional[str] = None,
+        previous_segments: Optional[List[str]] = None,
+        strict: bool = False
+    ) -> str:
         """
-        Generate cache key for context-aware translation
+        Generate cache key for context-aware translation (also used by dry-run planning)
+        
+        The primary key depends only on the source side (text and neighbouring source lines),
+        so it stays valid when upstream translations change between runs. The strict key also
+        includes the most recent previous translations.
         
         Args:
             text: Text being translated
             context: Translation context
             provider: Provider name
+            neighbour_hash: Hash of the neighbouring source lines (None to derive from previous segments)
+            previous_segments: Previous segments (None to use context.previous_segments)
+            strict: Generate the strict key
             
         Returns:
             Cache key string
         """
         key_components = context.get_cache_key_components()
         
-        # Add context-specific components
-        context_hash = ""
-        if hasattr(context, 'previous_segments') and context.previous_segments:
-            # Hash recent context for cache key
-            import hashlib
-            recent_context = "|".join(context.previous_segments[-2:])  # Last 2 segments
-            context_hash = hashlib.md5(recent_context.encode()).hexdigest()[:8]
+        if previous_segments is None:
+            previous_segments = getattr(context, 'previous_segments', None) or []
+        recent = previous_segments[-2:]  # Last 2 segments
+        if neighbour_hash is None:
+            # Source side of "[time] text -> translation" entries
+            neighbour_hash = hash_lines(segment.split(" -> ", 1)[0] for segment in recent)
         
         key_components.update({
             'text': text,
             'provider': provider,
             'strategy': 'context_aware',
-            'context_hash': context_hash
+            'neighbours': neighbour_hash
         })
+        if strict:
+            key_components['context_hash'] = hash_lines(recent)
         
         return self.cache_service.generate_key(**key_components)
@@ -0,0 +1,139 @@
+"""
+Context Index - Application Layer
+Precomputed per-file context for context-aware translation
+"""
+
+import hashlib
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, List
+from ...core import SubtitleBlock, TranslationContext
+
+# Number of previous translations shown in a prompt
+PROMPT_HISTORY_SIZE = 3
+
+# Number of opening source lines shown as file-level context in window prompts
+FILE_CONTEXT_SIZE = 5
+
+
+def hash_lines(lines: Iterable[str]) -> str:
+    """Short stable hash of a sequence of lines ("" for no lines)"""
+    joined = "\x1e".join(lines)
+    return hashlib.md5(joined.encode()).hexdigest()[:12] if joined else ""
+
+
+class ContextIndex:
+    """
+    Read-only index of the rendered neighbour strings of a file
+
+    Built once per file, so assembling the context of a block only slices precomputed
+    strings (O(window)) instead of re-rendering neighbours and cloning the context.
+    Safe to share between threads translating different segments.
+    """
+
+    def __init__(self, blocks: List[SubtitleBlock], context: TranslationContext):
+        """
+        Build the index
+
+        Args:
+            blocks: All subtitle blocks of the file
+            context: Translation context (window size and prompt template)
+        """
+        self.window_size = context.context_window_size
+        self.prompt_template = context.get_prompt_template()
+        self.rendered = [f"[{block.start_time}] {block.text}" for block in blocks]
+        # Opening lines of the file, identical for every window (part of the stable prompt prefix)
+        self.file_context = [line for line, block in zip(self.rendered, blocks) if block.text.strip()][:FILE_CONTEXT_SIZE]
+        
+        # Hash of the neighbouring source texts only (no timestamps, no translations),
+        # stable across runs as long as the source file does not change around the block
+        texts = [block.text for block in blocks]
+        window = self.window_size
+        self.neighbour_hashes = [
+            hash_lines(texts[max(0, i - window):i] + ["|"] + texts[i + 1:i + window + 1])
+            for i in range(len(texts))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.rendered)
+
+    def neighbours(self, index: int) -> List[str]:
+        """
+        Rendered source lines around a block (previous blocks, then following blocks)
+
+        Args:
+            index: Index of the block
+
+        Returns:
+            Up to 2 * window_size rendered lines
+        """
+        window = self.window_size
+        return self.rendered[max(0, index - window):index] + self.rendered[index + 1:index + window + 1]
+
+    def following(self, index: int) -> List[str]:
+        """
+        Rendered source lines after a block
+
+        Args:
+            index: Index of the block
+
+        Returns:
+            Up to window_size rendered lines
+        """
+        return self.rendered[index + 1:index + self.window_size + 1]
+
+    def new_history(self, start: int) -> 'TranslationHistory':
+        """
+        Create the translation history of a segment
+
+        Args:
+            start: Index of the first block of the segment
+
+        Returns:
+            History seeded with the read-only source lines just before the segment
+        """
+        seed = self.rendered[max(0, start - self.window_size):start]
+        return TranslationHistory(seed, max(self.window_size, PROMPT_HISTORY_SIZE))
+
+
+class TranslationHistory:
+    """
+    Ring buffer of the most recent translations of a segment
+
+    Old entries fall off the end automatically, so appending never copies the list.
+    """
+
+    def __init__(self, seed: List[str], size: int):
+        """
+        Initialize the history
+
+        Args:
+            seed: Initial entries (source-only lines before the segment)
+            size: Maximum number of entries kept
+        """
+        self._entries: Deque[str] = deque(seed, maxlen=max(1, size))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, block: SubtitleBlock, translated_text: str) -> None:
+        """
+        Record a translated block
+
+        Args:
+            block: Source block
+            translated_text: Its translation
+        """
+        self._entries.append(f"[{block.start_time}] {block.text} -> {translated_text}")
+
+    def recent(self, count: int = PROMPT_HISTORY_SIZE) -> List[str]:
+        """
+        Most recent entries, oldest first
+
+        Args:
+            count: Maximum number of entries
+
+        Returns:
+            List of rendered entries
+        """
+        return list(islice(self._entries, max(0, len(self._entries) - count), None))
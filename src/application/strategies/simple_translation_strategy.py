@@ -96,7 +96,7 @@ class SimpleTranslationStrategy(TranslationStrategy):
             return text
         
         # Generate cache key
-        cache_key = self._generate_cache_key(text, context, provider)
+        cache_key = self.generate_cache_key(text, context, provider)
         
         # Check cache first
         if context.use_cache:
@@ -221,9 +221,9 @@ class SimpleTranslationStrategy(TranslationStrategy):
         logger.info(f"Translated {len(translated_blocks)} subtitle blocks using simple strategy")
         return translated_blocks
     
-    def _generate_cache_key(self, text: str, context: TranslationContext, provider: str) -> str:
+    def generate_cache_key(self, text: str, context: TranslationContext, provider: str) -> str:
         """
-        Generate cache key for simple translation
+        Generate cache key for simple translation (also used by dry-run planning)
         
         Args:
             text: Text being translated
@@ -45,6 +45,8 @@ class TranslationContext:
     # Performance settings
     batch_size: int = 5
     enable_parallel: bool = True
+    shard_by_scene: bool = False  # Context-aware: chia file theo cảnh và dịch song song các đoạn
+    window_batching: bool = False  # Context-aware: gửi batch_size block liên tiếp trong một request
     
     # Advanced options
     preserve_formatting: bool = True
@@ -166,6 +168,8 @@ Translate this specific text to {self.target_language}:
             'max_retries': self.max_retries,
             'batch_size': self.batch_size,
             'enable_parallel': self.enable_parallel,
+            'shard_by_scene': self.shard_by_scene,
+            'window_batching': self.window_batching,
             'preserve_formatting': self.preserve_formatting,
             'preserve_technical_terms': self.preserve_technical_terms,
             'custom_prompt_template': self.custom_prompt_template,
@@ -4,7 +4,7 @@ Following Dependency Inversion Principle (SOLID)
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from ..entities.subtitle_block import SubtitleBlock
 from ..entities.translation_context import TranslationContext
 
@@ -100,6 +100,10 @@ class CacheService(ABC):
     def generate_key(self, **kwargs) -> str:
         """Tạo cache key từ parameters"""
         pass
+    
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """Kiểm tra hàng loạt các key đang có trong cache (backend nên ghi đè để không đọc từng giá trị)"""
+        return {key for key in keys if self.get(key) is not None}
 
 
 class TranscriptionService(ABC):
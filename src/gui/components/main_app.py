@@ -348,7 +348,7 @@ Text to translate:
                             engine=engine,
                             model_name=model_name,
                             device=self.device_var.get(),
-                            compute_type=self.compute_type_var.get()
+                            compute_type=self.compute_type_var.get(),
                             max_workers=self.max_workers_var.get()
                         )
                         self.root.after(0, lambda: messagebox.showinfo("Thành công", "Đã tạo phụ đề cho tất cả video!"))
@@ -395,26 +395,22 @@ Text to translate:
         try:
             processor = SubtitleProcessor(progress_window.update)
 
-
-        def process():
-            try:
-                processor.process_videos(
-                    input_folder,
-                    output_folder,
-                    generate=False,
-                    translate=True,
-
-                    target_lang="vi",
-                    service="novita",
-                    max_workers=self.max_workers_var.get()
-
-                )
-                self.root.after(0, lambda: messagebox.showinfo("Thành công", "Đã dịch xong phụ đề"))
-            except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Lỗi", str(e)))
-            finally:
-                self.root.after(0, progress_window.close)
-
+            def process():
+                try:
+                    processor.process_videos(
+                        input_folder,
+                        output_folder,
+                        generate=False,
+                        translate=True,
+                        target_lang=target_lang,
+                        service=service,
+                        max_workers=self.max_workers_var.get()
+                    )
+                    self.root.after(0, lambda: messagebox.showinfo("Thành công", "Đã dịch xong phụ đề"))
+                except Exception as e:
+                    self.root.after(0, lambda: messagebox.showerror("Lỗi", str(e)))
+                finally:
+                    self.root.after(0, progress_window.close)
 
             threading.Thread(target=process, daemon=True).start()
             thread_started = True
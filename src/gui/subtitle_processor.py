@@ -51,6 +51,12 @@ class SubtitleProcessor:
 
         total_files = len(video_files)
         completed = 0
+        
+        # Nhật ký của job: chạy lại sau sự cố sẽ tiếp tục từ các block đã dịch
+        journal = None
+        if translate:
+            from src.utils.job_journal import JobJournal
+            journal = JobJournal.for_job(input_folder, output_folder or "", target_lang, service)
 
         def process_file(video_file: Path) -> None:
             nonlocal completed
@@ -61,7 +67,7 @@ class SubtitleProcessor:
                 )
                 if not self._should_skip_translation(subtitle_file, target_lang):
                     if translate and subtitle_file:
-                        self._translate_subtitle(subtitle_file, target_lang, service)
+                        self._translate_subtitle(subtitle_file, target_lang, service, journal)
                 with self._progress_lock:
                     completed += 1
                     self._update_progress(completed, total_files, f"Hoàn thành {video_file.name}")
@@ -71,10 +77,14 @@ class SubtitleProcessor:
                     completed += 1
                     self._update_progress(completed, total_files, f"Lỗi: {str(e)}")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(process_file, vf) for vf in video_files]
-            for future in as_completed(futures):
-                future.result()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(process_file, vf) for vf in video_files]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            if journal is not None:
+                journal.close()
 
     def _update_progress(self, i, total, status):
         if self.progress_callback:
@@ -144,10 +154,14 @@ class SubtitleProcessor:
         
         return subtitle_path
         
-    def _translate_subtitle(self, subtitle_file: Path, target_lang: str, service: str) -> None:
-        """Dịch phụ đề"""
+    def _translate_subtitle(self, subtitle_file: Path, target_lang: str, service: str, journal=None) -> None:
+        """Dịch phụ đề (nhiều ngôn ngữ cách nhau bởi dấu phẩy được dịch chung một lượt)"""
+        target_langs = [lang.strip() for lang in target_lang.split(',') if lang.strip()]
+        if len(target_langs) > 1:
+            self.translator.process_subtitle_file_multi(str(subtitle_file), target_langs, service)
+            return
         output_file = subtitle_file.parent / f"{subtitle_file.stem}_{target_lang}.srt"
-        self.translator.process_subtitle_file(str(subtitle_file), str(output_file), target_lang, service)
+        self.translator.process_subtitle_file(str(subtitle_file), str(output_file), target_lang, service, journal=journal)
 
 class ProgressWindow:
     def __init__(self, parent):
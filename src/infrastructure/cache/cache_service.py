@@ -8,7 +8,7 @@ import json
 import hashlib
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 from pathlib import Path
 from ...core import CacheService
 
@@ -138,6 +138,30 @@ class FileCacheService(CacheService):
         
         return f"{readable_part}_{key_hash[:16]}"
     
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """
+        Bulk membership check using the in-memory expiry metadata (no cache file is read)
+        
+        Args:
+            keys: Cache keys to check
+            
+        Returns:
+            Keys that have a non-expired entry
+        """
+        expiry_times = self.metadata.get('expiry_times', {})
+        now = datetime.now()
+        found = set()
+        for key in keys:
+            expiry_str = expiry_times.get(key)
+            if not expiry_str:
+                continue
+            try:
+                if datetime.fromisoformat(expiry_str) >= now:
+                    found.add(key)
+            except ValueError:
+                continue
+        return found
+    
     def clear_expired(self) -> int:
         """
         Clear all expired cache entries
@@ -336,6 +360,11 @@ class MemoryCacheService(CacheService):
         key_string = '|'.join(f"{k}:{v}" for k, v in sorted_items)
         return hashlib.sha256(key_string.encode()).hexdigest()[:32]
     
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """Bulk membership check of non-expired entries"""
+        now = datetime.now()
+        return {key for key in keys if key in self.cache and self.cache[key]['expires_at'] >= now}
+    
     def clear_expired(self) -> int:
         """Clear expired entries"""
         current_time = datetime.now()
@@ -1,12 +1,18 @@
-import time
+from typing import Tuple
+import httpx
 from openai import OpenAI
 from .base import BaseProvider, logger
+from ...api.provider_errors import as_provider_error
 
 class NovitaProvider(BaseProvider):
+    name = "novita"
+    display_name = "Novita"
+    default_base_url = "https://api.novita.ai/v3/openai"
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.client = OpenAI(
-            base_url="https://api.novita.ai/v3/openai",
+            base_url=self.base_url,
             api_key=api_key
         )
         self.models = [
@@ -26,27 +32,8 @@ class NovitaProvider(BaseProvider):
             'google/gemma-3-27b-it',
             'qwen/qwq-32b',
         ]
-        
-        # Theo dõi trạng thái rate limit của các model
-        self.rate_limited_models = {}
-        self.rate_limit_reset_time = 60  # Reset sau 60 giây (1 phút)
     
-    def _is_rate_limited(self, model):
-        """Kiểm tra xem model có đang bị rate limit không"""
-        if model not in self.rate_limited_models:
-            return False
-            
-        limit_time = self.rate_limited_models[model]
-        current_time = time.time()
-        
-        # Nếu đã qua thời gian reset, xóa khỏi danh sách bị limit
-        if current_time - limit_time > self.rate_limit_reset_time:
-            del self.rate_limited_models[model]
-            return False
-            
-        return True
-
-    def _try_translate_with_model(self, text: str, target_lang: str, model: str) -> str:
+    def _try_translate_with_model(self, text: str, target_lang: str, model: str, timeout: Tuple[float, float]) -> str:
         system_prompt = self.get_system_prompt(target_lang)
         messages = [
             {"role": "system", "content": system_prompt},
@@ -67,44 +54,18 @@ class NovitaProvider(BaseProvider):
             model_params['temperature'] = 0
 
         try:
-            response = self.client.chat.completions.create(
+            # Dùng raw response để đọc được header x-ratelimit-* cho quota ledger
+            raw_response = self.client.chat.completions.with_raw_response.create(
                 model=model,
                 messages=messages,
+                timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
                 **model_params
             )
+            response = raw_response.parse()
+            tokens = response.usage.total_tokens if response.usage else 0
+            self._record_quota(model, raw_response.headers, tokens)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Novita API error with model {model}: {str(e)}")
-            if "RATE_LIMIT_EXCEEDED" in str(e):
-                # Đánh dấu model này đã bị rate limit
-                self.rate_limited_models[model] = time.time()
-            raise
-
-    def translate(self, text: str, target_lang: str) -> str:
-        """Dịch văn bản sử dụng Novita API, thử lần lượt các model không bị rate limit."""
-        last_error = None
-        
-        # Lọc danh sách model chưa bị rate limit
-        available_models = [m for m in self.models if not self._is_rate_limited(m)]
-        
-        if not available_models:
-            # Nếu tất cả model đều bị rate limit, reset model có thời gian rate limit lâu nhất
-            oldest_model = min(self.rate_limited_models.items(), key=lambda x: x[1])[0]
-            available_models = [oldest_model]
-            del self.rate_limited_models[oldest_model]
-            logger.info(f"All models rate limited, trying oldest limited model: {oldest_model}")
-        
-        for model in available_models:
-            try:
-                logger.info(f"Trying Novita API with model: {model}")
-                result = self._try_translate_with_model(text, target_lang, model)
-                # Nếu thành công, ghi nhớ model này để ưu tiên trong lần sau
-                return result
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Failed with model {model}, trying next model...")
-                continue
-                
-        # Nếu tất cả các model đều thất bại
-        logger.error("All Novita models failed")
-        raise last_error 
\ No newline at end of file
+            # Lỗi của OpenAI SDK mang status_code và header Retry-After
+            raise as_provider_error(e, self.name, model) from e
@@ -6,6 +6,9 @@ Implements ProviderService interface for the application layer
 import logging
 from typing import List, Optional, Dict
 from ...core import ProviderService
+from ...api.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from ...api.provider_errors import ProviderError, RateLimitedError, ContextTooLongError
+from ...api.quota_ledger import QuotaLedger, get_quota_ledger
 from .base import BaseProvider
 
 logger = logging.getLogger(__name__)
@@ -20,14 +23,29 @@ class ConcreteProviderService(ProviderService):
     - Isolates application layer from infrastructure details
     """
     
-    def __init__(self, providers: Optional[Dict[str, BaseProvider]] = None, provider_priorities: Optional[List[str]] = None):
+    def __init__(
+        self, 
+        providers: Optional[Dict[str, BaseProvider]] = None, 
+        provider_priorities: Optional[List[str]] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        quota_ledger: Optional[QuotaLedger] = None
+    ):
         """
         Initialize provider service
         
         Args:
             providers: Dictionary of provider instances (None for auto-discovery)
             provider_priorities: List of provider names in priority order (None for defaults)
+            circuit_breaker: Shared circuit breaker (None for the process-wide instance)
+            quota_ledger: Persisted quota ledger (None for the process-wide instance)
         """
+        # Same breaker as the legacy APIHandler so both paths see provider health
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+        
+        # Providers exhausted in a previous run stay skipped until their quota resets
+        self.quota_ledger = quota_ledger or get_quota_ledger()
+        self.quota_ledger.apply_to(self.circuit_breaker)
+        
         if providers is None:
             # Auto-discover providers (implement basic discovery)
             self.providers = self._discover_providers()
@@ -94,6 +112,10 @@ class ConcreteProviderService(ProviderService):
             provider = self.active_providers.get(provider_name)
             if not provider:
                 continue
+            
+            # Skip open circuits without spending a request
+            if not self.circuit_breaker.allow_request(provider_name):
+                continue
                 
             try:
                 logger.debug(f"Trying provider: {provider_name}")
@@ -101,12 +123,35 @@ class ConcreteProviderService(ProviderService):
                 
                 if result and result.strip():
                     logger.debug(f"Successfully translated with provider: {provider_name}")
+                    self.circuit_breaker.record_success(provider_name)
                     return result.strip()
                 else:
                     logger.warning(f"Provider {provider_name} returned empty result")
+                    self.circuit_breaker.record_failure(provider_name)
                     
+            except CircuitOpenError as e:
+                # Every model is circuit-open: keep the provider closed off until one reopens
+                self.circuit_breaker.record_failure(provider_name, cooldown=e.retry_in, trip=True)
+                last_error = e
+                continue
+            except ContextTooLongError as e:
+                # Other providers would reject the same text; the caller has to split it
+                self.circuit_breaker.release(provider_name)
+                logger.warning(f"Text too long for provider {provider_name}: {str(e)}")
+                last_error = e
+                break
+            except ProviderError as e:
+                # Typed errors open the circuit for exactly as long as the server asked
+                logger.warning(f"Provider {provider_name} failed with {type(e).__name__}: {str(e)}")
+                if isinstance(e, RateLimitedError) or e.scope == 'provider':
+                    self.circuit_breaker.record_failure(provider_name, cooldown=e.cooldown, trip=True)
+                else:
+                    self.circuit_breaker.record_failure(provider_name)
+                last_error = e
+                continue
             except Exception as e:
                 logger.warning(f"Provider {provider_name} failed: {str(e)}")
+                self.circuit_breaker.record_failure(provider_name)
                 last_error = e
                 continue
         
@@ -130,13 +175,15 @@ class ConcreteProviderService(ProviderService):
         providers_to_try = []
         
         # Add preferred provider first if specified and available
-        if preferred_provider and preferred_provider in self.active_providers:
+        if (preferred_provider and preferred_provider in self.active_providers and
+                self.circuit_breaker.is_available(preferred_provider)):
             providers_to_try.append(preferred_provider)
         
         # Add other providers in priority order
         for provider_name in self.provider_priorities:
             if (provider_name in self.active_providers and 
-                provider_name not in providers_to_try):
+                provider_name not in providers_to_try and
+                    self.circuit_breaker.is_available(provider_name)):
                 providers_to_try.append(provider_name)
         
         return providers_to_try
@@ -157,13 +204,17 @@ class ConcreteProviderService(ProviderService):
                 status[name] = {
                     'available': True,
                     'test_successful': bool(test_result),
-                    'last_error': None
+                    'last_error': None,
+                    'circuit_state': self.circuit_breaker.get_state(name).value,
+                    'remaining_requests': self.quota_ledger.remaining(name)
                 }
             except Exception as e:
                 status[name] = {
                     'available': False,
                     'test_successful': False,
-                    'last_error': str(e)
+                    'last_error': str(e),
+                    'circuit_state': self.circuit_breaker.get_state(name).value,
+                    'remaining_requests': self.quota_ledger.remaining(name)
                 }
         
         return status
@@ -215,6 +215,80 @@ class TranslationFacade:
             logger.error(f"Subtitle translation failed: {e}")
             raise
     
+    def plan_subtitle_files(
+        self,
+        file_paths: List[str],
+        target_language: str,
+        source_language: str = "auto",
+        provider: Optional[str] = "groq",
+        max_workers: int = 4
+    ):
+        """
+        Estimate requests, tokens and time for translating subtitle files (dry run, no provider calls)
+        
+        Cache coverage is checked with one bulk lookup, using the same cache keys as the active strategy.
+        
+        Args:
+            file_paths: Paths to subtitle files
+            target_language: Target language code
+            source_language: Source language code
+            provider: Provider name (None lets the provider service pick, keyed as 'auto')
+            max_workers: Number of parallel workers
+            
+        Returns:
+            TranslationPlan with the estimate for the provider
+        """
+        from ..translator.translation_plan import TranslationPlan, SKIPPED, CACHED, TRANSLATE
+        from ..application.strategies.context_index import ContextIndex
+        
+        context = TranslationContext(
+            target_language=target_language,
+            source_language=source_language,
+            mode=TranslationMode.CONTEXT_AWARE if self.use_context_aware else TranslationMode.SIMPLE,
+            provider_name=provider,
+            max_workers=max_workers
+        )
+        strategy = self.strategies['context_aware' if self.use_context_aware else 'simple']
+        # Same provider key the strategies store translations under
+        provider = context.provider_name or 'auto'
+        # Context-aware window batching sends batch_size blocks per request
+        blocks_per_request = (
+            context.batch_size
+            if self.use_context_aware and context.window_batching and not context.custom_prompt_template
+            else 1
+        )
+        plan = TranslationPlan(target_language, [provider], max_workers, blocks_per_request)
+        
+        parsed = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    subtitle_blocks = SubtitleBlock.parse_srt_content(f.read())
+            except (OSError, ValueError) as e:
+                plan.add_note(f"Không đọc được {file_path}: {e}")
+                continue
+            
+            index = ContextIndex(subtitle_blocks, context) if self.use_context_aware else None
+            keys = []
+            for i, block in enumerate(subtitle_blocks):
+                if not block.text.strip():
+                    keys.append(None)
+                elif index is not None:
+                    keys.append(strategy.generate_cache_key(
+                        block.text, context, provider, neighbour_hash=index.neighbour_hashes[i]
+                    ))
+                else:
+                    keys.append(strategy.generate_cache_key(block.text, context, provider))
+            parsed.append((file_path, subtitle_blocks, keys))
+        
+        cached_keys = self.cache_service.contains_many([key for _, _, keys in parsed for key in keys if key])
+        for file_path, subtitle_blocks, keys in parsed:
+            plan.add_file(file_path, [
+                (block.text, SKIPPED if key is None else CACHED if key in cached_keys else TRANSLATE)
+                for block, key in zip(subtitle_blocks, keys)
+            ])
+        return plan
+    
     def set_translation_mode(self, mode: str) -> None:
         """
         Set translation mode
@@ -0,0 +1,140 @@
+"""
+Dịch theo tầng: model rẻ dịch trước, chỉ block không qua được bộ kiểm tra mới chuyển lên model mạnh
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from ..api.retry_budget import Deadline, DeadlineExceeded, RetryAborted
+from ..api.provider_errors import ContextTooLongError
+from .translation_validator import TranslationValidator
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tiers(spec: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """Tách cấu hình tầng rẻ (ví dụ "groq:llama-3.1-8b-instant,cerebras")
+
+    Args:
+        spec: Các tầng cách nhau bởi dấu phẩy, mỗi tầng là "provider" hoặc "provider:model"
+
+    Returns:
+        Danh sách (provider, model hoặc None) theo thứ tự thử
+    """
+    tiers = []
+    for item in (spec or '').split(','):
+        provider, _, model = item.strip().partition(':')
+        if provider:
+            tiers.append((provider.strip(), model.strip() or None))
+    return tiers
+
+
+class TranslationCascade:
+    """Dịch một block qua các tầng rẻ trước, rồi tới provider được yêu cầu.
+
+    Kết quả của mỗi tầng rẻ được TranslationValidator kiểm tra; block đạt dừng ở tầng đó,
+    block lỗi hoặc không đạt được chuyển lên tầng kế tiếp. Tầng cuối là provider được yêu cầu
+    (kèm các provider dự phòng như bình thường), kết quả của nó được giữ dù không đạt kiểm tra.
+    """
+
+    def __init__(self, api_handler, tiers: List[Tuple[str, Optional[str]]],
+                 validator: Optional[TranslationValidator] = None):
+        """Khởi tạo TranslationCascade
+
+        Args:
+            api_handler: Trình xử lý API
+            tiers: Các tầng rẻ theo thứ tự thử, mỗi tầng là (provider, model hoặc None)
+            validator: Bộ kiểm tra bản dịch (None để dùng cấu hình mặc định)
+        """
+        self.api_handler = api_handler
+        self.tiers = tiers
+        self.validator = validator or TranslationValidator()
+        self._handled: Counter = Counter()
+        self._escalations: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def translate(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Dịch một đoạn văn bản qua các tầng
+
+        Args:
+            text: Văn bản cần dịch
+            target_lang: Ngôn ngữ đích
+            service: Provider của tầng cuối
+            deadline: Thời hạn và ngân sách retry của block
+
+        Returns:
+            Văn bản đã dịch hoặc None nếu mọi tầng đều lỗi
+        """
+        providers = getattr(self.api_handler, 'providers', {})
+        for provider, model in self.tiers:
+            if providers.get(provider) is None:
+                continue
+            label = _tier_label(provider, model)
+            reason = None
+            try:
+                # Tầng rẻ chỉ dùng provider của chính nó: lỗi thì chuyển tầng, không chuyển sang provider khác
+                result = self.api_handler.translate(text, target_lang, provider, deadline=deadline, model=model,
+                                                    failover=False)
+            except (DeadlineExceeded, RetryAborted):
+                raise
+            except ContextTooLongError:
+                # Model rẻ không đủ context: để tầng sau (context lớn hơn) dịch thay vì chia nhỏ
+                result, reason = None, 'context'
+            except Exception as e:
+                logger.debug(f"Tầng {label} lỗi, chuyển lên tầng kế tiếp: {str(e)}")
+                result = None
+
+            if reason is None:
+                reason = self.validator.check(text, result, target_lang) if result else 'error'
+            if reason is None:
+                self._record(label)
+                return result
+            logger.debug(f"Bản dịch của tầng {label} không đạt ({reason}): {text[:50]}")
+            with self._lock:
+                self._escalations[reason] += 1
+
+        result = self.api_handler.translate(text, target_lang, service, deadline=deadline)
+        if result:
+            self._record(service)
+            reason = self.validator.check(text, result, target_lang)
+            if reason is not None:
+                logger.warning(f"Bản dịch của tầng cuối {service} không đạt kiểm tra ({reason}), vẫn giữ: {text[:50]}")
+        return result
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Lấy số block mỗi tầng đã dịch và số lần chuyển tầng theo lý do
+
+        Returns:
+            Từ điển {'tiers': {tầng: số block}, 'escalations': {lý do: số lần}}
+        """
+        with self._lock:
+            return {'tiers': dict(self._handled), 'escalations': dict(self._escalations)}
+
+    def format_report(self) -> str:
+        """Tạo báo cáo một dòng về tỉ lệ block mỗi tầng đã dịch
+
+        Returns:
+            Báo cáo, chuỗi rỗng nếu chưa dịch block nào
+        """
+        stats = self.get_stats()
+        total = sum(stats['tiers'].values())
+        if not total:
+            return ""
+        tiers = ", ".join(f"{label} {count / total:.0%} ({count} block)"
+                          for label, count in sorted(stats['tiers'].items(), key=lambda item: -item[1]))
+        report = f"Dịch theo tầng: {tiers}"
+        if stats['escalations']:
+            reasons = ", ".join(f"{reason} {count}" for reason, count in
+                                sorted(stats['escalations'].items(), key=lambda item: -item[1]))
+            report += f"; lý do chuyển tầng: {reasons}"
+        return report
+
+    def _record(self, label: str) -> None:
+        with self._lock:
+            self._handled[label] += 1
+
+
+def _tier_label(provider: str, model: Optional[str]) -> str:
+    return f"{provider}:{model}" if model else provider
@@ -0,0 +1,311 @@
+"""
+Dịch cả thư mục phụ đề với một pool luồng dùng chung cho mọi file
+"""
+
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileJob:
+    """Trạng thái dịch của một file trong lần chạy thư mục"""
+
+    def __init__(self, input_file: str, blocks: List[str], writer, retry_budget=None):
+        """Khởi tạo FileJob
+
+        Args:
+            input_file: Đường dẫn file phụ đề đầu vào
+            blocks: Các block phụ đề gốc
+            writer: OrderedSubtitleWriter ghi file đầu ra
+            retry_budget: Ngân sách retry dùng chung của lần chạy
+        """
+        self.input_file = input_file
+        self.blocks = blocks
+        self.writer = writer
+        self.retry_budget = retry_budget
+        self.errors: List[Optional[str]] = [None] * len(blocks)
+        self.stats = {
+            'total_blocks': len(blocks),
+            'resumed': 0,
+            'journaled': 0,
+            'successful': 0,
+            'failed': 0,
+            'deferred': 0,
+            'cache_hits': 0,
+            'skipped': {}
+        }
+        self.stats_lock = threading.Lock()
+        self.next_submit = 0
+        # Block lỗi ở lần đầu, chờ lượt dịch lại của file
+        self.deferred: List[int] = []
+        # Số block đang dịch lần đầu và số lượt dịch lại của từng block
+        self.first_in_flight = 0
+        self.retry_passes: Dict[int, int] = {}
+        self.retry_service: Optional[str] = None
+        self.start_time = time.time()
+
+
+class DirectoryScheduler:
+    """Lập lịch dịch nhiều file trên một pool luồng duy nhất.
+
+    Block của mọi file được đưa vào cùng một hàng đợi theo thứ tự file, nên phần đuôi chậm
+    của một file được lấp bằng block của file kế tiếp và file nhỏ không để trống pool.
+    Mọi request đi qua cùng một APIHandler, tức là cùng một bộ giới hạn tốc độ theo provider.
+    Block xong được chuyển cho OrderedSubtitleWriter của file, ghi dần ra file theo đúng thứ tự;
+    file được hoàn tất ngay khi block cuối cùng của nó xong. Khi bộ đệm sắp xếp lại của một file đã đầy,
+    pool tiếp tục nhận block của file kế tiếp trong lúc chờ.
+
+    Không block nào retry tại chỗ (không luồng nào ngủ chờ backoff). Block lỗi ở lần đầu được hoãn
+    tới lượt dịch lại của file, bắt đầu khi mọi block gửi được của file đã dịch xong lần đầu, bằng
+    provider khác; lượt dịch lại được ưu tiên trước block mới. Block vẫn lỗi được xếp lại vào hàng đợi
+    tối đa max_retry_passes lượt (trong ngân sách retry của lần chạy) rồi mới bị đánh dấu lỗi.
+
+    Nếu có JobJournal, block đã dịch ở lần chạy trước được lấy thẳng từ nhật ký thay vì gửi vào pool,
+    và file đã hoàn tất (nội dung gốc không đổi) được bỏ qua.
+    """
+
+    def __init__(self, translator, max_workers: int = 4, max_pending: Optional[int] = None, journal=None,
+                 max_retry_passes: int = 2):
+        """Khởi tạo DirectoryScheduler
+
+        Args:
+            translator: Đối tượng SubtitleTranslator (dịch từng block)
+            max_workers: Số luồng tối đa của pool dùng chung
+            max_pending: Số block tối đa đã gửi vào pool mà chưa xong
+                (mặc định 2 * max_workers, giới hạn số file được đọc trước)
+            journal: JobJournal của job (None để không ghi nhật ký)
+            max_retry_passes: Số lượt dịch lại tối đa của một block lỗi ở lần đầu
+        """
+        self.translator = translator
+        self.journal = journal
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.max_retry_passes = max(1, max_retry_passes)
+
+    def run(self, files: List[Tuple[str, str]], target_lang: str, service: str) -> Dict[str, int]:
+        """Dịch danh sách file
+
+        Args:
+            files: Danh sách (file đầu vào, file đầu ra)
+            target_lang: Ngôn ngữ đích
+            service: Dịch vụ dịch thuật
+
+        Returns:
+            Từ điển thống kê gồm số file thành công và thất bại
+        """
+        from ..api.retry_budget import RetryBudget
+
+        stats = {'successful': 0, 'failed': 0}
+        # Một ngân sách retry cho cả lần chạy, giới hạn tổng số request theo tổng số block của mọi file
+        retry_budget = RetryBudget()
+        # Block của các lượt dịch lại đã sẵn sàng, được gửi trước mọi block mới
+        retries: Deque[Tuple[FileJob, int]] = deque()
+        jobs = self._iter_jobs(files, stats, retry_budget)
+        # File đã mở còn block chưa gửi, theo thứ tự file
+        open_jobs: List[FileJob] = []
+        active: Set[FileJob] = set()
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                in_flight: Dict[concurrent.futures.Future, Tuple[FileJob, int, bool]] = {}
+
+                def submit(job, idx, pass_service, first_attempt):
+                    # Lỗi không retry tại chỗ, block được đưa lại hàng đợi để luồng không ngủ chờ backoff
+                    future = executor.submit(
+                        self.translator._translate_block, idx, job.blocks[idx], target_lang, service,
+                        pass_service, True, job.stats, job.stats_lock, job.errors, job.retry_budget
+                    )
+                    in_flight[future] = (job, idx, first_attempt)
+                    if first_attempt:
+                        job.first_in_flight += 1
+
+                while True:
+                    while len(in_flight) < self.max_pending:
+                        if retries:
+                            job, idx = retries.popleft()
+                            submit(job, idx, job.retry_service, False)
+                            continue
+
+                        # File trước được ưu tiên; file có bộ đệm sắp xếp lại đã đầy (đang chờ block đầu tiên
+                        # chưa ghi xong) nhường chỗ cho file sau thay vì để pool rảnh
+                        job = next((j for j in open_jobs if j.next_submit < j.writer.window_end()), None)
+                        if job is None:
+                            job = next(jobs, None)
+                            if job is None:
+                                break
+                            active.add(job)
+                            if job.writer.done():
+                                # File rỗng hoặc đã dịch xong ở lần chạy trước
+                                self._finish(job, stats)
+                                active.discard(job)
+                            else:
+                                open_jobs.append(job)
+                            continue
+
+                        if self._replay_block(job):
+                            job.next_submit += 1
+                            if job.writer.done():
+                                self._finish(job, stats)
+                                active.discard(job)
+                        else:
+                            submit(job, job.next_submit, service, True)
+                            job.next_submit += 1
+                        if job.next_submit >= len(job.blocks):
+                            open_jobs.remove(job)
+                        self._release_deferred(job, retries, service)
+
+                    if not in_flight:
+                        break
+
+                    done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        job, idx, first_attempt = in_flight.pop(future)
+                        if first_attempt:
+                            job.first_in_flight -= 1
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            job.errors[idx] = f"Block {idx+1} lỗi: {str(e)}"
+                            result = None
+
+                        if result is None and first_attempt:
+                            with job.stats_lock:
+                                job.stats['deferred'] += 1
+                            job.deferred.append(idx)
+                            self._release_deferred(job, retries, service)
+                            continue
+                        if result is None and self._requeue(job, idx):
+                            retries.append((job, idx))
+                            continue
+                        if result is None:
+                            logger.warning(job.errors[idx] or f"Block {idx+1} dịch lỗi")
+                            with job.stats_lock:
+                                job.stats['failed'] += 1
+                            result = self.translator._mark_failed_block(idx, job.blocks[idx])
+                        elif self.journal is not None:
+                            self.journal.record_block(job.writer.output_file, idx, result)
+
+                        job.writer.add(idx, result)
+                        if job.writer.done():
+                            self._finish(job, stats)
+                            active.discard(job)
+                        elif first_attempt:
+                            self._release_deferred(job, retries, service)
+        finally:
+            # Dừng giữa chừng: giữ file .part làm điểm tiếp tục cho lần chạy sau
+            for job in active:
+                job.writer.abort()
+
+        # Tỉ lệ block mỗi tầng đã dịch (cộng dồn trong tiến trình) khi bật dịch theo tầng
+        cascade = getattr(self.translator.translator_service, 'cascade', None)
+        report = cascade.format_report() if cascade is not None else ""
+        if report:
+            logger.info(report)
+        retry_stats = retry_budget.get_stats()
+        if retry_stats['requests']:
+            logger.info(f"Ngân sách retry của lần chạy: {retry_stats['retries']} lần retry cho "
+                        f"{retry_stats['requests']} block (hệ số khuếch đại {retry_stats['amplification']:.2f}), "
+                        f"{retry_stats['retries_denied']} lần bị từ chối")
+        return stats
+
+    def _iter_jobs(self, files: List[Tuple[str, str]], stats: Dict[str, int], retry_budget) -> Iterator[FileJob]:
+        """Đọc lần lượt từng file khi cần và mở file đầu ra của nó"""
+        from ..utils.job_journal import source_fingerprint
+        from .ordered_writer import OrderedSubtitleWriter
+
+        processor = self.translator.subtitle_processor
+        for input_file, output_file in files:
+            try:
+                content = processor.read_subtitle_file(input_file)
+                blocks = processor.split_into_blocks(content)
+                if self.journal is not None:
+                    self.journal.begin_file(output_file, source_fingerprint(content))
+                    if self.journal.is_complete(output_file) and os.path.exists(output_file):
+                        logger.info(f"File {output_file} đã hoàn tất ở lần chạy trước, bỏ qua")
+                        stats['successful'] += 1
+                        continue
+                writer = OrderedSubtitleWriter(output_file, processor)
+                resumed = writer.open(blocks)
+            except Exception as e:
+                logger.error(f"Lỗi khi mở file phụ đề {input_file}: {str(e)}")
+                stats['failed'] += 1
+                continue
+
+            logger.info(f"Đang xử lý: {input_file}")
+            job = FileJob(input_file, blocks, writer, retry_budget)
+            job.stats['resumed'] = resumed
+            job.next_submit = resumed
+            yield job
+
+    def _release_deferred(self, job: FileJob, retries: Deque[Tuple[FileJob, int]], service: str) -> None:
+        """Bắt đầu lượt dịch lại của file khi không còn block nào của file đang chờ dịch lần đầu
+
+        Block chưa gửi nằm ngoài bộ đệm sắp xếp lại cũng phải chờ block bị hoãn, nên lượt dịch lại
+        bắt đầu ngay khi file không gửi thêm được block nào.
+        """
+        if not job.deferred or job.first_in_flight:
+            return
+        if job.next_submit < min(len(job.blocks), job.writer.window_end()):
+            return
+        if job.retry_service is None:
+            job.retry_service = self.translator._pick_retry_service(service)
+        logger.info(f"Dịch lại {len(job.deferred)} block bị hoãn của {job.input_file} "
+                    f"bằng provider {job.retry_service}")
+        retries.extend((job, idx) for idx in sorted(job.deferred))
+        job.deferred = []
+
+    def _requeue(self, job: FileJob, idx: int) -> bool:
+        """Cho block lỗi ở lượt dịch lại thêm một lượt nếu chưa hết số lượt và còn ngân sách retry"""
+        passes = job.retry_passes.get(idx, 0) + 1
+        job.retry_passes[idx] = passes
+        if passes >= self.max_retry_passes:
+            return False
+        return job.retry_budget is None or job.retry_budget.acquire()
+
+    def _replay_block(self, job: FileJob) -> bool:
+        """Lấy block kế tiếp của file từ nhật ký nếu đã dịch ở lần chạy trước
+
+        Returns:
+            True nếu block đã được chuyển thẳng cho writer
+        """
+        if self.journal is None:
+            return False
+        block = self.journal.get_block(job.writer.output_file, job.next_submit)
+        if block is None:
+            return False
+        job.writer.add(job.next_submit, block)
+        with job.stats_lock:
+            job.stats['journaled'] += 1
+        return True
+
+    def _finish(self, job: FileJob, stats: Dict[str, int]) -> None:
+        """Hoàn tất file đã ghi đủ block và cập nhật thống kê"""
+        translated = job.stats['resumed'] + job.stats['journaled'] + job.stats['successful']
+        if job.stats['total_blocks'] and not translated:
+            logger.error(f"Tất cả block của {job.input_file} đều dịch lỗi")
+            job.writer.abort(discard=True)
+            success = False
+        else:
+            if job.stats['failed']:
+                logger.warning(f"Lưu file với {job.stats['failed']} block lỗi đã được đánh dấu")
+            success = job.writer.close()
+            if success and self.journal is not None:
+                # File đích đã được đổi tên nguyên tử, giờ mới đánh dấu hoàn tất trong nhật ký
+                self.journal.mark_complete(job.writer.output_file)
+            if success:
+                logger.info(f"Đã lưu phụ đề dịch vào: {job.writer.output_file}")
+
+        stats['successful' if success else 'failed'] += 1
+        reused = job.stats['resumed'] + job.stats['journaled']
+        resumed_detail = f" (tiếp tục với {reused} block đã dịch trước đó)" if reused else ""
+        logger.info(f"Đã dịch xong file {job.input_file} trong {time.time() - job.start_time:.2f}s{resumed_detail}: "
+                    f"{translated}/{job.stats['total_blocks']} block thành công, "
+                    f"{job.stats['cache_hits']} từ cache, "
+                    f"{sum(job.stats['skipped'].values())} không cần gọi provider, "
+                    f"{job.stats['deferred'] - job.stats['failed']}/{job.stats['deferred']} block hoãn dịch lại thành công")
@@ -0,0 +1,217 @@
+"""
+Ước lượng chi phí dịch của từng file và sắp xếp thứ tự dịch các file trong một thư mục
+"""
+
+import os
+import re
+import logging
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Số ký tự trung bình của một token (ước lượng cho văn bản phụ đề)
+CHARS_PER_TOKEN = 4
+
+# Trạng thái của một block khi phân loại trước khi dịch
+SKIPPED = 'skipped'
+CACHED = 'cached'
+TRANSLATE = 'translate'
+UNPARSEABLE = 'unparseable'
+
+# fifo: giữ nguyên thứ tự tìm thấy (mặc định, không cần quét trước)
+# sjf: file rẻ nhất trước (có kết quả sớm nhất)
+# lpt: file đắt nhất trước (tổng thời gian ngắn nhất, file nhỏ lấp phần đuôi)
+ORDER_POLICIES = ('fifo', 'sjf', 'lpt')
+
+_RANGE_PATTERN = re.compile(r'^(\d+)\s*[-–]\s*(\d+)$')
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+class FileCost:
+    """Chi phí ước lượng để dịch một file phụ đề"""
+
+    def __init__(self, input_file: str, output_file: str, position: int,
+                 blocks: int = 0, uncached: int = 0, chars: int = 0):
+        """Khởi tạo FileCost
+
+        Args:
+            input_file: Đường dẫn file phụ đề đầu vào
+            output_file: Đường dẫn file phụ đề đầu ra
+            position: Vị trí của file trong danh sách ban đầu
+            blocks: Số block của file
+            uncached: Số block cần gọi provider (chưa có trong cache, không bị bỏ qua)
+            chars: Số ký tự của các block cần gọi provider
+        """
+        self.input_file = input_file
+        self.output_file = output_file
+        self.position = position
+        self.blocks = blocks
+        self.uncached = uncached
+        self.chars = chars
+
+    @property
+    def tokens(self) -> int:
+        """Số token đầu vào ước lượng của các block cần gọi provider"""
+        return (self.chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def __repr__(self) -> str:
+        return (f"FileCost({os.path.basename(self.input_file)}: {self.uncached}/{self.blocks} block, "
+                f"~{self.tokens} token)")
+
+
+def classify_files(translator, input_files: List[str], target_lang: str,
+                   service: str) -> List[Tuple[str, Optional[List[Tuple[str, str]]], Optional[str]]]:
+    """Phân loại mọi block của các file như khi dịch: không cần dịch (bộ lọc), đã có trong cache, cần gọi provider
+    hoặc không phân tách được (sẽ bị đánh dấu lỗi khi dịch)
+
+    Mọi file được đọc và phân loại trước, rồi cache được kiểm tra hàng loạt một lần cho mọi block
+    (không đọc từng mục cache).
+
+    Args:
+        translator: Đối tượng SubtitleTranslator
+        input_files: Danh sách file phụ đề
+        target_lang: Ngôn ngữ đích
+        service: Dịch vụ dịch thuật (dùng làm khóa cache)
+
+    Returns:
+        Danh sách (file, [(văn bản, trạng thái)] theo thứ tự block, lỗi) theo thứ tự ban đầu;
+        file không đọc được có danh sách block None kèm thông báo lỗi
+    """
+    processor = translator.subtitle_processor
+    cache_manager = translator.cache_manager
+    skip_classifier = getattr(translator.translator_service, 'skip_classifier', None)
+
+    # (file, [(văn bản, trạng thái, khóa cache hoặc None)], lỗi)
+    parsed = []
+    for input_file in input_files:
+        try:
+            blocks = processor.split_into_blocks(processor.read_subtitle_file(input_file))
+        except Exception as e:
+            parsed.append((input_file, None, str(e)))
+            continue
+
+        entries = []
+        for block in blocks:
+            try:
+                _, _, text = processor.parse_subtitle_block(block)
+            except ValueError:
+                entries.append((block, UNPARSEABLE, None))
+                continue
+            if skip_classifier is not None and skip_classifier.check(text, target_lang) is not None:
+                entries.append((text, SKIPPED, None))
+                continue
+            entries.append((text, TRANSLATE, cache_manager.generate_key(text, target_lang=target_lang, service=service)))
+        parsed.append((input_file, entries, None))
+
+    cached_keys = cache_manager.contains_many(
+        [key for _, entries, _ in parsed if entries for _, _, key in entries if key]
+    )
+    return [
+        (input_file, None if entries is None else [
+            (text, CACHED if key in cached_keys else status) for text, status, key in entries
+        ], error)
+        for input_file, entries, error in parsed
+    ]
+
+
+def estimate_file_costs(translator, files: List[Tuple[str, str]], target_lang: str, service: str) -> List[FileCost]:
+    """Ước lượng chi phí dịch từng file theo phân loại block của classify_files
+
+    Args:
+        translator: Đối tượng SubtitleTranslator
+        files: Danh sách (file đầu vào, file đầu ra) theo thứ tự ban đầu
+        target_lang: Ngôn ngữ đích
+        service: Dịch vụ dịch thuật (dùng làm khóa cache)
+
+    Returns:
+        FileCost của từng file theo thứ tự ban đầu (chi phí 0 nếu không đọc được file)
+    """
+    classified = classify_files(translator, [input_file for input_file, _ in files], target_lang, service)
+
+    costs = []
+    for position, ((input_file, output_file), (_, entries, error)) in enumerate(zip(files, classified)):
+        cost = FileCost(input_file, output_file, position)
+        costs.append(cost)
+        if entries is None:
+            logger.warning(f"Không ước lượng được chi phí của {input_file}: {error}")
+            continue
+
+        cost.blocks = len(entries)
+        for text, status in entries:
+            if status == TRANSLATE:
+                cost.uncached += 1
+                cost.chars += len(text)
+    return costs
+
+
+def parse_priorities(spec: Optional[str]) -> List[str]:
+    """Tách chuỗi ưu tiên (ví dụ "1-5, intro*") thành danh sách mục
+
+    Args:
+        spec: Các mục cách nhau bởi dấu phẩy; mỗi mục là khoảng số "a-b", một số, hoặc mẫu glob
+
+    Returns:
+        Danh sách mục theo thứ tự ưu tiên giảm dần
+    """
+    if not spec:
+        return []
+    return [item.strip() for item in spec.split(',') if item.strip()]
+
+
+def priority_rank(path: str, priorities: Sequence[str]) -> int:
+    """Tính hạng ưu tiên của một file (nhỏ hơn được dịch trước)
+
+    Mục dạng số so với số đầu tiên trong tên file ("Lecture 03 - Intro.srt" là 3),
+    mục còn lại là mẫu glob so với tên file hoặc đường dẫn.
+
+    Args:
+        path: Đường dẫn file
+        priorities: Danh sách mục ưu tiên
+
+    Returns:
+        Vị trí của mục đầu tiên khớp, len(priorities) nếu không khớp mục nào
+    """
+    name = Path(path).name
+    number_match = _NUMBER_PATTERN.search(Path(path).stem)
+    number = int(number_match.group()) if number_match else None
+
+    for rank, item in enumerate(priorities):
+        range_match = _RANGE_PATTERN.match(item)
+        if range_match:
+            low, high = sorted(int(value) for value in range_match.groups())
+            if number is not None and low <= number <= high:
+                return rank
+        elif item.isdigit():
+            if number == int(item):
+                return rank
+        elif fnmatch(name, item) or fnmatch(str(path), item):
+            return rank
+    return len(priorities)
+
+
+def order_files(costs: List[FileCost], policy: str = 'fifo', priorities: Sequence[str] = ()) -> List[FileCost]:
+    """Sắp xếp các file theo nhóm ưu tiên, rồi theo chính sách trong từng nhóm
+
+    Args:
+        costs: Chi phí của các file
+        policy: 'fifo', 'sjf' hoặc 'lpt'
+        priorities: Danh sách mục ưu tiên của người dùng
+
+    Returns:
+        Danh sách FileCost theo thứ tự dịch
+    """
+    if policy not in ORDER_POLICIES:
+        logger.warning(f"Chính sách sắp xếp file không hợp lệ: {policy}, dùng fifo")
+        policy = 'fifo'
+
+    def sort_key(cost: FileCost):
+        rank = priority_rank(cost.input_file, priorities)
+        if policy == 'sjf':
+            return rank, cost.tokens, cost.uncached, cost.position
+        if policy == 'lpt':
+            return rank, -cost.tokens, -cost.uncached, cost.position
+        return rank, cost.position
+
+    return sorted(costs, key=sort_key)
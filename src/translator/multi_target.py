@@ -0,0 +1,93 @@
+"""
+Dịch sang nhiều ngôn ngữ đích trong cùng một request: dựng prompt và đọc phản hồi JSON
+"""
+
+import os
+import json
+import re
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+
+
+def build_multi_target_prompt(texts: List[str], target_langs: List[str]) -> str:
+    """Dựng prompt yêu cầu dịch một batch văn bản sang mọi ngôn ngữ đích cùng lúc
+
+    Args:
+        texts: Danh sách văn bản cần dịch (ID là vị trí, bắt đầu từ 1)
+        target_langs: Danh sách mã ngôn ngữ đích
+
+    Returns:
+        Prompt yêu cầu phản hồi dạng JSON {"ID": {"lang": "bản dịch"}}
+    """
+    example = {"1": {lang: f"<{lang} translation of 1>" for lang in target_langs}}
+    source = {str(i): text for i, text in enumerate(texts, 1)}
+    return (
+        f"Translate every subtitle in the JSON object below into each of these languages: "
+        f"{', '.join(target_langs)}.\n"
+        "Return ONLY a JSON object with the same IDs, where each value maps a language code "
+        f"to the translation, for example: {json.dumps(example, ensure_ascii=False)}\n"
+        "Keep line breaks (\\n), numbers, technical terms, product names and code exactly as they are.\n\n"
+        f"{json.dumps(source, ensure_ascii=False, indent=1)}"
+    )
+
+
+def parse_multi_target_response(response: str, count: int, target_langs: List[str]) -> List[Dict[str, str]]:
+    """Đọc phản hồi JSON của prompt nhiều ngôn ngữ
+
+    Args:
+        response: Phản hồi của provider
+        count: Số văn bản trong batch
+        target_langs: Danh sách mã ngôn ngữ đích
+
+    Returns:
+        Danh sách (theo vị trí) từ điển {lang: bản dịch}; mục thiếu hoặc sai định dạng bị bỏ qua
+    """
+    results: List[Dict[str, str]] = [{} for _ in range(count)]
+    if not response:
+        return results
+
+    text = _CODE_FENCE_PATTERN.sub('', response.strip())
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end <= start:
+        logger.warning("Phản hồi nhiều ngôn ngữ không chứa JSON")
+        return results
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError as e:
+        logger.warning(f"Phản hồi nhiều ngôn ngữ không đúng định dạng JSON: {str(e)}")
+        return results
+    if not isinstance(data, dict):
+        return results
+
+    for key, translations in data.items():
+        try:
+            position = int(str(key).strip()) - 1
+        except ValueError:
+            continue
+        if not 0 <= position < count or not isinstance(translations, dict):
+            continue
+        for lang in target_langs:
+            value = translations.get(lang)
+            if isinstance(value, str) and value.strip():
+                results[position][lang] = value.strip()
+    return results
+
+
+def language_output_path(input_file: str, lang: str, output_dir: Optional[str] = None) -> str:
+    """Tạo đường dẫn file phụ đề cho một ngôn ngữ: <tên gốc>_<lang>.srt
+
+    Args:
+        input_file: Đường dẫn file phụ đề gốc
+        lang: Mã ngôn ngữ
+        output_dir: Thư mục đầu ra (None để dùng thư mục của file gốc)
+
+    Returns:
+        Đường dẫn file đầu ra
+    """
+    directory = output_dir or os.path.dirname(input_file)
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(directory, f"{stem}_{lang}.srt")
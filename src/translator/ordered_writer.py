@@ -0,0 +1,209 @@
+"""
+Ghi phụ đề dịch ra file theo thứ tự block ngay trong lúc dịch
+"""
+
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Hậu tố của file đang ghi dở, đồng thời là điểm tiếp tục khi chạy lại
+PART_SUFFIX = '.part'
+
+# Tiền tố văn bản của block dịch lỗi (block này không được tính là đã xong khi tiếp tục)
+ERROR_MARKER_PREFIX = '[TRANSLATION ERROR FOR BLOCK'
+
+_BLANK_LINES_PATTERN = re.compile(r'\n\s*\n')
+
+
+class OrderedSubtitleWriter:
+    """Nhận block dịch xong theo thứ tự bất kỳ và ghi nối tiếp ra file theo đúng thứ tự.
+
+    Block về sớm được giữ trong bộ đệm sắp xếp lại, giới hạn bởi reorder_limit: người gọi chỉ gửi
+    block có vị trí nhỏ hơn window_end(). Phần đầu liên tục được ghi ngay vào <output>.part
+    (fsync định kỳ); khi đủ block, file .part được đổi tên thành file đích. Nếu tiến trình dừng
+    giữa chừng, lần chạy sau đọc lại file .part và tiếp tục từ block đầu tiên chưa ghi.
+    Bộ nhớ dùng cho kết quả chỉ phụ thuộc reorder_limit, không phụ thuộc độ dài file.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        subtitle_processor,
+        reorder_limit: Optional[int] = None,
+        fsync_every: Optional[int] = None
+    ):
+        """Khởi tạo OrderedSubtitleWriter
+
+        Args:
+            output_file: Đường dẫn file phụ đề đầu ra
+            subtitle_processor: Đối tượng SubtitleProcessor (phân tách/tạo block)
+            reorder_limit: Số block tối đa tính từ block chưa ghi đầu tiên được phép gửi đi dịch
+            fsync_every: Số block ghi giữa hai lần fsync
+        """
+        self.output_file = output_file
+        self.part_file = output_file + PART_SUFFIX
+        self.subtitle_processor = subtitle_processor
+        self.reorder_limit = reorder_limit or int(os.getenv('WRITER_REORDER_LIMIT', '256'))
+        self.fsync_every = fsync_every or int(os.getenv('WRITER_FSYNC_EVERY', '50'))
+
+        self.total = 0
+        self.next_index = 0
+        self.resumed = 0
+        self._buffer: Dict[int, str] = {}
+        self._file = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+
+    def open(self, original_blocks: List[str]) -> int:
+        """Mở file .part để ghi, giữ lại phần đã ghi ở lần chạy trước nếu còn khớp với file gốc
+
+        Args:
+            original_blocks: Các block phụ đề gốc
+
+        Returns:
+            Số block đầu tiên đã có sẵn (không cần dịch lại)
+        """
+        self.total = len(original_blocks)
+        directory = os.path.dirname(self.part_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        count, offset = self._read_checkpoint(original_blocks)
+        self._file = open(self.part_file, 'r+b' if count else 'wb')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+        self.next_index = self.resumed = count
+        if count:
+            logger.info(f"Tiếp tục {self.output_file} từ block {count + 1}/{self.total}")
+        return count
+
+    def window_end(self) -> int:
+        """Vị trí block đầu tiên chưa được phép gửi đi dịch (giới hạn bộ đệm sắp xếp lại)"""
+        with self._lock:
+            return self.next_index + self.reorder_limit
+
+    def done(self) -> bool:
+        """Kiểm tra đã ghi đủ mọi block chưa"""
+        with self._lock:
+            return self.next_index >= self.total
+
+    def add(self, index: int, block: str) -> None:
+        """Nhận một block đã dịch (hoặc đã đánh dấu lỗi) và ghi phần đầu liên tục ra file
+
+        Args:
+            index: Vị trí của block trong file
+            block: Block phụ đề hoàn chỉnh
+        """
+        with self._lock:
+            if index < self.next_index:
+                return
+            self._buffer[index] = block
+            written = 0
+            while self.next_index in self._buffer:
+                self._write(self.next_index, self._buffer.pop(self.next_index))
+                self.next_index += 1
+                written += 1
+            if not written:
+                return
+            # Đẩy xuống hệ điều hành sau mỗi lần ghi (tiến trình chết vẫn còn dữ liệu),
+            # fsync định kỳ để giới hạn phần mất khi cả máy dừng đột ngột
+            self._file.flush()
+            self._unsynced += written
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+
+    def close(self) -> bool:
+        """Hoàn tất file: fsync rồi đổi tên file .part thành file đích
+
+        Returns:
+            True nếu đã ghi đủ block và đổi tên thành công
+        """
+        with self._lock:
+            if self._file is None:
+                return False
+            complete = self.next_index >= self.total and not self._buffer
+            try:
+                if complete and self.total:
+                    # Bỏ dòng trống thừa sau block cuối cùng
+                    self._file.seek(0, os.SEEK_END)
+                    self._file.truncate(self._file.tell() - 1)
+                self._sync()
+                self._file.close()
+                self._file = None
+                if not complete:
+                    logger.error(f"File {self.part_file} chưa đủ block ({self.next_index}/{self.total})")
+                    return False
+                os.replace(self.part_file, self.output_file)
+                return True
+            except OSError as e:
+                logger.error(f"Lỗi khi hoàn tất file {self.output_file}: {str(e)}")
+                return False
+
+    def abort(self, discard: bool = False) -> None:
+        """Đóng file giữa chừng, giữ file .part làm điểm tiếp tục (hoặc xóa nếu discard)
+
+        Args:
+            discard: Xóa file .part
+        """
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._sync()
+                    self._file.close()
+                except OSError as e:
+                    logger.error(f"Lỗi khi đóng file {self.part_file}: {str(e)}")
+                self._file = None
+            self._buffer.clear()
+            if discard and os.path.exists(self.part_file):
+                os.remove(self.part_file)
+
+    def _write(self, index: int, block: str) -> None:
+        try:
+            number, timestamp, text = self.subtitle_processor.parse_subtitle_block(block)
+            block = self.subtitle_processor.create_subtitle_block(str(index + 1), timestamp, text)
+        except ValueError:
+            # Nếu không thể phân tích block, giữ nguyên
+            pass
+        # Dòng trống bên trong block sẽ làm hỏng cấu trúc file phụ đề
+        block = _BLANK_LINES_PATTERN.sub('\n', block.strip())
+        self._file.write((block + '\n\n').encode('utf-8'))
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _read_checkpoint(self, original_blocks: List[str]):
+        """Đếm số block đầu tiên trong file .part khớp với file gốc (cùng timestamp, không lỗi)
+
+        Returns:
+            Tuple (số block giữ lại, độ dài tính bằng byte của phần giữ lại)
+        """
+        if not os.path.exists(self.part_file):
+            return 0, 0
+        try:
+            with open(self.part_file, 'rb') as f:
+                content = f.read().decode('utf-8')
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Không đọc được {self.part_file}, dịch lại từ đầu: {str(e)}")
+            return 0, 0
+
+        # Mỗi block kết thúc bằng một dòng trống, phần sau dòng trống cuối cùng là block ghi dở
+        written = content.split('\n\n')[:-1]
+        count, offset = 0, 0
+        for block, original in zip(written, original_blocks):
+            try:
+                _, timestamp, text = self.subtitle_processor.parse_subtitle_block(block)
+                _, original_timestamp, _ = self.subtitle_processor.parse_subtitle_block(original)
+            except ValueError:
+                break
+            if timestamp != original_timestamp or text.startswith(ERROR_MARKER_PREFIX):
+                break
+            count += 1
+            offset += len((block + '\n\n').encode('utf-8'))
+        return count, offset
@@ -0,0 +1,266 @@
+"""
+Bộ lọc cục bộ cho các block không cần gọi provider (nhãn âm thanh, số, URL, code,
+văn bản đã ở ngôn ngữ đích)
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Nhãn âm thanh/ghi chú của Whisper: [Music], (applause), ♪ ... ♪
+SOUND_TAG_PATTERN = re.compile(r'^\s*(?:[\[\(]\s*([^\[\]\(\)]{1,40}?)\s*[\]\)]\s*)+$')
+MUSIC_NOTES_PATTERN = re.compile(r'^[\s♪♫♩♬#*~.…-]+$')
+NON_LINGUISTIC_PATTERN = re.compile(r'^[\d\s.,:;%$€£¥+\-*/=<>()\[\]#&!?\'"…–—_|^~`@]+$')
+URL_PATTERN = re.compile(r'^\s*(?:(?:https?://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.]+|[\w-]+(?:\.[\w-]+)*\.(?:com|org|net|io|dev|vn)(?:/\S*)?)\s*$', re.IGNORECASE)
+# Thẻ định dạng của SRT (<i>, <font color=...>, {\an8}), bỏ đi trước khi phân loại
+FORMAT_TAG_PATTERN = re.compile(r'</?(?:i|b|u|s|font)\b[^<>]*>|\{\\[^{}]*\}', re.IGNORECASE)
+# Dòng có thể là code: bắt đầu giống một câu lệnh/khai báo
+CODE_LINE_PATTERN = re.compile(
+    r'^\s*(?:\$ |>>> |#include|import \w|from [\w.]+ import|def \w+\(|class \w+[(:]|function \w*\(|'
+    r'(?:const|let|var) \w+ ?=|public |private |return\b|sudo |npm |pip |git |docker |kubectl |'
+    r'SELECT |INSERT |UPDATE |CREATE |</?\w+[^>]*>|[\w.]+\([^)]*\);?$|[{}]\s*$|\w+ ?= ?[\w"\'\[{(])'
+)
+# Câu tiếng Anh bình thường cũng có thể bắt đầu bằng "import", "git", "SELECT"... nên code còn cần bằng chứng
+# mạnh: dấu nhắc lệnh, một dòng kết thúc như câu lệnh (;, {, }, lời gọi hàm, "def ...:"),
+CODE_END_PATTERN = re.compile(
+    r'^\s*(?:\$|>>>) \S|(?:[;{}]|[\w.]\w*\([^()]*\)|^\s*(?:def|class|if|elif|else|for|while|try|except|with)\b.*:)\s*$',
+    re.MULTILINE
+)
+# hoặc ít nhất MIN_CODE_TOKENS ký hiệu code
+CODE_TOKEN_PATTERN = re.compile(r'\w\(|[{}\[\];]|==|!=|<=|>=|=>|->|::|&&|\|\||\s=\s|--\w|\w_\w|\w\.\w+\(')
+MIN_CODE_TOKENS = 2
+
+# Bản dịch có sẵn cho các nhãn âm thanh thường gặp
+PHRASEBOOK: Dict[str, Dict[str, str]] = {
+    'vi': {
+        'music': 'Âm nhạc', 'applause': 'Vỗ tay', 'laughter': 'Tiếng cười', 'laughs': 'Tiếng cười',
+        'laughing': 'Tiếng cười', 'silence': 'Im lặng', 'inaudible': 'Không nghe rõ', 'noise': 'Tiếng ồn',
+        'cheering': 'Reo hò', 'sighs': 'Thở dài', 'coughs': 'Ho', 'no audio': 'Không có âm thanh',
+        'background music': 'Nhạc nền', 'upbeat music': 'Nhạc sôi động', 'music playing': 'Nhạc đang phát',
+        'keyboard clicking': 'Tiếng gõ phím', 'typing': 'Tiếng gõ phím', 'blank_audio': 'Không có âm thanh',
+    },
+}
+
+# Ngôn ngữ có hệ chữ riêng: khoảng ký tự Unicode đặc trưng
+SCRIPT_RANGES: Dict[str, List[Tuple[int, int]]] = {
+    'ja': [(0x3040, 0x30FF), (0x4E00, 0x9FFF)],
+    'zh': [(0x4E00, 0x9FFF), (0x3400, 0x4DBF)],
+    'ko': [(0xAC00, 0xD7AF), (0x1100, 0x11FF)],
+    'ru': [(0x0400, 0x04FF)],
+    'uk': [(0x0400, 0x04FF)],
+    'th': [(0x0E00, 0x0E7F)],
+    'ar': [(0x0600, 0x06FF)],
+    'he': [(0x0590, 0x05FF)],
+    'hi': [(0x0900, 0x097F)],
+}
+
+# Chữ cái chỉ có trong tiếng Việt (sau khi bỏ dấu thanh vẫn còn, hoặc dấu thanh đặc trưng)
+VIETNAMESE_LETTERS = set('ăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ')
+
+# Văn bản mẫu để dựng hồ sơ n-gram ký tự cho bộ nhận diện ngôn ngữ
+LANGUAGE_SAMPLES: Dict[str, str] = {
+    'vi': (
+        "xin chào các bạn hôm nay chúng ta sẽ tìm hiểu về cách cài đặt và cấu hình hệ thống "
+        "đây là một ví dụ rất quan trọng mà bạn cần phải nắm được trước khi bắt đầu bài học tiếp theo "
+        "nếu bạn không hiểu thì hãy xem lại phần trước và thử làm theo từng bước một cách cẩn thận "
+        "chúng tôi đã chuẩn bị những tài liệu này để giúp người học có thể thực hành ngay trên máy của mình "
+        "khi chạy chương trình bạn sẽ thấy kết quả được hiển thị ở đây và có thể thay đổi các tham số"
+    ),
+    'en': (
+        "hello everyone today we are going to learn how to install and configure the system "
+        "this is a very important example that you need to understand before we start the next lesson "
+        "if you do not understand it then please go back to the previous part and follow each step carefully "
+        "we have prepared these materials to help learners practice right away on their own machine "
+        "when you run the program you will see the result shown here and you can change the parameters"
+    ),
+    'fr': (
+        "bonjour à tous aujourd'hui nous allons apprendre comment installer et configurer le système "
+        "c'est un exemple très important que vous devez comprendre avant de commencer la prochaine leçon "
+        "si vous ne comprenez pas alors revenez à la partie précédente et suivez chaque étape avec soin"
+    ),
+    'es': (
+        "hola a todos hoy vamos a aprender cómo instalar y configurar el sistema "
+        "este es un ejemplo muy importante que necesitas entender antes de empezar la siguiente lección "
+        "si no lo entiendes entonces vuelve a la parte anterior y sigue cada paso con cuidado"
+    ),
+    'de': (
+        "hallo zusammen heute lernen wir wie man das system installiert und konfiguriert "
+        "das ist ein sehr wichtiges beispiel das sie verstehen müssen bevor wir mit der nächsten lektion beginnen "
+        "wenn sie es nicht verstehen dann gehen sie zurück zum vorherigen teil und folgen sie jedem schritt"
+    ),
+}
+
+
+class NgramLanguageIdentifier:
+    """Nhận diện ngôn ngữ bằng hồ sơ trigram ký tự (phương pháp xếp hạng out-of-place)"""
+
+    def __init__(self, samples: Optional[Dict[str, str]] = None, profile_size: int = 300):
+        """Khởi tạo bộ nhận diện
+
+        Args:
+            samples: Văn bản mẫu theo mã ngôn ngữ (None để dùng mẫu có sẵn)
+            profile_size: Số n-gram giữ lại trong hồ sơ mỗi ngôn ngữ
+        """
+        self.profile_size = profile_size
+        self.profiles = {
+            lang: self._profile(text) for lang, text in (samples or LANGUAGE_SAMPLES).items()
+        }
+
+    def detect(self, text: str) -> Tuple[Optional[str], float]:
+        """Đoán ngôn ngữ của văn bản
+
+        Args:
+            text: Văn bản cần nhận diện
+
+        Returns:
+            Tuple (mã ngôn ngữ, độ chênh khoảng cách so với ngôn ngữ đứng thứ hai trong khoảng 0-1)
+        """
+        profile = self._profile(text)
+        if not profile:
+            return None, 0.0
+
+        distances = sorted(
+            (self._distance(profile, reference), lang) for lang, reference in self.profiles.items()
+        )
+        best_distance, best_lang = distances[0]
+        if len(distances) == 1:
+            return best_lang, 1.0
+        worst = len(profile) * self.profile_size
+        margin = (distances[1][0] - best_distance) / worst if worst else 0.0
+        return best_lang, margin
+
+    def _profile(self, text: str) -> Dict[str, int]:
+        counts = Counter()
+        for word in re.findall(r'[^\W\d_]+', text.lower()):
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                counts[padded[i:i + 3]] += 1
+        return {gram: rank for rank, (gram, _) in enumerate(counts.most_common(self.profile_size))}
+
+    def _distance(self, profile: Dict[str, int], reference: Dict[str, int]) -> int:
+        return sum(abs(rank - reference.get(gram, self.profile_size)) for gram, rank in profile.items())
+
+
+class SkipClassifier:
+    """Lọc các block không cần dịch trước khi gọi provider.
+
+    Block được trả nguyên văn (hoặc lấy từ phrasebook) nếu là nhãn âm thanh, chỉ gồm số/ký hiệu,
+    URL, đoạn code, hoặc đã ở sẵn ngôn ngữ đích. Bộ đếm cho biết đã tránh được bao nhiêu lần gọi.
+    """
+
+    def __init__(self, min_letters: int = 12, min_margin: float = 0.05,
+                 phrasebook: Optional[Dict[str, Dict[str, str]]] = None):
+        """Khởi tạo SkipClassifier
+
+        Args:
+            min_letters: Số chữ cái tối thiểu để tin kết quả nhận diện ngôn ngữ
+            min_margin: Độ chênh tối thiểu giữa ngôn ngữ đích và ngôn ngữ đứng thứ hai
+            phrasebook: Bản dịch có sẵn cho nhãn âm thanh theo ngôn ngữ đích
+        """
+        self.min_letters = min_letters
+        self.min_margin = min_margin
+        self.phrasebook = phrasebook if phrasebook is not None else PHRASEBOOK
+        self.identifier = NgramLanguageIdentifier()
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, text: str, target_lang: str) -> Optional[Tuple[str, str]]:
+        """Kiểm tra block có cần gọi provider không
+
+        Args:
+            text: Văn bản của block
+            target_lang: Ngôn ngữ đích
+
+        Returns:
+            Tuple (lý do, văn bản đầu ra) nếu không cần dịch, None nếu cần gọi provider
+        """
+        result = self._classify(text, target_lang)
+        if result is not None:
+            with self._lock:
+                self._counts[result[0]] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        """Lấy số lần gọi provider đã tránh được theo từng lý do
+
+        Returns:
+            Từ điển {lý do: số block}
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def _classify(self, text: str, target_lang: str) -> Optional[Tuple[str, str]]:
+        stripped = FORMAT_TAG_PATTERN.sub('', text).strip()
+        if not stripped:
+            return 'empty', text
+
+        if MUSIC_NOTES_PATTERN.match(stripped):
+            return 'sound_tag', text
+        if SOUND_TAG_PATTERN.match(stripped):
+            return 'sound_tag', self._translate_tags(text.strip(), target_lang)
+        if NON_LINGUISTIC_PATTERN.match(stripped):
+            return 'non_linguistic', text
+        if URL_PATTERN.match(stripped):
+            return 'url', text
+        if self._is_code(stripped):
+            return 'code', text
+
+        if self._is_target_language(stripped, target_lang):
+            return 'already_target', text
+        return None
+
+    def _is_code(self, text: str) -> bool:
+        lines = [line for line in text.split('\n') if line.strip()]
+        if not all(CODE_LINE_PATTERN.match(line) for line in lines):
+            return False
+        return bool(CODE_END_PATTERN.search(text)) or len(CODE_TOKEN_PATTERN.findall(text)) >= MIN_CODE_TOKENS
+
+    def _translate_tags(self, text: str, target_lang: str) -> str:
+        phrases = self.phrasebook.get(target_lang.lower(), {})
+
+        def replace(match: re.Match) -> str:
+            tag = match.group(2).strip()
+            translated = phrases.get(tag.lower())
+            return f"{match.group(1)}{translated}{match.group(3)}" if translated else match.group(0)
+
+        return re.sub(r'([\[\(]\s*)([^\[\]\(\)]+?)(\s*[\]\)])', replace, text)
+
+    def _is_target_language(self, text: str, target_lang: str) -> bool:
+        lang = target_lang.lower().split('-')[0]
+        letters = [c for c in text if c.isalpha()]
+        if len(letters) < self.min_letters:
+            return False
+
+        ranges = SCRIPT_RANGES.get(lang)
+        if ranges:
+            in_script = sum(1 for c in letters if any(lo <= ord(c) <= hi for lo, hi in ranges))
+            return in_script / len(letters) >= 0.6
+
+        if lang == 'vi' and not any(c in VIETNAMESE_LETTERS for c in text.lower()):
+            # Không có chữ cái riêng của tiếng Việt thì không thể đã là tiếng Việt
+            return False
+        if lang != 'vi' and lang in self.identifier.profiles and any(
+            unicodedata.category(c) == 'Lo' for c in letters
+        ):
+            return False
+
+        detected, margin = self.identifier.detect(text)
+        return detected == lang and margin >= self.min_margin
+
+
+_shared_classifier: Optional[SkipClassifier] = None
+_shared_lock = threading.Lock()
+
+def get_skip_classifier() -> SkipClassifier:
+    """Lấy SkipClassifier dùng chung cho toàn bộ tiến trình
+
+    Returns:
+        Đối tượng SkipClassifier dùng chung
+    """
+    global _shared_classifier
+    with _shared_lock:
+        if _shared_classifier is None:
+            _shared_classifier = SkipClassifier()
+        return _shared_classifier
@@ -2,6 +2,7 @@ import os
 import logging
 import time
 import json
+import threading
 from typing import List, Optional, Dict, Tuple
 from pathlib import Path
 import concurrent.futures
@@ -55,124 +56,277 @@ class SubtitleTranslator:
         self.translator_service = translator_service
         self.subtitle_processor = subtitle_processor
         
-    def process_subtitle_file(self, input_file: str, output_file: str, target_lang: str = 'vi', service: str = 'novita', max_workers: int = 10) -> bool:
+    def process_subtitle_file(self, input_file: str, output_file: str, target_lang: str = 'vi', service: str = 'novita', max_workers: int = 10, journal=None) -> bool:
         """Xử lý file phụ đề và tạo bản dịch (song song nhiều block).
         
+        Block dịch xong được ghi dần vào <output_file>.part theo đúng thứ tự; nếu lần chạy trước
+        dừng giữa chừng, phần đã ghi được giữ lại và chỉ dịch tiếp các block còn thiếu.
+        
         Args:
             input_file: Đường dẫn file phụ đề đầu vào
             output_file: Đường dẫn file phụ đề đầu ra
             target_lang: Ngôn ngữ đích (mặc định: vi)
             service: Dịch vụ dịch thuật sử dụng
             max_workers: Số luồng xử lý tối đa
+            journal: JobJournal của job chứa file này (tiếp tục từ các block đã dịch trong nhật ký)
             
         Returns:
             True nếu thành công, False nếu thất bại
         """
+        from .directory_scheduler import DirectoryScheduler
+        
+        try:
+            scheduler = DirectoryScheduler(self, max_workers, journal=journal)
+            results = scheduler.run([(input_file, output_file)], target_lang, service)
+            return results['successful'] == 1
+            
+        except Exception as e:
+            logger.error(f"Lỗi khi xử lý file phụ đề: {str(e)}")
+            return False
+    
+    def process_subtitle_file_multi(
+        self,
+        input_file: str,
+        target_langs: List[str],
+        service: str = 'novita',
+        max_workers: int = 10,
+        output_dir: Optional[str] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, bool]:
+        """Dịch file phụ đề sang nhiều ngôn ngữ, mỗi batch block chỉ tốn một request cho mọi ngôn ngữ.
+        
+        Mỗi ngôn ngữ được ghi ra <tên gốc>_<lang>.srt và lưu cache theo khóa riêng
+        (cùng khóa với chế độ một ngôn ngữ), mục thiếu trong phản hồi được dịch lại riêng.
+        
+        Args:
+            input_file: Đường dẫn file phụ đề đầu vào
+            target_langs: Danh sách ngôn ngữ đích
+            service: Dịch vụ dịch thuật sử dụng
+            max_workers: Số luồng xử lý tối đa
+            output_dir: Thư mục đầu ra (None để ghi cạnh file gốc)
+            batch_size: Số block mỗi request (None để đọc từ MULTI_TARGET_BATCH_SIZE)
+            
+        Returns:
+            Từ điển {ngôn ngữ: True nếu thành công}
+        """
+        from ..api.retry_budget import RetryBudget, Deadline
+        from .multi_target import language_output_path
+        
         start_time = time.time()
+        batch_size = batch_size or int(os.getenv('MULTI_TARGET_BATCH_SIZE', '10'))
         try:
-            # Đọc nội dung file phụ đề
+            retry_budget = RetryBudget()
             content = self.subtitle_processor.read_subtitle_file(input_file)
-            
-            # Tách thành các block
             blocks = self.subtitle_processor.split_into_blocks(content)
             
-            # Khởi tạo thống kê
-            stats = {
-                'total_blocks': len(blocks),
-                'successful': 0,
-                'failed': 0,
-                'cache_hits': 0
-            }
+            translated = {lang: [None] * len(blocks) for lang in target_langs}
+            errors = {lang: [None] * len(blocks) for lang in target_langs}
+            stats = {'cache_hits': 0, 'skipped': 0, 'requests': 0, 'fallback_requests': 0}
+            stats_lock = threading.Lock()
+            skip_classifier = getattr(self.translator_service, 'skip_classifier', None)
             
-            # Dịch các block song song
-            translated_blocks, errors = self._translate_blocks_parallel(
-                blocks, target_lang, service, max_workers, stats
-            )
+            # Lấy sẵn từ cache/bộ lọc, chỉ giữ lại các cặp (block, ngôn ngữ) cần gọi provider
+            pending = []
+            for idx, block in enumerate(blocks):
+                try:
+                    number, timestamp, text = self.subtitle_processor.parse_subtitle_block(block)
+                except Exception as e:
+                    for lang in target_langs:
+                        errors[lang][idx] = f"Block {idx+1} lỗi: {str(e)}"
+                    continue
+                
+                missing = []
+                for lang in target_langs:
+                    skipped = skip_classifier.check(text, lang) if skip_classifier is not None else None
+                    if skipped is not None:
+                        output = skipped[1]
+                        stats['skipped'] += 1
+                    else:
+                        cache_key = self.cache_manager.generate_key(text, target_lang=lang, service=service)
+                        output = self.cache_manager.get(cache_key)
+                        if output:
+                            stats['cache_hits'] += 1
+                    if output:
+                        translated[lang][idx] = self.subtitle_processor.create_subtitle_block(number, timestamp, output)
+                    else:
+                        missing.append(lang)
+                if missing:
+                    pending.append((idx, number, timestamp, text, missing))
+            
+            def translate_batch(batch):
+                langs = [lang for lang in target_langs if any(lang in item[4] for item in batch)]
+                deadline = Deadline(budget=retry_budget, defer_retries=True)
+                results = self.translator_service.translate_multi(
+                    [item[3] for item in batch], langs, service, deadline=deadline
+                )
+                with stats_lock:
+                    stats['requests'] += 1
+                
+                for (idx, number, timestamp, text, missing), result in zip(batch, results):
+                    for lang in missing:
+                        output = result.get(lang)
+                        if output:
+                            self.cache_manager.set(
+                                self.cache_manager.generate_key(text, target_lang=lang, service=service), output
+                            )
+                        else:
+                            # Thiếu trong phản hồi: dịch riêng ngôn ngữ này (có cache và retry)
+                            with stats_lock:
+                                stats['fallback_requests'] += 1
+                            output = self.translator_service.translate_text(
+                                text, lang, service, deadline=Deadline(budget=retry_budget)
+                            )
+                        if output:
+                            translated[lang][idx] = self.subtitle_processor.create_subtitle_block(number, timestamp, output)
+                            errors[lang][idx] = None
+                        else:
+                            errors[lang][idx] = f"Block {idx+1} dịch lỗi hoặc rỗng ({lang})"
+            
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for future in concurrent.futures.as_completed([executor.submit(translate_batch, b) for b in batches]):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Lỗi khi dịch batch nhiều ngôn ngữ: {str(e)}")
             
-            # Xử lý và lưu kết quả
-            success = self._process_and_save_results(
-                translated_blocks, errors, blocks, output_file
-            )
+            results = {}
+            for lang in target_langs:
+                output_file = language_output_path(input_file, lang, output_dir)
+                results[lang] = self._process_and_save_results(translated[lang], errors[lang], blocks, output_file)
             
-            # Log kết quả
+            single_requests = sum(len(item[4]) for item in pending)
             elapsed_time = time.time() - start_time
-            logger.info(f"Đã dịch xong file {input_file} trong {elapsed_time:.2f}s: "
-                       f"{stats['successful']}/{stats['total_blocks']} block thành công, "
-                       f"{stats['cache_hits']} từ cache")
-            return success
+            logger.info(f"Đã dịch {input_file} sang {', '.join(target_langs)} trong {elapsed_time:.2f}s: "
+                       f"{stats['requests']} request nhiều ngôn ngữ + {stats['fallback_requests']} request bổ sung "
+                       f"(thay cho {single_requests} request nếu dịch riêng từng ngôn ngữ), "
+                       f"{stats['cache_hits']} từ cache, {stats['skipped']} không cần gọi provider")
+            return results
             
         except Exception as e:
-            logger.error(f"Lỗi khi xử lý file phụ đề: {str(e)}")
-            return False
+            logger.error(f"Lỗi khi xử lý file phụ đề nhiều ngôn ngữ: {str(e)}")
+            return {lang: False for lang in target_langs}
     
-    def _translate_blocks_parallel(
-        self, 
-        blocks: List[str], 
-        target_lang: str, 
-        service: str, 
-        max_workers: int,
-        stats: Dict
-    ) -> Tuple[List[Optional[str]], List[Optional[str]]]:
-        """Dịch các block phụ đề song song.
+    def _translate_block(
+        self,
+        idx: int,
+        block: str,
+        target_lang: str,
+        service: str,
+        pass_service: str,
+        defer_retries: bool,
+        stats: Dict,
+        stats_lock: threading.Lock,
+        errors: List[Optional[str]],
+        retry_budget=None
+    ) -> Optional[str]:
+        """Dịch một block phụ đề (bỏ qua block không cần dịch, dùng cache nếu có).
         
         Args:
-            blocks: Danh sách các block phụ đề
+            idx: Vị trí của block trong file
+            block: Block phụ đề gốc
             target_lang: Ngôn ngữ đích
-            service: Dịch vụ dịch thuật
-            max_workers: Số luồng tối đa
-            stats: Từ điển lưu thông tin thống kê
+            service: Dịch vụ dịch thuật của lần chạy (dùng làm khóa cache)
+            pass_service: Dịch vụ dùng cho lượt dịch hiện tại
+            defer_retries: Không retry tại chỗ, block lỗi được hoãn tới lượt sau
+            stats: Từ điển thống kê của file
+            stats_lock: Khóa bảo vệ stats
+            errors: Danh sách lỗi của file (ghi vào vị trí idx)
+            retry_budget: Ngân sách retry của file
             
         Returns:
-            Tuple (danh sách block đã dịch, danh sách lỗi)
+            Block đã dịch, None nếu lỗi
         """
-        translated_blocks = [None] * len(blocks)
-        errors = [None] * len(blocks)
+        from ..api.retry_budget import Deadline
         
-        def translate_block_wrapper(idx, block):
-            try:
-                # Phân tách block
-                number, timestamp, text = self.subtitle_processor.parse_subtitle_block(block)
-                
-                # Kiểm tra cache
-                cache_key = self.cache_manager.generate_key(text, target_lang=target_lang, service=service)
-                cached_result = self.cache_manager.get(cache_key)
-                
-                if cached_result:
-                    stats['cache_hits'] += 1
+        def count(key):
+            with stats_lock:
+                stats[key] += 1
+        
+        try:
+            # Phân tách block
+            number, timestamp, text = self.subtitle_processor.parse_subtitle_block(block)
+            
+            # Block không cần dịch được điền ngay, không gọi provider
+            skip_classifier = getattr(self.translator_service, 'skip_classifier', None)
+            skipped = skip_classifier.check(text, target_lang) if skip_classifier is not None else None
+            if skipped is not None:
+                reason, output = skipped
+                with stats_lock:
+                    stats['skipped'][reason] = stats['skipped'].get(reason, 0) + 1
                     stats['successful'] += 1
-                    return self.subtitle_processor.create_subtitle_block(number, timestamp, cached_result)
-                
-                # Dịch văn bản
-                translated_text = self.translator_service.translate_text(text, target_lang, service)
-                
-                if not translated_text:
-                    errors[idx] = f"Block {idx+1} dịch lỗi hoặc rỗng"
-                    return None
-                    
-                # Lưu kết quả vào cache
-                self.cache_manager.set(cache_key, translated_text)
+                errors[idx] = None
+                return self.subtitle_processor.create_subtitle_block(number, timestamp, output)
+            
+            # Kiểm tra cache
+            cache_key = self.cache_manager.generate_key(text, target_lang=target_lang, service=service)
+            cached_result = self.cache_manager.get(cache_key)
+            
+            if cached_result:
+                count('cache_hits')
+                count('successful')
+                errors[idx] = None
+                return self.subtitle_processor.create_subtitle_block(number, timestamp, cached_result)
+            
+            # Dịch văn bản với thời hạn riêng cho block, truyền xuống mọi tầng retry
+            deadline = Deadline(budget=retry_budget, defer_retries=defer_retries)
+            translated_text = self.translator_service.translate_text(text, target_lang, pass_service, deadline=deadline)
+            
+            if not translated_text:
+                errors[idx] = f"Block {idx+1} dịch lỗi hoặc rỗng"
+                return None
                 
-                stats['successful'] += 1
-                return self.subtitle_processor.create_subtitle_block(number, timestamp, translated_text)
+            # Lưu kết quả vào cache
+            self.cache_manager.set(cache_key, translated_text)
+            
+            count('successful')
+            errors[idx] = None
+            return self.subtitle_processor.create_subtitle_block(number, timestamp, translated_text)
+            
+        except Exception as e:
+            errors[idx] = f"Block {idx+1} lỗi: {str(e)}"
+            return None
+    
+    def _pick_retry_service(self, service: str) -> str:
+        """Chọn provider cho lượt dịch lại các block bị hoãn.
+        
+        Args:
+            service: Provider đã dùng ở lượt đầu
+            
+        Returns:
+            Provider khả dụng đầu tiên khác service theo thứ tự ưu tiên, hoặc chính service
+        """
+        priorities = getattr(self.api_handler, 'provider_priority', None) or []
+        providers = getattr(self.api_handler, 'providers', None) or {}
+        circuit_breaker = getattr(self.api_handler, 'circuit_breaker', None)
+        
+        for name in priorities:
+            if name == service or providers.get(name) is None:
+                continue
+            if circuit_breaker is None or circuit_breaker.is_available(name):
+                return name
+        return service
                 
-            except Exception as e:
-                errors[idx] = f"Block {idx+1} lỗi: {str(e)}"
-                stats['failed'] += 1
-                return None
+    def _mark_failed_block(self, idx: int, original_block: str) -> str:
+        """Tạo block thay thế cho block dịch lỗi.
+        
+        Giữ nguyên số thứ tự, timestamp và văn bản gốc để phụ đề vẫn khớp thời gian.
         
-        # Sử dụng ThreadPoolExecutor để dịch song song
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_idx = {executor.submit(translate_block_wrapper, i, block): i for i, block in enumerate(blocks)}
+        Args:
+            idx: Vị trí của block trong file
+            original_block: Block phụ đề gốc
             
-            for future in concurrent.futures.as_completed(future_to_idx):
-                idx = future_to_idx[future]
-                try:
-                    translated_blocks[idx] = future.result()
-                except Exception as e:
-                    errors[idx] = f"Block {idx+1} lỗi: {str(e)}"
-                    stats['failed'] += 1
-                    
-        return translated_blocks, errors
+        Returns:
+            Block gốc có đánh dấu lỗi ở đầu văn bản
+        """
+        from .ordered_writer import ERROR_MARKER_PREFIX
+        
+        marker = f"{ERROR_MARKER_PREFIX} {idx+1}]"
+        try:
+            number, timestamp, text = self.subtitle_processor.parse_subtitle_block(original_block)
+            return self.subtitle_processor.create_subtitle_block(number, timestamp, f"{marker}\n{text}")
+        except Exception:
+            return original_block
                 
     def _process_and_save_results(
         self, 
@@ -205,13 +359,9 @@ class SubtitleTranslator:
             
             # Nếu một số block dịch thành công, vẫn lưu file kết quả
             # nhưng đánh dấu các block lỗi
+            # (giữ nguyên số thứ tự, timestamp và văn bản gốc để phụ đề vẫn khớp thời gian)
             for i in failed_blocks:
-                number = str(i+1)
-                translated_blocks[i] = self.subtitle_processor.create_subtitle_block(
-                    number, 
-                    "00:00:00,000 --> 00:00:01,000", 
-                    f"[TRANSLATION ERROR FOR BLOCK {i+1}]"
-                )
+                translated_blocks[i] = self._mark_failed_block(i, original_blocks[i])
             logger.warning(f"Lưu file với {len(failed_blocks)} block lỗi đã được đánh dấu")
             
         # Đánh số lại các block và ghép lại
@@ -226,59 +376,157 @@ class SubtitleTranslator:
             logger.error(f"Lỗi khi lưu file {output_file}")
             return False
             
-    def process_directory(self, input_dir: str, output_dir: str, target_lang: str = 'vi', service: str = 'novita', max_workers: int = 4) -> Dict[str, int]:
+    def process_directory(
+        self,
+        input_dir: str,
+        output_dir: str,
+        target_lang: str = 'vi',
+        service: str = 'novita',
+        max_workers: int = 4,
+        journal=None,
+        order: Optional[str] = None,
+        priorities: Optional[List[str]] = None
+    ) -> Dict[str, int]:
         """Xử lý toàn bộ thư mục chứa file phụ đề.
         
+        Block của mọi file được dịch trên cùng một pool luồng và cùng bộ giới hạn tốc độ
+        theo provider; mỗi file được ghi ra ngay khi dịch xong. Thứ tự dịch các file được
+        quyết định bởi nhóm ưu tiên của người dùng, rồi theo thứ tự tìm thấy hoặc theo chi phí
+        ước lượng của từng file nếu chọn sjf/lpt.
+        
         Args:
             input_dir: Thư mục đầu vào
             output_dir: Thư mục đầu ra
             target_lang: Ngôn ngữ đích
             service: Dịch vụ dịch thuật
-            max_workers: Số luồng xử lý tối đa cho mỗi file
+            max_workers: Số luồng xử lý tối đa dùng chung cho mọi file
+            journal: JobJournal của job (None để dùng nhật ký theo thư mục, ngôn ngữ và dịch vụ)
+            order: Thứ tự dịch các file: 'fifo' (thứ tự tìm thấy, mặc định), 'sjf' (file rẻ trước,
+                có kết quả sớm nhất) hoặc 'lpt' (file đắt trước, tổng thời gian ngắn nhất);
+                None để đọc từ FILE_ORDER
+            priorities: Các mục được dịch trước, ví dụ ["1-5", "intro*"] (None để đọc từ FILE_PRIORITY)
             
         Returns:
             Từ điển thống kê kết quả
         """
-        os.makedirs(output_dir, exist_ok=True)
+        from .directory_scheduler import DirectoryScheduler
+        from .file_ordering import FileCost, estimate_file_costs, order_files, parse_priorities
+        from ..utils.job_journal import JobJournal
         
-        # Tìm tất cả file .srt trong thư mục
-        input_files = list(Path(input_dir).glob('**/*.srt'))
+        start_time = time.time()
+        os.makedirs(output_dir, exist_ok=True)
         
+        files, skipped, total = self._collect_directory_files(input_dir, output_dir)
         stats = {
-            'total_files': len(input_files),
+            'total_files': total,
             'successful': 0,
             'failed': 0,
-            'skipped': 0
+            'skipped': skipped
         }
         
-        # Xử lý từng file
+        # Sắp xếp thứ tự dịch (sjf/lpt phải đọc trước mọi file và kiểm tra cache để ước lượng chi phí)
+        order = order or os.getenv('FILE_ORDER', 'fifo')
+        if priorities is None:
+            priorities = parse_priorities(os.getenv('FILE_PRIORITY'))
+        if order in ('sjf', 'lpt'):
+            costs = estimate_file_costs(self, files, target_lang, service)
+        else:
+            costs = [FileCost(input_file, output_file, i) for i, (input_file, output_file) in enumerate(files)]
+        costs = order_files(costs, order, priorities)
+        files = [(cost.input_file, cost.output_file) for cost in costs]
+        if costs:
+            more = f" và {len(costs) - 10} file khác" if len(costs) > 10 else ""
+            logger.info(f"Thứ tự dịch ({order}): {costs[:10]}{more}")
+        
+        # Dịch mọi file còn lại trên một pool luồng dùng chung
+        owns_journal = journal is None
+        if owns_journal:
+            journal = JobJournal.for_job(input_dir, output_dir, target_lang, service)
+        try:
+            scheduler = DirectoryScheduler(self, max_workers, journal=journal)
+            results = scheduler.run(files, target_lang, service)
+        finally:
+            if owns_journal:
+                journal.close()
+        stats['successful'] = results['successful']
+        stats['failed'] = results['failed']
+                
+        logger.info(f"Kết quả xử lý thư mục: {stats['successful']}/{stats['total_files']} file thành công "
+                    f"trong {time.time() - start_time:.2f}s")
+        return stats 
+    
+    def _collect_directory_files(self, input_dir: str, output_dir: str) -> Tuple[List[Tuple[str, str]], int, int]:
+        """Tìm các file phụ đề cần dịch trong thư mục.
+        
+        Args:
+            input_dir: Thư mục đầu vào
+            output_dir: Thư mục đầu ra
+            
+        Returns:
+            Tuple (danh sách (file đầu vào, file đầu ra) chưa có bản dịch, số file bỏ qua, tổng số file)
+        """
+        # Tìm tất cả file .srt trong thư mục
+        input_files = sorted(Path(input_dir).glob('**/*.srt'))
+        
+        files = []
+        skipped = 0
         for input_file in input_files:
             # Tạo đường dẫn output tương ứng
             rel_path = input_file.relative_to(input_dir)
             output_file = Path(output_dir) / rel_path
             os.makedirs(output_file.parent, exist_ok=True)
             
-            logger.info(f"Đang xử lý: {input_file}")
-            
             # Kiểm tra file đã tồn tại
             if output_file.exists():
                 logger.info(f"File {output_file} đã tồn tại, bỏ qua")
-                stats['skipped'] += 1
+                skipped += 1
                 continue
-                
-            # Xử lý file
-            success = self.process_subtitle_file(
-                str(input_file), 
-                str(output_file), 
-                target_lang, 
-                service, 
-                max_workers
-            )
+            files.append((str(input_file), str(output_file)))
+        return files, skipped, len(input_files)
+    
+    def plan_directory(self, input_dir: str, output_dir: str, target_lang: str = 'vi', service: str = 'novita', max_workers: int = 4):
+        """Lập kế hoạch dịch một thư mục (dry-run, không gọi API).
+        
+        Args:
+            input_dir: Thư mục đầu vào
+            output_dir: Thư mục đầu ra
+            target_lang: Ngôn ngữ đích
+            service: Dịch vụ dịch thuật
+            max_workers: Số luồng xử lý tối đa dùng chung cho mọi file
             
-            if success:
-                stats['successful'] += 1
-            else:
-                stats['failed'] += 1
-                
-        logger.info(f"Kết quả xử lý thư mục: {stats['successful']}/{stats['total_files']} file thành công")
-        return stats 
\ No newline at end of file
+        Returns:
+            TranslationPlan của các file chưa có bản dịch
+        """
+        files, skipped, _ = self._collect_directory_files(input_dir, output_dir)
+        plan = self.plan_files(files, target_lang, service, max_workers)
+        if skipped:
+            plan.add_note(f"{skipped} file đã có bản dịch, bỏ qua")
+        return plan
+    
+    def plan_files(self, files: List[Tuple[str, str]], target_lang: str = 'vi', service: str = 'novita', max_workers: int = 4):
+        """Lập kế hoạch dịch danh sách file (dry-run, không gọi API).
+        
+        Mọi block được phân loại bằng classify_files (cùng cách phân loại với sắp xếp file): không cần dịch
+        (bộ lọc), đã có trong cache (kiểm tra hàng loạt một lần cho mọi file) hoặc cần gọi provider.
+        
+        Args:
+            files: Danh sách (file đầu vào, file đầu ra)
+            target_lang: Ngôn ngữ đích
+            service: Dịch vụ dịch thuật chính
+            max_workers: Số luồng xử lý tối đa
+            
+        Returns:
+            TranslationPlan với ước lượng cho provider chính và các provider dự phòng
+        """
+        from .file_ordering import classify_files
+        from .translation_plan import TranslationPlan
+        
+        priorities = getattr(self.api_handler, 'provider_priority', None) or []
+        plan = TranslationPlan(target_lang, [service] + [name for name in priorities if name != service], max_workers)
+        
+        for input_file, entries, error in classify_files(self, [input_file for input_file, _ in files], target_lang, service):
+            if entries is None:
+                plan.add_note(f"Không đọc được {input_file}: {error}")
+                continue
+            plan.add_file(input_file, entries)
+        return plan
@@ -0,0 +1,220 @@
+"""
+Lập kế hoạch dịch (dry-run): ước lượng số request, token và thời gian trước khi chạy, không gọi API
+"""
+
+import os
+import math
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .file_ordering import CHARS_PER_TOKEN, SKIPPED, CACHED, TRANSLATE, UNPARSEABLE
+
+logger = logging.getLogger(__name__)
+
+
+class FilePlan:
+    """Kế hoạch dịch của một file"""
+
+    def __init__(self, name: str):
+        """Khởi tạo FilePlan
+
+        Args:
+            name: Tên (đường dẫn) file phụ đề
+        """
+        self.name = name
+        self.blocks = 0
+        self.skipped = 0
+        self.unparseable = 0
+        self.cached = 0
+        self.duplicates = 0
+        self.to_translate = 0
+        self.chars = 0
+        self.requests = 0
+
+
+class TranslationPlan:
+    """Kế hoạch dịch nhiều file, tính từ trạng thái của từng block.
+
+    Block trùng văn bản với một block cần dịch trước đó (cùng file hoặc file khác) được tính là
+    trùng lặp: chỉ lần đầu gọi provider, các lần sau lấy từ cache. Thời gian ước lượng cho mỗi provider:
+        max(số request * độ trễ / số luồng, số request * khoảng cách tối thiểu giữa hai request)
+    với độ trễ lấy từ số liệu đã ghi nhận (ModelRanker, LatencyTracker) và khoảng cách từ bộ giới hạn tốc độ.
+    """
+
+    def __init__(
+        self,
+        target_lang: str,
+        providers: List[str],
+        max_workers: int = 4,
+        blocks_per_request: int = 1,
+        prompt_tokens: Optional[int] = None,
+        default_latency: Optional[float] = None
+    ):
+        """Khởi tạo TranslationPlan
+
+        Args:
+            target_lang: Ngôn ngữ đích
+            providers: Các provider cần ước lượng (provider đầu tiên là provider chính)
+            max_workers: Số luồng dịch song song
+            blocks_per_request: Số block trong một request
+            prompt_tokens: Số token của phần hướng dẫn trong mỗi request (None để đọc từ PLAN_PROMPT_TOKENS)
+            default_latency: Độ trễ (giây) khi chưa có số liệu (None để đọc từ PLAN_DEFAULT_LATENCY)
+        """
+        self.target_lang = target_lang
+        self.providers = providers
+        self.max_workers = max(1, max_workers)
+        self.blocks_per_request = max(1, blocks_per_request)
+        self.prompt_tokens = prompt_tokens if prompt_tokens is not None else int(os.getenv('PLAN_PROMPT_TOKENS', '200'))
+        self.default_latency = default_latency or float(os.getenv('PLAN_DEFAULT_LATENCY', '2.0'))
+
+        self.files: List[FilePlan] = []
+        self.notes: List[str] = []
+        self._seen: Set[str] = set()
+
+    def add_file(self, name: str, blocks: Iterable[Tuple[str, str]]) -> FilePlan:
+        """Thêm một file vào kế hoạch
+
+        Args:
+            name: Tên (đường dẫn) file phụ đề
+            blocks: Danh sách (văn bản, trạng thái) theo thứ tự block,
+                trạng thái là SKIPPED, UNPARSEABLE, CACHED hoặc TRANSLATE
+
+        Returns:
+            FilePlan của file
+        """
+        plan = FilePlan(name)
+        for text, status in blocks:
+            plan.blocks += 1
+            if status == SKIPPED:
+                plan.skipped += 1
+            elif status == UNPARSEABLE:
+                plan.unparseable += 1
+            elif status == CACHED:
+                plan.cached += 1
+            elif text in self._seen:
+                plan.duplicates += 1
+            else:
+                self._seen.add(text)
+                plan.to_translate += 1
+                plan.chars += len(text)
+        plan.requests = math.ceil(plan.to_translate / self.blocks_per_request)
+        self.files.append(plan)
+        return plan
+
+    def add_note(self, note: str) -> None:
+        """Thêm ghi chú vào báo cáo (ví dụ file không đọc được)"""
+        self.notes.append(note)
+
+    def totals(self) -> Dict[str, int]:
+        """Tổng hợp số block, số request và số token của toàn bộ kế hoạch
+
+        Returns:
+            Từ điển thống kê
+        """
+        totals = {key: sum(getattr(plan, key) for plan in self.files)
+                  for key in ('blocks', 'skipped', 'unparseable', 'cached', 'duplicates', 'to_translate', 'chars',
+                              'requests')}
+        totals['files'] = len(self.files)
+        text_tokens = math.ceil(totals['chars'] / CHARS_PER_TOKEN)
+        totals['input_tokens'] = text_tokens + totals['requests'] * self.prompt_tokens
+        # Bản dịch có độ dài xấp xỉ văn bản gốc
+        totals['output_tokens'] = text_tokens
+        return totals
+
+    def provider_estimates(self) -> List[Dict]:
+        """Ước lượng thời gian chạy nếu toàn bộ request đi qua từng provider
+
+        Returns:
+            Danh sách từ điển gồm provider, interval, latency, latency_source, seconds
+        """
+        requests = self.totals()['requests']
+        estimates = []
+        for provider in self.providers:
+            interval = provider_interval(provider)
+            latency, source = recorded_latency(provider)
+            if latency is None:
+                latency, source = self.default_latency, 'mặc định'
+            seconds = max(requests * latency / self.max_workers, requests * interval)
+            estimates.append({
+                'provider': provider,
+                'interval': interval,
+                'latency': latency,
+                'latency_source': source,
+                'seconds': seconds
+            })
+        return estimates
+
+    def format_report(self) -> str:
+        """Tạo báo cáo dạng văn bản
+
+        Returns:
+            Báo cáo nhiều dòng
+        """
+        totals = self.totals()
+        blocks = totals['blocks'] or 1
+        lines = [
+            f"KẾ HOẠCH DỊCH ({self.target_lang}): {totals['files']} file, {totals['blocks']} block",
+            f"- Có sẵn trong cache: {totals['cached']} block ({totals['cached'] / blocks:.0%})",
+            f"- Không cần dịch: {totals['skipped']} block",
+            f"- Không phân tách được (sẽ bị đánh dấu lỗi): {totals['unparseable']} block",
+            f"- Trùng lặp (dịch một lần): {totals['duplicates']} block",
+            f"- Cần gọi provider: {totals['to_translate']} block, {totals['requests']} request "
+            f"({self.blocks_per_request} block/request)",
+            f"- Token ước lượng: ~{totals['input_tokens']} đầu vào, ~{totals['output_tokens']} đầu ra",
+            f"Thời gian ước lượng ({self.max_workers} luồng):",
+        ]
+        for estimate in self.provider_estimates():
+            lines.append(
+                f"- {estimate['provider']}: ~{_format_duration(estimate['seconds'])} "
+                f"(độ trễ {estimate['latency']:.1f}s theo {estimate['latency_source']}, "
+                f"tối thiểu {estimate['interval']:.2f}s giữa hai request)"
+            )
+
+        expensive = sorted((plan for plan in self.files if plan.requests), key=lambda plan: -plan.requests)[:5]
+        if expensive:
+            lines.append("File tốn nhiều request nhất:")
+            lines.extend(f"- {os.path.basename(plan.name)}: {plan.requests} request, "
+                         f"{plan.cached}/{plan.blocks} block có sẵn" for plan in expensive)
+        lines.extend(f"Lưu ý: {note}" for note in self.notes)
+        return "\n".join(lines)
+
+
+def provider_interval(provider: str) -> float:
+    """Khoảng cách tối thiểu (giây) giữa hai request tới provider theo bộ giới hạn tốc độ và RPM"""
+    from ..api.translation_service import TranslationService
+
+    interval = TranslationService.get_rate_limit(provider, TranslationService.is_paid_provider(provider))
+    rpm = int(os.getenv(f"{provider.upper()}_RPM", '1000'))
+    return max(interval, 60.0 / rpm if rpm > 0 else 0.0)
+
+
+def recorded_latency(provider: str) -> Tuple[Optional[float], str]:
+    """Độ trễ đã ghi nhận của provider (không gọi API)
+
+    Ưu tiên độ trễ của model xếp hạng cao nhất trong ModelRanker (lưu trên đĩa),
+    sau đó tới trung vị của LatencyTracker trong tiến trình hiện tại.
+
+    Returns:
+        Tuple (độ trễ tính bằng giây hoặc None, nguồn số liệu)
+    """
+    from ..api.model_ranker import get_model_ranker
+    from ..api.latency_tracker import get_latency_tracker
+
+    rankings = get_model_ranker().get_rankings(provider)
+    measured = [entry for entry in rankings.values() if entry.get('latency')]
+    if measured:
+        best = max(measured, key=lambda entry: entry['score'])
+        return best['latency'], 'xếp hạng model'
+
+    median = get_latency_tracker().percentile(provider, q=0.5)
+    if median is not None:
+        return median, 'phiên hiện tại'
+    return None, ''
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} phút"
+    return f"{seconds / 3600:.1f} giờ"
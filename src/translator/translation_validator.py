@@ -0,0 +1,102 @@
+"""
+Kiểm tra cục bộ chất lượng bản dịch (không gọi API), dùng để quyết định có cần dịch lại bằng model mạnh hơn
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+from .skip_classifier import SCRIPT_RANGES, VIETNAMESE_LETTERS
+
+# Thẻ định dạng trong phụ đề: <i>, </font>, {\an8}
+TAG_PATTERN = re.compile(r'<[^<>]+>|\{\\[^{}]*\}')
+NUMBER_PATTERN = re.compile(r'\d+')
+WORD_PATTERN = re.compile(r'[^\W\d_]{3,}')
+
+
+class TranslationValidator:
+    """Kiểm tra bản dịch theo các quy tắc rẻ, không cần model:
+
+    - Bản dịch không rỗng
+    - Tỉ lệ độ dài bản dịch / bản gốc nằm trong khoảng cho phép (chỉ với câu đủ dài)
+    - Bản dịch không lặp lại nguyên văn bản gốc
+    - Giữ nguyên các thẻ định dạng và các con số
+    - Có chữ viết của ngôn ngữ đích (hệ chữ riêng, hoặc chữ cái riêng của tiếng Việt)
+    """
+
+    def __init__(self, min_ratio: Optional[float] = None, max_ratio: Optional[float] = None,
+                 min_chars: int = 20, min_letters: int = 12, echo_overlap: float = 0.8):
+        """Khởi tạo TranslationValidator
+
+        Args:
+            min_ratio: Tỉ lệ độ dài tối thiểu (None để đọc từ VALIDATOR_MIN_RATIO)
+            max_ratio: Tỉ lệ độ dài tối đa (None để đọc từ VALIDATOR_MAX_RATIO)
+            min_chars: Số ký tự tối thiểu của bản gốc để kiểm tra tỉ lệ độ dài
+            min_letters: Số chữ cái tối thiểu của bản gốc để kiểm tra chữ viết của ngôn ngữ đích
+            echo_overlap: Tỉ lệ từ của bản gốc xuất hiện lại trong bản dịch để coi là chưa dịch
+        """
+        self.min_ratio = min_ratio or float(os.getenv('VALIDATOR_MIN_RATIO', '0.3'))
+        self.max_ratio = max_ratio or float(os.getenv('VALIDATOR_MAX_RATIO', '3.0'))
+        self.min_chars = min_chars
+        self.min_letters = min_letters
+        self.echo_overlap = echo_overlap
+
+    def check(self, source: str, translation: Optional[str], target_lang: str) -> Optional[str]:
+        """Kiểm tra một bản dịch
+
+        Args:
+            source: Văn bản gốc
+            translation: Bản dịch
+            target_lang: Ngôn ngữ đích
+
+        Returns:
+            Lý do không đạt ('empty', 'length_ratio', 'echo', 'tags', 'numbers', 'target_script'),
+            None nếu bản dịch đạt
+        """
+        source = source.strip()
+        translation = (translation or '').strip()
+        if not translation:
+            return 'empty'
+
+        if len(source) >= self.min_chars:
+            ratio = len(translation) / len(source)
+            if not self.min_ratio <= ratio <= self.max_ratio:
+                return 'length_ratio'
+
+        if self._is_echo(source, translation):
+            return 'echo'
+        if Counter(TAG_PATTERN.findall(source)) != Counter(TAG_PATTERN.findall(translation)):
+            return 'tags'
+        if Counter(NUMBER_PATTERN.findall(source)) - Counter(NUMBER_PATTERN.findall(translation)):
+            return 'numbers'
+        if not self._has_target_script(source, translation, target_lang):
+            return 'target_script'
+        return None
+
+    def _is_echo(self, source: str, translation: str) -> bool:
+        if _normalize(source) == _normalize(translation) and any(c.isalpha() for c in source):
+            return True
+        # Bản dịch giữ lại gần hết từ của bản gốc (một số thuật ngữ tiếng Anh được giữ là bình thường)
+        source_words = WORD_PATTERN.findall(source.lower())
+        if len(source_words) < 4:
+            return False
+        translated_words = set(WORD_PATTERN.findall(translation.lower()))
+        kept = sum(1 for word in source_words if word in translated_words)
+        return kept / len(source_words) >= self.echo_overlap
+
+    def _has_target_script(self, source: str, translation: str, target_lang: str) -> bool:
+        if sum(1 for c in source if c.isalpha()) < self.min_letters:
+            return True
+        lang = target_lang.lower().split('-')[0]
+        ranges = SCRIPT_RANGES.get(lang)
+        if ranges:
+            return any(lo <= ord(c) <= hi for c in translation for lo, hi in ranges)
+        if lang == 'vi':
+            return any(c in VIETNAMESE_LETTERS for c in translation.lower())
+        # Ngôn ngữ dùng chữ Latin không có dấu hiệu riêng để kiểm tra
+        return True
+
+
+def _normalize(text: str) -> str:
+    return ''.join(c for c in text.casefold() if c.isalnum())
@@ -2,12 +2,18 @@
 Các giao diện và triển khai cho dịch vụ dịch thuật
 """
 
+import os
 from abc import ABC, abstractmethod
 from typing import List, Optional, Dict, Any
 import logging
 
 from ..api.handler import APIHandler
+from ..api.retry_budget import Deadline, DeadlineExceeded, RetryAborted
+from ..api.provider_errors import ProviderError, ContextTooLongError
 from ..utils.cache_manager import CacheManager, TranslationCacheManager
+from .skip_classifier import SkipClassifier, get_skip_classifier
+from .multi_target import build_multi_target_prompt, parse_multi_target_response
+from .cascade import TranslationCascade, parse_tiers
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +21,7 @@ class TranslatorService(ABC):
     """Giao diện cho dịch vụ dịch thuật"""
     
     @abstractmethod
-    def translate_text(self, text: str, target_lang: str, service: str) -> Optional[str]:
+    def translate_text(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Dịch một đoạn văn bản"""
         pass
         
@@ -27,31 +33,48 @@ class TranslatorService(ABC):
 class APITranslatorService(TranslatorService):
     """Triển khai dịch vụ dịch thuật sử dụng API"""
     
-    def __init__(self, api_handler: Optional[APIHandler] = None, cache_manager: Optional[CacheManager] = None):
+    def __init__(self, api_handler: Optional[APIHandler] = None, cache_manager: Optional[CacheManager] = None,
+                 skip_classifier: Optional[SkipClassifier] = None, cascade: Optional[TranslationCascade] = None):
         """Khởi tạo dịch vụ dịch thuật
         
         Args:
             api_handler: Trình xử lý API
             cache_manager: Trình quản lý cache
+            skip_classifier: Bộ lọc block không cần dịch (None để dùng bộ dùng chung, tắt bằng SKIP_CLASSIFIER=0)
+            cascade: Dịch theo tầng model rẻ trước (None để đọc các tầng rẻ từ CASCADE_TIERS, rỗng là tắt)
         """
         self.api_handler = api_handler or APIHandler()
         self.cache_manager = cache_manager or TranslationCacheManager()
+        if skip_classifier is None and os.getenv('SKIP_CLASSIFIER', '1') != '0':
+            skip_classifier = get_skip_classifier()
+        self.skip_classifier = skip_classifier
+        if cascade is None and os.getenv('CASCADE_TIERS'):
+            cascade = TranslationCascade(self.api_handler, parse_tiers(os.getenv('CASCADE_TIERS')))
+        self.cascade = cascade
         
         # Cấu hình dịch thuật
         self.max_retries = 3
         self.split_factor = 2
 
-    def translate_text(self, text: str, target_lang: str, service: str) -> Optional[str]:
+    def translate_text(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Dịch một đoạn văn bản
         
         Args:
             text: Văn bản cần dịch
             target_lang: Ngôn ngữ đích
             service: Tên dịch vụ API
+            deadline: Thời hạn và ngân sách retry của block (None nếu không giới hạn)
             
         Returns:
             Văn bản đã dịch hoặc None nếu có lỗi
         """
+        # Block không cần dịch (nhãn âm thanh, số, URL, code, đã ở ngôn ngữ đích) không gọi provider
+        if self.skip_classifier is not None:
+            skipped = self.skip_classifier.check(text, target_lang)
+            if skipped is not None:
+                logger.debug(f"Bỏ qua gọi provider ({skipped[0]}): {text[:50]}")
+                return skipped[1]
+        
         # Kiểm tra cache trước
         cache_key = self.cache_manager.generate_key(text, target_lang=target_lang, service=service)
         cached_result = self.cache_manager.get(cache_key)
@@ -61,7 +84,7 @@ class APITranslatorService(TranslatorService):
             return cached_result
             
         # Nếu không có trong cache, dịch với retry nếu cần
-        translated_text = self._translate_with_retry(text, target_lang, service)
+        translated_text = self._translate_with_retry(text, target_lang, service, deadline)
         
         # Lưu kết quả vào cache nếu thành công
         if translated_text:
@@ -87,32 +110,69 @@ class APITranslatorService(TranslatorService):
             results.append(result)
             
         return results
+    
+    def translate_multi(self, texts: List[str], target_langs: List[str], service: str,
+                        deadline: Optional[Deadline] = None) -> List[Dict[str, str]]:
+        """Dịch một batch văn bản sang nhiều ngôn ngữ đích trong một request
+        
+        Không retry: mục thiếu trong phản hồi để tầng trên dịch lại từng ngôn ngữ bằng translate_text.
+        
+        Args:
+            texts: Danh sách văn bản cần dịch
+            target_langs: Danh sách ngôn ngữ đích
+            service: Tên dịch vụ API
+            deadline: Thời hạn và ngân sách retry của batch (None nếu không giới hạn)
+            
+        Returns:
+            Danh sách (theo vị trí) từ điển {ngôn ngữ: bản dịch}, có thể thiếu mục nếu lỗi
+        """
+        if not texts:
+            return []
+        prompt = build_multi_target_prompt(texts, target_langs)
+        try:
+            # Prompt JSON phải đi nguyên vẹn trong một request: cắt theo ký tự sẽ làm hỏng JSON
+            response = self.api_handler.translate(prompt, ", ".join(target_langs), service, deadline=deadline,
+                                                  allow_chunking=False)
+        except Exception as e:
+            logger.warning(f"Lỗi khi dịch nhiều ngôn ngữ cho batch {len(texts)} block: {str(e)}")
+            return [{} for _ in texts]
+        return parse_multi_target_response(response, len(texts), target_langs)
             
-    def _translate_with_retry(self, text: str, target_lang: str, service: str) -> Optional[str]:
+    def _translate_with_retry(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Thử dịch văn bản với số lần thử lại
         
         Args:
             text: Văn bản cần dịch
             target_lang: Ngôn ngữ đích
             service: Tên dịch vụ API
+            deadline: Thời hạn và ngân sách retry của block
             
         Returns:
             Văn bản đã dịch hoặc None nếu thất bại
         """
         for attempt in range(self.max_retries):
-            try:
-                return self._try_translate(text, target_lang, service)
-            except Exception as e:
-                error_msg = str(e).lower()
+            # Lần thử lại chỉ được thực hiện khi block không bị hoãn retry, còn thời gian và còn ngân sách
+            if attempt > 0 and deadline is not None and not (deadline.can_retry() and deadline.acquire_retry()):
+                logger.warning(f"Dừng thử lại sau {attempt} lần: retry bị hoãn, hết thời hạn hoặc hết ngân sách")
+                return None
                 
+            try:
+                return self._try_translate(text, target_lang, service, deadline)
+            except ContextTooLongError as e:
                 # Xử lý trường hợp văn bản quá dài
-                if "too long" in error_msg or "maximum context" in error_msg or "token limit" in error_msg:
-                    logger.warning(f"Văn bản quá dài, thử chia nhỏ (lần {attempt+1}/{self.max_retries})")
-                    result = self._handle_text_too_long(text, target_lang, service, e)
-                    if result:
-                        return result
-                else:
-                    logger.warning(f"Lỗi khi dịch (lần {attempt+1}/{self.max_retries}): {str(e)}")
+                logger.warning(f"Văn bản quá dài, thử chia nhỏ (lần {attempt+1}/{self.max_retries})")
+                result = self._handle_text_too_long(text, target_lang, service, e, deadline)
+                if result:
+                    return result
+            except (DeadlineExceeded, RetryAborted) as e:
+                logger.warning(f"Dừng dịch block: {str(e)}")
+                return None
+            except Exception as e:
+                if isinstance(e, ProviderError) and not e.retryable:
+                    # Lỗi nghiêm trọng (sai API key, hết quota, ...): thử lại cũng vô ích
+                    logger.error(f"Lỗi không thể thử lại ({type(e).__name__}): {str(e)}")
+                    return None
+                logger.warning(f"Lỗi khi dịch (lần {attempt+1}/{self.max_retries}): {str(e)}")
                     
                 # Nếu đây là lần thử cuối cùng
                 if attempt == self.max_retries - 1:
@@ -121,13 +181,14 @@ class APITranslatorService(TranslatorService):
                     
         return None
                 
-    def _try_translate(self, text: str, target_lang: str, service: str) -> Optional[str]:
+    def _try_translate(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Thực hiện dịch thuật không có retry
         
         Args:
             text: Văn bản cần dịch
             target_lang: Ngôn ngữ đích 
             service: Tên dịch vụ
+            deadline: Thời hạn và ngân sách retry của block
             
         Returns:
             Văn bản đã dịch
@@ -138,13 +199,17 @@ class APITranslatorService(TranslatorService):
         if not text.strip():
             return ""
             
-        result = self.api_handler.translate(text, target_lang, service)
+        if self.cascade is not None:
+            result = self.cascade.translate(text, target_lang, service, deadline)
+        else:
+            result = self.api_handler.translate(text, target_lang, service, deadline=deadline)
         if not result:
             raise Exception(f"Kết quả dịch rỗng từ dịch vụ {service}")
             
         return result
             
-    def _handle_text_too_long(self, text: str, target_lang: str, service: str, error: Exception) -> Optional[str]:
+    def _handle_text_too_long(self, text: str, target_lang: str, service: str, error: Exception,
+                              deadline: Optional[Deadline] = None) -> Optional[str]:
         """Xử lý trường hợp văn bản quá dài
         
         Args:
@@ -152,20 +217,22 @@ class APITranslatorService(TranslatorService):
             target_lang: Ngôn ngữ đích
             service: Tên dịch vụ
             error: Lỗi gốc
+            deadline: Thời hạn và ngân sách retry của block
             
         Returns:
             Văn bản đã dịch hoặc None nếu thất bại
         """
         # Thử chia văn bản
-        return self._translate_long_text(text, target_lang, service)
+        return self._translate_long_text(text, target_lang, service, deadline)
             
-    def _translate_long_text(self, text: str, target_lang: str, service: str) -> Optional[str]:
+    def _translate_long_text(self, text: str, target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Dịch văn bản dài bằng cách chia nhỏ
         
         Args:
             text: Văn bản dài
             target_lang: Ngôn ngữ đích
             service: Tên dịch vụ
+            deadline: Thời hạn và ngân sách retry của block
             
         Returns:
             Văn bản đã dịch hoặc None nếu thất bại
@@ -173,15 +240,16 @@ class APITranslatorService(TranslatorService):
         parts = self._split_text(text, self.split_factor)
         logger.info(f"Chia văn bản thành {len(parts)} phần")
         
-        return self._translate_text_parts(parts, target_lang, service)
+        return self._translate_text_parts(parts, target_lang, service, deadline)
     
-    def _translate_text_parts(self, parts: List[str], target_lang: str, service: str) -> Optional[str]:
+    def _translate_text_parts(self, parts: List[str], target_lang: str, service: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Dịch và ghép các phần của văn bản
         
         Args:
             parts: Các phần văn bản
             target_lang: Ngôn ngữ đích
             service: Tên dịch vụ
+            deadline: Thời hạn và ngân sách retry của block
             
         Returns:
             Văn bản đã dịch hoặc None nếu thất bại
@@ -191,7 +259,7 @@ class APITranslatorService(TranslatorService):
         for i, part in enumerate(parts):
             try:
                 logger.info(f"Đang dịch phần {i+1}/{len(parts)}")
-                translated = self._try_translate(part, target_lang, service)
+                translated = self._try_translate(part, target_lang, service, deadline)
                 if translated:
                     translated_parts.append(translated)
                 else:
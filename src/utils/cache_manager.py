@@ -17,7 +17,7 @@ import os
 import json
 import logging
 import hashlib
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -44,6 +44,10 @@ class CacheManager(ABC):
     def clear(self, pattern: Optional[str] = None) -> bool:
         """Xóa cache (theo pattern nếu có)"""
         pass
+        
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """Kiểm tra hàng loạt các key đang có trong cache (lớp con nên ghi đè để không đọc từng giá trị)"""
+        return {key for key in keys if self.get(key) is not None}
 
 class TranslationCacheManager(CacheManager):
     """Triển khai cụ thể của CacheManager cho việc lưu cache bản dịch"""
@@ -149,6 +153,24 @@ class TranslationCacheManager(CacheManager):
             logger.error(f"Lỗi khi xóa cache: {str(e)}")
             return False
             
+    def contains_many(self, keys: List[str]) -> Set[str]:
+        """Kiểm tra hàng loạt các key có trong cache bằng một lần liệt kê thư mục (không mở file cache)
+        
+        Args:
+            keys: Danh sách khóa cache
+            
+        Returns:
+            Tập các khóa đang có trong cache
+        """
+        if not self.use_cache:
+            return set()
+        try:
+            names = {entry.name for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')}
+        except OSError as e:
+            logger.warning(f"Lỗi khi liệt kê cache: {str(e)}")
+            return set()
+        return {key for key in keys if f"{key}.json" in names}
+            
     def _get_cache_path(self, cache_key: str) -> str:
         """Tạo đường dẫn cache từ cache key
         
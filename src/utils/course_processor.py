@@ -19,7 +19,7 @@ logging.basicConfig(
     ]
 )
 
-def process_video(input_video, translate=False):
+def process_video(input_video, translate=False, journal=None):
     """Xử lý một video và tạo phụ đề SRT tại vị trí video gốc"""
     try:
         # Tạo tên file output SRT cùng vị trí với video
@@ -28,14 +28,17 @@ def process_video(input_video, translate=False):
         
         # Kiểm tra nếu file phụ đề đã tồn tại
         if output_srt.exists():
-            logging.info(f"Video {video_path.name} đã có phụ đề SRT, bỏ qua")
-            return True
-        
-        logging.info(f"Đang xử lý video: {video_path.name}")
-        
-        # Tạo phụ đề SRT
-        generate_subtitles(str(video_path), str(output_srt), model_name="small.en")
-        logging.info(f"Đã tạo phụ đề SRT cho video {video_path.name}")
+            if not translate:
+                logging.info(f"Video {video_path.name} đã có phụ đề SRT, bỏ qua")
+                return True
+            # Bản dịch còn dở (hoặc chưa có): chỉ dịch tiếp
+            logging.info(f"Video {video_path.name} đã có phụ đề SRT, bỏ qua bước tạo phụ đề")
+        else:
+            logging.info(f"Đang xử lý video: {video_path.name}")
+            
+            # Tạo phụ đề SRT
+            generate_subtitles(str(video_path), str(output_srt), model_name="small.en")
+            logging.info(f"Đã tạo phụ đề SRT cho video {video_path.name}")
 
         # Dịch phụ đề nếu được yêu cầu
         if translate:
@@ -45,7 +48,7 @@ def process_video(input_video, translate=False):
             api_handler = APIHandler()
             translator = SubtitleTranslator(api_handler)
             output_srt_vi = output_srt.parent / f"{output_srt.stem}_vi.srt"
-            result = translator.process_subtitle_file(str(output_srt), str(output_srt_vi))
+            result = translator.process_subtitle_file(str(output_srt), str(output_srt_vi), journal=journal)
             if result:
                 logging.info(f"Đã dịch phụ đề cho video {video_path.name}")
             else:
@@ -57,44 +60,89 @@ def process_video(input_video, translate=False):
         logging.error(f"Lỗi khi xử lý video {input_video}: {str(e)}")
         return False
 
+def print_translation_plan(video_dir, video_files):
+    """In kế hoạch dịch phụ đề của các video (dry-run, không gọi API)"""
+    from src.translator.subtitle import SubtitleTranslator
+    
+    files = []
+    missing = []
+    for video_file in video_files:
+        srt_file = Path(video_dir, video_file).with_suffix('.srt')
+        vi_file = srt_file.parent / f"{srt_file.stem}_vi.srt"
+        if not srt_file.exists():
+            missing.append(video_file)
+        elif not vi_file.exists():
+            files.append((str(srt_file), str(vi_file)))
+    
+    translator = SubtitleTranslator(APIHandler())
+    plan = translator.plan_files(files, target_lang='vi')
+    if missing:
+        plan.add_note(f"{len(missing)} video chưa có phụ đề SRT, chưa tính vào kế hoạch")
+    print(plan.format_report())
+
 def main():
     # Thiết lập argument parser
     parser = argparse.ArgumentParser(description='Tạo và dịch phụ đề cho video')
     parser.add_argument('--translate', action='store_true', help='Dịch phụ đề sang tiếng Việt')
+    parser.add_argument('--priority', default=os.getenv('FILE_PRIORITY'),
+                        help='Video xử lý trước, cách nhau bởi dấu phẩy (ví dụ "1-5,intro*")')
+    parser.add_argument('--plan', action='store_true',
+                        help='Chỉ ước lượng số request, token và thời gian dịch, không gọi API')
     args = parser.parse_args()
 
     # Lấy danh sách video trong thư mục Khoa_hoc_mau
     video_dir = "Khoa_hoc_mau"
     video_files = sorted([f for f in os.listdir(video_dir) if f.endswith(('.mp4', '.MP4'))])
     
+    # Đưa các video được ưu tiên lên trước (giữ thứ tự tên trong mỗi nhóm)
+    from src.translator.file_ordering import parse_priorities, priority_rank
+    priorities = parse_priorities(args.priority)
+    if priorities:
+        video_files.sort(key=lambda f: priority_rank(f, priorities))
+    
+    if args.plan:
+        print_translation_plan(video_dir, video_files)
+        return
+    
     total_videos = len(video_files)
     logging.info(f"Tìm thấy {total_videos} video để xử lý")
     if args.translate:
         logging.info("Chế độ dịch phụ đề đã được bật")
     
+    # Nhật ký của job: chạy lại sau sự cố sẽ tiếp tục từ các block đã dịch
+    journal = None
+    if args.translate:
+        from src.utils.job_journal import JobJournal
+        journal = JobJournal.for_job(video_dir, "vi")
+    
     # Xử lý từng video
     success_count = 0
     skipped_count = 0
     
-    for video_file in video_files:
-        input_path = os.path.join(video_dir, video_file)
+    try:
+        for video_file in video_files:
+            input_path = os.path.join(video_dir, video_file)
         
-        # Kiểm tra nếu đã có file SRT
-        if os.path.exists(input_path.replace('.mp4', '.srt')):
-            if args.translate:
-                # Nếu bật chế độ dịch, kiểm tra file dịch
-                vi_file = input_path.replace('.mp4', '_vi.srt')
-                if os.path.exists(vi_file):
-                    logging.info(f"Bỏ qua video {video_file} (đã có phụ đề và bản dịch)")
+            # Kiểm tra nếu đã có file SRT
+            if os.path.exists(input_path.replace('.mp4', '.srt')):
+                if args.translate:
+                    # Nếu bật chế độ dịch, kiểm tra file dịch
+                    vi_file = input_path.replace('.mp4', '_vi.srt')
+                    if os.path.exists(vi_file):
+                        logging.info(f"Bỏ qua video {video_file} (đã có phụ đề và bản dịch)")
+                        skipped_count += 1
+                        continue
+                else:
+                    logging.info(f"Bỏ qua video {video_file} (đã có phụ đề)")
                     skipped_count += 1
                     continue
-            else:
-                logging.info(f"Bỏ qua video {video_file} (đã có phụ đề)")
-                skipped_count += 1
-                continue
             
-        if process_video(input_path, args.translate):
-            success_count += 1
+            if process_video(input_path, args.translate, journal):
+                success_count += 1
+    finally:
+        # Dừng giữa chừng (Ctrl+C, lỗi) vẫn fsync phần nhật ký còn lại
+        if journal is not None:
+            journal.close()
     
     # Tổng kết
     logging.info("Hoàn thành xử lý:")
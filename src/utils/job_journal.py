@@ -0,0 +1,204 @@
+"""
+Nhật ký của một job dịch: ghi nối tiếp các block đã dịch và các file đã hoàn tất để tiếp tục sau sự cố
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def source_fingerprint(content: str) -> str:
+    """Mã nhận diện nội dung file phụ đề gốc (đổi nội dung thì kết quả cũ không còn dùng được)"""
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class JobJournal:
+    """Nhật ký append-only (JSONL) của một job dịch nhiều file, an toàn với đa luồng.
+
+    Mỗi dòng là một bản ghi:
+        {"f": file, "s": fingerprint}          bắt đầu dịch file với nội dung gốc s
+        {"f": file, "b": vị trí, "t": block}   block đã dịch xong
+        {"f": file, "done": true}              file đã được ghi hoàn chỉnh
+    Khi mở, nhật ký được đọc lại một lần vào bộ nhớ, nên mọi kiểm tra khi tiếp tục là O(1).
+    Dòng cuối ghi dở (tiến trình chết giữa chừng) bị bỏ qua.
+    """
+
+    def __init__(self, path: str, fsync_every: Optional[int] = None):
+        """Khởi tạo JobJournal
+
+        Args:
+            path: Đường dẫn file nhật ký
+            fsync_every: Số bản ghi giữa hai lần fsync (bản ghi hoàn tất file luôn được fsync)
+        """
+        self.path = path
+        self.fsync_every = fsync_every or int(os.getenv('JOB_JOURNAL_FSYNC_EVERY', '20'))
+
+        self._fingerprints: Dict[str, str] = {}
+        self._blocks: Dict[str, Dict[int, str]] = {}
+        self._completed: Set[str] = set()
+        self._unsynced = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        obsolete = self._replay()
+        if obsolete:
+            self._compact()
+        self._file = open(path, 'ab')
+
+    @classmethod
+    def for_job(cls, root: str, *params: str) -> 'JobJournal':
+        """Mở nhật ký của job dịch một thư mục với các tham số cho trước
+
+        Args:
+            root: Thư mục của job
+            *params: Các tham số phân biệt job (ví dụ ngôn ngữ đích, dịch vụ)
+
+        Returns:
+            Nhật ký trong JOB_JOURNAL_DIR (mặc định ~/.subtitle_translator_jobs)
+        """
+        journal_dir = os.getenv('JOB_JOURNAL_DIR') or os.path.join(os.path.expanduser("~"), ".subtitle_translator_jobs")
+        key = "|".join([os.path.abspath(root), *params])
+        name = hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(journal_dir, f"{name}.jsonl"))
+
+    def is_complete(self, file_key: str) -> bool:
+        """Kiểm tra file đã được ghi hoàn chỉnh ở lần chạy trước chưa"""
+        with self._lock:
+            return file_key in self._completed
+
+    def begin_file(self, file_key: str, fingerprint: str) -> int:
+        """Bắt đầu (hoặc tiếp tục) dịch một file
+
+        Args:
+            file_key: Khóa của file (đường dẫn file đầu ra)
+            fingerprint: Mã nhận diện nội dung file gốc
+
+        Returns:
+            Số block đã có trong nhật ký (0 nếu file gốc đã thay đổi)
+        """
+        with self._lock:
+            if self._fingerprints.get(file_key) == fingerprint:
+                return len(self._blocks.get(file_key, {}))
+            self._fingerprints[file_key] = fingerprint
+            self._blocks[file_key] = {}
+            self._completed.discard(file_key)
+            self._append({'f': file_key, 's': fingerprint})
+            return 0
+
+    def get_block(self, file_key: str, index: int) -> Optional[str]:
+        """Lấy block đã dịch ở lần chạy trước
+
+        Args:
+            file_key: Khóa của file
+            index: Vị trí của block
+
+        Returns:
+            Block đã dịch, None nếu chưa có
+        """
+        with self._lock:
+            return self._blocks.get(file_key, {}).get(index)
+
+    def record_block(self, file_key: str, index: int, block: str) -> None:
+        """Ghi nhận một block đã dịch xong
+
+        Args:
+            file_key: Khóa của file
+            index: Vị trí của block
+            block: Block đã dịch
+        """
+        with self._lock:
+            self._blocks.setdefault(file_key, {})[index] = block
+            self._append({'f': file_key, 'b': index, 't': block})
+
+    def mark_complete(self, file_key: str) -> None:
+        """Đánh dấu file đã được ghi hoàn chỉnh (gọi sau khi file đích đã được đổi tên xong)
+
+        Args:
+            file_key: Khóa của file
+        """
+        with self._lock:
+            self._completed.add(file_key)
+            self._blocks.pop(file_key, None)
+            self._append({'f': file_key, 'done': True}, sync=True)
+
+    def close(self) -> None:
+        """Đóng nhật ký (fsync phần còn lại)"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _append(self, record: Dict, sync: bool = False) -> None:
+        if self._file is None:
+            return
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        self._file.write(line.encode('utf-8'))
+        self._file.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _replay(self) -> int:
+        """Đọc lại nhật ký vào bộ nhớ
+
+        Returns:
+            Số bản ghi không còn cần giữ (block của file đã xong hoặc đã bị bắt đầu lại)
+        """
+        if not os.path.exists(self.path):
+            return 0
+
+        records, obsolete = 0, 0
+        with open(self.path, 'rb') as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw.decode('utf-8'))
+                    file_key = record['f']
+                except (ValueError, KeyError, TypeError):
+                    # Dòng ghi dở ở cuối nhật ký
+                    obsolete += 1
+                    continue
+                records += 1
+                if 's' in record:
+                    obsolete += len(self._blocks.get(file_key, {}))
+                    self._fingerprints[file_key] = record['s']
+                    self._blocks[file_key] = {}
+                    self._completed.discard(file_key)
+                elif record.get('done'):
+                    obsolete += len(self._blocks.pop(file_key, {}))
+                    self._completed.add(file_key)
+                elif 'b' in record:
+                    self._blocks.setdefault(file_key, {})[int(record['b'])] = record['t']
+
+        if records:
+            logger.info(f"Tiếp tục job từ nhật ký {self.path}: {len(self._completed)} file đã xong, "
+                        f"{sum(len(b) for b in self._blocks.values())} block đã dịch")
+        return obsolete
+
+    def _compact(self) -> None:
+        """Ghi lại nhật ký chỉ với các bản ghi còn cần, thay thế nguyên tử file cũ"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for file_key, fingerprint in self._fingerprints.items():
+                lines = [{'f': file_key, 's': fingerprint}]
+                if file_key in self._completed:
+                    lines.append({'f': file_key, 'done': True})
+                else:
+                    lines.extend({'f': file_key, 'b': i, 't': t} for i, t in sorted(self._blocks.get(file_key, {}).items()))
+                for record in lines:
+                    f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
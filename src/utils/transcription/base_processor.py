@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 
 class BaseTranscriptionProcessor(ABC):
     """
@@ -14,12 +14,14 @@ class BaseTranscriptionProcessor(ABC):
         pass
         
     @abstractmethod
-    def transcribe_audio(self, audio_path: str) -> Optional[Dict[str, Any]]:
+    def transcribe_audio(self, audio_path: str,
+                         on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
         """
         Chuyển đổi audio thành văn bản
         
         Args:
             audio_path: Đường dẫn đến file audio
+            on_segment: Hàm được gọi với từng segment ngay khi có kết quả
             
         Returns:
             Dict chứa kết quả chuyển đổi hoặc None nếu có lỗi
@@ -3,7 +3,7 @@ import torch
 import logging
 import time
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 from pathlib import Path
 
 # Import faster-whisper
@@ -47,7 +47,8 @@ def format_timestamp(seconds):
     return f"{hours:02d}:{minutes:02d}:{int(seconds_remainder):02d},{milliseconds:03d}"
 
 class FasterWhisperProcessor(BaseTranscriptionProcessor):
-    def __init__(self, model_name: str = MODEL_BASE, device: str = 'cuda', compute_type: str = 'float16'):
+    def __init__(self, model_name: str = MODEL_BASE, device: str = 'cuda', compute_type: str = 'float16',
+                 beam_size: int = 5, word_timestamps: bool = True):
         """
         Khởi tạo FasterWhisperProcessor
         
@@ -55,6 +56,8 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
             model_name: Tên model Whisper (tiny, base, small, medium, large-v3, distil-large-v3)
             device: Thiết bị chạy model (cuda/cpu)
             compute_type: Loại tính toán (float16, float32, int8, int8_float16)
+            beam_size: Số beam khi giải mã (1 là greedy, nhanh nhất)
+            word_timestamps: Tính timestamp cho từng từ (tốn thêm thời gian)
         """
         self.model_name = validate_model_name(model_name)
         
@@ -70,6 +73,8 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
             logger.warning("float16 không được hỗ trợ trên CPU, sử dụng float32 thay thế")
             self.compute_type = 'float32'
             
+        self.beam_size = beam_size
+        self.word_timestamps = word_timestamps
         self.model = None
         
     def load_model(self) -> None:
@@ -93,12 +98,14 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
             logger.error(f"Error loading model: {str(e)}")
             raise
             
-    def transcribe_audio(self, audio_path: str) -> Optional[Dict[str, Any]]:
+    def transcribe_audio(self, audio_path: str,
+                         on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
         """
         Chuyển đổi audio thành văn bản
         
         Args:
             audio_path: Đường dẫn đến file audio
+            on_segment: Hàm được gọi với từng segment ngay khi được giải mã
             
         Returns:
             Dict chứa kết quả chuyển đổi hoặc None nếu có lỗi
@@ -112,8 +119,8 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
             # Cấu hình cho transcribe
             transcribe_options = {
                 "language": "en",  # Mặc định là tiếng Anh
-                "beam_size": 5,
-                "word_timestamps": True,  # Bật timestamp cho từng từ
+                "beam_size": self.beam_size,
+                "word_timestamps": self.word_timestamps,  # Timestamp cho từng từ
                 "condition_on_previous_text": True,  # Sử dụng ngữ cảnh từ đoạn trước
                 "temperature": 0.0,  # Không sử dụng sampling
                 "compression_ratio_threshold": 2.4,
@@ -125,16 +132,14 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
             # Thực hiện chuyển đổi
             segments, info = self.model.transcribe(audio_path, **transcribe_options)
             
-            # Convert generator to list for easier handling
-            segments_list = list(segments)
-            
             # Format kết quả tương tự như whisper
             result = {
                 "segments": [],
                 "language": info.language
             }
             
-            for segment in segments_list:
+            # Segments là generator: mỗi segment được giải mã khi lặp tới
+            for segment in segments:
                 words = []
                 if hasattr(segment, 'words') and segment.words:
                     for word in segment.words:
@@ -151,6 +156,8 @@ class FasterWhisperProcessor(BaseTranscriptionProcessor):
                     "text": segment.text,
                     "words": words
                 })
+                if on_segment is not None:
+                    on_segment(result["segments"][-1])
                 
             return result
             
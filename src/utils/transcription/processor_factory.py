@@ -27,7 +27,7 @@ class TranscriptionProcessorFactory:
             engine: Loại engine (openai_whisper, faster_whisper)
             model_name: Tên model
             device: Thiết bị (cuda, cpu)
-            **kwargs: Tham số bổ sung cho processor cụ thể
+            **kwargs: Tham số bổ sung cho processor cụ thể (compute_type, beam_size, word_timestamps)
             
         Returns:
             BaseTranscriptionProcessor hoặc None nếu không hỗ trợ
@@ -38,11 +38,15 @@ class TranscriptionProcessorFactory:
             
         logger.info(f"Creating {engine} processor with model {model_name} on {device}")
         
+        # Chỉ chuyển các tùy chọn giải mã được chỉ định, còn lại dùng mặc định của từng processor
+        decode_options = {name: kwargs[name] for name in ('beam_size', 'word_timestamps') if name in kwargs}
+        
         if engine == ENGINE_OPENAI_WHISPER:
-            return WhisperProcessor(model_name=model_name, device=device)
+            return WhisperProcessor(model_name=model_name, device=device, **decode_options)
         elif engine == ENGINE_FASTER_WHISPER:
             # Extract compute_type for FasterWhisperProcessor if provided
             compute_type = kwargs.get('compute_type', 'float16')
-            return FasterWhisperProcessor(model_name=model_name, device=device, compute_type=compute_type)
+            return FasterWhisperProcessor(model_name=model_name, device=device, compute_type=compute_type,
+                                          **decode_options)
         
         return None 
\ No newline at end of file
@@ -4,7 +4,7 @@ import whisper
 import logging
 import time
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from pathlib import Path
 
 from .gpu_utils import get_gpu_info, clear_gpu_memory
@@ -36,16 +36,21 @@ def format_timestamp(seconds):
     return f"{hours:02d}:{minutes:02d}:{int(seconds_remainder):02d},{milliseconds:03d}"
 
 class WhisperProcessor(BaseTranscriptionProcessor):
-    def __init__(self, model_name: str = 'base.en', device: str = 'cuda'):
+    def __init__(self, model_name: str = 'base.en', device: str = 'cuda',
+                 beam_size: Optional[int] = None, word_timestamps: bool = True):
         """
         Khởi tạo WhisperProcessor
         
         Args:
             model_name: Tên model Whisper (tiny.en, base.en, small.en)
             device: Thiết bị chạy model (cuda/cpu)
+            beam_size: Số beam khi giải mã (None là greedy)
+            word_timestamps: Tính timestamp cho từng từ (tốn thêm thời gian)
         """
         self.model_name = validate_model_name(model_name)
         self.device = device if torch.cuda.is_available() else 'cpu'
+        self.beam_size = beam_size
+        self.word_timestamps = word_timestamps
         self.model = None
         
     def load_model(self) -> None:
@@ -69,12 +74,14 @@ class WhisperProcessor(BaseTranscriptionProcessor):
             logger.error(f"Error loading model: {str(e)}")
             raise
             
-    def transcribe_audio(self, audio_path: str) -> Optional[Dict[str, Any]]:
+    def transcribe_audio(self, audio_path: str,
+                         on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
         """
         Chuyển đổi audio thành văn bản
         
         Args:
             audio_path: Đường dẫn đến file audio
+            on_segment: Hàm được gọi với từng segment (Whisper chỉ trả segment khi dịch xong cả file)
             
         Returns:
             Dict chứa kết quả chuyển đổi hoặc None nếu có lỗi
@@ -90,7 +97,7 @@ class WhisperProcessor(BaseTranscriptionProcessor):
                 "language": "en",  # Luôn sử dụng tiếng Anh cho model .en
                 "fp16": self.device == 'cuda',
                 "verbose": False,
-                "word_timestamps": True,  # Bật timestamp cho từng từ
+                "word_timestamps": self.word_timestamps,  # Timestamp cho từng từ
                 "condition_on_previous_text": True,  # Sử dụng ngữ cảnh từ đoạn trước
                 "temperature": 0.0,  # Không sử dụng sampling
                 "compression_ratio_threshold": 2.4,
@@ -98,8 +105,14 @@ class WhisperProcessor(BaseTranscriptionProcessor):
                 "no_speech_threshold": 0.6
             }
             
+            if self.beam_size is not None:
+                transcribe_options["beam_size"] = self.beam_size
+            
             # Thực hiện chuyển đổi
             result = self.model.transcribe(audio_path, **transcribe_options)
+            if on_segment is not None:
+                for segment in result["segments"]:
+                    on_segment(segment)
             return result
             
         except Exception as e:
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark thông lượng dịch phụ đề trên bộ SRT tổng hợp và server provider giả lập.
+
+Các kịch bản chạy đúng đường dịch thật (provider Groq trỏ tới MockProviderServer qua GROQ_BASE_URL,
+đi qua rate limiter, circuit breaker và cache):
+
+    file           SubtitleTranslator.process_subtitle_file lần lượt từng file
+    directory      SubtitleTranslator.process_directory trên cả thư mục
+    simple         TranslationService.translate_subtitle_file (lớp application, chế độ simple)
+    context_aware  TranslationService.translate_subtitle_file (lớp application, chế độ context-aware)
+
+Kết quả (blocks/s, số request mỗi block, độ trễ p50/p95 của file, tỉ lệ cache hit) được in ra dưới dạng JSON
+và so với baseline đã lưu; thoát với mã 1 nếu có chỉ số tệ hơn baseline quá ngưỡng:
+
+    python -m tests.benchmark_translation --files 20 --blocks 120 --latency 0.05 --save-baseline
+    python -m tests.benchmark_translation --files 20 --blocks 120 --latency 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tests.mock_provider_server import MockConfig, MockProviderServer
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = ROOT_DIR / "tests" / "benchmark_translation_baseline.json"
+SCENARIOS = ('file', 'directory', 'simple', 'context_aware')
+MOCK_MODEL = 'mock-model'
+# Chỉ số so với baseline và chiều tốt hơn của chúng
+METRICS = (
+    ('blocks_per_s', 'higher'),
+    ('requests_per_block', 'lower'),
+    ('p95_file_s', 'lower'),
+    ('cache_hit_rate', 'higher'),
+)
+
+# Câu thường gặp trong khóa học lập trình, lặp lại giữa các file như lời chào đầu bài
+COMMON_LINES = [
+    "Welcome back to the course.",
+    "Let's get started.",
+    "In this lesson, we are going to build the API.",
+    "See you in the next video.",
+    "Let me show you how this works.",
+    "Okay, so let's open the terminal.",
+    "Don't forget to save the file.",
+    "Now let's run the tests again.",
+]
+SUBJECTS = ["the server", "this function", "the database", "our component", "the request", "the user",
+            "the config file", "the router", "each element", "the cache"]
+VERBS = ["returns", "updates", "creates", "validates", "renders", "loads", "sends", "stores", "parses", "calls"]
+OBJECTS = ["a new token", "the response", "<i>two</i> arguments", "the list of items", "an error message",
+           "port 8080", "the session", "3 records", "the default value", "a JSON object"]
+TAILS = ["", " when the page loads", " before we continue", " inside the loop", " right here",
+         " after the user logs in", " in version 2", " for every request"]
+
+
+def _format_timestamp(ms: int) -> str:
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def generate_corpus(directory: str, files: int, blocks: int, seed: int = 0, repeat_rate: float = 0.2) -> List[str]:
+    """Sinh bộ file SRT tổng hợp, tái lập được theo seed
+
+    Args:
+        directory: Thư mục chứa các file được sinh
+        files: Số file
+        blocks: Số block trung bình mỗi file (mỗi file dao động ±50%)
+        seed: Hạt giống cho bộ sinh ngẫu nhiên
+        repeat_rate: Tỉ lệ dòng lặp lại nguyên văn (câu quen thuộc hoặc dòng đã xuất hiện), tạo cache hit
+
+    Returns:
+        Danh sách đường dẫn file theo thứ tự sinh
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    seen: List[str] = []
+    paths = []
+    for index in range(files):
+        count = max(1, int(blocks * rng.uniform(0.5, 1.5)))
+        entries = []
+        start = 0
+        for number in range(1, count + 1):
+            lines = []
+            for _ in range(1 if rng.random() < 0.7 else 2):
+                if rng.random() < repeat_rate:
+                    line = rng.choice(COMMON_LINES + seen[-200:])
+                else:
+                    line = (f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} "
+                            f"{rng.choice(OBJECTS)}{rng.choice(TAILS)}.")
+                    seen.append(line)
+                lines.append(line)
+            duration = int(rng.uniform(1200, 5500))
+            entries.append(f"{number}\n{_format_timestamp(start)} --> {_format_timestamp(start + duration)}\n"
+                           + "\n".join(lines) + "\n")
+            start += duration + int(rng.uniform(0, 2500))
+        path = os.path.join(directory, f"{index + 1:03d} - lesson.srt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(entries))
+        paths.append(path)
+    return paths
+
+
+def count_blocks(paths: List[str]) -> int:
+    """Đếm số block trong các file SRT (số đoạn cách nhau bởi dòng trống)"""
+    total = 0
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            total += sum(1 for part in f.read().split("\n\n") if part.strip())
+    return total
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Phân vị q (0-100) có nội suy tuyến tính, 0 nếu danh sách rỗng"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(files: int, blocks: int, seconds: float, requests: int,
+              file_latencies: List[float], lookups: int, hits: int) -> Dict[str, float]:
+    """Tổng hợp chỉ số của một kịch bản"""
+    return {
+        'files': files,
+        'blocks': blocks,
+        'seconds': round(seconds, 3),
+        'blocks_per_s': round(blocks / seconds, 2) if seconds > 0 else 0.0,
+        'requests': requests,
+        'requests_per_block': round(requests / blocks, 3) if blocks else 0.0,
+        'p50_file_s': round(percentile(file_latencies, 50), 3),
+        'p95_file_s': round(percentile(file_latencies, 95), 3),
+        'cache_hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+    }
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """So kết quả với baseline
+
+    Args:
+        result: Kết quả benchmark
+        baseline: Kết quả đã lưu làm baseline
+        tolerance: Mức tệ hơn tương đối cho phép (0.2 là 20%)
+
+    Returns:
+        Danh sách mô tả các chỉ số tệ hơn baseline quá ngưỡng (rỗng nếu không có)
+    """
+    regressions = []
+    for scenario, metrics in result.get('scenarios', {}).items():
+        base = baseline.get('scenarios', {}).get(scenario)
+        if not base:
+            continue
+        for metric, better in METRICS:
+            new, old = metrics.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            if better == 'higher':
+                worse = new < old * (1 - tolerance)
+            else:
+                worse = new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{scenario}.{metric}: {old} -> {new}")
+    return regressions
+
+
+class CountingCache:
+    """Bọc cache thật để đếm số lần tra cứu và số lần trúng"""
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def get(self, key, *args, **kwargs):
+        value = self._cache.get(key, *args, **kwargs)
+        with self._lock:
+            self.lookups += 1
+            if value:
+                self.hits += 1
+        return value
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+
+def configure_environment(work_dir: str, base_url: str, args) -> None:
+    """Trỏ provider Groq tới server giả lập và cô lập mọi trạng thái lưu trên đĩa trong work_dir
+
+    Phải gọi trước khi import src (các bộ dùng chung đọc cấu hình lúc khởi tạo).
+    """
+    for name in ('NOVITA', 'GOOGLE', 'MISTRAL', 'OPENROUTER', 'CEREBRAS'):
+        os.environ.pop(f"{name}_API_KEY", None)
+    os.environ.update({
+        'GROQ_API_KEY': 'mock',
+        'GROQ_BASE_URL': base_url,
+        'GROQ_RPM': str(args.rpm),
+        'PROVIDER_PRIORITY': 'groq',
+        'MODEL_RANKING_FILE': os.path.join(work_dir, 'model_rankings.json'),
+        'QUOTA_LEDGER_FILE': os.path.join(work_dir, 'quota_ledger.json'),
+        'MODEL_REGISTRY_FILE': os.path.join(work_dir, 'model_registry.json'),
+        'JOB_JOURNAL_DIR': os.path.join(work_dir, 'jobs'),
+        'CASSETTE_MODE': 'off',
+        'CASCADE_TIERS': '',
+        'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+    })
+
+
+def build_subtitle_translator(cache_dir: str, min_interval: float):
+    """Tạo SubtitleTranslator dùng provider Groq giả lập và cache đếm lượt trúng"""
+    from src.api.handler import APIHandler
+    from src.translator.subtitle import SubtitleTranslator
+    from src.translator.translator_service import APITranslatorService
+    from src.utils.cache_manager import TranslationCacheManager
+
+    handler = APIHandler()
+    handler.providers['groq'].models = [MOCK_MODEL]
+    # Khoảng cách tối thiểu giữa hai request thay cho giới hạn của tài khoản Groq miễn phí
+    handler.translation_service.get_rate_limit = lambda provider, paid=False: min_interval
+    cache = CountingCache(TranslationCacheManager(cache_dir))
+    return SubtitleTranslator(api_handler=handler, cache_manager=cache,
+                              translator_service=APITranslatorService(handler, cache))
+
+
+def run_file_scenario(paths: List[str], output_dir: str, cache_dir: str, args) -> Dict:
+    """Dịch lần lượt từng file bằng SubtitleTranslator.process_subtitle_file"""
+    translator = build_subtitle_translator(cache_dir, args.min_interval)
+    latencies = []
+    start_time = time.time()
+    for path in paths:
+        file_start = time.time()
+        translator.process_subtitle_file(path, os.path.join(output_dir, os.path.basename(path)),
+                                         args.target_lang, 'groq', max_workers=args.workers)
+        latencies.append(time.time() - file_start)
+    cache = translator.cache_manager
+    return {'seconds': time.time() - start_time, 'latencies': latencies,
+            'lookups': cache.lookups, 'hits': cache.hits}
+
+
+def run_directory_scenario(input_dir: str, output_dir: str, cache_dir: str, args) -> Dict:
+    """Dịch cả thư mục bằng SubtitleTranslator.process_directory
+
+    Độ trễ của file là thời điểm file đầu ra được ghi so với lúc bắt đầu. Thứ tự fifo được dùng
+    để lượt quét cache ước lượng chi phí (sjf/lpt) không bị tính vào tỉ lệ cache hit.
+    """
+    translator = build_subtitle_translator(cache_dir, args.min_interval)
+    start_time = time.time()
+    translator.process_directory(input_dir, output_dir, args.target_lang, 'groq',
+                                 max_workers=args.workers, order='fifo')
+    seconds = time.time() - start_time
+    latencies = [path.stat().st_mtime - start_time for path in Path(output_dir).glob('**/*.srt')]
+    cache = translator.cache_manager
+    return {'seconds': seconds, 'latencies': latencies, 'lookups': cache.lookups, 'hits': cache.hits}
+
+
+def run_application_scenario(paths: List[str], mode_name: str, args) -> Dict:
+    """Dịch lần lượt từng file bằng TranslationService.translate_subtitle_file của lớp application"""
+    from src.core import SubtitleBlock, TranslationContext, TranslationMode
+    from src.application import TranslationService
+    from src.infrastructure import ConcreteProviderService, MemoryCacheService
+    from src.infrastructure.providers import GroqProvider
+
+    provider = GroqProvider('mock')
+    provider.models = [MOCK_MODEL]
+    cache = CountingCache(MemoryCacheService())
+    service = TranslationService(ConcreteProviderService({'groq': provider}, ['groq']), cache)
+    mode = TranslationMode(mode_name)
+
+    latencies = []
+    start_time = time.time()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            blocks = SubtitleBlock.parse_srt_content(f.read())
+        context = TranslationContext(target_language=args.target_lang, provider_name='groq',
+                                     mode=mode, max_workers=args.workers)
+        file_start = time.time()
+        service.translate_subtitle_file(blocks, context)
+        latencies.append(time.time() - file_start)
+    return {'seconds': time.time() - start_time, 'latencies': latencies,
+            'lookups': cache.lookups, 'hits': cache.hits}
+
+
+def run_benchmark(args) -> Dict:
+    """Chạy các kịch bản đã chọn và trả về kết quả dạng JSON
+
+    Args:
+        args: Tham số dòng lệnh (xem parse_args)
+
+    Returns:
+        Từ điển {'config': ..., 'scenarios': {tên: chỉ số}}
+    """
+    config = MockConfig(
+        latency=args.latency, latency_sigma=args.latency_sigma, per_1k_chars=args.per_1k_chars,
+        rate_limit_rate=args.rate_limit, retry_after=args.retry_after, error_rate=args.error, seed=args.seed
+    )
+    work_dir = tempfile.mkdtemp(prefix='translation_benchmark_')
+    result = {'config': benchmark_config(args), 'scenarios': {}}
+    try:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        paths = generate_corpus(corpus_dir, args.files, args.blocks, args.seed, args.repeat_rate)
+        blocks = count_blocks(paths)
+        with MockProviderServer(config) as server:
+            configure_environment(work_dir, server.base_url, args)
+            for scenario in args.scenarios:
+                output_dir = os.path.join(work_dir, f"out_{scenario}")
+                cache_dir = os.path.join(work_dir, f"cache_{scenario}")
+                os.makedirs(output_dir, exist_ok=True)
+                requests_before = server.stats['requests']
+                if scenario == 'file':
+                    run = run_file_scenario(paths, output_dir, cache_dir, args)
+                elif scenario == 'directory':
+                    run = run_directory_scenario(corpus_dir, output_dir, cache_dir, args)
+                else:
+                    run = run_application_scenario(paths, scenario, args)
+                result['scenarios'][scenario] = summarize(
+                    len(paths), blocks, run['seconds'], server.stats['requests'] - requests_before,
+                    run['latencies'], run['lookups'], run['hits']
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def benchmark_config(args) -> Dict:
+    """Các tham số quyết định kết quả; chỉ so với baseline có cùng cấu hình"""
+    return {name: getattr(args, name) for name in (
+        'files', 'blocks', 'repeat_rate', 'seed', 'target_lang', 'workers', 'min_interval', 'rpm',
+        'latency', 'latency_sigma', 'per_1k_chars', 'rate_limit', 'retry_after', 'error'
+    )}
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark thông lượng dịch phụ đề với provider giả lập')
+    parser.add_argument('--files', type=int, default=12, help='Số file SRT tổng hợp')
+    parser.add_argument('--blocks', type=int, default=80, help='Số block trung bình mỗi file')
+    parser.add_argument('--repeat-rate', type=float, default=0.2, help='Tỉ lệ dòng lặp lại (tạo cache hit)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target-lang', default='vi')
+    parser.add_argument('--workers', type=int, default=8, help='Số luồng dịch')
+    parser.add_argument('--min-interval', type=float, default=0.0, help='Khoảng cách tối thiểu giữa hai request (giây)')
+    parser.add_argument('--rpm', type=int, default=1000, help='Giới hạn request mỗi phút của provider')
+    parser.add_argument('--latency', type=float, default=0.05, help='Độ trễ trung vị của server giả lập (giây)')
+    parser.add_argument('--latency-sigma', type=float, default=0.3, help='Độ lệch log-normal của độ trễ')
+    parser.add_argument('--per-1k-chars', type=float, default=0.02, help='Độ trễ cộng thêm mỗi 1000 ký tự (giây)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Tỉ lệ phản hồi 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After của phản hồi 429 (giây)')
+    parser.add_argument('--error', type=float, default=0.0, help='Tỉ lệ lỗi 500')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Các kịch bản, phân tách bởi dấu phẩy ({', '.join(SCENARIOS)})")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='File baseline để so sánh')
+    parser.add_argument('--save-baseline', action='store_true', help='Lưu kết quả làm baseline mới')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Mức tệ hơn tương đối cho phép so với baseline')
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file (mặc định in ra màn hình)')
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Kịch bản không hợp lệ: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    result = run_benchmark(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"Đã lưu baseline vào {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Chưa có baseline {args.baseline}, chạy lại với --save-baseline để tạo", file=sys.stderr)
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('config') != result['config']:
+        print("Cấu hình khác baseline, bỏ qua so sánh", file=sys.stderr)
+        return 0
+    regressions = compare(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Tệ hơn baseline: {regression}", file=sys.stderr)
+    if not regressions:
+        print("Không có chỉ số nào tệ hơn baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
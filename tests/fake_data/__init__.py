@@ -0,0 +1 @@
+"""Bộ sinh dữ liệu giả cho kiểm thử và benchmark."""
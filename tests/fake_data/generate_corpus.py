@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sinh bộ dữ liệu lớn, tái lập được theo seed, để chạy thử tải cho quét thư mục, cache và lập lịch dịch.
+
+Cây thư mục mô phỏng khóa học thật:
+
+    <output>/<NN - Khóa học>/<NN - Chương>/<NN - Bài>.srt   (kèm .wav/.mp4 và _vi.srt nếu bật)
+
+Phụ đề có phân phối gần với khóa học lập trình: số block mỗi bài và số từ mỗi block theo phân phối
+log-normal, câu quen thuộc lặp lại theo phân phối Zipf (nguồn cache hit), một phần file là bản sao
+nguyên văn của bài khác (bài quay lại, bài tổng kết) và một phần block không cần dịch (nhạc, lệnh).
+Mỗi file được sinh từ seed riêng theo vị trí của nó nên thêm khóa học không làm đổi các file cũ.
+File corpus.json ghi lại tham số và thống kê của bộ dữ liệu.
+
+    python -m tests.fake_data.generate_corpus /tmp/corpus --courses 30 --seed 1
+    python -m tests.fake_data.generate_corpus /tmp/media --courses 1 --sections 1 --lessons 2 \\
+        --media mp4 --media-files 2 --media-duration 3600
+"""
+
+import os
+import json
+import math
+import random
+import argparse
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional
+
+from tests.fake_data.speech import synthesize_speech
+
+TOPICS = {
+    'Python': (["the function", "this list", "the dictionary", "our class", "the loop", "the module",
+                "the virtual environment", "the decorator", "this generator", "the exception"],
+               ["pip install requests", "python main.py", "def __init__(self):", "import os"]),
+    'JavaScript': (["the component", "this promise", "the array", "our callback", "the event listener",
+                    "the state", "this hook", "the router", "the fetch call", "the bundle"],
+                   ["npm install", "npm run dev", "console.log(user)", "const app = express()"]),
+    'Docker': (["the container", "this image", "the volume", "our network", "the Dockerfile",
+                "the compose file", "the registry", "this layer", "the port mapping", "the entrypoint"],
+               ["docker build -t app .", "docker compose up -d", "docker ps", "EXPOSE 8080"]),
+    'SQL': (["the table", "this query", "the index", "our join", "the primary key", "the transaction",
+             "the view", "this column", "the foreign key", "the migration"],
+            ["SELECT * FROM users;", "CREATE INDEX idx_email", "BEGIN;", "GROUP BY country"]),
+}
+VERBS = ["returns", "updates", "creates", "validates", "renders", "loads", "sends", "stores", "parses",
+         "calls", "handles", "checks", "wraps", "exports", "reads"]
+# {n} được thay bằng số ngẫu nhiên để câu giảng bài ít trùng nhau như thật
+OBJECTS = ["a new token", "the response", "<i>two</i> arguments", "the list of items", "an error message",
+           "port {n}", "the session", "{n} records", "the default value", "a JSON object", "the user input",
+           "the config", "{n} rows", "the result", "version {n}"]
+FILLERS = ["So", "Now", "Okay", "Alright", "And", "Basically", "Right", "Here", "Then", "Actually"]
+CLAUSES = ["when the page loads", "before we continue", "inside the loop", "right here", "after the user logs in",
+           "for every request", "on line {n}", "in the next step", "as you can see", "without any errors"]
+# Câu quen thuộc của giảng viên, lặp lại giữa các bài với tần suất theo Zipf
+CATCHPHRASES = [
+    "Let's get started.", "Welcome back.", "See you in the next video.", "Okay, let's go.",
+    "Let me show you how this works.", "Don't forget to save the file.", "Now let's run it again.",
+    "As you can see, it works.", "Let's take a look at the code.", "That's it for this lesson.",
+    "Any questions, leave them in the Q&A.", "Let's open the terminal.", "Let me zoom in a bit.",
+    "Pause the video and try it yourself.", "Great job!", "Let's move on.", "Hi everyone.",
+    "In this section, we'll build a small project.", "Let's refresh the browser.", "Perfect.",
+]
+# Block không cần dịch (nhạc, âm thanh, chỉ có số)
+NON_SPEECH = ["[Music]", "♪ ♪", "[Applause]", "[Laughter]", "...", "2", "10", "[Typing]"]
+SECTION_NAMES = ["Introduction", "Setup", "Basics", "Core Concepts", "Working with Data", "Testing",
+                 "Deployment", "Best Practices", "Project", "Advanced Topics", "Performance", "Wrap-up"]
+LESSON_WORDS = ["Intro", "Installing", "First Steps", "Variables", "Functions", "Errors", "Files", "APIs",
+                "Debugging", "Refactoring", "Review", "Exercise", "Solution", "Deep Dive", "Summary"]
+
+def _timestamp(ms: int) -> str:
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def _wrap(text: str, width: int = 42) -> List[str]:
+    """Chia câu thành tối đa hai dòng như phụ đề thật"""
+    if len(text) <= width:
+        return [text]
+    middle = len(text) // 2
+    cut = min((i for i in range(len(text)) if text[i] == ' '), key=lambda i: abs(i - middle), default=-1)
+    return [text] if cut < 0 else [text[:cut], text[cut + 1:]]
+
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class SubtitleFactory:
+    """Sinh nội dung phụ đề với phân phối độ dài và lặp lại gần với khóa học thật"""
+
+    def __init__(self, blocks: int = 120, words: int = 8, repeat_rate: float = 0.2, non_speech_rate: float = 0.02):
+        """Khởi tạo SubtitleFactory
+
+        Args:
+            blocks: Số block trung vị mỗi bài (log-normal, bài 2-30 phút)
+            words: Số từ trung vị mỗi block (log-normal)
+            repeat_rate: Tỉ lệ block là câu quen thuộc lặp lại (theo Zipf)
+            non_speech_rate: Tỉ lệ block không cần dịch
+        """
+        self.blocks = blocks
+        self.words = words
+        self.repeat_rate = repeat_rate
+        self.non_speech_rate = non_speech_rate
+        self._catchphrase_weights = _zipf_weights(len(CATCHPHRASES))
+
+    def sentence(self, rng: random.Random, topic: str) -> str:
+        """Một câu giảng bài có độ dài theo phân phối log-normal"""
+        subjects, commands = TOPICS[topic]
+        target = max(1, min(30, int(round(rng.lognormvariate(math.log(self.words), 0.5)))))
+        if rng.random() < 0.08:
+            words = f"Type {rng.choice(commands)}".split()
+        elif target <= 4:
+            words = f"Look at {rng.choice(subjects)}".split()
+        else:
+            words = [rng.choice(FILLERS) + ","] if rng.random() < 0.4 else []
+            obj = rng.choice(OBJECTS).format(n=rng.randint(2, 9000))
+            words += f"{rng.choice(subjects)} {rng.choice(VERBS)} {obj}".split()
+            # Thêm mệnh đề trọn vẹn tới khi đủ độ dài (không cắt giữa mệnh đề)
+            while len(words) < target:
+                words += rng.choice(CLAUSES).format(n=rng.randint(1, 400)).split()
+        text = ' '.join(words)
+        return text[0].upper() + text[1:] + ('' if text.endswith(('.', ';', ':', ')')) else '.')
+
+    def lesson(self, rng: random.Random, topic: str) -> str:
+        """Nội dung SRT của một bài"""
+        count = max(3, int(rng.lognormvariate(math.log(self.blocks), 0.6)))
+        entries = []
+        start = int(rng.uniform(0, 3000))
+        for number in range(1, count + 1):
+            roll = rng.random()
+            if roll < self.non_speech_rate:
+                text = rng.choice(NON_SPEECH)
+            elif roll < self.non_speech_rate + self.repeat_rate:
+                text = rng.choices(CATCHPHRASES, self._catchphrase_weights)[0]
+            else:
+                text = self.sentence(rng, topic)
+            # Khoảng 2.5 từ mỗi giây, tối thiểu 1 giây mỗi block
+            duration = max(1000, int(len(text.split()) / 2.5 * 1000 * rng.uniform(0.8, 1.3)))
+            entries.append(f"{number}\n{_timestamp(start)} --> {_timestamp(start + duration)}\n"
+                           + "\n".join(_wrap(text)) + "\n")
+            start += duration + int(rng.expovariate(1 / 400))
+        return "\n".join(entries)
+
+
+def make_video(audio_path: str, output_path: str) -> str:
+    """Ghép audio với khung hình đen thành MP4 (cần ffmpeg), giữ nguyên độ dài audio"""
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', 'color=c=black:s=640x360:r=5',
+        '-i', audio_path,
+        '-shortest', '-c:v', 'libx264', '-tune', 'stillimage', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '64k',
+        output_path
+    ]
+    subprocess.run(command, check=True)
+    return output_path
+
+
+def pseudo_translate(content: str) -> str:
+    """Bản dịch giả của file SRT (dùng cho các bài coi như đã dịch)"""
+    return content.translate(str.maketrans('aeoudAEOUD', 'ăêôưđĂÊÔƯĐ'))
+
+
+def generate_corpus(
+    output_dir: str,
+    courses: int = 5,
+    sections: int = 6,
+    lessons: int = 12,
+    blocks: int = 120,
+    words: int = 8,
+    repeat_rate: float = 0.2,
+    duplicate_rate: float = 0.02,
+    non_speech_rate: float = 0.02,
+    translated_rate: float = 0.0,
+    media: Optional[str] = None,
+    media_files: int = 0,
+    media_duration: float = 600.0,
+    seed: int = 0
+) -> Dict:
+    """Sinh cây khóa học với phụ đề (và media nếu cần)
+
+    Args:
+        output_dir: Thư mục gốc của bộ dữ liệu
+        courses: Số khóa học
+        sections: Số chương trung bình mỗi khóa (±50%)
+        lessons: Số bài trung bình mỗi chương (±50%)
+        blocks: Số block trung vị mỗi bài
+        words: Số từ trung vị mỗi block
+        repeat_rate: Tỉ lệ block là câu quen thuộc lặp lại
+        duplicate_rate: Tỉ lệ bài là bản sao nguyên văn của một bài trước đó
+        non_speech_rate: Tỉ lệ block không cần dịch
+        translated_rate: Tỉ lệ bài đã có bản dịch <tên>_vi.srt
+        media: 'wav' hoặc 'mp4' để sinh media cho các bài đầu tiên (None để không sinh)
+        media_files: Số bài có media
+        media_duration: Độ dài mỗi file media (giây)
+        seed: Hạt giống cho bộ sinh ngẫu nhiên
+
+    Returns:
+        Thông tin bộ dữ liệu (tham số và thống kê), cũng được ghi vào corpus.json
+    """
+    factory = SubtitleFactory(blocks, words, repeat_rate, non_speech_rate)
+    topics = sorted(TOPICS)
+    stats = Counter()
+    block_lengths = []
+    lines = Counter()
+    written: List[str] = []
+
+    for course in range(1, courses + 1):
+        course_rng = random.Random(f"{seed}:{course}")
+        topic = topics[(course - 1) % len(topics)]
+        course_dir = os.path.join(output_dir, f"{course:02d} - {topic} Course {course}")
+        for section in range(1, max(1, int(sections * course_rng.uniform(0.5, 1.5))) + 1):
+            section_dir = os.path.join(course_dir, f"{section:02d} - {SECTION_NAMES[(section - 1) % len(SECTION_NAMES)]}")
+            os.makedirs(section_dir, exist_ok=True)
+            stats['sections'] += 1
+            for lesson in range(1, max(1, int(lessons * course_rng.uniform(0.5, 1.5))) + 1):
+                rng = random.Random(f"{seed}:{course}:{section}:{lesson}")
+                title = f"{lesson:02d} - {rng.choice(LESSON_WORDS)} {rng.choice(TOPICS[topic][0]).split()[-1]}"
+                path = os.path.join(section_dir, f"{title}.srt")
+                if written and rng.random() < duplicate_rate:
+                    with open(rng.choice(written), 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    stats['duplicate_files'] += 1
+                else:
+                    content = factory.lesson(rng, topic)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                written.append(path)
+
+                for entry in content.strip().split("\n\n"):
+                    text = ' '.join(entry.split("\n")[2:])
+                    block_lengths.append(len(text.split()))
+                    lines[text] += 1
+                if rng.random() < translated_rate:
+                    with open(os.path.join(section_dir, f"{title}_vi.srt"), 'w', encoding='utf-8') as f:
+                        f.write(pseudo_translate(content))
+                    stats['translated_files'] += 1
+
+    media_paths = []
+    if media and media_files > 0:
+        for index, path in enumerate(written[:media_files]):
+            audio_path = os.path.splitext(path)[0] + '.wav'
+            synthesize_speech(audio_path, media_duration, seed=seed * 100003 + index)
+            if media == 'mp4':
+                media_path = make_video(audio_path, os.path.splitext(path)[0] + '.mp4')
+                os.remove(audio_path)
+            else:
+                media_path = audio_path
+            media_paths.append(os.path.relpath(media_path, output_dir))
+
+    block_lengths.sort()
+    manifest = {
+        'seed': seed,
+        'params': {
+            'courses': courses, 'sections': sections, 'lessons': lessons, 'blocks': blocks, 'words': words,
+            'repeat_rate': repeat_rate, 'duplicate_rate': duplicate_rate, 'non_speech_rate': non_speech_rate,
+            'translated_rate': translated_rate, 'media': media, 'media_files': media_files,
+            'media_duration': media_duration,
+        },
+        'courses': courses,
+        'sections': stats['sections'],
+        'files': len(written),
+        'blocks': len(block_lengths),
+        'unique_blocks': len(lines),
+        'repeated_block_ratio': round(1 - len(lines) / len(block_lengths), 4) if block_lengths else 0.0,
+        'duplicate_files': stats['duplicate_files'],
+        'translated_files': stats['translated_files'],
+        'words_per_block': {
+            'p50': block_lengths[len(block_lengths) // 2] if block_lengths else 0,
+            'p95': block_lengths[int(len(block_lengths) * 0.95)] if block_lengths else 0,
+        },
+        'media': media_paths,
+    }
+    with open(os.path.join(output_dir, 'corpus.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sinh bộ dữ liệu khóa học lớn để chạy thử tải')
+    parser.add_argument('output_dir', help='Thư mục gốc của bộ dữ liệu')
+    parser.add_argument('--courses', type=int, default=5)
+    parser.add_argument('--sections', type=int, default=6, help='Số chương trung bình mỗi khóa')
+    parser.add_argument('--lessons', type=int, default=12, help='Số bài trung bình mỗi chương')
+    parser.add_argument('--blocks', type=int, default=120, help='Số block trung vị mỗi bài')
+    parser.add_argument('--words', type=int, default=8, help='Số từ trung vị mỗi block')
+    parser.add_argument('--repeat-rate', type=float, default=0.2, help='Tỉ lệ câu quen thuộc lặp lại')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02, help='Tỉ lệ bài là bản sao của bài khác')
+    parser.add_argument('--non-speech-rate', type=float, default=0.02, help='Tỉ lệ block không cần dịch')
+    parser.add_argument('--translated-rate', type=float, default=0.0, help='Tỉ lệ bài đã có _vi.srt')
+    parser.add_argument('--media', choices=['wav', 'mp4'], help='Sinh media cho các bài đầu tiên')
+    parser.add_argument('--media-files', type=int, default=1, help='Số bài có media')
+    parser.add_argument('--media-duration', type=float, default=600.0, help='Độ dài mỗi file media (giây)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate_corpus(
+        args.output_dir, args.courses, args.sections, args.lessons, args.blocks, args.words,
+        args.repeat_rate, args.duplicate_rate, args.non_speech_rate, args.translated_rate,
+        args.media, args.media_files, args.media_duration, args.seed
+    )
+    print(f"Đã sinh {manifest['files']} file phụ đề ({manifest['blocks']} block, "
+          f"{manifest['repeated_block_ratio']:.0%} block lặp lại) trong {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
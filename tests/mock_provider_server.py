@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server giả lập API chat-completions tương thích OpenAI để chạy test và benchmark không tốn quota.
+
+Trỏ mọi provider (trừ Gemini, dùng giao thức riêng) tới server bằng PROVIDER_BASE_URL,
+hoặc từng provider bằng {PROVIDER}_BASE_URL, kèm API key bất kỳ:
+
+    python tests/mock_provider_server.py --port 8765 --latency 0.3 --rate-limit 0.05
+    PROVIDER_BASE_URL=http://127.0.0.1:8765/v1 GROQ_API_KEY=mock NOVITA_API_KEY=mock python ...
+
+Bản dịch giả là tất định: cùng văn bản luôn cho cùng kết quả, giữ nguyên số, thẻ định dạng
+và có chữ cái tiếng Việt nên qua được TranslationValidator.
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+
+TARGET_LANG_PATTERN = re.compile(r'Translate the following text to ([^.\n]+)\.')
+# Giữ nguyên thẻ định dạng và số khi tạo bản dịch giả
+PROTECTED_PATTERN = re.compile(r'(<[^<>]+>|\{\\[^{}]*\}|\d+)')
+PSEUDO_LETTERS = str.maketrans('aeoudAEOUD', 'ăêôưđĂÊÔƯĐ')
+
+
+def pseudo_translate(text: str, target_lang: str = 'vi') -> str:
+    """Bản dịch giả tất định: đổi nguyên âm sang chữ cái có dấu, giữ nguyên số và thẻ"""
+    parts = PROTECTED_PATTERN.split(text)
+    translated = ''.join(part if i % 2 else part.translate(PSEUDO_LETTERS) for i, part in enumerate(parts))
+    return translated if target_lang.lower().startswith('vi') else f"[{target_lang}] {translated}"
+
+
+class MockConfig:
+    """Cấu hình hành vi của server giả lập"""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_sigma: float = 0.0,
+        per_1k_chars: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        timeout_rate: float = 0.0,
+        hang_seconds: float = 30.0,
+        truncate_rate: float = 0.0,
+        error_rate: float = 0.0,
+        unknown_models: Optional[Set[str]] = None,
+        seed: int = 0
+    ):
+        """Khởi tạo MockConfig
+
+        Args:
+            latency: Độ trễ trung vị mỗi request (giây)
+            latency_sigma: Độ lệch của phân phối log-normal quanh trung vị (0 là độ trễ cố định)
+            per_1k_chars: Số giây cộng thêm cho mỗi 1000 ký tự đầu vào
+            rate_limit_rate: Xác suất trả 429 kèm header Retry-After
+            retry_after: Giá trị Retry-After (giây) của phản hồi 429
+            timeout_rate: Xác suất treo request hang_seconds giây (client sẽ timeout)
+            hang_seconds: Thời gian treo của request bị timeout
+            truncate_rate: Xác suất cắt cụt phản hồi JSON giữa chừng
+            error_rate: Xác suất trả lỗi 500
+            unknown_models: Các model trả 404 (model không tồn tại)
+            seed: Hạt giống cho bộ sinh ngẫu nhiên (lỗi và độ trễ tái lập được)
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.per_1k_chars = per_1k_chars
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.truncate_rate = truncate_rate
+        self.error_rate = error_rate
+        self.unknown_models = unknown_models or set()
+        self.seed = seed
+
+
+class MockProviderServer:
+    """Server HTTP giả lập chạy trong luồng nền, dùng được như context manager"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        """Khởi tạo MockProviderServer
+
+        Args:
+            config: Cấu hình hành vi (None để không có độ trễ và lỗi)
+            host: Địa chỉ lắng nghe
+            port: Cổng lắng nghe (0 để chọn cổng trống)
+        """
+        self.config = config or MockConfig()
+        self.stats: Counter = Counter()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL gốc để đặt vào PROVIDER_BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockProviderServer':
+        """Chạy server trong luồng nền"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Dừng server"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockProviderServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _draw(self) -> Dict[str, float]:
+        """Chọn ngẫu nhiên (tái lập được) kết quả và độ trễ của một request"""
+        config = self.config
+        with self._lock:
+            roll = self._random.random()
+            jitter = self._random.lognormvariate(0, config.latency_sigma) if config.latency_sigma else 1.0
+        outcome = 'ok'
+        for name, rate in (('rate_limit', config.rate_limit_rate), ('timeout', config.timeout_rate),
+                           ('truncate', config.truncate_rate), ('error', config.error_rate)):
+            if roll < rate:
+                outcome = name
+                break
+            roll -= rate
+        return {'outcome': outcome, 'latency': config.latency * jitter}
+
+    def _record(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                server._record('requests')
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self.path.rstrip('/').endswith('chat/completions'):
+                    return self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+                try:
+                    request = json.loads(body)
+                    messages = request['messages']
+                    model = request['model']
+                except (ValueError, KeyError, TypeError):
+                    return self._send_json(400, {'error': {'message': 'Invalid request body'}})
+
+                if model in server.config.unknown_models:
+                    server._record('404')
+                    return self._send_json(404, {'error': {'message': f"The model `{model}` does not exist",
+                                                           'code': 'model_not_found'}})
+
+                text = messages[-1].get('content', '')
+                prompt = ' '.join(message.get('content', '') for message in messages[:-1])
+                match = TARGET_LANG_PATTERN.search(prompt)
+                target_lang = match.group(1).strip() if match else 'vi'
+
+                draw = server._draw()
+                outcome = draw['outcome']
+                server._record(outcome)
+                if outcome == 'rate_limit':
+                    return self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}},
+                                           headers={'Retry-After': str(server.config.retry_after)})
+                if outcome == 'error':
+                    return self._send_json(500, {'error': {'message': 'Internal server error'}})
+                if outcome == 'timeout':
+                    time.sleep(server.config.hang_seconds)
+                time.sleep(draw['latency'] + server.config.per_1k_chars * len(text) / 1000)
+
+                content = pseudo_translate(text, target_lang)
+                prompt_tokens = (len(prompt) + len(text)) // 4
+                completion_tokens = len(content) // 4
+                payload = json.dumps({
+                    'id': f"chatcmpl-mock-{server.stats['requests']}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens},
+                }).encode('utf-8')
+                if outcome == 'truncate':
+                    # Khai báo đủ độ dài nhưng chỉ gửi một nửa rồi đóng kết nối
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload[:len(payload) // 2])
+                    self.close_connection = True
+                    return
+                self._send(200, payload)
+
+            def _send_json(self, status, data, headers=None):
+                self._send(status, json.dumps(data).encode('utf-8'), headers)
+
+            def _send(self, status, payload, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client đã bỏ request (timeout)
+                    pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server giả lập API chat-completions tương thích OpenAI')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='Độ trễ trung vị (giây)')
+    parser.add_argument('--latency-sigma', type=float, default=0.3, help='Độ lệch log-normal của độ trễ')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Tỉ lệ phản hồi 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After của phản hồi 429 (giây)')
+    parser.add_argument('--timeout', type=float, default=0.0, help='Tỉ lệ request bị treo')
+    parser.add_argument('--truncate', type=float, default=0.0, help='Tỉ lệ phản hồi bị cắt cụt')
+    parser.add_argument('--error', type=float, default=0.0, help='Tỉ lệ lỗi 500')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, latency_sigma=args.latency_sigma, rate_limit_rate=args.rate_limit,
+                        retry_after=args.retry_after, timeout_rate=args.timeout, truncate_rate=args.truncate,
+                        error_rate=args.error, seed=args.seed)
+    server = MockProviderServer(config, args.host, args.port)
+    print(f"Mock provider server: PROVIDER_BASE_URL={server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Thống kê: {dict(server.stats)}")
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
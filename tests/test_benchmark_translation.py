@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tests import benchmark_translation as benchmark
+
+
+def test_corpus_is_reproducible_and_has_repeated_lines(tmp_path):
+    first = benchmark.generate_corpus(str(tmp_path / "a"), files=3, blocks=40, seed=5)
+    second = benchmark.generate_corpus(str(tmp_path / "b"), files=3, blocks=40, seed=5)
+
+    contents = [Path(path).read_text(encoding="utf-8") for path in first]
+    assert contents == [Path(path).read_text(encoding="utf-8") for path in second]
+    assert contents[0].startswith("1\n00:00:00,000 --> ")
+    assert 60 <= benchmark.count_blocks(first) <= 180
+
+    # Dòng lặp lại nguyên văn là nguồn cache hit của benchmark
+    lines = [line for text in contents for line in text.splitlines() if line.endswith(".")]
+    assert len(set(lines)) < len(lines)
+
+
+def test_summary_reports_percentiles_and_rates():
+    summary = benchmark.summarize(files=4, blocks=200, seconds=10, requests=150,
+                                  file_latencies=[1.0, 2.0, 3.0, 10.0], lookups=200, hits=50)
+    assert summary["blocks_per_s"] == 20.0
+    assert summary["requests_per_block"] == 0.75
+    assert summary["p50_file_s"] == 2.5
+    assert summary["p95_file_s"] == pytest.approx(8.95)
+    assert summary["cache_hit_rate"] == 0.25
+    assert benchmark.percentile([], 95) == 0.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"scenarios": {"file": {"blocks_per_s": 100, "requests_per_block": 1.0,
+                                       "p95_file_s": 2.0, "cache_hit_rate": 0.5}}}
+    better = {"scenarios": {"file": {"blocks_per_s": 130, "requests_per_block": 0.8,
+                                     "p95_file_s": 2.3, "cache_hit_rate": 0.45}}}
+    worse = {"scenarios": {"file": {"blocks_per_s": 70, "requests_per_block": 1.3,
+                                    "p95_file_s": 2.5, "cache_hit_rate": 0.3},
+                           "directory": {"blocks_per_s": 1}}}
+
+    assert benchmark.compare(better, baseline) == []
+    assert benchmark.compare(worse, baseline) == [
+        "file.blocks_per_s: 100 -> 70",
+        "file.requests_per_block: 1.0 -> 1.3",
+        "file.p95_file_s: 2.0 -> 2.5",
+        "file.cache_hit_rate: 0.5 -> 0.3",
+    ]
+
+
+def test_benchmark_runs_every_scenario_against_the_mock_server(tmp_path):
+    for module in ("backoff", "dotenv", "requests", "openai"):
+        pytest.importorskip(module)
+    output = tmp_path / "result.json"
+    baseline = tmp_path / "baseline.json"
+    args = ["--files", "2", "--blocks", "6", "--latency", "0", "--latency-sigma", "0",
+            "--per-1k-chars", "0", "--baseline", str(baseline), "--output", str(output)]
+
+    assert benchmark.main(args + ["--save-baseline"]) == 0
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert set(result["scenarios"]) == set(benchmark.SCENARIOS)
+    for metrics in result["scenarios"].values():
+        assert metrics["blocks"] > 0 and metrics["blocks_per_s"] > 0
+    assert benchmark.main(args) in (0, 1)
@@ -0,0 +1,97 @@
+import types
+
+from src.api.circuit_breaker import CircuitBreaker
+from src.api.translation_service import TranslationService
+from src.translator import cascade
+from src.translator.translation_validator import TranslationValidator
+
+
+class FakeHandler:
+    """Trả bản dịch theo (provider, model), ghi nhận các lần gọi"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.providers = {"groq": object(), "novita": object()}
+        self.calls = []
+
+    def translate(self, text, target_lang=None, provider_name=None, deadline=None, model=None, failover=True):
+        self.calls.append((provider_name, model))
+        answer = self.answers[(provider_name, model)]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer(text) if callable(answer) else answer
+
+
+def test_validator_rules():
+    validator = TranslationValidator()
+    source = "We deployed <i>version 2</i> on 15 servers yesterday."
+
+    assert validator.check(source, "Hôm qua chúng tôi đã triển khai <i>phiên bản 2</i> trên 15 máy chủ.", "vi") is None
+    assert validator.check(source, "", "vi") == "empty"
+    assert validator.check(source, "Triển khai.", "vi") == "length_ratio"
+    assert validator.check(source, source, "vi") == "echo"
+    assert validator.check(source, "Hôm qua chúng tôi đã triển khai phiên bản 2 trên 15 máy chủ.", "vi") == "tags"
+    assert validator.check(source, "Hôm qua chúng tôi đã triển khai <i>phiên bản 2</i> trên 16 máy chủ.", "vi") == "numbers"
+    assert validator.check("Please open the settings page now.", "Por favor abra la pagina de ajustes.", "vi") == "target_script"
+    assert validator.check("Please open the settings page now.", "設定ページを開いてください。", "ja") is None
+    assert validator.check("Thank you.", "Cảm ơn.", "vi") is None
+
+
+def test_only_failing_blocks_escalate_and_tiers_are_reported():
+    good = "Cảm ơn các bạn đã theo dõi bài học."
+    handler = FakeHandler({
+        ("groq", "llama-3.1-8b-instant"): lambda text: good if text.startswith("Thanks") else text,
+        ("novita", None): "Đây là bản dịch của model mạnh hơn.",
+    })
+    tiers = cascade.parse_tiers("groq:llama-3.1-8b-instant, cerebras")
+    translator = cascade.TranslationCascade(handler, tiers)
+
+    assert tiers == [("groq", "llama-3.1-8b-instant"), ("cerebras", None)]
+    assert translator.translate("Thanks everyone for watching this lesson.", "vi", "novita") == good
+    assert translator.translate("Let us now open the configuration file.", "vi", "novita").startswith("Đây là")
+    # Tầng không có provider được cấu hình bị bỏ qua mà không gọi
+    assert ("cerebras", None) not in handler.calls
+    assert translator.get_stats() == {
+        "tiers": {"groq:llama-3.1-8b-instant": 1, "novita": 1},
+        "escalations": {"echo": 1},
+    }
+    assert "groq:llama-3.1-8b-instant 50% (1 block)" in translator.format_report()
+
+
+def test_cheap_tier_errors_escalate():
+    handler = FakeHandler({
+        ("groq", "llama-3.1-8b-instant"): RuntimeError("rate limited"),
+        ("novita", None): "Mở tệp cấu hình.",
+    })
+    translator = cascade.TranslationCascade(handler, [("groq", "llama-3.1-8b-instant")])
+
+    assert translator.translate("Open the config file.", "vi", "novita") == "Mở tệp cấu hình."
+    assert translator.get_stats()["escalations"] == {"error": 1}
+
+
+class RecordingProvider:
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = []
+
+    def translate(self, text, target_lang, deadline=None, model=None):
+        self.requests.append(text)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def test_failing_cheap_tier_does_not_fail_over_to_other_providers():
+    groq = RecordingProvider(RuntimeError("rate limited"))
+    novita = RecordingProvider("Mở tệp cấu hình.")
+    providers = {"groq": groq, "novita": novita}
+    service = TranslationService(providers, types.SimpleNamespace(check_rate_limit=lambda name: True),
+                                 ["groq", "novita"], circuit_breaker=CircuitBreaker())
+    handler = types.SimpleNamespace(providers=providers, translate=service.translate)
+    translator = cascade.TranslationCascade(handler, [("groq", None)])
+
+    assert translator.translate("Open the config file.", "vi", "novita") == "Mở tệp cấu hình."
+    # Tầng groq lỗi thì chuyển tầng; novita chỉ được gọi một lần, ở tầng cuối
+    assert len(groq.requests) == 1
+    assert novita.requests == ["Open the config file."]
+    assert translator.get_stats() == {"tiers": {"novita": 1}, "escalations": {"error": 1}}
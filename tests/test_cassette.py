@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from src.api import cassette as cassette_module
+from src.api import provider_errors
+from src.api.cassette import Cassette
+from src.api.circuit_breaker import CircuitBreaker
+from src.api.model_ranker import ModelRanker
+from src.api.providers import base
+from src.api.quota_ledger import QuotaLedger
+
+
+class ScriptedProvider(base.BaseProvider):
+    """Model "slow" trả kết quả sau 0.2s, model "limited" luôn trả 429"""
+    name = "scripted"
+    display_name = "Scripted"
+
+    def __init__(self, tmp_path, cassette, network=True):
+        super().__init__(
+            "key", circuit_breaker=CircuitBreaker(),
+            model_ranker=ModelRanker(storage_path=str(tmp_path / "rank.json")),
+            quota_ledger=QuotaLedger(storage_path=str(tmp_path / "quota.json")),
+            cassette=cassette,
+        )
+        self.models = ["limited", "slow"]
+        self.network = network
+
+    def _try_translate_with_model(self, text, target_lang, model, timeout):
+        assert self.network, "replay must not reach the network"
+        if model == "limited":
+            raise provider_errors.RateLimitedError("HTTP 429", provider=self.name, model=model,
+                                                   status=429, retry_after=5)
+        time.sleep(0.2)
+        self._record_quota(model, {"x-ratelimit-remaining-requests": "99", "content-type": "json"}, tokens=12)
+        return f"{target_lang}: {text}"
+
+
+def record(tmp_path, path):
+    recorder = Cassette(str(path), mode="record")
+    provider = ScriptedProvider(tmp_path / "rec", recorder)
+    assert provider.translate("Hello", "vi") == "vi: Hello"
+    recorder.close()
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".jsonl.gz"])
+def test_replay_reproduces_results_errors_and_quota_without_network(tmp_path, suffix):
+    path = tmp_path / f"traffic{suffix}"
+    (tmp_path / "rec").mkdir()
+    record(tmp_path, path)
+
+    replayer = Cassette(str(path), mode="replay", time_scale=0)
+    provider = ScriptedProvider(tmp_path, replayer, network=False)
+    start = time.time()
+    assert provider.translate("Hello", "vi") == "vi: Hello"
+    assert time.time() - start < 0.15
+
+    # Lỗi 429 được phát lại với đúng kiểu và Retry-After, nên mạch của model vẫn mở như lúc ghi
+    assert provider.circuit_breaker.retry_in("scripted", "limited") > 0
+    assert provider.quota_ledger.remaining("scripted", "slow") == 99
+
+    # Request chưa ghi báo lỗi tạm thời thay vì gọi mạng ("limited" đang mở mạch nên chỉ thử "slow")
+    with pytest.raises(cassette_module.CassetteMissError):
+        provider.translate("Never recorded", "vi")
+    assert replayer.misses == 1
+
+
+def test_replay_keeps_recorded_latency_scaled(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    (tmp_path / "rec").mkdir()
+    record(tmp_path, path)
+
+    provider = ScriptedProvider(tmp_path, Cassette(str(path), mode="replay", time_scale=0.5), network=False)
+    start = time.time()
+    provider.translate("Hello", "vi")
+    assert 0.08 <= time.time() - start < 0.5
+
+
+def test_recording_stores_hashed_keys_and_filtered_headers(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    (tmp_path / "rec").mkdir()
+    record(tmp_path, path)
+
+    text = path.read_text(encoding="utf-8")
+    assert "Hello\"" not in text.replace("vi: Hello", "")
+    assert "content-type" not in text
+    assert text.count("\n") == 2
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src.api.circuit_breaker import CircuitBreaker, CircuitState
+
+
+def test_opens_after_threshold_and_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_period=0.05)
+
+    breaker.record_failure("groq")
+    assert breaker.allow_request("groq")
+    breaker.record_failure("groq")
+    assert breaker.get_state("groq") == CircuitState.OPEN
+    assert not breaker.allow_request("groq")
+
+    time.sleep(0.06)
+    # Chỉ một luồng nhận được quyền thăm dò
+    assert breaker.allow_request("groq")
+    assert not breaker.allow_request("groq")
+
+    breaker.record_success("groq")
+    assert breaker.get_state("groq") == CircuitState.CLOSED
+    assert breaker.allow_request("groq")
+
+
+def test_failed_probe_reopens_and_model_circuits_are_independent():
+    breaker = CircuitBreaker(model_failure_threshold=1, model_cooldown_period=0.05)
+
+    breaker.record_failure("novita", "model-a", trip=True)
+    assert not breaker.allow_request("novita", "model-a")
+    assert breaker.allow_request("novita", "model-b")
+    assert breaker.allow_request("novita")
+
+    time.sleep(0.06)
+    assert breaker.allow_request("novita", "model-a")
+    opened, _ = breaker.record_failure("novita", "model-a")
+    assert opened
+    assert breaker.retry_in("novita", "model-a") > 0
+
+
+def test_concurrent_failures_are_counted_exactly():
+    breaker = CircuitBreaker(failure_threshold=1000, cooldown_period=1)
+
+    def fail_many():
+        for _ in range(100):
+            breaker.record_failure("google")
+
+    threads = [threading.Thread(target=fail_many) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert breaker.snapshot()["google"]["failures"] == 800
@@ -0,0 +1,260 @@
+import threading
+
+from src.application import TranslationService
+from src.application.strategies.context_aware_translation_strategy import ContextAwareTranslationStrategy
+from src.application.strategies.context_index import ContextIndex
+from src.core import SubtitleBlock, TranslationContext, TranslationMode
+
+
+def make_blocks(count, scene_every=None):
+    blocks, t = [], 0.0
+    for i in range(count):
+        if scene_every and i and i % scene_every == 0:
+            t += 5.0
+        blocks.append(SubtitleBlock(i + 1, stamp(t), stamp(t + 1.0), f"line {i + 1}"))
+        t += 1.5
+    return blocks
+
+
+def stamp(seconds):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+class EchoProvider:
+    def __init__(self):
+        self.prompts = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def translate_text(self, text, target_lang, provider_name=None):
+        with self._lock:
+            self.prompts.append(text)
+            self.threads.add(threading.get_ident())
+        if "Lines to translate:" not in text:
+            return "vi: " + text.rsplit("\n", 1)[-1]
+        lines = text.split("Lines to translate:\n", 1)[1].splitlines()
+        return "\n".join(line.replace("] ", "] vi: ", 1) for line in lines if line.startswith("[") and self.keep(line))
+
+    def keep(self, line):
+        return True
+
+    def get_available_providers(self):
+        return ["echo"]
+
+
+def make_context(**overrides):
+    return TranslationContext(target_language="vi", mode=TranslationMode.CONTEXT_AWARE, **overrides)
+
+
+def test_segments_cut_at_scene_gaps_and_cover_every_block():
+    strategy = ContextAwareTranslationStrategy(None, None, min_segment_size=5, max_segment_size=30)
+    segments = strategy._split_into_segments(make_blocks(40, scene_every=10))
+
+    assert segments == [(0, 10), (10, 20), (20, 30), (30, 40)]
+
+
+def test_long_scene_is_cut_at_max_size_and_short_tail_is_merged():
+    strategy = ContextAwareTranslationStrategy(None, None, min_segment_size=5, max_segment_size=12)
+    segments = strategy._split_into_segments(make_blocks(27))
+
+    assert segments[0][0] == 0 and segments[-1][1] == 27
+    assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+    assert all(5 <= end - start <= 12 + 5 for start, end in segments)
+
+
+def test_sharded_mode_keeps_order_and_only_shares_source_context():
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None, min_segment_size=5, max_segment_size=30)
+    blocks = make_blocks(40, scene_every=10)
+
+    results = strategy.translate_blocks(blocks, make_context(max_workers=4, batch_size=1, shard_by_scene=True), provider)
+
+    assert [b.translated_text for b in results] == [f"vi: line {i + 1}" for i in range(40)]
+    assert strategy.last_run_stats["mode"] == "sharded"
+    assert strategy.last_run_stats["segments"] == 4
+    # Khối đầu của segment 2 chỉ thấy văn bản nguồn của segment 1, không thấy bản dịch
+    first_of_second = next(p for p in provider.prompts if p.endswith("\nline 11"))
+    assert "line 10" in first_of_second
+    assert "vi: line 10" not in first_of_second
+
+
+def test_window_mode_sends_k_blocks_per_request_with_a_shared_prefix():
+    blocks = make_blocks(40, scene_every=10)
+    blocks[3].text = "two\nlines"
+    single, windowed = EchoProvider(), EchoProvider()
+    strategy = ContextAwareTranslationStrategy(single, None, min_segment_size=5, max_segment_size=30)
+    strategy.translate_blocks(blocks, make_context(enable_parallel=False, batch_size=1), single)
+    single_stats = strategy.last_run_stats
+
+    strategy.provider_service = windowed
+    results = strategy.translate_blocks(blocks, make_context(enable_parallel=False, batch_size=5, window_batching=True),
+                                        windowed)
+
+    assert results[3].translated_text == "vi: two\nlines"
+    assert results[39].translated_text == "vi: line 40"
+    assert strategy.last_run_stats["requests"] == single_stats["requests"] // 5
+    assert strategy.last_run_stats["prompt_chars"] < single_stats["prompt_chars"] / 2
+    prefixes = {p.split("Context (for reference only", 1)[0] for p in windowed.prompts}
+    assert len(prefixes) == 1
+
+
+def test_window_prompts_share_instructions_and_file_context_as_prefix():
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None)
+    context = make_context(enable_parallel=False, batch_size=5, window_batching=True)
+
+    strategy.translate_blocks(make_blocks(20), context, provider)
+
+    assert len(provider.prompts) == 4
+    # Phần đầu giống hệt nhau ở mọi cửa sổ, ngữ cảnh riêng và dòng cần dịch nằm sau
+    prefixes = {p.split("\n\nContext (for reference only", 1)[0] for p in provider.prompts}
+    assert len(prefixes) == 1
+    prefix = prefixes.pop()
+    assert all(f"] line {i}\n" in prefix + "\n" for i in range(1, 6))
+    assert all(p.index("Context (for reference only") < p.index("Lines to translate:") for p in provider.prompts)
+
+
+def test_window_batching_is_off_by_default():
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None)
+
+    strategy.translate_blocks(make_blocks(10), make_context(enable_parallel=False), provider)
+
+    assert strategy.last_run_stats["requests"] == 10
+
+
+def test_lines_missing_from_window_response_fall_back_to_single_requests():
+    provider = EchoProvider()
+    provider.keep = lambda line: not line.startswith("[2]")
+    strategy = ContextAwareTranslationStrategy(provider, None)
+
+    results = strategy.translate_blocks(make_blocks(5), make_context(enable_parallel=False, batch_size=5, window_batching=True),
+                                        provider)
+
+    assert [b.translated_text for b in results] == [f"vi: line {i + 1}" for i in range(5)]
+    assert strategy.last_run_stats["requests"] == 2
+
+
+def test_sequential_mode_when_parallel_is_disabled():
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None, min_segment_size=5, max_segment_size=30)
+
+    strategy.translate_blocks(make_blocks(40, scene_every=10), make_context(enable_parallel=False, batch_size=1), provider)
+
+    assert strategy.last_run_stats["mode"] == "sequential"
+    assert len(provider.threads) == 1
+
+
+def test_default_context_translates_the_file_as_one_chain():
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None, min_segment_size=5, max_segment_size=30)
+
+    results = strategy.translate_blocks(make_blocks(40, scene_every=10), make_context(batch_size=1), provider)
+
+    assert [b.translated_text for b in results] == [f"vi: line {i + 1}" for i in range(40)]
+    assert strategy.last_run_stats["mode"] == "sequential"
+    # Khối đầu cảnh thứ hai vẫn thấy bản dịch của cảnh trước
+    first_of_second = next(p for p in provider.prompts if p.endswith("\nline 11"))
+    assert "vi: line 10" in first_of_second
+
+
+def test_translation_service_builds_and_runs_the_context_aware_strategy():
+    provider = EchoProvider()
+    service = TranslationService(provider)
+
+    results = service.translate_subtitle_file(make_blocks(12), make_context(use_cache=False, enable_parallel=False))
+
+    assert [b.translated_text for b in results] == [f"vi: line {i + 1}" for i in range(12)]
+    strategy = service._get_strategy(TranslationMode.CONTEXT_AWARE)
+    assert strategy.provider_service is provider
+
+
+def test_context_index_renders_neighbours_once_and_history_is_bounded():
+    blocks = make_blocks(10)
+    index = ContextIndex(blocks, make_context(context_window_size=2))
+
+    assert index.neighbours(0) == [index.rendered[1], index.rendered[2]]
+    assert index.neighbours(5) == index.rendered[3:5] + index.rendered[6:8]
+
+    history = index.new_history(4)
+    assert history.recent() == index.rendered[2:4]
+    for block in blocks[4:9]:
+        history.append(block, "vi")
+    assert len(history) == 3
+    assert history.recent(2) == [f"[{b.start_time}] {b.text} -> vi" for b in blocks[7:9]]
+
+
+def test_translate_blocks_never_clones_the_context(monkeypatch):
+    provider = EchoProvider()
+    strategy = ContextAwareTranslationStrategy(provider, None)
+
+    def fail_clone(self, **overrides):
+        raise AssertionError("context cloned")
+
+    monkeypatch.setattr(TranslationContext, "clone", fail_clone)
+    results = strategy.translate_blocks(make_blocks(12), make_context(batch_size=1), provider)
+
+    assert all(block.translated_text for block in results)
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+    def generate_key(self, **kwargs):
+        return "|".join(f"{k}={kwargs[k]}" for k in sorted(kwargs))
+
+
+class NumberedProvider(EchoProvider):
+    """Trả bản dịch khác nhau ở mỗi lần chạy để mô phỏng bản dịch phía trước thay đổi"""
+
+    def __init__(self, run):
+        super().__init__()
+        self.run = run
+
+    def translate_text(self, text, target_lang, provider_name=None):
+        return super().translate_text(text, target_lang, provider_name).replace("vi:", f"vi{self.run}:")
+
+
+def test_rerun_hits_source_context_keys_even_when_previous_translations_change():
+    cache = DictCache()
+    blocks = make_blocks(20)
+    context = make_context(enable_parallel=False, batch_size=1)
+    strategy = ContextAwareTranslationStrategy(NumberedProvider(1), cache, strict_cache=True)
+    strategy.translate_blocks(blocks, context, NumberedProvider(1))
+    assert strategy.get_cache_report()["primary_hits"] == 0
+
+    # Bản dịch khối 1 thay đổi nên khóa strict của các khối ngay sau bị lệch, khóa theo nguồn vẫn trúng
+    cache.data = {k: v for k, v in cache.data.items() if not k.endswith("text=line 1")}
+    rerun = NumberedProvider(2)
+    results = strategy.translate_blocks(blocks, context, rerun)
+    report = strategy.last_run_stats["cache"]
+
+    assert report["lookups"] == 20
+    assert report["primary_hit_rate"] == 19 / 20
+    assert report["strict_hit_rate"] < report["primary_hit_rate"]
+    assert len(rerun.prompts) == 1
+    assert results[5].translated_text == "vi1: line 6"
+
+
+def test_changed_neighbour_source_misses_the_primary_key():
+    cache = DictCache()
+    context = make_context(enable_parallel=False, batch_size=1)
+    strategy = ContextAwareTranslationStrategy(EchoProvider(), cache)
+    strategy.translate_blocks(make_blocks(10), context, EchoProvider())
+
+    edited = make_blocks(10)
+    edited[4].text = "edited line"
+    strategy.translate_blocks(edited, context, EchoProvider())
+
+    report = strategy.get_cache_report()
+    # Khối 5 đổi nội dung, khối 2-4 và 6-8 đổi ngữ cảnh nguồn (cửa sổ 3)
+    assert report["primary_hits"] == 3
+    assert report["strict_hit_rate"] is None
@@ -0,0 +1,54 @@
+import json
+import wave
+from collections import Counter
+from pathlib import Path
+
+from tests.fake_data import generate_corpus
+
+
+def snapshot(root):
+    return {str(path.relative_to(root)): path.read_bytes() for path in sorted(Path(root).rglob("*")) if path.is_file()}
+
+
+def test_corpus_is_reproducible_and_nested_like_a_course(tmp_path):
+    first = generate_corpus.generate_corpus(str(tmp_path / "a"), courses=3, sections=3, lessons=4, blocks=30, seed=7)
+    second = generate_corpus.generate_corpus(str(tmp_path / "b"), courses=3, sections=3, lessons=4, blocks=30, seed=7)
+
+    assert first == second
+    assert snapshot(tmp_path / "a") == snapshot(tmp_path / "b")
+    files = sorted((tmp_path / "a").rglob("*.srt"))
+    assert len(files) == first["files"] > 0
+    # <khóa học>/<chương>/<bài>.srt
+    assert {len(path.relative_to(tmp_path / "a").parts) for path in files} == {3}
+    assert json.loads((tmp_path / "a" / "corpus.json").read_text(encoding="utf-8")) == first
+
+    # Thêm khóa học không làm đổi các file đã sinh
+    generate_corpus.generate_corpus(str(tmp_path / "c"), courses=4, sections=3, lessons=4, blocks=30, seed=7)
+    bigger = snapshot(tmp_path / "c")
+    assert all(bigger[name] == content for name, content in snapshot(tmp_path / "a").items() if name != "corpus.json")
+
+
+def test_blocks_repeat_and_files_duplicate_for_cache_and_dedupe(tmp_path):
+    manifest = generate_corpus.generate_corpus(str(tmp_path), courses=2, sections=4, lessons=8, blocks=40,
+                                               repeat_rate=0.3, duplicate_rate=0.1, translated_rate=0.5, seed=1)
+
+    contents = Counter(path.read_text(encoding="utf-8") for path in tmp_path.rglob("*.srt")
+                       if not path.stem.endswith("_vi"))
+    assert manifest["duplicate_files"] > 0
+    assert sum(count - 1 for count in contents.values()) >= manifest["duplicate_files"]
+    assert manifest["repeated_block_ratio"] > 0.25
+    assert manifest["translated_files"] == len(list(tmp_path.rglob("*_vi.srt"))) > 0
+    assert 3 <= manifest["words_per_block"]["p50"] <= manifest["words_per_block"]["p95"] <= 30
+
+    text = next(iter(contents))
+    assert text.startswith("1\n00:00:0")
+    assert all(len(line) <= 60 for line in text.splitlines())
+
+
+def test_media_is_generated_with_the_requested_duration(tmp_path):
+    manifest = generate_corpus.generate_corpus(str(tmp_path), courses=1, sections=1, lessons=2, blocks=5,
+                                               media="wav", media_files=1, media_duration=1.5, seed=2)
+
+    [media] = manifest["media"]
+    with wave.open(str(tmp_path / media), "rb") as f:
+        assert (f.getframerate(), f.getnframes()) == (16000, 24000)
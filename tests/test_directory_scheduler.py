@@ -0,0 +1,249 @@
+import threading
+import time
+import types
+
+import pytest
+
+from src.translator.subtitle import SubtitleTranslator
+from src.translator.subtitle_processor import SubtitleProcessor
+from src.utils.job_journal import JobJournal, source_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def journal_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOB_JOURNAL_DIR", str(tmp_path / "journals"))
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def generate_key(self, text, target_lang, service):
+        return f"{service}:{target_lang}:{text}"
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class SlowTranslator:
+    """Dịch bằng cách viết hoa, ghi nhận số request đồng thời lớn nhất"""
+
+    def __init__(self, fail_once=()):
+        self.skip_classifier = None
+        self.fail_once = set(fail_once)
+        self.services = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def translate_text(self, text, target_lang, service, deadline=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.services.append((text, service))
+            fail = text in self.fail_once
+            self.fail_once.discard(text)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return None if fail else text.upper()
+
+
+def make_translator(service):
+    handler = types.SimpleNamespace(provider_priority=["novita", "groq"], providers={"novita": 1, "groq": 1},
+                                    circuit_breaker=None)
+    return SubtitleTranslator(
+        api_handler=handler, cache_manager=DictCache(), translator_service=service,
+        subtitle_processor=SubtitleProcessor()
+    )
+
+
+def write_srt(path, lines):
+    blocks = [f"{i}\n00:00:0{i},000 --> 00:00:0{i},900\n{line}" for i, line in enumerate(lines, 1)]
+    path.write_text("\n\n".join(blocks) + "\n", encoding="utf-8")
+
+
+def read_texts(path):
+    return [block.split("\n", 2)[2] for block in path.read_text(encoding="utf-8").strip().split("\n\n")]
+
+
+def test_small_files_share_one_pool_and_keep_block_order(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    for n in range(6):
+        write_srt(source / f"ep{n}.srt", [f"file {n} line {i}" for i in range(2)])
+    service = SlowTranslator()
+
+    stats = make_translator(service).process_directory(str(source), str(output), max_workers=4)
+
+    assert stats == {"total_files": 6, "successful": 6, "failed": 0, "skipped": 0}
+    # File chỉ có 2 block, nhưng pool vẫn chạy đủ 4 luồng nhờ lấy block của file kế tiếp
+    assert service.peak == 4
+    for n in range(6):
+        assert read_texts(output / f"ep{n}.srt") == [f"FILE {n} LINE {i}" for i in range(2)]
+
+
+def test_deferred_blocks_are_retried_with_another_provider(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    write_srt(source / "a.srt", ["one", "two", "three"])
+    service = SlowTranslator(fail_once={"two"})
+
+    stats = make_translator(service).process_directory(str(source), str(output), max_workers=2)
+
+    assert stats["successful"] == 1
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE"]
+    assert ("two", "groq") in service.services
+
+
+def test_deferred_pass_waits_for_the_file_and_never_retries_in_place(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    write_srt(source / "a.srt", ["one", "two", "three", "four"])
+
+    class FailsTwice(SlowTranslator):
+        def __init__(self):
+            super().__init__(fail_once={"two"})
+            self.failures = {"two": 2}
+            self.deferring = []
+
+        def translate_text(self, text, target_lang, service, deadline=None):
+            self.deferring.append(deadline.defer_retries)
+            if self.failures.get(text):
+                self.failures[text] -= 1
+                self.fail_once.add(text)
+            return super().translate_text(text, target_lang, service, deadline)
+
+    service = FailsTwice()
+    stats = make_translator(service).process_directory(str(source), str(output), max_workers=1)
+
+    assert stats["successful"] == 1
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE", "FOUR"]
+    # Lượt dịch lại bắt đầu sau mọi lần dịch đầu của file; lỗi lần nữa thì quay lại hàng đợi
+    assert [text for text, _ in service.services] == ["one", "two", "three", "four", "two", "two"]
+    assert service.services[-1] == ("two", "groq")
+    assert all(service.deferring)
+
+
+def test_existing_outputs_are_skipped(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    output.mkdir()
+    write_srt(source / "done.srt", ["old"])
+    write_srt(source / "new.srt", ["new"])
+    (output / "done.srt").write_text("kept", encoding="utf-8")
+    service = SlowTranslator()
+
+    stats = make_translator(service).process_directory(str(source), str(output))
+
+    assert stats == {"total_files": 2, "successful": 1, "failed": 0, "skipped": 1}
+    assert (output / "done.srt").read_text(encoding="utf-8") == "kept"
+    assert [text for text, _ in service.services] == ["new"]
+
+
+def test_partial_output_is_resumed_from_the_part_file(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    output.mkdir()
+    write_srt(source / "a.srt", ["one", "two", "three"])
+    # File .part chỉ chứa các block đã ghi trọn vẹn (mỗi block kết thúc bằng một dòng trống)
+    write_srt(output / "a.srt.part", ["ONE", "TWO"])
+    with open(output / "a.srt.part", "a", encoding="utf-8") as f:
+        f.write("\n")
+    service = SlowTranslator()
+
+    stats = make_translator(service).process_directory(str(source), str(output))
+
+    assert stats["successful"] == 1
+    assert [text for text, _ in service.services] == ["three"]
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE"]
+    assert not (output / "a.srt.part").exists()
+
+
+def test_journal_skips_blocks_translated_before_a_crash(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    write_srt(source / "a.srt", ["one", "two", "three", "four"])
+    journal = JobJournal(str(tmp_path / "job.jsonl"))
+    fingerprint = source_fingerprint((source / "a.srt").read_text(encoding="utf-8"))
+    journal.begin_file(str(output / "a.srt"), fingerprint)
+    # Block 2 và 4 đã xong nhưng chưa kịp ghi ra file .part (còn trong bộ đệm sắp xếp lại)
+    journal.record_block(str(output / "a.srt"), 1, "2\n00:00:02,000 --> 00:00:02,900\nTWO")
+    journal.record_block(str(output / "a.srt"), 3, "4\n00:00:04,000 --> 00:00:04,900\nFOUR")
+    service = SlowTranslator()
+
+    stats = make_translator(service).process_directory(str(source), str(output), journal=journal)
+
+    assert stats["successful"] == 1
+    assert sorted(text for text, _ in service.services) == ["one", "three"]
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE", "FOUR"]
+    assert journal.is_complete(str(output / "a.srt"))
+
+    (output / "a.srt").unlink()
+    make_translator(service).process_subtitle_file(str(source / "a.srt"), str(output / "a.srt"), journal=journal)
+    # File gốc không đổi nhưng file đích đã mất: dịch lại thay vì bỏ qua
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE", "FOUR"]
+
+
+def test_all_files_of_a_run_share_one_retry_budget(tmp_path):
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    for n in range(3):
+        write_srt(source / f"ep{n}.srt", [f"file {n} line {i}" for i in range(2)])
+    translator = make_translator(SlowTranslator())
+    budgets = []
+    translate_block = translator._translate_block
+
+    def spy(*args):
+        budgets.append(args[-1])
+        return translate_block(*args)
+
+    translator._translate_block = spy
+    translator.process_directory(str(source), str(output), max_workers=2)
+
+    assert len(budgets) == 6
+    assert len({id(budget) for budget in budgets}) == 1
+    assert budgets[0].get_stats()["requests"] == 6
+
+
+def test_full_reorder_window_lets_the_next_file_use_the_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("WRITER_REORDER_LIMIT", "2")
+    # Thứ tự mặc định giữ nguyên thứ tự file (a.srt trước dù b.srt ngắn hơn)
+    monkeypatch.delenv("FILE_ORDER", raising=False)
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    write_srt(source / "a.srt", ["slow", "a2", "a3", "a4"])
+    write_srt(source / "b.srt", ["b1", "b2"])
+
+    class StuckFirstBlock(SlowTranslator):
+        def translate_text(self, text, target_lang, service, deadline=None):
+            if text == "slow":
+                time.sleep(0.5)
+            return super().translate_text(text, target_lang, service, deadline)
+
+    service = StuckFirstBlock()
+    stats = make_translator(service).process_directory(str(source), str(output), max_workers=2)
+
+    assert stats["successful"] == 2
+    # Bộ đệm của a.srt đầy ("slow" chưa xong) nên b.srt được dịch trước các block còn lại của a.srt
+    started = [text for text, _ in service.services]
+    assert started.index("b2") < started.index("a3")
+    assert read_texts(output / "a.srt") == ["SLOW", "A2", "A3", "A4"]
+
+
+def test_deferred_head_block_is_retried_when_the_reorder_window_is_full(tmp_path, monkeypatch):
+    monkeypatch.setenv("WRITER_REORDER_LIMIT", "2")
+    source, output = tmp_path / "in", tmp_path / "out"
+    source.mkdir()
+    write_srt(source / "a.srt", ["one", "two", "three", "four", "five"])
+    service = SlowTranslator(fail_once={"one"})
+
+    stats = make_translator(service).process_directory(str(source), str(output), max_workers=1)
+
+    assert stats["successful"] == 1
+    assert read_texts(output / "a.srt") == ["ONE", "TWO", "THREE", "FOUR", "FIVE"]
+    # "one" giữ bộ đệm nên được dịch lại ngay khi file không gửi thêm được block nào
+    assert [text for text, _ in service.services][:3] == ["one", "two", "one"]
@@ -0,0 +1,79 @@
+import types
+from pathlib import Path
+
+from src.translator import file_ordering
+from src.translator.file_ordering import FileCost
+from src.translator.subtitle_processor import SubtitleProcessor
+
+
+class DictCache:
+    def __init__(self, data):
+        self.data = data
+        self.bulk_lookups = 0
+
+    def generate_key(self, text, target_lang, service):
+        return text
+
+    def get(self, key):
+        raise AssertionError("ước lượng chi phí không được đọc từng mục cache")
+
+    def contains_many(self, keys):
+        self.bulk_lookups += 1
+        return {key for key in keys if key in self.data}
+
+
+def test_priority_ranges_numbers_and_globs():
+    priorities = file_ordering.parse_priorities("1-5, 9 ,intro*")
+
+    assert priorities == ["1-5", "9", "intro*"]
+    assert file_ordering.priority_rank("course/Lecture 03 - Basics.srt", priorities) == 0
+    assert file_ordering.priority_rank("Lecture 9.srt", priorities) == 1
+    assert file_ordering.priority_rank("intro.srt", priorities) == 2
+    assert file_ordering.priority_rank("Lecture 12.srt", priorities) == 3
+
+
+def test_sjf_and_lpt_order_within_priority_groups():
+    costs = [
+        FileCost("Lecture 7.srt", "", 0, blocks=10, uncached=10, chars=4000),
+        FileCost("Lecture 8.srt", "", 1, blocks=10, uncached=2, chars=400),
+        FileCost("Lecture 2.srt", "", 2, blocks=90, uncached=90, chars=40000),
+        FileCost("Lecture 9.srt", "", 3, blocks=50, uncached=50, chars=20000),
+    ]
+
+    def names(ordered):
+        return [Path(cost.input_file).stem for cost in ordered]
+
+    assert names(file_ordering.order_files(costs, "sjf")) == ["Lecture 8", "Lecture 7", "Lecture 9", "Lecture 2"]
+    assert names(file_ordering.order_files(costs, "lpt")) == ["Lecture 2", "Lecture 9", "Lecture 7", "Lecture 8"]
+    assert names(file_ordering.order_files(costs, "fifo", ["7-8"])) == ["Lecture 7", "Lecture 8", "Lecture 2", "Lecture 9"]
+    assert names(file_ordering.order_files(costs, "sjf", ["1-5"]))[0] == "Lecture 2"
+    assert names(file_ordering.order_files(costs)) == ["Lecture 7", "Lecture 8", "Lecture 2", "Lecture 9"]
+
+
+def write_srt(path, texts):
+    path.write_text("\n\n".join(
+        f"{i}\n00:00:0{i},000 --> 00:00:0{i},900\n{text}" for i, text in enumerate(texts, 1)
+    ), encoding="utf-8")
+
+
+def test_cost_counts_only_blocks_that_need_the_provider(tmp_path):
+    write_srt(tmp_path / "a.srt", ["Hello there", "Cached line", "[Music]", "How are you?"])
+    write_srt(tmp_path / "b.srt", ["Cached line"])
+    skip_classifier = types.SimpleNamespace(check=lambda text, lang: ("sound", text) if text == "[Music]" else None)
+    cache = DictCache({"Cached line": "Dòng đã dịch"})
+    translator = types.SimpleNamespace(
+        subtitle_processor=SubtitleProcessor(),
+        cache_manager=cache,
+        translator_service=types.SimpleNamespace(skip_classifier=skip_classifier),
+    )
+    files = [(str(tmp_path / "a.srt"), "a_out.srt"), (str(tmp_path / "b.srt"), "b_out.srt"),
+             (str(tmp_path / "missing.srt"), "c_out.srt")]
+
+    a, b, missing = file_ordering.estimate_file_costs(translator, files, "vi", "novita")
+
+    assert (a.blocks, a.uncached, a.chars) == (4, 2, len("Hello there") + len("How are you?"))
+    assert a.tokens == 6
+    assert (b.blocks, b.uncached, b.position) == (1, 0, 1)
+    assert (missing.blocks, missing.uncached, missing.output_file) == (0, 0, "c_out.srt")
+    # Một lần kiểm tra cache hàng loạt cho mọi file
+    assert cache.bulk_lookups == 1
@@ -0,0 +1,60 @@
+import json
+
+from src.utils.job_journal import JobJournal
+
+
+def test_blocks_and_completion_survive_a_restart(tmp_path):
+    path = str(tmp_path / "job.jsonl")
+    journal = JobJournal(path)
+    assert journal.begin_file("a_vi.srt", "src-a") == 0
+    journal.record_block("a_vi.srt", 2, "3\n00:00:03,000 --> 00:00:04,000\nba")
+    journal.record_block("a_vi.srt", 0, "1\n00:00:01,000 --> 00:00:02,000\nmột")
+    journal.begin_file("b_vi.srt", "src-b")
+    journal.record_block("b_vi.srt", 0, "x")
+    journal.mark_complete("b_vi.srt")
+    journal.close()
+
+    resumed = JobJournal(path)
+    assert resumed.begin_file("a_vi.srt", "src-a") == 2
+    assert resumed.get_block("a_vi.srt", 2).endswith("ba")
+    assert resumed.get_block("a_vi.srt", 1) is None
+    assert resumed.is_complete("b_vi.srt")
+    assert resumed.get_block("b_vi.srt", 0) is None
+
+
+def test_changed_source_discards_previous_blocks(tmp_path):
+    path = str(tmp_path / "job.jsonl")
+    journal = JobJournal(path)
+    journal.begin_file("a_vi.srt", "old")
+    journal.record_block("a_vi.srt", 0, "cũ")
+    journal.mark_complete("a_vi.srt")
+    journal.close()
+
+    resumed = JobJournal(path)
+    assert resumed.begin_file("a_vi.srt", "new") == 0
+    assert not resumed.is_complete("a_vi.srt")
+    assert resumed.get_block("a_vi.srt", 0) is None
+
+
+def test_torn_last_line_is_ignored_and_compacted(tmp_path):
+    path = tmp_path / "job.jsonl"
+    journal = JobJournal(str(path))
+    journal.begin_file("a_vi.srt", "src")
+    journal.record_block("a_vi.srt", 0, "một")
+    journal.begin_file("done_vi.srt", "src")
+    journal.record_block("done_vi.srt", 0, "xong")
+    journal.mark_complete("done_vi.srt")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"f": "a_vi.srt", "b": 1, "t": "h')
+
+    resumed = JobJournal(str(path))
+    assert resumed.begin_file("a_vi.srt", "src") == 1
+    resumed.record_block("a_vi.srt", 1, "hai")
+    resumed.close()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert {"f": "a_vi.srt", "b": 1, "t": "hai"} in records
+    # Block của file đã xong không còn được giữ lại sau khi nén nhật ký
+    assert not any(r.get("f") == "done_vi.srt" and "b" in r for r in records)
+    assert JobJournal(str(path)).get_block("a_vi.srt", 0) == "một"
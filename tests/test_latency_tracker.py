@@ -0,0 +1,53 @@
+import pytest
+
+from src.api.latency_tracker import LatencyTracker
+
+
+class FakeDeadline:
+    def __init__(self, remaining):
+        self._remaining = remaining
+
+    def remaining(self):
+        return self._remaining
+
+
+def make_tracker():
+    return LatencyTracker(connect_timeout=4, default_read_timeout=30, multiplier=3,
+                          per_1k_chars=2, min_read_timeout=1, max_read_timeout=120, min_samples=10)
+
+
+def test_defaults_until_enough_samples():
+    tracker = make_tracker()
+    for _ in range(9):
+        tracker.record("groq", "fast", 0.8)
+    assert tracker.get_timeouts("groq", "fast") == (4, 30)
+
+
+def test_fast_model_gets_tight_read_timeout_and_size_term():
+    tracker = make_tracker()
+    for i in range(100):
+        tracker.record("groq", "fast", 0.5 + i * 0.003, chars=0)
+
+    connect, read = tracker.get_timeouts("groq", "fast")
+    assert connect == 4
+    assert read == pytest.approx(0.797 * 3)
+
+    # Batch 10 000 ký tự được cộng thêm 20 giây thay vì bị cắt ở timeout của block ngắn
+    _, long_read = tracker.get_timeouts("groq", "fast", chars=10000)
+    assert long_read == pytest.approx(read + 20)
+
+
+def test_latency_is_normalized_by_size_and_pooled_per_provider():
+    tracker = make_tracker()
+    for _ in range(20):
+        tracker.record("novita", "model-a", 1.0 + 2 * 5, chars=5000)
+
+    assert tracker.percentile("novita", "model-a") == pytest.approx(1.0)
+    # Model mới của cùng provider dùng số liệu gộp
+    assert tracker.get_timeouts("novita", "model-b")[1] == pytest.approx(3.0)
+
+
+def test_timeouts_are_capped_by_deadline():
+    tracker = make_tracker()
+    assert tracker.get_timeouts("google", "m", deadline=FakeDeadline(2.5)) == (2.5, 2.5)
+    assert tracker.get_timeouts("google", "m", deadline=FakeDeadline(0)) == (1.0, 1.0)
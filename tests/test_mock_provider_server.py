@@ -0,0 +1,83 @@
+import http.client
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tests.mock_provider_server import MockConfig, MockProviderServer
+
+
+def chat(base_url, text, model="mock-model", target_lang="vi"):
+    request = urllib.request.Request(
+        f"{base_url}/chat/completions",
+        data=json.dumps({"model": model, "messages": [
+            {"role": "system", "content": f"Translate the following text to {target_lang}. Only return the text"},
+            {"role": "user", "content": text},
+        ]}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_pseudo_translation_is_deterministic_and_keeps_numbers_and_tags():
+    with MockProviderServer() as server:
+        first = chat(server.base_url, "Open <i>port 8080</i> and add 2 users")
+        second = chat(server.base_url, "Open <i>port 8080</i> and add 2 users")
+
+    content = first["choices"][0]["message"]["content"]
+    assert content == second["choices"][0]["message"]["content"]
+    assert content == "Ôpên <i>pôrt 8080</i> ănđ ăđđ 2 ưsêrs"
+    assert first["usage"]["total_tokens"] > 0
+    assert server.stats["requests"] == 2
+
+
+def test_rate_limit_truncation_and_unknown_models_are_injected():
+    with MockProviderServer(MockConfig(rate_limit_rate=1.0, retry_after=7)) as server:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            chat(server.base_url, "Hello")
+    assert error.value.code == 429
+    assert error.value.headers["Retry-After"] == "7"
+
+    with MockProviderServer(MockConfig(truncate_rate=1.0)) as server:
+        with pytest.raises((http.client.IncompleteRead, ValueError)):
+            chat(server.base_url, "Hello")
+
+    with MockProviderServer(MockConfig(unknown_models={"gone-model"})) as server:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            chat(server.base_url, "Hello", model="gone-model")
+    assert error.value.code == 404
+
+
+def test_fault_sequence_is_reproducible_with_the_same_seed():
+    def outcomes(seed):
+        server = MockProviderServer(MockConfig(rate_limit_rate=0.3, error_rate=0.2, seed=seed))
+        try:
+            return [server._draw()["outcome"] for _ in range(50)]
+        finally:
+            server.stop()
+
+    assert outcomes(3) == outcomes(3)
+    assert {"ok", "rate_limit", "error"} == set(outcomes(3))
+
+
+def test_providers_fail_over_between_mock_servers(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    from src.api import provider_errors
+    from src.api.providers import groq
+
+    with MockProviderServer(MockConfig(rate_limit_rate=1.0, retry_after=30)) as limited, \
+            MockProviderServer(MockConfig(latency=0.01)) as healthy:
+        monkeypatch.setenv("MODEL_RANKING_FILE", str(tmp_path / "rankings.json"))
+        monkeypatch.setenv("GROQ_BASE_URL", limited.base_url)
+        provider = groq.GroqProvider("mock")
+        provider.models = ["mock-model"]
+        with pytest.raises(provider_errors.ProviderError):
+            provider.translate("Hello there", "vi")
+        assert limited.stats["rate_limit"] == 1
+
+        monkeypatch.setenv("GROQ_BASE_URL", healthy.base_url)
+        provider = groq.GroqProvider("mock")
+        provider.models = ["other-model"]
+        assert provider.translate("Hello there", "vi") == "Hêllô thêrê"
@@ -0,0 +1,60 @@
+import time
+
+from src.api.model_ranker import ModelRanker
+from src.utils.cache_manager import TranslationCacheManager
+
+MODELS = ["model-a", "model-b", "model-c"]
+
+
+def test_last_successful_model_is_tried_first(tmp_path):
+    ranker = ModelRanker(storage_path=str(tmp_path / "rankings.json"))
+    assert ranker.rank("novita", MODELS) == MODELS
+
+    ranker.record_failure("novita", "model-a")
+    ranker.record_failure("novita", "model-b")
+    ranker.record_success("novita", "model-c", latency=1.0)
+    assert ranker.rank("novita", MODELS)[0] == "model-c"
+
+    # Model "dính" lỗi thì mất ưu tiên, model chưa thử được đưa lên trước model đã lỗi
+    ranker.record_failure("novita", "model-c")
+    ranker.record_failure("novita", "model-c")
+    assert ranker.rank("novita", ["model-d"] + MODELS)[0] == "model-d"
+
+
+def test_scores_decay_back_to_configured_order(tmp_path):
+    ranker = ModelRanker(storage_path=str(tmp_path / "rankings.json"), half_life=0.01)
+    ranker.record_failure("groq", "model-a")
+    ranker.record_success("groq", "model-b", latency=0.5)
+    assert ranker.rank("groq", MODELS)[0] == "model-b"
+
+    time.sleep(0.3)
+    # Điểm cộng dính và điểm lỗi đã phân rã về mức trung tính
+    assert ranker.rank("groq", MODELS)[0] != "model-b"
+    assert abs(ranker.get_rankings("groq")["model-a"]["score"] - 0.5) < 1e-3
+
+
+def test_rankings_persist_across_instances(tmp_path):
+    path = str(tmp_path / "rankings.json")
+    ranker = ModelRanker(storage_path=path)
+    ranker.record_success("google", "model-b", latency=2.0)
+    ranker.flush()
+
+    reloaded = ModelRanker(storage_path=path)
+    assert reloaded.rank("google", MODELS)[0] == "model-b"
+    assert reloaded.get_rankings("google")["model-b"]["latency"] == 2.0
+
+
+def test_clearing_the_translation_cache_keeps_rankings(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("MODEL_RANKING_FILE", raising=False)
+    monkeypatch.delenv("SUBTITLE_TRANSLATOR_STATE_DIR", raising=False)
+    ranker = ModelRanker()
+    ranker.record_success("groq", "model-c", latency=1.0)
+    ranker.flush()
+
+    cache = TranslationCacheManager()
+    assert not ranker.storage_path.startswith(cache.cache_dir)
+    cache.clear_expired()
+    cache.clear()
+
+    assert ModelRanker().rank("groq", MODELS)[0] == "model-c"
@@ -0,0 +1,84 @@
+import pytest
+
+from src.api import model_registry, translation_service
+from src.api.circuit_breaker import CircuitBreaker
+from src.api.model_ranker import ModelRanker
+from src.api.provider_errors import ContextTooLongError
+from src.api.providers import base
+from src.api.quota_ledger import QuotaLedger
+
+
+class FakeProvider(base.BaseProvider):
+    def __init__(self, name, models, registry, tmp_path):
+        self.name = name
+        self.display_name = name
+        super().__init__(
+            "key", circuit_breaker=CircuitBreaker(),
+            model_ranker=ModelRanker(storage_path=str(tmp_path / f"{name}_rank.json")),
+            quota_ledger=QuotaLedger(storage_path=str(tmp_path / f"{name}_quota.json")),
+            model_registry=registry,
+        )
+        self.models = models
+        self.calls = []
+
+    def _try_translate_with_model(self, text, target_lang, model, timeout):
+        self.calls.append(model)
+        return f"{model}: {len(text)}"
+
+
+class AllowAll:
+    def check_rate_limit(self, provider):
+        return True
+
+    def handle_error(self, error, provider):
+        return False
+
+
+@pytest.fixture
+def registry():
+    registry = model_registry.ModelRegistry(storage_path="", output_ratio=1.5)
+    registry.register("small", "tiny-4k", context_window=4096, max_output=2048)
+    registry.register("big", "huge-128k", context_window=131072, max_output=8192)
+    return registry
+
+
+def test_capabilities_come_from_defaults_and_overrides(registry):
+    info = registry.get("groq", "llama-3-8b-8192")
+    assert (info.context_window, info.max_output) == (8192, 4096)
+    assert registry.get("openrouter", "qwen/qwen3-32b:free").cost(1000, 1000) == 0.0
+    assert registry.get("mystery", "unknown-model").context_window is None
+    assert registry.get("small", "tiny-4k").context_window == 4096
+
+    # 8000 ký tự ~ 2000 token vào + 3000 token ra: vượt giới hạn đầu ra 2048 của model nhỏ
+    assert registry.fits("small", "tiny-4k", 4000)
+    assert not registry.fits("small", "tiny-4k", 8000)
+    assert registry.fits("mystery", "unknown-model", 10 ** 6)
+
+
+def test_provider_skips_models_that_cannot_fit_without_a_request(registry, tmp_path):
+    provider = FakeProvider("small", ["tiny-4k", "unknown-model"], registry, tmp_path)
+    assert provider.translate("x" * 8000, "vi") == "unknown-model: 8000"
+    assert provider.calls == ["unknown-model"]
+
+    provider.models = ["tiny-4k"]
+    with pytest.raises(ContextTooLongError):
+        provider.translate("x" * 8000, "vi")
+    assert provider.calls == ["unknown-model"]
+
+
+def test_long_text_is_routed_to_a_provider_that_fits(registry, tmp_path):
+    small = FakeProvider("small", ["tiny-4k"], registry, tmp_path)
+    big = FakeProvider("big", ["huge-128k"], registry, tmp_path)
+    service = translation_service.TranslationService(
+        {"small": small, "big": big}, AllowAll(), ["small", "big"], circuit_breaker=CircuitBreaker()
+    )
+    service.translation_chunk_size = 100000
+    service.get_rate_limit = lambda provider, paid=False: 0
+
+    assert service.translate("short text", "vi", "small") == "tiny-4k: 10"
+    assert service.translate("x" * 8000, "vi", "small") == "huge-128k: 8000"
+    assert small.calls == ["tiny-4k"]
+
+    with pytest.raises(ContextTooLongError):
+        service.translate("x" * 400000, "vi", "small")
+    assert big.calls == ["huge-128k"]
@@ -0,0 +1,69 @@
+import json
+import os
+import types
+
+from src.api.circuit_breaker import CircuitBreaker
+from src.api.translation_service import TranslationService
+from src.translator import multi_target
+from src.translator.translator_service import APITranslatorService
+
+
+def test_prompt_lists_every_language_and_numbers_every_text():
+    prompt = multi_target.build_multi_target_prompt(["Hello", "Line one\nline two"], ["vi", "en", "ja"])
+
+    assert "vi, en, ja" in prompt
+    source = json.loads(prompt[prompt.index("\n\n{") + 2:])
+    assert source == {"1": "Hello", "2": "Line one\nline two"}
+
+
+def test_response_is_parsed_per_position_and_language():
+    response = "```json\n" + json.dumps({
+        "1": {"vi": "Xin chào", "en": "Hello"},
+        "2": {"vi": "Dòng một\ndòng hai", "en": ""},
+        "7": {"vi": "ngoài batch"},
+        "x": {"vi": "sai ID"},
+    }, ensure_ascii=False) + "\n```"
+
+    results = multi_target.parse_multi_target_response(response, 3, ["vi", "en"])
+
+    assert results == [{"vi": "Xin chào", "en": "Hello"}, {"vi": "Dòng một\ndòng hai"}, {}]
+
+
+def test_malformed_response_yields_empty_results():
+    assert multi_target.parse_multi_target_response("Sorry, I can't", 2, ["vi"]) == [{}, {}]
+    assert multi_target.parse_multi_target_response('{"1": {"vi": "x"', 1, ["vi"]) == [{}]
+
+
+def test_each_language_gets_its_own_file(tmp_path):
+    source = str(tmp_path / "lesson 1.srt")
+
+    assert multi_target.language_output_path(source, "vi") == str(tmp_path / "lesson 1_vi.srt")
+    assert multi_target.language_output_path(source, "en", "out") == os.path.join("out", "lesson 1_en.srt")
+
+
+class JsonEchoProvider:
+    """Trả lời prompt JSON bằng JSON, lỗi nếu prompt bị cắt"""
+
+    def __init__(self):
+        self.requests = []
+
+    def translate(self, text, target_lang, deadline=None, model=None):
+        self.requests.append(text)
+        source = json.loads(text[text.index("\n\n{") + 2:])
+        langs = target_lang.split(", ")
+        return json.dumps({key: {lang: f"{lang}: {value}" for lang in langs} for key, value in source.items()})
+
+
+def test_batch_longer_than_a_chunk_is_sent_in_one_request():
+    provider = JsonEchoProvider()
+    service = TranslationService({"novita": provider}, types.SimpleNamespace(check_rate_limit=lambda name: True),
+                                 ["novita"], circuit_breaker=CircuitBreaker())
+    translator = APITranslatorService(api_handler=types.SimpleNamespace(translate=service.translate),
+                                      cache_manager=object())
+    texts = [f"Subtitle line number {i} that is long enough to fill the batch quickly" for i in range(30)]
+
+    results = translator.translate_multi(texts, ["vi", "ja"], "novita")
+
+    assert len(provider.requests) == 1
+    assert len(provider.requests[0]) > service.translation_chunk_size
+    assert results == [{"vi": f"vi: {text}", "ja": f"ja: {text}"} for text in texts]
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from src.translator import ordered_writer
+from src.translator.subtitle_processor import SubtitleProcessor
+
+processor = SubtitleProcessor()
+
+
+def source_blocks(count):
+    return [f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\nline {i}" for i in range(1, count + 1)]
+
+
+def translated(blocks, index, prefix="dịch"):
+    return blocks[index].replace("line", prefix)
+
+
+def test_out_of_order_blocks_are_written_as_a_prefix(tmp_path):
+    output = tmp_path / "out.srt"
+    blocks = source_blocks(4)
+    writer = ordered_writer.OrderedSubtitleWriter(str(output), processor, reorder_limit=2)
+    assert writer.open(blocks) == 0
+    assert writer.window_end() == 2
+
+    writer.add(1, translated(blocks, 1))
+    assert writer.next_index == 0
+    assert Path(writer.part_file).read_text(encoding="utf-8") == ""
+
+    writer.add(0, translated(blocks, 0))
+    assert writer.next_index == 2
+    assert writer.window_end() == 4
+    assert Path(writer.part_file).read_text(encoding="utf-8").count("dịch") == 2
+
+    writer.add(3, translated(blocks, 3))
+    writer.add(2, translated(blocks, 2))
+    assert writer.done() and writer.close()
+
+    assert not Path(writer.part_file).exists()
+    assert output.read_text(encoding="utf-8") == "\n\n".join(translated(blocks, i) for i in range(4)) + "\n"
+
+
+def test_partial_file_resumes_after_last_complete_block(tmp_path):
+    output = tmp_path / "out.srt"
+    blocks = source_blocks(5)
+    writer = ordered_writer.OrderedSubtitleWriter(str(output), processor)
+    writer.open(blocks)
+    for i in range(3):
+        writer.add(i, translated(blocks, i))
+    writer.abort()
+    # Mô phỏng tiến trình chết khi đang ghi block thứ 4
+    with open(writer.part_file, "a", encoding="utf-8") as f:
+        f.write("4\n00:00:04,000 --> 00:00")
+
+    resumed = ordered_writer.OrderedSubtitleWriter(str(output), processor)
+    assert resumed.open(blocks) == 3
+    for i in range(3, 5):
+        resumed.add(i, translated(blocks, i))
+    assert resumed.close()
+
+    assert processor.split_into_blocks(output.read_text(encoding="utf-8")) == [
+        translated(blocks, i) for i in range(5)
+    ]
+
+
+def test_failed_or_mismatched_blocks_are_not_resumed(tmp_path):
+    output = tmp_path / "out.srt"
+    blocks = source_blocks(3)
+    writer = ordered_writer.OrderedSubtitleWriter(str(output), processor)
+    writer.open(blocks)
+    writer.add(0, translated(blocks, 0))
+    writer.add(1, blocks[1].replace("line", ordered_writer.ERROR_MARKER_PREFIX + " 2]\nline"))
+    writer.abort()
+
+    assert ordered_writer.OrderedSubtitleWriter(str(output), processor).open(blocks) == 1
+    assert ordered_writer.OrderedSubtitleWriter(str(output), processor).open(source_blocks(3)[1:]) == 0
@@ -1,178 +1,332 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+Benchmark tạo phụ đề trên CPU cho các engine của TranscriptionProcessorFactory.
+
+Chạy ma trận engine × model × compute_type × beam_size × word_timestamps trên các clip trong
+tests/fake_data (tạo bằng generate_fake_data.py) hoặc trên audio giả giọng nói sinh theo seed.
+Mỗi ô của ma trận chạy trong một tiến trình riêng, cố định số luồng CPU, nên peak RSS và thời gian
+load model không bị ảnh hưởng bởi các ô trước. Kết quả gồm real-time factor (thời gian xử lý / độ dài
+audio), peak RSS, thời gian load model và thời gian tới segment đầu tiên, in ra dưới dạng JSON và so
+với baseline đã lưu (thoát với mã 1 nếu tệ hơn quá ngưỡng):
+
+    python -m tests.test_performance --engines faster_whisper --models tiny --save-baseline
+    python -m tests.test_performance --engines faster_whisper --models tiny
+
+Chạy bằng pytest chỉ kiểm tra phần sinh audio và so sánh; phép đo thật cần RUN_TRANSCRIPTION_BENCHMARK=1
+(tải model Whisper).
+"""
 
 import os
+import sys
+import json
 import time
-import subprocess
+import wave
+import hashlib
 import argparse
-import psutil
-import torch
-import gc
-import traceback
-from generate_subtitles import generate_subtitles, get_gpu_info, clear_gpu_memory
-import logging
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-# Enable PyTorch CUDA logging with smaller memory block size
-os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "max_split_size_mb:24"
-
-def get_process_memory():
-    """Get current process memory usage in MB."""
-    process = psutil.Process(os.getpid())
-    return process.memory_info().rss / 1024 / 1024  # Convert to MB
-
-def benchmark_model(audio_path, model_size, language="en", iterations=1):
-    """Benchmark a specific model size."""
-    total_time = 0
-    max_gpu_memory = 0
-    max_cpu_memory = 0
-    successful_runs = 0
-    
-    logger.info(f"===== Benchmarking {model_size} model with language={language} =====")
-    logger.info(f"Initial CPU memory: {get_process_memory():.2f} MB")
-    logger.info(f"Initial GPU status: {get_gpu_info()}")
-    
-    for i in range(iterations):
-        logger.info(f"Iteration {i+1}/{iterations}")
-        
-        # Force garbage collection and clear GPU memory before test
-        clear_gpu_memory()
-        gc.collect()
-        time.sleep(1)  # Give system a moment to release resources
-        
-        # Measure CPU memory before
-        start_cpu_mem = get_process_memory()
-        
-        # Measure time
-        start_time = time.time()
-        
-        # Generate subtitles
-        output_path = f"test_output_{model_size}_{i+1}.srt"
-        
-        try:
-            success = generate_subtitles(audio_path, output_path, model_size, language)
-            if success:
-                successful_runs += 1
-                
-            # Calculate time
-            elapsed = time.time() - start_time
-            total_time += elapsed
-            
-            # Measure GPU memory
-            if torch.cuda.is_available():
-                curr_gpu_allocated = torch.cuda.memory_allocated() / 1024 / 1024  # MB
-                max_gpu_memory = max(max_gpu_memory, curr_gpu_allocated)
-            
-            # Measure CPU memory
-            curr_cpu_mem = get_process_memory()
-            max_cpu_memory = max(max_cpu_memory, curr_cpu_mem - start_cpu_mem)
-            
-            logger.info(f"Iteration {i+1} completed in {elapsed:.2f} seconds (Success: {success})")
-            
-        except Exception as e:
-            logger.error(f"Error during benchmark iteration {i+1}: {str(e)}")
-            logger.error(traceback.format_exc())
-            
-        logger.info(f"Current GPU status: {get_gpu_info()}")
-        
-        # Clean up output file
-        if os.path.exists(output_path):
-            os.remove(output_path)
-            
-        # Extra cleanup between iterations
-        clear_gpu_memory()
-        gc.collect()
-        time.sleep(2)  # Give system time to release resources
-    
-    # Calculate average time only for successful runs
-    avg_time = total_time / max(successful_runs, 1) if successful_runs > 0 else float('inf')
-    
-    logger.info(f"\n===== Results for {model_size} model =====")
-    logger.info(f"Successful runs: {successful_runs}/{iterations}")
-    logger.info(f"Average time (successful runs): {avg_time:.2f} seconds")
-    logger.info(f"Max GPU memory used: {max_gpu_memory:.2f} MB")
-    logger.info(f"Max additional CPU memory used: {max_cpu_memory:.2f} MB")
-    
+import platform
+import statistics
+import subprocess
+import tempfile
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from tests.fake_data.speech import synthesize_speech
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+FAKE_DATA_DIR = ROOT_DIR / "tests" / "fake_data"
+DEFAULT_BASELINE = ROOT_DIR / "tests" / "benchmark_transcription_baseline.json"
+
+ENGINES = ('faster_whisper', 'openai_whisper')
+MODELS = ('tiny', 'base')
+COMPUTE_TYPES = ('int8', 'float32')
+BEAM_SIZES = (1, 5)
+WORD_TIMESTAMPS = (False, True)
+# Chỉ số so với baseline (càng thấp càng tốt)
+METRICS = ('rtf', 'load_s', 'first_segment_s', 'peak_rss_mb')
+
+def audio_duration(path: str) -> float:
+    """Độ dài audio (giây): đọc header với WAV thật, dùng ffprobe với định dạng khác"""
+    try:
+        with wave.open(path, 'rb') as f:
+            return f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError):
+        # generate_fake_data.py lưu MP3 của gTTS với đuôi .wav
+        output = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        return float(output.strip())
+
+
+def find_clips(audio: Optional[List[str]], work_dir: str, duration: float, seed: int) -> List[str]:
+    """Chọn các clip để đo: được chỉ định, trong fake_data, hoặc audio giả sinh theo seed"""
+    if audio:
+        return [str(Path(path).resolve()) for path in audio]
+    clips = sorted(str(path) for path in FAKE_DATA_DIR.glob('test_audio_*.wav'))
+    if clips:
+        return clips
+    return [synthesize_speech(os.path.join(work_dir, f"speech_{duration:g}s_seed{seed}.wav"), duration, seed)]
+
+
+def build_matrix(engines=ENGINES, models=MODELS, compute_types=COMPUTE_TYPES,
+                 beam_sizes=BEAM_SIZES, word_timestamps=WORD_TIMESTAMPS) -> List[Dict]:
+    """Tạo các ô của ma trận benchmark
+
+    openai_whisper chỉ chạy float32 trên CPU nên các compute_type khác của engine này bị bỏ qua.
+    """
+    cases = []
+    for engine, model, compute_type, beam_size, words in product(
+            engines, models, compute_types, beam_sizes, word_timestamps):
+        if engine == 'openai_whisper' and compute_type != 'float32':
+            continue
+        case = {'engine': engine, 'model': model, 'compute_type': compute_type,
+                'beam_size': beam_size, 'word_timestamps': words}
+        case['id'] = f"{engine}/{model}/{compute_type}/beam{beam_size}/{'words' if words else 'nowords'}"
+        cases.append(case)
+    return cases
+
+
+def peak_rss_mb() -> float:
+    """Bộ nhớ RSS cao nhất của tiến trình hiện tại (MB)"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả KB, macOS trả byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case: Dict, clips: List[str], repeats: int, warmup: int, threads: int) -> Dict:
+    """Đo một ô của ma trận trong tiến trình hiện tại (gọi từ tiến trình con)
+
+    Args:
+        case: Ô của ma trận (engine, model, compute_type, beam_size, word_timestamps)
+        clips: Các file audio
+        repeats: Số lần đo mỗi clip (lấy trung vị)
+        warmup: Số lần chạy làm nóng trên clip đầu tiên, không tính
+        threads: Số luồng CPU
+
+    Returns:
+        Các chỉ số của ô
+    """
+    import torch
+    torch.manual_seed(0)
+    torch.set_num_threads(threads)
+    from src.utils.transcription.processor_factory import TranscriptionProcessorFactory
+
+    # Model của openai-whisper trong processor là bản tiếng Anh (tiny.en, base.en)
+    model_name = case['model'] if case['engine'] == 'faster_whisper' else f"{case['model']}.en"
+    processor = TranscriptionProcessorFactory.create_processor(
+        case['engine'], model_name, device='cpu', compute_type=case['compute_type'],
+        beam_size=case['beam_size'], word_timestamps=case['word_timestamps']
+    )
+    start = time.perf_counter()
+    processor.load_model()
+    load_s = time.perf_counter() - start
+
+    for _ in range(warmup):
+        processor.transcribe_audio(clips[0])
+
+    durations = [audio_duration(clip) for clip in clips]
+    rtfs, first_segments, outputs = [], [], []
+    segments = 0
+    for _ in range(repeats):
+        elapsed = 0.0
+        texts = []
+        for clip in clips:
+            first = []
+            start = time.perf_counter()
+            result = processor.transcribe_audio(
+                clip, on_segment=lambda segment: first or first.append(time.perf_counter() - start))
+            clip_elapsed = time.perf_counter() - start
+            if result is None:
+                raise RuntimeError(f"Không tạo được phụ đề cho {clip}")
+            elapsed += clip_elapsed
+            # Không có segment nào thì coi như segment đầu tiên tới khi xong cả clip
+            first_segments.append(first[0] if first else clip_elapsed)
+            texts.append(' '.join(segment['text'].strip() for segment in result['segments']))
+            if not outputs:
+                segments += len(result['segments'])
+        rtfs.append(elapsed / sum(durations))
+        outputs.append(texts)
+
     return {
-        "model": model_size,
-        "success_rate": successful_runs / iterations if iterations > 0 else 0,
-        "avg_time": avg_time,
-        "max_gpu_memory": max_gpu_memory,
-        "max_cpu_memory": max_cpu_memory
+        'rtf': round(statistics.median(rtfs), 4),
+        'rtf_spread': round(max(rtfs) - min(rtfs), 4),
+        'load_s': round(load_s, 3),
+        'first_segment_s': round(statistics.median(first_segments), 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'segments': segments,
+        # Cùng model và cùng audio phải cho cùng văn bản; khác là dấu hiệu phép đo không tái lập
+        'output_sha1': hashlib.sha1('\n'.join(outputs[0]).encode('utf-8')).hexdigest()[:12],
+        'stable_output': all(texts == outputs[0] for texts in outputs),
     }
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="Benchmark Whisper models")
-    parser.add_argument("audio_path", help="Path to input audio file (WAV)")
-    parser.add_argument("--models", "-m", default="tiny,base,small", 
-                        help="Comma-separated list of models to test (tiny, base, small)")
-    parser.add_argument("--language", "-l", default="en", help="Language code (default: English)")
-    parser.add_argument("--iterations", "-i", type=int, default=1, help="Number of iterations for each model")
-    
-    args = parser.parse_args()
-    
-    # Verify input audio exists
-    if not os.path.exists(args.audio_path):
-        logger.error(f"Input audio file does not exist: {args.audio_path}")
-        exit(1)
-    
-    # Parse models
-    models = [model.strip() for model in args.models.split(',')]
-    
-    # Run benchmarks
-    results = []
-    for model in models:
-        # Extra cleanup before each model test
-        clear_gpu_memory()
-        gc.collect()
-        time.sleep(3)  # Give system more time to release resources
-        
-        result = benchmark_model(args.audio_path, model, args.language, args.iterations)
-        results.append(result)
-    
-    # Compare results
-    logger.info("\n===== Comparison =====")
-    logger.info(f"{'Model':<10} {'Success Rate':<15} {'Avg Time (s)':<15} {'Max GPU (MB)':<15} {'Max CPU (MB)':<15}")
-    for result in results:
-        logger.info(f"{result['model']:<10} {result['success_rate']*100:.1f}% {result['avg_time']:.2f} {result['max_gpu_memory']:.2f} {result['max_cpu_memory']:.2f}")
-    
-    # Recommend model based on performance, success rate and memory
-    successful_results = [r for r in results if r['success_rate'] > 0]
-    
-    logger.info("\n===== Recommendations =====")
-    if successful_results:
-        fastest = min(successful_results, key=lambda x: x['avg_time'])
-        lowest_memory = min(successful_results, key=lambda x: x['max_gpu_memory'] if x['max_gpu_memory'] > 0 else float('inf'))
-        
-        logger.info(f"Fastest model: {fastest['model']} ({fastest['avg_time']:.2f} seconds)")
-        if lowest_memory['max_gpu_memory'] > 0:
-            logger.info(f"Lowest memory usage: {lowest_memory['model']} ({lowest_memory['max_gpu_memory']:.2f} MB)")
-        else:
-            logger.info("CPU was used for all models, memory comparison not applicable")
-            
-        # Best balance of speed and accuracy
-        best_model = fastest
-        for model in successful_results:
-            # Prefer larger models with good speed
-            if model['model'] in ['base', 'small'] and model['avg_time'] < fastest['avg_time'] * 1.5:
-                best_model = model
-                break
-                
-        logger.info(f"Recommended model for your system: {best_model['model']} (Balance of accuracy and speed)")
-    else:
-        logger.warning("No models completed successfully. Try with the 'tiny' model only or check your CUDA setup.")
-        
-    logger.info("\nNote: If you're seeing CUDA memory errors, try these solutions:")
-    logger.info("1. Close other applications that might be using GPU memory")
-    logger.info("2. Set environment variable PYTORCH_CUDA_ALLOC_CONF=max_split_size_mb:16")
-    logger.info("3. If only CPU runs succeed, your GPU may not have enough VRAM for larger models")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+
+def run_case_subprocess(case: Dict, clips: List[str], args) -> Dict:
+    """Chạy một ô trong tiến trình con với số luồng CPU cố định"""
+    env = dict(os.environ, OMP_NUM_THREADS=str(args.threads), MKL_NUM_THREADS=str(args.threads),
+               CUDA_VISIBLE_DEVICES='', PYTHONHASHSEED='0')
+    command = [sys.executable, '-m', 'tests.test_performance', '--run-case', json.dumps(case),
+               '--repeats', str(args.repeats), '--warmup', str(args.warmup), '--threads', str(args.threads),
+               '--audio', *clips]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env, cwd=str(ROOT_DIR))
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {**case, 'error': (completed.stderr.strip().splitlines() or ['unknown error'])[-1]}
+    return {**case, **json.loads(lines[-1])}
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float = 0.15) -> List[str]:
+    """So kết quả với baseline theo từng ô của ma trận
+
+    Args:
+        result: Kết quả benchmark
+        baseline: Kết quả đã lưu làm baseline
+        tolerance: Mức tệ hơn tương đối cho phép (0.15 là 15%)
+
+    Returns:
+        Danh sách mô tả các chỉ số tệ hơn baseline quá ngưỡng (rỗng nếu không có)
+    """
+    previous = {case['id']: case for case in baseline.get('results', [])}
+    regressions = []
+    for case in result.get('results', []):
+        base = previous.get(case['id'])
+        if not base or 'error' in base:
+            continue
+        if 'error' in case:
+            regressions.append(f"{case['id']}: {case['error']}")
+            continue
+        for metric in METRICS:
+            new, old = case.get(metric), base.get(metric)
+            if new is not None and old is not None and new > old * (1 + tolerance):
+                regressions.append(f"{case['id']}.{metric}: {old} -> {new}")
+    return regressions
+
+
+def _split(value: str, cast=str) -> tuple:
+    return tuple(cast(item.strip()) for item in value.split(',') if item.strip())
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark tạo phụ đề trên CPU')
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--models', default=','.join(MODELS))
+    parser.add_argument('--compute-types', default=','.join(COMPUTE_TYPES))
+    parser.add_argument('--beam-sizes', default=','.join(map(str, BEAM_SIZES)))
+    parser.add_argument('--word-timestamps', default='off,on', help='off, on hoặc off,on')
+    parser.add_argument('--audio', nargs='*', help='Các file audio (mặc định: tests/fake_data hoặc audio giả)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Độ dài audio giả (giây)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=4, help='Số luồng CPU cố định cho mọi ô')
+    parser.add_argument('--repeats', type=int, default=3, help='Số lần đo mỗi clip (lấy trung vị)')
+    parser.add_argument('--warmup', type=int, default=1, help='Số lần chạy làm nóng không tính')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='File baseline để so sánh')
+    parser.add_argument('--save-baseline', action='store_true', help='Lưu kết quả làm baseline mới')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Mức tệ hơn tương đối cho phép')
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file (mặc định in ra màn hình)')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case), args.audio, args.repeats, args.warmup, args.threads)))
+        return 0
+
+    # Audio giả được sinh lại giống hệt theo seed nên chỉ cần lưu ở thư mục tạm
+    work_dir = Path(tempfile.gettempdir()) / "voicesub_benchmark"
+    clips = find_clips(args.audio, str(work_dir), args.duration, args.seed)
+    cases = build_matrix(
+        _split(args.engines), _split(args.models), _split(args.compute_types), _split(args.beam_sizes, int),
+        _split(args.word_timestamps, lambda value: value == 'on')
+    )
+    result = {
+        'config': {
+            'clips': [{'name': Path(clip).name, 'duration_s': round(audio_duration(clip), 2)} for clip in clips],
+            'threads': args.threads, 'repeats': args.repeats, 'warmup': args.warmup,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'results': [],
+    }
+    for case in cases:
+        print(f"Đang đo {case['id']}...", file=sys.stderr)
+        result['results'].append(run_case_subprocess(case, clips, args))
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"Đã lưu baseline vào {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Chưa có baseline {args.baseline}, chạy lại với --save-baseline để tạo", file=sys.stderr)
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('config') != result['config']:
+        print("Cấu hình (clip, số luồng, máy) khác baseline, bỏ qua so sánh", file=sys.stderr)
+        return 0
+    regressions = compare(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Tệ hơn baseline: {regression}", file=sys.stderr)
+    if not regressions:
+        print("Không có chỉ số nào tệ hơn baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def test_synthetic_speech_is_reproducible(tmp_path):
+    first = synthesize_speech(str(tmp_path / "a.wav"), duration=2.0, seed=3)
+    second = synthesize_speech(str(tmp_path / "b.wav"), duration=2.0, seed=3)
+    other = synthesize_speech(str(tmp_path / "c.wav"), duration=2.0, seed=4)
+
+    assert Path(first).read_bytes() == Path(second).read_bytes()
+    assert Path(first).read_bytes() != Path(other).read_bytes()
+    assert audio_duration(first) == 2.0
+
+
+def test_matrix_skips_compute_types_openai_whisper_cannot_run():
+    cases = build_matrix()
+    assert len(cases) == 2 * 2 * 2 * 2 + 2 * 2 * 2
+    assert {case['compute_type'] for case in cases if case['engine'] == 'openai_whisper'} == {'float32'}
+    assert len({case['id'] for case in cases}) == len(cases)
+
+
+def test_compare_reports_slower_cases_and_new_errors():
+    baseline = {'results': [
+        {'id': 'a', 'rtf': 0.2, 'load_s': 1.0, 'first_segment_s': 0.5, 'peak_rss_mb': 400},
+        {'id': 'b', 'rtf': 0.3, 'load_s': 1.0, 'first_segment_s': 0.5, 'peak_rss_mb': 400},
+    ]}
+    result = {'results': [
+        {'id': 'a', 'rtf': 0.25, 'load_s': 0.9, 'first_segment_s': 0.55, 'peak_rss_mb': 410},
+        {'id': 'b', 'error': 'MemoryError'},
+        {'id': 'c', 'rtf': 9.0},
+    ]}
+    assert compare(result, baseline) == ['a.rtf: 0.2 -> 0.25', 'b: MemoryError']
+
+
+@pytest.mark.skipif(os.getenv('RUN_TRANSCRIPTION_BENCHMARK') != '1',
+                    reason='Cần RUN_TRANSCRIPTION_BENCHMARK=1 (tải model Whisper)')
+def test_cpu_benchmark_measures_the_smallest_case(tmp_path):
+    pytest.importorskip('faster_whisper')
+    output = tmp_path / "result.json"
+    code = main(['--engines', 'faster_whisper', '--models', 'tiny', '--compute-types', 'int8',
+                 '--beam-sizes', '1', '--word-timestamps', 'off', '--repeats', '1', '--warmup', '0',
+                 '--duration', '5', '--baseline', str(tmp_path / "baseline.json"), '--output', str(output)])
+    assert code == 0
+    [case] = json.loads(output.read_text(encoding='utf-8'))['results']
+    assert 'error' not in case
+    assert case['rtf'] > 0 and case['load_s'] > 0 and case['peak_rss_mb'] > 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import pytest
+
+from src.api import provider_errors as errors
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "12"}, 12.0),
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"Retry-After": "Wed, 21 Oct 2015 07:28:10 GMT"}, 10.0),
+    ({"x-ratelimit-reset-requests": "6m0s", "x-ratelimit-remaining-requests": "0",
+      "x-ratelimit-reset-tokens": "250ms", "x-ratelimit-remaining-tokens": "900"}, 360.0),
+    ({"X-RateLimit-Reset": str(int((1445412480 + 30) * 1000))}, 30.0),
+    ({}, None),
+])
+def test_parse_retry_after(headers, expected):
+    now = 1445412480.0  # 21 Oct 2015 07:28:00 GMT
+    result = errors.parse_retry_after(headers, now=now)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("status, text, expected", [
+    (429, "Too Many Requests", errors.RateLimitedError),
+    (429, "You exceeded your current quota", errors.QuotaExhaustedError),
+    (402, "Payment required", errors.QuotaExhaustedError),
+    (400, "This model's maximum context length is 8192 tokens", errors.ContextTooLongError),
+    (413, "Payload too large", errors.ContextTooLongError),
+    (503, "Service unavailable", errors.TransientError),
+    (401, "Invalid API key", errors.FatalError),
+    (404, "Model not found", errors.FatalError),
+])
+def test_raise_for_status_classifies_errors(status, text, expected):
+    with pytest.raises(expected) as info:
+        errors.raise_for_status(FakeResponse(status, {"Retry-After": "7"}, text), "groq", "model-a")
+    assert info.value.status == status
+    assert info.value.retry_after == 7.0
+    assert info.value.provider == "groq"
+
+
+def test_cooldown_follows_server_and_fatal_scope():
+    rate_limited = errors.classify_http_error(429, "slow down", {"Retry-After": "3"})
+    assert rate_limited.cooldown == 3.0 and rate_limited.retryable
+
+    assert errors.classify_http_error(401, "unauthorized").scope == "provider"
+    assert errors.classify_http_error(404, "no such model").scope == "model"
+    assert not errors.classify_http_error(403, "forbidden").retryable
+
+
+def test_as_provider_error_reads_sdk_attributes_and_messages():
+    class APIStatusError(Exception):
+        status_code = 429
+        response = FakeResponse(429, {"retry-after": "2"})
+
+    class ResourceExhausted(Exception):
+        code = 429
+
+    class ReadTimeout(Exception):
+        pass
+
+    sdk_error = errors.as_provider_error(APIStatusError("Error code: 429"), "novita", "m")
+    assert isinstance(sdk_error, errors.RateLimitedError) and sdk_error.retry_after == 2.0
+
+    gemini_error = errors.as_provider_error(ResourceExhausted("Please retry in 38.5s."), "google")
+    assert isinstance(gemini_error, errors.RateLimitedError) and gemini_error.retry_after == 38.5
+
+    assert isinstance(errors.as_provider_error(ReadTimeout("read timed out")), errors.TransientError)
+    assert isinstance(errors.as_provider_error(Exception("429 Client Error")), errors.RateLimitedError)
@@ -0,0 +1,85 @@
+import os
+import time
+
+from src.api.model_ranker import ModelRanker
+from src.api.quota_ledger import QuotaLedger
+from src.utils.cache_manager import TranslationCacheManager
+
+
+class FakeBreaker:
+    def __init__(self):
+        self.tripped = []
+
+    def record_failure(self, provider, model=None, cooldown=None, trip=False, threshold=None):
+        self.tripped.append((provider, model, round(cooldown)))
+
+
+def test_windows_are_learned_from_headers_and_estimated_between_responses(tmp_path):
+    ledger = QuotaLedger(storage_path=str(tmp_path / "ledger.json"))
+    ledger.record_usage("groq", "model-a", tokens=100, headers={
+        "x-ratelimit-limit-requests": "1000",
+        "x-ratelimit-remaining-requests": "2",
+        "x-ratelimit-reset-requests": "2m0s",
+        "x-ratelimit-remaining-tokens": "5000",
+    })
+    assert ledger.remaining("groq", "model-a") == 2
+    assert ledger.remaining("groq", "model-a", kind="tokens") == 5000
+
+    ledger.record_usage("groq", "model-a", tokens=10)
+    ledger.record_usage("groq", "model-a", tokens=10)
+    assert ledger.remaining("groq", "model-a") == 0
+    assert ledger.is_exhausted("groq", "model-a")
+    assert not ledger.is_exhausted("groq", "model-b")
+    assert ledger.get_usage("groq") == {"requests": 3, "tokens": 120}
+
+
+def test_exhaustion_survives_restart_and_trips_circuits(tmp_path):
+    path = str(tmp_path / "ledger.json")
+    QuotaLedger(storage_path=path).mark_exhausted("google", retry_after=600)
+
+    reloaded = QuotaLedger(storage_path=path)
+    assert reloaded.is_exhausted("google", "gemini-2.0-flash")
+    assert reloaded.remaining("google") == 0
+
+    breaker = FakeBreaker()
+    assert reloaded.apply_to(breaker) == 1
+    assert breaker.tripped == [("google", None, 600)]
+
+
+def test_configured_daily_limit(tmp_path, monkeypatch):
+    monkeypatch.setenv("MISTRAL_DAILY_REQUESTS", "2")
+    ledger = QuotaLedger(storage_path=str(tmp_path / "ledger.json"))
+    ledger.record_usage("mistral", "model-a")
+    assert ledger.remaining("mistral") == 1
+
+    ledger.record_usage("mistral", "model-b")
+    assert ledger.remaining("mistral") == 0
+    assert 0 < ledger.exhausted_for("mistral") <= 86400
+
+
+def test_expired_window_is_restored(tmp_path):
+    ledger = QuotaLedger(storage_path=str(tmp_path / "ledger.json"))
+    ledger.record_usage("cerebras", headers={
+        "x-ratelimit-limit-requests-minute": "30",
+        "x-ratelimit-remaining-requests-minute": "0",
+        "x-ratelimit-reset-requests-minute": "0.05",
+    })
+    assert ledger.is_exhausted("cerebras")
+    time.sleep(0.06)
+    assert not ledger.is_exhausted("cerebras")
+    assert ledger.remaining("cerebras") == 30
+
+
+def test_exhaustion_survives_clearing_the_translation_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for name in ("QUOTA_LEDGER_FILE", "MODEL_RANKING_FILE", "SUBTITLE_TRANSLATOR_STATE_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    ledger = QuotaLedger()
+    ledger.mark_exhausted("google", retry_after=600)
+    assert os.path.dirname(ledger.storage_path) == os.path.dirname(ModelRanker().storage_path)
+
+    cache = TranslationCacheManager()
+    cache.clear_expired()
+    cache.clear()
+
+    assert QuotaLedger().is_exhausted("google")
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from src.api.retry_budget import Deadline, DeadlineExceeded, RetryBudget
+
+
+def test_budget_bounds_retries_across_blocks():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    deadlines = [Deadline(60, budget) for _ in range(4)]
+
+    # 1 + 0.5 * 4 = 3 lượt retry cho cả lần chạy
+    granted = [d.acquire_retry() for d in deadlines for _ in range(3)]
+    assert granted.count(True) == 3
+
+    stats = budget.get_stats()
+    assert stats['requests'] == 4
+    assert stats['retries'] == 3
+    assert stats['retries_denied'] == 9
+    assert stats['amplification'] == pytest.approx(7 / 4)
+
+
+def test_expired_deadline_blocks_retries_and_is_counted_once():
+    budget = RetryBudget(ratio=1.0, min_retries=10)
+    deadline = Deadline(0.01, budget)
+    assert deadline.can_retry()
+
+    time.sleep(0.02)
+    assert not deadline.acquire_retry()
+    assert not deadline.can_retry()
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+    assert budget.get_stats()['deadline_exceeded'] == 1
+
+
+def test_retry_forced_by_outer_layer_is_still_recorded():
+    budget = RetryBudget(ratio=0.0, min_retries=0)
+    deadline = Deadline(60, budget)
+    assert not deadline.acquire_retry()
+
+    deadline.record_retry()
+    assert deadline.retries == 1
+    assert budget.get_stats()['retries'] == 1
+
+
+def test_deferred_deadline_switches_models_but_never_waits():
+    budget = RetryBudget(ratio=1.0, min_retries=10)
+    deadline = Deadline(60, budget, defer_retries=True)
+
+    assert not deadline.can_retry()
+    assert deadline.acquire_retry()
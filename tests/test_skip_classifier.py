@@ -0,0 +1,58 @@
+import pytest
+
+from src.translator.skip_classifier import SkipClassifier
+
+
+@pytest.fixture
+def classifier():
+    return SkipClassifier()
+
+
+@pytest.mark.parametrize("text, reason, output", [
+    ("[Music]", "sound_tag", "[Âm nhạc]"),
+    ("(applause)", "sound_tag", "(Vỗ tay)"),
+    ("[Music] [Laughter]", "sound_tag", "[Âm nhạc] [Tiếng cười]"),
+    ("[door creaks]", "sound_tag", "[door creaks]"),
+    ("♪ ♪", "sound_tag", "♪ ♪"),
+    ("2024", "non_linguistic", "2024"),
+    ("3.14 %", "non_linguistic", "3.14 %"),
+    ("https://example.com/docs", "url", "https://example.com/docs"),
+    ("<i>[Music]</i>", "sound_tag", "<i>[Âm nhạc]</i>"),
+    ("def main():\n    return 0", "code", "def main():\n    return 0"),
+    ("const total = price * quantity;", "code", "const total = price * quantity;"),
+    ("$ git commit -m 'first'", "code", "$ git commit -m 'first'"),
+    ("result = compute(a, b)", "code", "result = compute(a, b)"),
+    ("Xin chào các bạn, hôm nay chúng ta học Python", "already_target", "Xin chào các bạn, hôm nay chúng ta học Python"),
+])
+def test_blocks_that_need_no_provider_call(classifier, text, reason, output):
+    assert classifier.check(text, "vi") == (reason, output)
+
+
+@pytest.mark.parametrize("text", [
+    "Hello everyone, today we learn Python",
+    "import this module first",
+    "return to the main menu",
+    "Hà Nội is the capital",
+    "OK",
+    "<i>Hello there my friend</i>",
+    "git is a version control system (VCS).",
+    "private keys must be kept secret (never share them)",
+    "SELECT the option you want (the first one)",
+    "Total = price times quantity",
+])
+def test_linguistic_blocks_in_other_languages_are_translated(classifier, text):
+    assert classifier.check(text, "vi") is None
+
+
+def test_target_language_check_follows_target(classifier):
+    english = "Now click on the Settings button and choose Network"
+    assert classifier.check(english, "en") == ("already_target", english)
+    assert classifier.check("こんにちは、今日はパイソンを勉強します", "ja")[0] == "already_target"
+    assert classifier.check("Xin chào các bạn, hôm nay chúng ta học Python", "en") is None
+
+
+def test_counters_report_avoided_calls(classifier):
+    for text in ("[Music]", "[Music]", "42", "Hello everyone, today we learn Python"):
+        classifier.check(text, "vi")
+
+    assert classifier.get_stats() == {"sound_tag": 2, "non_linguistic": 1}
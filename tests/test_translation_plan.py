@@ -0,0 +1,141 @@
+import types
+from pathlib import Path
+
+import pytest
+
+from src.core.entities.subtitle_block import SubtitleBlock
+from src.core.entities.translation_context import TranslationContext, TranslationMode
+from src.integration import TranslationFacade
+from src.translator import file_ordering, subtitle
+from src.translator.subtitle_processor import SubtitleProcessor
+from src.translator.translation_plan import TranslationPlan, SKIPPED, CACHED, TRANSLATE
+
+
+@pytest.fixture(autouse=True)
+def isolated_rankings(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_RANKING_FILE", str(tmp_path / "rankings.json"))
+
+
+class DictCache:
+    def __init__(self, data):
+        self.data = data
+        self.bulk_calls = 0
+
+    def generate_key(self, text, target_lang, service):
+        return f"{service}:{target_lang}:{text}"
+
+    def get(self, key):
+        raise AssertionError("plan must use the bulk lookup")
+
+    def contains_many(self, keys):
+        self.bulk_calls += 1
+        return {key for key in keys if key in self.data}
+
+
+def test_duplicates_across_files_are_translated_once():
+    plan = TranslationPlan("vi", ["novita"], max_workers=2, prompt_tokens=10)
+    first = plan.add_file("a.srt", [("Hello", TRANSLATE), ("Hello", TRANSLATE), ("Bye", CACHED), ("[Music]", SKIPPED)])
+    second = plan.add_file("b.srt", [("Hello", TRANSLATE), ("New line", TRANSLATE)])
+
+    assert (first.to_translate, first.duplicates, first.cached, first.skipped) == (1, 1, 1, 1)
+    assert (second.to_translate, second.duplicates) == (1, 1)
+    totals = plan.totals()
+    assert totals["requests"] == 2
+    assert totals["chars"] == len("Hello") + len("New line")
+    assert totals["input_tokens"] == 4 + 2 * 10
+    assert totals["output_tokens"] == 4
+
+
+def test_wall_time_is_bounded_by_latency_and_rate_limit():
+    plan = TranslationPlan("vi", ["novita", "groq"], max_workers=2, blocks_per_request=2, default_latency=3.0)
+    plan.add_file("a.srt", [(f"line {i}", TRANSLATE) for i in range(8)])
+
+    estimates = {estimate["provider"]: estimate for estimate in plan.provider_estimates()}
+
+    # 4 request: novita không giới hạn tốc độ, groq (free) cách nhau 2s
+    assert estimates["novita"]["seconds"] == pytest.approx(4 * 3.0 / 2)
+    assert estimates["groq"]["seconds"] == pytest.approx(4 * 2)
+    assert "groq" in plan.format_report()
+
+
+def test_plan_files_checks_cache_once_and_makes_no_calls(tmp_path):
+    files = []
+    for name, texts in (("a.srt", ["Hello", "[Music]", "Cached"]), ("b.srt", ["Hello", "Other"])):
+        path = tmp_path / name
+        path.write_text("\n\n".join(
+            f"{i}\n00:00:0{i},000 --> 00:00:0{i},900\n{text}" for i, text in enumerate(texts, 1)
+        ), encoding="utf-8")
+        files.append((str(path), str(tmp_path / f"out_{name}")))
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("plan must not call providers")
+
+    skip_classifier = types.SimpleNamespace(check=lambda text, lang: ("sound", text) if text == "[Music]" else None)
+    cache = DictCache({"novita:vi:Cached": "Đã dịch"})
+    translator = subtitle.SubtitleTranslator(
+        api_handler=types.SimpleNamespace(provider_priority=["novita", "groq"], providers={}, circuit_breaker=None),
+        cache_manager=cache,
+        translator_service=types.SimpleNamespace(skip_classifier=skip_classifier, translate_text=no_network),
+        subtitle_processor=SubtitleProcessor(),
+    )
+
+    plan = translator.plan_files(files, "vi", "novita", max_workers=2)
+
+    assert cache.bulk_calls == 1
+    assert plan.providers == ["novita", "groq"]
+    totals = plan.totals()
+    assert (totals["blocks"], totals["skipped"], totals["cached"], totals["duplicates"], totals["to_translate"]) == (5, 1, 1, 1, 2)
+    assert not any(Path(output).exists() for _, output in files)
+
+
+def test_plan_and_file_ordering_classify_blocks_the_same_way(tmp_path):
+    path = tmp_path / "a.srt"
+    path.write_text("1\n00:00:01,000 --> 00:00:01,900\nHello\n\n2\n00:00:02,000 --> 00:00:02,900\n[Music]\n\n"
+                    "3\n00:00:03,000 --> 00:00:03,900\nCached\n\n4\n00:00:04,000 --> 00:00:04,900\nNew\n\n"
+                    "5\nbroken block", encoding="utf-8")
+    skip_classifier = types.SimpleNamespace(check=lambda text, lang: ("sound", text) if text == "[Music]" else None)
+    translator = subtitle.SubtitleTranslator(
+        api_handler=types.SimpleNamespace(provider_priority=["novita"], providers={}, circuit_breaker=None),
+        cache_manager=DictCache({"novita:vi:Cached": "Đã dịch"}),
+        translator_service=types.SimpleNamespace(skip_classifier=skip_classifier),
+        subtitle_processor=SubtitleProcessor(),
+    )
+    files = [(str(path), str(tmp_path / "out.srt"))]
+
+    totals = translator.plan_files(files, "vi", "novita").totals()
+    [cost] = file_ordering.estimate_file_costs(translator, files, "vi", "novita")
+
+    assert (cost.blocks, cost.uncached) == (totals["blocks"], totals["to_translate"]) == (5, 2)
+    assert cost.chars == totals["chars"]
+    # Block hỏng không bị tính là "không cần dịch"
+    assert (totals["skipped"], totals["unparseable"], totals["cached"]) == (1, 1, 1)
+    assert "Không phân tách được (sẽ bị đánh dấu lỗi): 1 block" in translator.plan_files(files, "vi", "novita").format_report()
+
+
+class FakeProviderService:
+    def __init__(self):
+        self.provider_names = []
+
+    def translate_text(self, text, target_lang, provider_name=None):
+        self.provider_names.append(provider_name)
+        return "Đã dịch"
+
+
+def test_facade_plan_without_provider_uses_the_translate_path_cache_keys(tmp_path):
+    path = tmp_path / "a.srt"
+    path.write_text("1\n00:00:01,000 --> 00:00:01,900\nHello\n\n2\n00:00:02,000 --> 00:00:02,900\nBye",
+                    encoding="utf-8")
+    facade = TranslationFacade(cache_dir=str(tmp_path / "cache"))
+
+    # Dịch như luồng thật khi không chọn provider: strategy lưu cache với provider 'auto'
+    provider_service = FakeProviderService()
+    context = TranslationContext(target_language="vi", mode=TranslationMode.CONTEXT_AWARE, max_workers=1)
+    blocks = SubtitleBlock.parse_srt_content(path.read_text(encoding="utf-8"))
+    assert all(facade.strategies["context_aware"].translate_blocks(blocks, context, provider_service))
+    assert set(provider_service.provider_names) == {None}
+
+    plan = facade.plan_subtitle_files([str(path)], "vi", provider=None, max_workers=1)
+
+    assert plan.providers == ["auto"]
+    totals = plan.totals()
+    assert (totals["cached"], totals["to_translate"]) == (2, 0)